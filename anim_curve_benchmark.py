@@ -0,0 +1,157 @@
+'''
+anim_curve_benchmark.py
+
+Animation curve reading speed of the exporter on a full Biped rig plus cameras: the animation
+curve API reader (anim_curves.read_curves) against the command reader it replaced
+(anim_curves.read_curves_commands). Every settable keyable channel of the rig controls and the
+cameras is keyed, then both readers read the bind joints, controls and cameras, like
+AnimExporter.animation_export. Both must return the same curves.
+
+Run:
+mayapy -m adv_scripting.anim_curve_benchmark --frames 200 --cameras 4
+python -m adv_scripting.anim_curve_benchmark --fake-maya
+'''
+import argparse
+import logging
+import math
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+READERS = ('api', 'commands')
+
+
+# SCENE ================================================================
+
+def key_channels(nodes, frames, key_step):
+    '''
+    Key every settable keyable scalar channel of nodes with a sine wave.
+
+    Returns number of keyed channels
+    '''
+    import maya.cmds as cmds
+    channels = 0
+    for node_index, node in enumerate(nodes):
+        for attribute in cmds.listAttr(node, keyable=True, scalar=True) or []:
+            plug = f'{node}.{attribute}'
+            if not cmds.getAttr(plug, settable=True):
+                continue
+            for frame in range(0, frames + 1, key_step):
+                value = math.sin(frame * 0.1 + node_index + channels * 0.01) * 10.0
+                cmds.setKeyframe(node, at=attribute, t=frame, v=value)
+            channels += 1
+    return channels
+
+
+def build_scene(frames=100, key_step=4, cameras=2):
+    '''
+    New scene with a keyed Biped rig and keyed cameras.
+
+    Returns list of the nodes the exporter reads: bind joints, controls, cameras and their shapes
+    '''
+    import maya.cmds as cmds
+    import adv_scripting.utilities as utils
+    import adv_scripting.rig.biped as biped
+    import adv_scripting.rig.settings as rig_settings
+    import adv_scripting.rig.skeleton_generator as skeleton_generator
+    import adv_scripting.rig.control_registry as control_registry
+
+    cmds.file(new=True, force=True)
+    skeleton = skeleton_generator.biped()
+    settings = rig_settings.BipedSettings(asset_name='benchmark', **skeleton.settings)
+    rig = biped.Biped(settings.asset_name, settings)
+    controls = control_registry.get_controls(rig.rig_grp)
+    camera_nodes = list()
+    for index in range(cameras):
+        camera = cmds.createNode('transform', name=f'benchmark_cam_{index:02}')
+        camera_nodes.append(camera)
+        camera_nodes.append(cmds.createNode('camera', name=f'{camera}Shape', parent=camera))
+    channels = key_channels(controls + camera_nodes, frames, key_step)
+    joints = list(utils.read_hierarchy(skeleton.root_joint).keys())
+    logger.info(f'Keyed {channels} channels on {len(controls)} controls and {cameras} cameras')
+    return joints + controls + camera_nodes
+
+
+# RUN ==================================================================
+
+def curve_key(curve):
+    return (curve['node'].rpartition('|')[2], curve['attribute'])
+
+
+def time_reader(reader, nodes, repeat=3):
+    '''
+    Returns (fastest seconds, curves)
+    '''
+    best = None
+    curves = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        curves = reader(nodes)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, curves
+
+
+def run(frames=100, key_step=4, cameras=2, repeat=3):
+    '''
+    Returns dict of reader -> dict with channels, keys, seconds and channels_per_second
+    '''
+    import adv_scripting.anim_curves as anim_curves
+    nodes = build_scene(frames, key_step, cameras)
+    readers = {'api': anim_curves.read_curves, 'commands': anim_curves.read_curves_commands}
+    results = dict()
+    curves = dict()
+    for name in READERS:
+        seconds, read = time_reader(readers[name], nodes, repeat)
+        curves[name] = {curve_key(curve): curve for curve in read}
+        keys = sum(len(curve['times']) for curve in read)
+        results[name] = {'channels': len(read), 'keys': keys, 'seconds': seconds,
+                         'channels_per_second': len(read) / seconds if seconds else 0.0}
+    for key, curve in curves['commands'].items():
+        other = curves['api'].get(key)
+        if other is None or any(other[field] != curve[field] for field in
+                                ('times', 'values', 'itt', 'ott')):
+            raise RuntimeError(f'Curve readers differ on {key[0]}.{key[1]}')
+    return results
+
+
+def format_results(results):
+    lines = [f"{'reader':<10}{'channels':>10}{'keys':>10}{'seconds':>10}{'channels/s':>14}"]
+    for name, result in results.items():
+        lines.append(f"{name:<10}{result['channels']:>10}{result['keys']:>10}"
+                     f"{result['seconds']:>10.3f}{result['channels_per_second']:>14.0f}")
+    if results['api']['seconds']:
+        lines.append(f"speedup: {results['commands']['seconds'] / results['api']['seconds']:.1f}x")
+    return '\n'.join(lines)
+
+
+# MAIN =================================================================
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmark animation curve reading.')
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--key-step', type=int, default=4, help='Frames between keys')
+    parser.add_argument('--cameras', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fake-maya', action='store_true',
+                        help='Run on the in-memory fake Maya engine instead of mayapy')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if args.fake_maya:
+        import adv_scripting.fake_maya as fake_maya
+        fake_maya.install()
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+
+    results = run(args.frames, args.key_step, args.cameras, args.repeat)
+    print(format_results(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
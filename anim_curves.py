@@ -0,0 +1,276 @@
+'''
+anim_curves.py
+
+Read the animation curves of nodes into curve dicts (see curve_format.py) through the animation
+curve API. The animCurve nodes driving the nodes are found with one connection query, then every
+key of a curve is read with MFnAnimCurve in a single pass; no per attribute command queries.
+
+read_curves_commands is the command based reader the exporter used before: listAnimatable, then
+three keyframe and six keyTangent queries per animated attribute. It is kept for comparison,
+see anim_curve_benchmark.py.
+
+write_curves keys curve dicts back the same way: the animCurve of each attribute is reused or
+created, all its keys are added with one MFnAnimCurve.addKeys call, then the tangents are set by
+key index. write_curves_commands is the setKeyframe / keyTangent per key importer it replaced,
+see import_benchmark.py.
+
+e.g.
+import adv_scripting.anim_curves as anim_curves
+curves = anim_curves.read_curves(['root_ctrl', 'shot_cam', 'shot_camShape'])
+anim_curves.write_curves(curves)
+'''
+import logging
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+import adv_scripting.curve_format as curve_format
+
+logger = logging.getLogger(__name__)
+
+# Decimals kept for key values, as in the exported files
+VALUE_PRECISION = 5
+# MFnAnimCurve tangent type -> keyTangent name
+TANGENT_TYPES = {oma.MFnAnimCurve.kTangentGlobal: 'global',
+                 oma.MFnAnimCurve.kTangentFixed: 'fixed',
+                 oma.MFnAnimCurve.kTangentLinear: 'linear',
+                 oma.MFnAnimCurve.kTangentFlat: 'flat',
+                 oma.MFnAnimCurve.kTangentSmooth: 'spline',
+                 oma.MFnAnimCurve.kTangentStep: 'step',
+                 oma.MFnAnimCurve.kTangentSlow: 'slow',
+                 oma.MFnAnimCurve.kTangentFast: 'fast',
+                 oma.MFnAnimCurve.kTangentClamped: 'clamped',
+                 oma.MFnAnimCurve.kTangentPlateau: 'plateau',
+                 oma.MFnAnimCurve.kTangentStepNext: 'stepnext',
+                 oma.MFnAnimCurve.kTangentAuto: 'auto'}
+# keyTangent name -> MFnAnimCurve tangent type
+TANGENT_NAMES = {name: tangent_type for tangent_type, name in TANGENT_TYPES.items()}
+# Tangents whose angle is not set, a fixed angle would unstep them
+STEP_TANGENTS = ('step', 'stepnext')
+# Curves keyed on time. Driven keys (animCurveU*) are not read.
+TIME_CURVE_TYPES = (oma.MFnAnimCurve.kAnimCurveTA, oma.MFnAnimCurve.kAnimCurveTL,
+                    oma.MFnAnimCurve.kAnimCurveTT, oma.MFnAnimCurve.kAnimCurveTU)
+
+
+# API READER ===========================================================
+
+def find_curves(nodes):
+    '''
+    animCurve nodes connected to the attributes of nodes, in one query.
+
+    Returns list of (node, attribute, animCurve name)
+    '''
+    if not nodes:
+        return list()
+    connections = cmds.listConnections(list(nodes), source=True, destination=False,
+                                       type='animCurve', connections=True, plugs=True) or []
+    result = list()
+    for plug, curve_plug in zip(connections[::2], connections[1::2]):
+        node, _, attribute = plug.rpartition('.')
+        result.append((node, attribute, curve_plug.rpartition('.')[0]))
+    return result
+
+
+def unit_scales():
+    '''
+    Returns (linear, angular, time unit): factors from internal units to UI units, UI time unit
+    '''
+    linear = om.MDistance(1.0, om.MDistance.kCentimeters).asUnits(om.MDistance.uiUnit())
+    angular = om.MAngle(1.0, om.MAngle.kRadians).asUnits(om.MAngle.uiUnit())
+    return linear, angular, om.MTime.uiUnit()
+
+
+def read_curve(fn, curve, scales, get_tangents=True):
+    '''
+    Fill the key lists of a curve dict from an MFnAnimCurve, in UI units like keyframe and
+    keyTangent return them.
+    '''
+    linear, angular, time_unit = scales
+    curve_type = fn.animCurveType
+    scale = angular if curve_type == oma.MFnAnimCurve.kAnimCurveTA else \
+        linear if curve_type == oma.MFnAnimCurve.kAnimCurveTL else 1.0
+    times = curve['times']
+    values = curve['values']
+    for index in range(fn.numKeys):
+        times.append(fn.input(index).asUnits(time_unit))
+        values.append(round(fn.value(index) * scale, VALUE_PRECISION))
+        if not get_tangents:
+            continue
+        curve['itt'].append(TANGENT_TYPES.get(fn.inTangentType(index), 'auto'))
+        curve['ott'].append(TANGENT_TYPES.get(fn.outTangentType(index), 'auto'))
+        in_angle, in_weight = fn.getTangentAngleWeight(index, True)
+        out_angle, out_weight = fn.getTangentAngleWeight(index, False)
+        curve['ia'].append(in_angle.asDegrees())
+        curve['oa'].append(out_angle.asDegrees())
+        curve['iw'].append(in_weight)
+        curve['ow'].append(out_weight)
+    return curve
+
+
+def read_curves(nodes, get_tangents=True):
+    '''
+    Arguments
+    nodes (list): node names
+    get_tangents (bool): also read tangent types, angles and weights
+
+    Returns list of curve dicts, one per animated attribute
+    '''
+    return list(iter_curves(nodes, get_tangents))
+
+
+def iter_curves(nodes, get_tangents=True):
+    '''
+    Read curves one at a time, ordered by node and attribute like curve_format.make_data, so
+    they can be written as they are read without holding them all.
+
+    Yields curve dicts
+    '''
+    found = sorted(find_curves(nodes))
+    if not found:
+        return
+    selection = om.MSelectionList()
+    for _, _, curve_name in found:
+        selection.add(curve_name)
+    scales = unit_scales()
+    fn = oma.MFnAnimCurve()
+    for index, (node, attribute, _) in enumerate(found):
+        fn.setObject(selection.getDependNode(index))
+        if fn.animCurveType not in TIME_CURVE_TYPES:
+            continue
+        yield read_curve(fn, curve_format.new_curve(node, attribute), scales, get_tangents)
+
+
+# API WRITER ===========================================================
+
+def find_plugs(curves):
+    '''
+    Returns list of MPlug per curve dict
+    '''
+    selection = om.MSelectionList()
+    nodes = dict()
+    for curve in curves:
+        if curve['node'] not in nodes:
+            nodes[curve['node']] = len(nodes)
+            selection.add(curve['node'])
+    plugs = list()
+    for curve in curves:
+        fn = om.MFnDependencyNode(selection.getDependNode(nodes[curve['node']]))
+        plugs.append(fn.findPlug(curve['attribute'], False))
+    return plugs
+
+
+def curve_object(plug, modifier=None):
+    '''
+    Returns the animCurve driving plug, a new one if the plug is not animated, None if the plug
+    is driven by something else. A curve created with a modifier is connected by its doIt().
+    '''
+    source = plug.source()
+    if not source.isNull:
+        return source.node() if source.node().hasFn(om.MFn.kAnimCurve) else None
+    return oma.MFnAnimCurve().create(plug, modifier=modifier)
+
+
+def write_tangents(fn, curve, indices, change=None):
+    '''
+    Set the tangent types, angles and weights of a curve dict on the keys at indices.
+    '''
+    for index, itt, ott, iw, ow, ia, oa in zip(indices, *(curve[field] for field in
+                                                           curve_format.TANGENT_FIELDS)):
+        fn.setInTangentType(index, TANGENT_NAMES.get(itt, oma.MFnAnimCurve.kTangentAuto), change)
+        fn.setOutTangentType(index, TANGENT_NAMES.get(ott, oma.MFnAnimCurve.kTangentAuto),
+                             change)
+        if itt not in STEP_TANGENTS:
+            fn.setTangent(index, om.MAngle(ia, om.MAngle.kDegrees), iw, True, change)
+        if ott not in STEP_TANGENTS:
+            fn.setTangent(index, om.MAngle(oa, om.MAngle.kDegrees), ow, False, change)
+
+
+def write_curves(curves, change=None, modifier=None):
+    '''
+    Arguments
+    curves (list): curve dicts (see curve_format.py) in UI units, tangent lists may be empty
+    change (MAnimCurveChange/None): records the key edits so they can be undone
+    modifier (MDGModifier/None): creates and connects the new animCurve nodes (doIt() is called
+        here), records them so they can be undone
+
+    Returns number of keys written
+    '''
+    curves = [curve for curve in curves if curve['times']]
+    if not curves:
+        return 0
+    linear, angular, time_unit = unit_scales()
+    targets = list()
+    for curve, plug in zip(curves, find_plugs(curves)):
+        curve_node = curve_object(plug, modifier)
+        if curve_node is None:
+            logger.warning(f"{curve['node']}.{curve['attribute']} is driven, keys not written")
+            continue
+        targets.append((curve, curve_node))
+    if modifier is not None:
+        # Connect the new curves before keying them
+        modifier.doIt()
+
+    fn = oma.MFnAnimCurve()
+    count = 0
+    for curve, curve_node in targets:
+        fn.setObject(curve_node)
+        curve_type = fn.animCurveType
+        scale = angular if curve_type == oma.MFnAnimCurve.kAnimCurveTA else \
+            linear if curve_type == oma.MFnAnimCurve.kAnimCurveTL else 1.0
+        existing = fn.numKeys
+        times = om.MTimeArray([om.MTime(time, time_unit) for time in curve['times']])
+        fn.addKeys(times, om.MDoubleArray([value / scale for value in curve['values']]),
+                   keepExistingKeys=True, change=change)
+        count += len(times)
+        if not curve['itt']:
+            continue
+        # Keys of a new curve are in time order, merged keys are looked up
+        indices = range(len(times)) if not existing else [fn.find(time) for time in times]
+        write_tangents(fn, curve, indices, change)
+    return count
+
+
+# COMMANDS =============================================================
+
+def read_curves_commands(nodes, get_tangents=True):
+    '''
+    Same result as read_curves with cmds queries per attribute.
+    '''
+    curves = list()
+    for node in nodes:
+        node_long = cmds.ls(node, long=True)[0]
+        for plug in cmds.listAnimatable(node) or []:
+            num_keys = cmds.keyframe(plug, q=True, kc=True)
+            if not num_keys:
+                continue
+            plug_node, _, attribute = plug.rpartition('.')
+            curve = curve_format.new_curve(node if plug_node == node_long else plug_node,
+                                           attribute)
+            curve['times'] = cmds.keyframe(plug, q=True, tc=True)
+            curve['values'] = [round(value, VALUE_PRECISION)
+                               for value in cmds.keyframe(plug, q=True, vc=True)]
+            if get_tangents:
+                for field in curve_format.TANGENT_FIELDS:
+                    curve[field] = cmds.keyTangent(plug, q=True, **{field: True})
+            curves.append(curve)
+    return curves
+
+
+def write_curves_commands(curves):
+    '''
+    Same result as write_curves with a setKeyframe and a keyTangent command per key.
+
+    Returns number of keys written
+    '''
+    count = 0
+    for curve in curves:
+        node = curve['node']
+        attribute = curve['attribute']
+        for frame, value, tangent in curve_format.keys(curve):
+            cmds.setKeyframe(node, at=attribute, t=frame, v=value)
+            if tangent:
+                cmds.keyTangent(node, e=True, at=attribute, t=(frame, frame), a=True,
+                    itt=tangent['itt'], ott=tangent['ott'],
+                    iw=tangent['iw'], ow=tangent['ow'],
+                    ia=tangent['ia'], oa=tangent['oa'])
+            count += 1
+    return count
@@ -0,0 +1,95 @@
+'''
+anim_undo.py
+
+Puts API animation edits on Maya's undo queue. Keys set with MFnAnimCurve (recorded in an
+MAnimCurveChange) and nodes created with an MDGModifier are not undoable by themselves, so
+Ctrl+Z would skip them. commit() hands them to the undoable advAnimEdit command of this plugin,
+which reverts them in undoIt() and replays them in redoIt(). The plugin is loaded on first use.
+
+import adv_scripting.anim_undo as anim_undo
+change, modifier = oma.MAnimCurveChange(), om.MDGModifier()
+anim_curves.write_curves(curves, change, modifier)
+anim_undo.commit(change, modifier)
+'''
+import logging
+import os
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+logger = logging.getLogger(__name__)
+
+COMMAND_NAME = 'advAnimEdit'
+# (MAnimCurveChange, MDGModifier) edits handed to the next advAnimEdit command
+_pending = list()
+
+
+def maya_useNewAPI():
+    pass
+
+
+# COMMAND ==============================================================
+
+class AnimEditCommand(om.MPxCommand):
+    '''
+    Holds edits that are already done, undoIt() and redoIt() revert and replay them.
+    '''
+    def __init__(self):
+        om.MPxCommand.__init__(self)
+        self.change = None
+        self.modifier = None
+
+    @staticmethod
+    def creator():
+        return AnimEditCommand()
+
+    def doIt(self, args):
+        # Maya loads the plugin file as a module of its own, commit() queues on the package one
+        import adv_scripting.anim_undo as anim_undo
+        if anim_undo._pending:
+            self.change, self.modifier = anim_undo._pending.pop(0)
+
+    def isUndoable(self):
+        return self.change is not None
+
+    def undoIt(self):
+        self.change.undoIt()
+        self.modifier.undoIt()
+
+    def redoIt(self):
+        self.modifier.doIt()
+        self.change.redoIt()
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin, 'adv_scripting').registerCommand(COMMAND_NAME, AnimEditCommand.creator)
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
+
+
+# COMMIT ===============================================================
+
+def load():
+    '''
+    Load this file as a plugin, if its command is not registered yet.
+    '''
+    if not hasattr(cmds, COMMAND_NAME):
+        logger.debug(f'Loading plugin {__file__}')
+        cmds.loadPlugin(os.path.abspath(__file__), quiet=True)
+
+
+def commit(change, modifier):
+    '''
+    Put done edits on Maya's undo queue, as one advAnimEdit command.
+
+    Arguments
+    change (MAnimCurveChange): key edits
+    modifier (MDGModifier): node edits, doIt() already called
+    '''
+    load()
+    _pending.append((change, modifier))
+    try:
+        getattr(cmds, COMMAND_NAME)()
+    finally:
+        _pending.clear()
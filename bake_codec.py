@@ -0,0 +1,121 @@
+'''
+bake_codec.py
+
+Compression of baked channels for the compressed bake file (see bake_format.CompressedBakeWriter).
+A block of frames x channels float values is encoded one channel (column) at a time:
+    1. quantize: the channel range of the block is split into 2^bits - 1 levels, codes are
+       uint16; the last code marks NaN (channels missing on a node). With a channel tolerance
+       the levels are at most twice the tolerance apart, coarser levels compress better.
+    2. delta: codes are replaced by their differences along time, delta=2 differences twice
+       (delta of delta), in uint16 arithmetic so decoding is exact
+    3. shuffle: low bytes of all codes, then high bytes, so smooth channels give long runs
+    4. compress: zlib, lzma or none
+
+The error of a decoded value is at most half a quantization step, within the tolerance. encode_block measures the
+exact error of every channel against the values it was given.
+
+e.g.
+import adv_scripting.bake_codec as bake_codec
+block = bake_codec.encode_block(values, bits=16, delta=2, compressor='zlib')
+column = bake_codec.decode_column(block['blobs'][0], len(values), block['minimum'][0],
+                                  block['step'][0], bits=16, delta=2, compressor='zlib')
+'''
+import logging
+import lzma
+import zlib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COMPRESSORS = {'zlib': (lambda data: zlib.compress(data, 9), zlib.decompress),
+               'lzma': (lzma.compress, lzma.decompress),
+               'none': (bytes, bytes)}
+BITS = range(2, 17)
+DELTAS = (0, 1, 2)
+
+
+def check(bits, delta, compressor):
+    if bits not in BITS:
+        raise ValueError(f'Unsupported quantization of {bits} bits, use 2 to 16.')
+    if delta not in DELTAS:
+        raise ValueError(f'Unsupported delta order {delta}, use one of {DELTAS}.')
+    if compressor not in COMPRESSORS:
+        raise ValueError(f"Unknown compressor '{compressor}', use one of {tuple(COMPRESSORS)}.")
+
+
+# QUANTIZE =============================================================
+
+def quantize(values, bits=16, tolerances=None):
+    '''
+    Arguments
+    values (array): frames x channels
+    tolerances (array/None): max error per channel, levels are spaced by at least twice the
+        tolerance unless that needs more than 2^bits - 1 levels
+
+    Returns (codes uint16 frames x channels, minimum, step) per channel
+    '''
+    nan_code = (1 << bits) - 1
+    nan = np.isnan(values)
+    minimum = np.where(nan, np.inf, values).min(axis=0, initial=np.inf)
+    maximum = np.where(nan, -np.inf, values).max(axis=0, initial=-np.inf)
+    missing = ~np.isfinite(minimum) # NaN on every frame
+    minimum = np.where(missing, 0.0, minimum)
+    maximum = np.where(missing, 0.0, maximum)
+    step = (maximum - minimum) / (nan_code - 1)
+    if tolerances is not None:
+        step = np.maximum(step, 2.0 * np.asarray(tolerances, dtype=float))
+    scaled = (values - minimum) / np.where(step > 0, step, 1.0)
+    codes = np.where(nan, nan_code, np.clip(np.rint(scaled), 0, nan_code - 1))
+    return codes.astype(np.uint16), minimum, step
+
+
+def dequantize(codes, minimum, step, bits=16):
+    values = minimum + codes * step
+    return np.where(codes == (1 << bits) - 1, np.nan, values)
+
+
+# DELTA ================================================================
+
+def delta_encode(codes, order):
+    for _ in range(order):
+        codes = np.diff(codes, axis=0, prepend=np.zeros_like(codes[:1]))
+    return codes
+
+
+def delta_decode(codes, order):
+    for _ in range(order):
+        codes = np.cumsum(codes, axis=0, dtype=np.uint16)
+    return codes
+
+
+# BLOCKS ===============================================================
+
+def encode_block(values, bits=16, delta=2, compressor='zlib', tolerances=None):
+    '''
+    Arguments
+    values (array like): frames x channels
+    tolerances (array like/None): max error per channel, see quantize
+
+    Returns dict with 'blobs' (bytes per channel), 'minimum', 'step' and 'error' (max absolute
+    error of the decoded values per channel) arrays
+    '''
+    check(bits, delta, compressor)
+    values = np.asarray(values, dtype=float)
+    codes, minimum, step = quantize(values, bits, tolerances)
+    difference = np.abs(dequantize(codes, minimum, step, bits) - values)
+    error = np.where(np.isnan(difference), 0.0, difference).max(axis=0, initial=0.0)
+    encoded = delta_encode(codes, delta).astype('<u2')
+    compress = COMPRESSORS[compressor][0]
+    blobs = [compress(np.ascontiguousarray(encoded[:, column]).view(np.uint8)
+                      .reshape(-1, 2).T.tobytes())
+             for column in range(values.shape[1])]
+    return {'blobs': blobs, 'minimum': minimum, 'step': step, 'error': error}
+
+
+def decode_column(blob, count, minimum, step, bits=16, delta=2, compressor='zlib'):
+    '''
+    Returns array of count decoded values
+    '''
+    data = np.frombuffer(COMPRESSORS[compressor][1](blob), dtype=np.uint8)
+    codes = data.reshape(2, count).T.copy().view('<u2').reshape(count)
+    return dequantize(delta_decode(codes, delta), minimum, step, bits)
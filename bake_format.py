@@ -0,0 +1,573 @@
+'''
+bake_format.py
+
+Columnar binary file for baked animation: one frames x nodes x channels array of float32 or
+float64 values with a name table. The array is read through a memory map, so any node, channel
+or frame slice is read from disk without loading or parsing the rest of the file.
+
+Layout:
+    MAGIC (8 bytes)
+    header length (uint32, little endian)
+    header (UTF-8 JSON): version, dtype, shape, frames, nodes, channels, data_offset
+    padding up to data_offset (a multiple of ALIGNMENT)
+    values (C order, little endian)
+
+Channels missing on a node (e.g. no scale on a camera) are NaN.
+
+Compressed layout (version COMPRESSED_VERSION, written by CompressedBakeWriter) for network
+storage. Every channel of every node is a column, encoded in blocks of frames with
+bake_codec.py (range quantization, delta or delta of delta along time, zlib or lzma):
+    MAGIC (8 bytes)
+    header length (uint32, little endian)
+    header (UTF-8 JSON): version, encoding (bits, delta, compressor), shape, frames, nodes,
+        channels, blocks ([first frame index, frame count] per block), max_error (max absolute
+        error per channel name), data_offset, tolerances (if given)
+    errors (float64 per column): exact max absolute error of every column
+    block index (INDEX_DTYPE per block and column): blob offset from data_offset, blob size,
+        quantization minimum and step
+    padding up to data_offset
+    blobs
+BakeFile decodes a column only when it is read.
+
+The header only needs the names, so BakeWriter streams the values in frame chunks as they are
+sampled; the file is the same as a one-shot write(). JsonBakeWriter does the same for the JSON
+debug bake.
+
+e.g.
+import adv_scripting.bake_format as bake_format
+bake_format.write(path, frames, nodes, channels, values)
+bake = bake_format.BakeFile(path)
+bake.channel('lt_upper_arm_proxy_jnt_01', 'rotateX') # values over all frames
+bake.to_frame_dict(nodes=['root_proxy_jnt'], frames=(10, 20))
+
+with bake_format.BakeWriter(path, frames, nodes, channels) as writer:
+    for start in range(0, len(frames), 100):
+        writer.write(values[start:start + 100]) # or sampled chunk by chunk
+
+with bake_format.CompressedBakeWriter(path, frames, nodes, channels, bits=16, delta=2) as writer:
+    writer.write(values)
+'''
+import json
+import logging
+import math
+import os
+import shutil
+import struct
+import numpy as np
+import adv_scripting.bake_codec as bake_codec
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'ADVBAKE\x00'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DTYPES = ('float32', 'float64')
+COMPRESSED_VERSION = 2
+# Frames encoded together per column in the compressed layout
+BLOCK_FRAMES = 1024
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('size', '<u4'), ('minimum', '<f8'), ('step', '<f8')])
+_LENGTH = struct.Struct('<I')
+
+
+# WRITE ================================================================
+
+def data_offset(header_size):
+    offset = len(MAGIC) + _LENGTH.size + header_size
+    return int(math.ceil(offset / ALIGNMENT) * ALIGNMENT)
+
+
+def make_header(frames, nodes, channels, dtype):
+    '''
+    Header dict, data_offset is where the values start.
+    '''
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported bake dtype '{dtype}', use one of {DTYPES}.")
+    header = {'version': FORMAT_VERSION,
+              'dtype': dtype,
+              'shape': [len(frames), len(nodes), len(channels)],
+              'frames': [float(frame) for frame in frames],
+              'nodes': list(nodes),
+              'channels': list(channels),
+              'data_offset': 0}
+    # Offset digits change the header size, so settle it in two passes
+    for _ in range(2):
+        header['data_offset'] = data_offset(len(json.dumps(header).encode('utf-8')))
+    return header
+
+
+def write_header(f, header):
+    encoded = json.dumps(header).encode('utf-8')
+    f.write(MAGIC)
+    f.write(_LENGTH.pack(len(encoded)))
+    f.write(encoded)
+    f.write(b'\x00' * (header['data_offset'] - f.tell()))
+
+
+def write(path, frames, nodes, channels, values, dtype='float32'):
+    '''
+    Arguments
+    path (str): file to write
+    frames (float list): frame numbers
+    nodes (str list): node names
+    channels (str list): attribute names, e.g. ['translateX', ...]
+    values (array like): frames x nodes x channels
+    dtype (str): 'float32' or 'float64'
+
+    Returns path
+    '''
+    values = np.asarray(values)
+    expected = (len(frames), len(nodes), len(channels))
+    if values.shape != expected:
+        raise ValueError(f'Bake values have shape {values.shape}, expected {expected}.')
+    with BakeWriter(path, frames, nodes, channels, dtype) as writer:
+        writer.write(values)
+    return path
+
+
+class BakeWriter():
+    '''
+    Write a bake file in frame chunks. The header is written on open, each write() appends the
+    values of the next frames, so only one chunk is in memory at a time. The file is removed
+    if the writer is left with an exception or without all frames.
+
+    Arguments
+    path (str): file to write
+    frames (float list): all frame numbers of the file
+    nodes (str list): node names
+    channels (str list): attribute names
+    dtype (str): 'float32' or 'float64'
+    '''
+    def __init__(self, path, frames, nodes, channels, dtype='float32'):
+        self.path = path
+        self.header = make_header(frames, nodes, channels, dtype)
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.shape = tuple(self.header['shape'])
+        self.frames_written = 0
+        self.file = open(path, 'wb')
+        write_header(self.file, self.header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+            os.remove(self.path)
+
+    def write(self, values):
+        '''
+        Arguments
+        values (array like): chunk frames x nodes x channels, the frames after the last chunk
+        '''
+        values = np.asarray(values, dtype=self.dtype)
+        if values.ndim != 3 or values.shape[1:] != self.shape[1:] or \
+                self.frames_written + len(values) > self.shape[0]:
+            raise ValueError(f'Bake chunk of shape {values.shape} does not fit frames '
+                             f'{self.frames_written}+ of {self.shape}.')
+        self.file.write(np.ascontiguousarray(values).tobytes())
+        self.frames_written += len(values)
+
+    def close(self):
+        self.file.close()
+        if self.frames_written != self.shape[0]:
+            os.remove(self.path)
+            raise ValueError(f'{self.path} has {self.frames_written} of {self.shape[0]} frames.')
+        logger.debug(f'Wrote bake {self.path}: {self.shape[0]} frames, {self.shape[1]} nodes, '
+                     f'{self.shape[2]} channels')
+
+
+class JsonBakeWriter():
+    '''
+    Write the JSON bake layout (see frame_dict) in frame chunks. The file is the same as
+    json.dump(frame_dict(...), f, indent=4) of all frames.
+
+    Arguments
+    path (str): file to write
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w')
+        self.frames_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def write(self, frames, nodes, channels, values):
+        '''
+        Arguments
+        values (array like): chunk frames x nodes x channels of frames
+        '''
+        for frame, frame_data in frame_dict(frames, nodes, channels, values).items():
+            # Indented entry without the braces of its one key dict
+            entry = json.dumps({frame: frame_data}, indent=4)[2:-2]
+            self.file.write((',\n' if self.frames_written else '{\n') + entry)
+            self.frames_written += 1
+
+    def close(self):
+        self.file.write('\n}' if self.frames_written else '{}')
+        self.file.close()
+
+
+class CompressedBakeWriter():
+    '''
+    Write a compressed bake file (COMPRESSED_VERSION) in frame chunks. Values are encoded in
+    blocks of block_frames whatever the chunk sizes, so the file does not depend on how the
+    values were chunked. Encoded blocks go to a temporary file next to path until close()
+    writes the header with the block index and error bounds in front of them.
+
+    Arguments
+    path (str): file to write
+    frames (float list): all frame numbers of the file
+    nodes (str list): node names
+    channels (str list): attribute names
+    bits (int): quantization bits, 2 to 16
+    delta (int): 0 stores the codes, 1 their differences, 2 the differences of differences
+    compressor (str): 'zlib', 'lzma' or 'none'
+    block_frames (int): frames per encoded block
+    tolerances (float list/float/None): max error per channel name, quantization levels are
+        spaced by twice the tolerance where the bits allow. Only limited by bits if None.
+    '''
+    def __init__(self, path, frames, nodes, channels, bits=16, delta=2, compressor='zlib',
+                 block_frames=BLOCK_FRAMES, tolerances=None):
+        bake_codec.check(bits, delta, compressor)
+        self.path = path
+        self.encoding = {'bits': bits, 'delta': delta, 'compressor': compressor}
+        self.frames = [float(frame) for frame in frames]
+        self.nodes = list(nodes)
+        self.channels = list(channels)
+        self.shape = (len(self.frames), len(self.nodes), len(self.channels))
+        self.block_frames = max(1, block_frames)
+        self.tolerances = None
+        if tolerances is not None:
+            # Per column, node major
+            self.tolerances = np.tile(np.broadcast_to(np.asarray(tolerances, dtype=float),
+                                                      (len(self.channels),)), len(self.nodes))
+        self.blocks = list()
+        self.index = list()
+        self.errors = np.zeros(self.shape[1] * self.shape[2])
+        self.pending = list()
+        self.frames_written = 0
+        self.size = 0
+        self.blob_path = f'{path}.blocks'
+        self.blob_file = open(self.blob_path, 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.blob_file.close()
+            os.remove(self.blob_path)
+
+    def write(self, values):
+        '''
+        Arguments
+        values (array like): chunk frames x nodes x channels, the frames after the last chunk
+        '''
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 3 or values.shape[1:] != self.shape[1:] or \
+                self.frames_written + len(values) > self.shape[0]:
+            raise ValueError(f'Bake chunk of shape {values.shape} does not fit frames '
+                             f'{self.frames_written}+ of {self.shape}.')
+        self.pending.append(values.reshape(len(values), -1))
+        self.frames_written += len(values)
+        while sum(len(chunk) for chunk in self.pending) >= self.block_frames:
+            self.encode(self.block_frames)
+
+    def encode(self, count):
+        pending = np.concatenate(self.pending)
+        self.pending = [pending[count:]] if count < len(pending) else list()
+        block = bake_codec.encode_block(pending[:count], tolerances=self.tolerances,
+                                        **self.encoding)
+        index = np.zeros(len(block['blobs']), dtype=INDEX_DTYPE)
+        index['minimum'] = block['minimum']
+        index['step'] = block['step']
+        for column, blob in enumerate(block['blobs']):
+            index[column]['offset'] = self.size
+            index[column]['size'] = len(blob)
+            self.blob_file.write(blob)
+            self.size += len(blob)
+        first = self.blocks[-1][0] + self.blocks[-1][1] if self.blocks else 0
+        self.blocks.append([first, count])
+        self.index.append(index)
+        self.errors = np.maximum(self.errors, block['error'])
+
+    def make_header(self):
+        errors = self.errors.reshape(self.shape[1:])
+        max_error = {channel: float(errors[:, index].max(initial=0.0))
+                     for index, channel in enumerate(self.channels)}
+        header = {'version': COMPRESSED_VERSION,
+                  'encoding': self.encoding,
+                  'shape': list(self.shape),
+                  'frames': self.frames,
+                  'nodes': self.nodes,
+                  'channels': self.channels,
+                  'blocks': self.blocks,
+                  'max_error': max_error,
+                  'data_offset': 0}
+        if self.tolerances is not None:
+            header['tolerances'] = dict(zip(self.channels,
+                                            self.tolerances[:len(self.channels)].tolist()))
+        index_size = self.errors.nbytes + len(self.blocks) * self.errors.size * INDEX_DTYPE.itemsize
+        for _ in range(2):
+            header['data_offset'] = data_offset(len(json.dumps(header).encode('utf-8')) +
+                                                index_size)
+        return header
+
+    def close(self):
+        remaining = sum(len(chunk) for chunk in self.pending)
+        if remaining:
+            self.encode(remaining)
+        self.blob_file.close()
+        if self.frames_written != self.shape[0]:
+            os.remove(self.blob_path)
+            raise ValueError(f'{self.path} has {self.frames_written} of {self.shape[0]} frames.')
+        header = self.make_header()
+        encoded = json.dumps(header).encode('utf-8')
+        with open(self.path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_LENGTH.pack(len(encoded)))
+            f.write(encoded)
+            f.write(self.errors.astype('<f8').tobytes())
+            for index in self.index:
+                f.write(index.tobytes())
+            f.write(b'\x00' * (header['data_offset'] - f.tell()))
+            with open(self.blob_path, 'rb') as blobs:
+                shutil.copyfileobj(blobs, f)
+        os.remove(self.blob_path)
+        raw_size = self.shape[0] * self.shape[1] * self.shape[2] * 4
+        logger.debug(f'Wrote compressed bake {self.path}: {self.shape} in {self.size} bytes '
+                     f'({raw_size / max(1, self.size):.1f}x smaller than float32)')
+
+
+# CONVERSION ===========================================================
+
+def from_frame_dict(data):
+    '''
+    Arrays from the JSON bake layout data[frame][node][channel] = value.
+
+    Returns (frames, nodes, channels, values), values is a float64 frames x nodes x channels
+    array with NaN for missing channels
+    '''
+    frames = sorted(data, key=float)
+    nodes = list()
+    channels = list()
+    for frame in frames:
+        for node, attributes in data[frame].items():
+            nodes.append(node)
+            channels.extend(attributes)
+    nodes = list(dict.fromkeys(nodes))
+    channels = list(dict.fromkeys(channels))
+    node_index = {node: index for index, node in enumerate(nodes)}
+    channel_index = {channel: index for index, channel in enumerate(channels)}
+    values = np.full((len(frames), len(nodes), len(channels)), np.nan)
+    for frame_index, frame in enumerate(frames):
+        for node, attributes in data[frame].items():
+            for channel, value in attributes.items():
+                values[frame_index, node_index[node], channel_index[channel]] = value
+    return [float(frame) for frame in frames], nodes, channels, values
+
+
+def frame_dict(frames, nodes, channels, values):
+    '''
+    JSON bake layout data[frame][node][channel] = value of a frames x nodes x channels array,
+    NaN values are left out.
+    '''
+    data = dict()
+    values = np.asarray(values, dtype=float)
+    for frame, frame_values in zip(frames, values):
+        frame_data = data[frame] = dict()
+        for node, node_values in zip(nodes, frame_values.tolist()):
+            frame_data[node] = {channel: round(value, 5)
+                                for channel, value in zip(channels, node_values)
+                                if not math.isnan(value)}
+    return data
+
+
+# READ =================================================================
+
+def frame_slice(frames, start=None, end=None):
+    '''
+    Slice of the indices of sorted frames in [start, end].
+    '''
+    frames = np.asarray(frames, dtype=float)
+    first = 0 if start is None else int(np.searchsorted(frames, start - 1e-6, 'left'))
+    last = len(frames) if end is None else int(np.searchsorted(frames, end + 1e-6, 'right'))
+    return slice(first, last)
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'{path} is not a bake file.')
+        length, = _LENGTH.unpack(f.read(_LENGTH.size))
+        header = json.loads(f.read(length).decode('utf-8'))
+    if header.get('version') not in (FORMAT_VERSION, COMPRESSED_VERSION):
+        raise ValueError(f"{path} has bake format version {header.get('version')}, "
+                         f"expected {FORMAT_VERSION} or {COMPRESSED_VERSION}.")
+    return header
+
+
+def is_bake_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class BakeFile():
+    '''
+    Read access to a bake file. Values are memory mapped on first use. In compressed files
+    only the blocks of the columns read are decoded, and kept.
+
+    Arguments
+    path (str): bake file
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.header = read_header(path)
+        self.frames = self.header['frames']
+        self.nodes = self.header['nodes']
+        self.channels = self.header['channels']
+        self.node_index = {node: index for index, node in enumerate(self.nodes)}
+        self.channel_index = {channel: index for index, channel in enumerate(self.channels)}
+        self.compressed = self.header['version'] == COMPRESSED_VERSION
+        # Max absolute error per node and channel of compressed files, None if not compressed
+        self.errors = None
+        self._index = None
+        self._blocks = dict()
+        self._values = None
+        if self.compressed:
+            self.read_index()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}('{self.path}')"
+
+    def read_index(self):
+        shape = self.header['shape']
+        columns = shape[1] * shape[2]
+        with open(self.path, 'rb') as f:
+            f.seek(len(MAGIC))
+            length, = _LENGTH.unpack(f.read(_LENGTH.size))
+            f.seek(length, 1)
+            self.errors = np.frombuffer(f.read(columns * 8), dtype='<f8').reshape(shape[1:])
+            self._index = np.frombuffer(
+                f.read(len(self.header['blocks']) * columns * INDEX_DTYPE.itemsize),
+                dtype=INDEX_DTYPE).reshape(len(self.header['blocks']), columns)
+
+    def decode_block(self, column, block):
+        key = (column, block)
+        if key not in self._blocks:
+            entry = self._index[block, column]
+            with open(self.path, 'rb') as f:
+                f.seek(self.header['data_offset'] + int(entry['offset']))
+                blob = f.read(int(entry['size']))
+            self._blocks[key] = bake_codec.decode_column(
+                blob, self.header['blocks'][block][1], entry['minimum'], entry['step'],
+                **self.header['encoding'])
+        return self._blocks[key]
+
+    def column(self, node_index, channel_index, frames=slice(None)):
+        '''
+        Returns array of a column over a slice of frame indices
+        '''
+        if not self.compressed:
+            return self.values[frames, node_index, channel_index]
+        start, stop, _ = frames.indices(len(self.frames))
+        column = node_index * len(self.channels) + channel_index
+        parts = [np.zeros(0)]
+        for block, (first, count) in enumerate(self.header['blocks']):
+            if first < stop and first + count > start:
+                parts.append(self.decode_block(column, block)[max(start - first, 0):stop - first])
+        return np.concatenate(parts)
+
+    @property
+    def values(self):
+        '''
+        Memory mapped frames x nodes x channels array, decoded in full for compressed files.
+        '''
+        if self._values is None:
+            shape = tuple(self.header['shape'])
+            if self.compressed:
+                self._values = np.empty(shape)
+                for node_index in range(shape[1]):
+                    for channel_index in range(shape[2]):
+                        self._values[:, node_index, channel_index] = \
+                            self.column(node_index, channel_index)
+                return self._values
+            dtype = np.dtype(self.header['dtype']).newbyteorder('<')
+            if 0 in shape:
+                self._values = np.zeros(shape, dtype=dtype)
+            else:
+                self._values = np.memmap(self.path, dtype=dtype, mode='r',
+                                         offset=self.header['data_offset'], shape=shape)
+        return self._values
+
+    def close(self):
+        # Drop the memory map so the file can be replaced (needed on Windows)
+        self._values = None
+        self._blocks = dict()
+
+    def frame_range(self, start=None, end=None):
+        '''
+        Slice of frame indices for frames in [start, end].
+        '''
+        return frame_slice(self.frames, start, end)
+
+    def node_values(self, node_index, frames=slice(None)):
+        if not self.compressed:
+            return self.values[frames, node_index, :]
+        return np.stack([self.column(node_index, channel_index, frames)
+                         for channel_index in range(len(self.channels))], axis=-1)
+
+    def node(self, node, start=None, end=None):
+        '''
+        Returns frames x channels array of a node
+        '''
+        return self.node_values(self.node_index[node], self.frame_range(start, end))
+
+    def channel(self, node, channel, start=None, end=None):
+        '''
+        Returns array of a node channel over frames
+        '''
+        return self.column(self.node_index[node], self.channel_index[channel],
+                           self.frame_range(start, end))
+
+    def frame(self, frame):
+        '''
+        Returns nodes x channels array at a frame
+        '''
+        frames = self.frame_range(frame, frame)
+        if frames.start == frames.stop:
+            raise KeyError(f'{self.path} has no frame {frame}')
+        if not self.compressed:
+            return self.values[frames.start]
+        return np.stack([self.node_values(node_index, frames)[0]
+                         for node_index in range(len(self.nodes))])
+
+    def to_frame_dict(self, nodes=None, frames=None):
+        '''
+        JSON bake layout data[frame][node][channel] = value, for debugging and older tools.
+
+        Arguments
+        nodes (str list/None): only these nodes
+        frames (tuple/None): only frames in (start, end)
+        '''
+        nodes = self.nodes if nodes is None else nodes
+        selected = self.frame_range(*(frames or (None, None)))
+        values = np.zeros((len(self.frames[selected]), 0, len(self.channels)))
+        if nodes:
+            values = np.stack([self.node_values(self.node_index[node], selected)
+                               for node in nodes], axis=1)
+        return frame_dict(self.frames[selected], nodes, self.channels, values)
@@ -0,0 +1,172 @@
+'''
+bake_sampler.py
+
+Constraint-free bake of joint transforms. The world and parent inverse matrices of every node are
+evaluated at each frame in a time context (MDGContext), so the current time is not changed and
+nothing is created in the scene. Samples are written into preallocated NumPy arrays:
+    world (frames x nodes x 4 x 4): world matrix
+    local (frames x nodes x 4 x 4): world matrix relative to the parent, offsetParentMatrix included
+    values (frames x nodes x CHANNELS): translate, rotate (degrees) and scale of local, the
+        rotation without the joint orient, i.e. the values a proxy joint constrained to the node
+        and baked would get
+
+e.g.
+import adv_scripting.bake_sampler as bake_sampler
+samples = bake_sampler.sample(['root_bnd_jnt', 'spine_bnd_jnt_01'], range(1, 121))
+samples['values'][:, 0, 3] # rotateX of root_bnd_jnt at every frame
+'''
+import logging
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ('translateX', 'translateY', 'translateZ',
+            'rotateX', 'rotateY', 'rotateZ',
+            'scaleX', 'scaleY', 'scaleZ')
+# rotateOrder enum -> axes in the order they are applied
+ROTATE_ORDERS = ((0, 1, 2), (1, 2, 0), (2, 0, 1), (0, 2, 1), (1, 0, 2), (2, 1, 0))
+
+
+# ROTATIONS ============================================================
+
+def axis_rotations(angles, axis):
+    '''
+    Row vector rotation matrices about one axis.
+
+    Arguments
+    angles (array): radians, any shape
+
+    Returns array of angles.shape x 3 x 3
+    '''
+    cos = np.cos(angles)
+    sin = np.sin(angles)
+    matrices = np.zeros(np.shape(angles) + (3, 3))
+    i, j = (axis + 1) % 3, (axis + 2) % 3
+    matrices[..., axis, axis] = 1.0
+    matrices[..., i, i] = cos
+    matrices[..., j, j] = cos
+    matrices[..., i, j] = sin
+    matrices[..., j, i] = -sin
+    return matrices
+
+
+def euler_to_matrix(angles, order=0):
+    '''
+    Arguments
+    angles (array): ... x 3 radians
+    order (int): rotateOrder
+
+    Returns array of ... x 3 x 3
+    '''
+    angles = np.asarray(angles, dtype=float)
+    first, second, third = ROTATE_ORDERS[order]
+    return (axis_rotations(angles[..., first], first) @
+            axis_rotations(angles[..., second], second) @
+            axis_rotations(angles[..., third], third))
+
+
+def matrix_to_euler(matrices, order=0):
+    '''
+    Euler angles of row vector rotation matrices, inverse of euler_to_matrix.
+
+    Arguments
+    matrices (array): ... x 3 x 3 orthonormal
+
+    Returns array of ... x 3 radians
+    '''
+    i, j, k = ROTATE_ORDERS[order]
+    # Odd permutations of the axes flip the signs
+    sign = 1.0 if (i, j, k) in ROTATE_ORDERS[:3] else -1.0
+    angles = np.empty(matrices.shape[:-2] + (3,))
+    angles[..., j] = np.arcsin(np.clip(-sign * matrices[..., i, k], -1.0, 1.0))
+    angles[..., i] = np.arctan2(sign * matrices[..., j, k], matrices[..., k, k])
+    angles[..., k] = np.arctan2(sign * matrices[..., i, j], matrices[..., i, i])
+    return angles
+
+
+# SAMPLING =============================================================
+
+def matrix_plugs(nodes):
+    '''
+    Returns list of (worldMatrix[0], parentInverseMatrix[0]) plugs per node
+    '''
+    selection = om.MSelectionList()
+    for node in nodes:
+        selection.add(node)
+    plugs = list()
+    for index in range(len(nodes)):
+        fn = om.MFnDependencyNode(selection.getDependNode(index))
+        plugs.append((fn.findPlug('worldMatrix', False).elementByLogicalIndex(0),
+                      fn.findPlug('parentInverseMatrix', False).elementByLogicalIndex(0)))
+    return plugs
+
+
+def sample_matrices(nodes, frames):
+    '''
+    Returns (world, parent_inverse) arrays of frames x nodes x 4 x 4
+    '''
+    plugs = matrix_plugs(nodes)
+    world = np.empty((len(frames), len(nodes), 4, 4))
+    parent_inverse = np.empty((len(frames), len(nodes), 4, 4))
+    time_unit = om.MTime.uiUnit()
+    for frame_index, frame in enumerate(frames):
+        context = om.MDGContext(om.MTime(frame, time_unit))
+        previous = context.makeCurrent()
+        try:
+            for node_index, (world_plug, parent_plug) in enumerate(plugs):
+                world[frame_index, node_index].flat = \
+                    om.MFnMatrixData(world_plug.asMObject()).matrix()
+                parent_inverse[frame_index, node_index].flat = \
+                    om.MFnMatrixData(parent_plug.asMObject()).matrix()
+        finally:
+            previous.makeCurrent()
+    return world, parent_inverse
+
+
+def local_channels(local, joint_orients, rotate_orders):
+    '''
+    Arguments
+    local (array): frames x nodes x 4 x 4
+    joint_orients (array): nodes x 3 degrees, zero for transforms
+    rotate_orders (list): rotateOrder per node
+
+    Returns array of frames x nodes x CHANNELS
+    '''
+    channels = np.empty(local.shape[:2] + (len(CHANNELS),))
+    channels[..., 0:3] = local[..., 3, :3]
+    scale = np.linalg.norm(local[..., :3, :3], axis=-1)
+    channels[..., 6:9] = scale
+    rotation = local[..., :3, :3] / np.where(scale > 1e-12, scale, 1.0)[..., None]
+    # Joint matrices rotate by rotate then joint orient, remove the orient
+    orient = euler_to_matrix(np.radians(joint_orients))
+    rotation = rotation @ np.swapaxes(orient, -1, -2)
+    for order in set(rotate_orders):
+        columns = [index for index, node_order in enumerate(rotate_orders) if node_order == order]
+        channels[:, columns, 3:6] = np.degrees(matrix_to_euler(rotation[:, columns], order))
+    return channels
+
+
+def sample(nodes, frames):
+    '''
+    Arguments
+    nodes (list): transforms or joints
+    frames (list): frame numbers
+
+    Returns dict with 'frames', 'nodes', 'channels' (CHANNELS) and the arrays 'world', 'local'
+    and 'values' (frames x nodes x channels)
+    '''
+    frames = list(frames)
+    nodes = list(nodes)
+    joint_orients = np.zeros((len(nodes), 3))
+    rotate_orders = list()
+    for index, node in enumerate(nodes):
+        if cmds.objectType(node, isAType='joint'):
+            joint_orients[index] = cmds.getAttr(f'{node}.jointOrient')[0]
+        rotate_orders.append(cmds.getAttr(f'{node}.rotateOrder'))
+    world, parent_inverse = sample_matrices(nodes, frames)
+    local = world @ parent_inverse
+    logger.debug(f'Sampled {len(nodes)} nodes over {len(frames)} frames')
+    return {'frames': frames, 'nodes': nodes, 'channels': list(CHANNELS), 'world': world,
+            'local': local, 'values': local_channels(local, joint_orients, rotate_orders)}
@@ -0,0 +1,369 @@
+'''
+bake_shards.py
+
+Frame-sharded parallel bake. [start_frame, end_frame] is split into shards; each shard is sampled
+by a headless worker interpreter (mayapy) that opens the same scene file and runs
+bake_sampler.sample on its frames. Shard results are merged in frame order, so the merged arrays
+are the same whatever order the workers finish in, and the same as sampling in one process.
+
+For long ranges, iter_chunks() streams the bake: the workers are started once for the whole
+range and sample their shard chunk_size frames at a time, saving each chunk as they go. The
+chunks are yielded in frame order and deleted once read.
+
+Ranges shorter than min_shard_frames per worker, or a single worker, are sampled in process.
+Workers sample the file on disk, use saved_scene() for the scene file so a scene with unsaved
+changes is sampled in process. Workers send back only the arrays the caller asks for (default
+'values', 9 floats per node and frame; 'world' and 'local' add 32).
+
+Run a bake on its own:
+mayapy -m adv_scripting.bake_shards scene.ma --nodes root_bnd_jnt spine_bnd_jnt_01 --start 1 --end 2000 --workers 4 --output bake.bin
+
+Workers run with --mayapy (default: MAYAPY environment variable, else the current interpreter).
+Extra --python-path directories are put in front of the worker PYTHONPATH, e.g. a directory with
+a stand-in maya package for tests.
+'''
+import argparse
+import importlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Directory containing the adv_scripting package, needed on the worker PYTHONPATH
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+DEFAULT_SAMPLER = 'adv_scripting.bake_sampler:sample'
+# Arrays of a sample merged over shards, all frames first
+ARRAY_KEYS = ('values', 'world', 'local')
+# Arrays the workers send back by default
+DEFAULT_ARRAYS = ('values',)
+MIN_SHARD_FRAMES = 50
+POLL_INTERVAL = 0.05
+
+
+# SHARDS ===============================================================
+
+def split_frames(frames, shards):
+    '''
+    Split frames into at most shards contiguous runs of near equal length.
+
+    Returns list of frame lists
+    '''
+    frames = list(frames)
+    shards = max(1, min(shards, len(frames)))
+    size, extra = divmod(len(frames), shards)
+    result = list()
+    start = 0
+    for index in range(shards):
+        end = start + size + (1 if index < extra else 0)
+        result.append(frames[start:end])
+        start = end
+    return [shard for shard in result if shard]
+
+
+def merge(samples):
+    '''
+    Merge shard samples in shard order.
+
+    Returns sample dict like bake_sampler.sample
+    '''
+    first = samples[0]
+    merged = {'frames': [frame for sample in samples for frame in sample['frames']],
+              'nodes': first['nodes'], 'channels': first['channels']}
+    for key in ARRAY_KEYS:
+        if all(key in sample for sample in samples):
+            merged[key] = np.concatenate([sample[key] for sample in samples])
+    return merged
+
+
+def saved_scene():
+    '''
+    Scene file for the workers to open: the current scene when it is saved and has no unsaved
+    changes, else None (the workers would sample a stale file).
+    '''
+    import maya.cmds as cmds
+    scene_file = cmds.file(q=True, sceneName=True)
+    if not scene_file or cmds.file(q=True, modified=True):
+        return None
+    return scene_file
+
+
+def import_sampler(sampler):
+    '''
+    Arguments
+    sampler (str): 'module:function'
+    '''
+    module_name, function_name = sampler.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+# WORKER ===============================================================
+
+def chunk_path(job, index):
+    return f"{job['output_prefix']}_{index:04}.npz"
+
+
+def write_chunk(path, sample, arrays):
+    '''
+    Save the arrays of a chunk sample, renamed into place once complete so the controller never
+    reads a partial file.
+    '''
+    partial = path + '.partial'
+    with open(partial, 'wb') as f:
+        np.savez(f, channels=np.array(sample['channels']),
+                 **{key: sample[key] for key in arrays if key in sample})
+    os.replace(partial, path)
+
+
+def run_worker(job_path):
+    '''
+    Worker entry point. Opens the scene once and samples its shard chunk_frames at a time,
+    saving every chunk as soon as it is sampled.
+
+    Returns process exit code
+    '''
+    with open(job_path, 'r') as f:
+        job = json.load(f)
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+    logger.info(f"Sampling shard {job['shard']}: frames {job['frames'][0]}-{job['frames'][-1]}")
+    result = {'shard': job['shard']}
+    timer = time.perf_counter()
+    try:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+        import maya.cmds as cmds
+        cmds.file(job['scene_file'], open=True, force=True)
+        sampler = import_sampler(job['sampler'])
+        for index, frames in enumerate(chunk_frames(job['frames'], job['chunk_frames'])):
+            sample = sampler(job['nodes'], frames)
+            write_chunk(chunk_path(job, index), sample, job.get('arrays', ARRAY_KEYS))
+        result.update(status='success', frames=job['frames'], nodes=sample['nodes'],
+                      channels=sample['channels'])
+    except Exception:
+        logger.error(traceback.format_exc())
+        result['status'] = 'failed'
+        result['error'] = traceback.format_exc().strip().splitlines()[-1]
+    result['seconds'] = time.perf_counter() - timer
+    with open(job['result_file'], 'w') as f:
+        json.dump(result, f)
+    return 0 if result['status'] == 'success' else 1
+
+
+def chunk_frames(frames, size):
+    '''
+    Returns list of consecutive frame lists of at most size frames, all frames if size is None
+    '''
+    frames = list(frames)
+    size = max(1, size or len(frames))
+    return [frames[start:start + size] for start in range(0, len(frames), size)]
+
+
+# CONTROLLER ===========================================================
+
+class ShardedBake():
+    '''
+    Arguments
+    scene_file (str): saved scene the workers open
+    workers (int): number of worker processes, also the number of shards
+    min_shard_frames (int): sample in process when a shard would have fewer frames
+    timeout (float): seconds before a worker is killed and the bake fails
+    interpreter (str/None): worker executable, MAYAPY environment variable or sys.executable if None
+    python_path (str list): directories put in front of the worker PYTHONPATH
+    sampler (str): 'module:function' sampling (nodes, frames), see bake_sampler.sample
+    work_dir (str/None): job, log and shard files, a temporary directory removed afterwards if None
+    arrays (str list): sample arrays the workers send back, of ARRAY_KEYS
+    '''
+    def __init__(self, scene_file, workers=2, min_shard_frames=MIN_SHARD_FRAMES, timeout=3600,
+                 interpreter=None, python_path=(), sampler=DEFAULT_SAMPLER, work_dir=None,
+                 arrays=DEFAULT_ARRAYS):
+        self.scene_file = scene_file
+        self.workers = max(1, workers)
+        self.min_shard_frames = min_shard_frames
+        self.timeout = timeout
+        self.interpreter = interpreter or os.environ.get('MAYAPY') or sys.executable
+        self.python_path = [os.path.abspath(path) for path in python_path]
+        self.sampler = sampler
+        self.work_dir = work_dir
+        self.arrays = list(arrays)
+        self.shard_seconds = list()
+        self.workers_started = 0
+
+    def shard_count(self, frame_count):
+        return max(1, min(self.workers, frame_count // max(1, self.min_shard_frames)))
+
+    def sample(self, nodes, frames):
+        '''
+        Returns sample dict like bake_sampler.sample
+        '''
+        return merge(list(self.iter_chunks(nodes, frames)))
+
+    def iter_chunks(self, nodes, frames, chunk_size=None):
+        '''
+        Sample frames in chunks. One worker per shard samples the whole shard, opening the scene
+        once, and saves a chunk at a time. Chunks are read back and removed in frame order while
+        the workers go on, so memory holds one chunk whatever the frame range.
+
+        Arguments
+        chunk_size (int/None): frames per chunk, a whole shard if None
+
+        Yields sample dicts like bake_sampler.sample of consecutive frame chunks
+        '''
+        frames = list(frames)
+        shards = split_frames(frames, self.shard_count(len(frames)))
+        if len(shards) > 1 and not self.scene_file:
+            logger.warning('Scene is not saved, workers cannot open it. Sampling in process.')
+        if len(shards) < 2 or not self.scene_file:
+            logger.debug(f'Sampling {len(frames)} frames in process')
+            sampler = import_sampler(self.sampler)
+            for chunk in chunk_frames(frames, chunk_size):
+                yield sampler(nodes, chunk)
+            return
+        work_dir = self.work_dir or tempfile.mkdtemp(prefix='bake_shards_')
+        os.makedirs(work_dir, exist_ok=True)
+        try:
+            yield from self.run(list(nodes), shards, chunk_size, work_dir)
+        finally:
+            if self.work_dir is None:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    def worker_env(self):
+        env = dict(os.environ)
+        paths = self.python_path + [ROOT_DIR]
+        if env.get('PYTHONPATH'):
+            paths.append(env['PYTHONPATH'])
+        env['PYTHONPATH'] = os.pathsep.join(paths)
+        return env
+
+    def start(self, nodes, shard, frames, chunk_size, work_dir):
+        name = f'shard_{shard:03}'
+        job = {'shard': shard, 'scene_file': self.scene_file, 'nodes': nodes, 'frames': frames,
+               'chunk_frames': chunk_size, 'sampler': self.sampler, 'arrays': self.arrays,
+               'output_prefix': os.path.join(work_dir, name),
+               'result_file': os.path.join(work_dir, f'{name}_result.json'),
+               'log_file': os.path.join(work_dir, f'{name}.log')}
+        job_path = os.path.join(work_dir, f'{name}.json')
+        with open(job_path, 'w') as f:
+            json.dump(job, f)
+        log = open(job['log_file'], 'w')
+        process = subprocess.Popen([self.interpreter, '-m', 'adv_scripting.bake_shards',
+                                    '--worker', job_path],
+                                   stdout=log, stderr=subprocess.STDOUT, env=self.worker_env(),
+                                   cwd=work_dir)
+        self.workers_started += 1
+        logger.debug(f'Started shard {shard}, frames {frames[0]}-{frames[-1]} (pid {process.pid})')
+        return {'job': job, 'process': process, 'log': log, 'start': time.perf_counter()}
+
+    def run(self, nodes, shards, chunk_size, work_dir):
+        '''
+        Start a worker per shard, then yield the chunks of every shard in frame order.
+        '''
+        items = list()
+        results = dict()
+        try:
+            for shard, frames in enumerate(shards):
+                items.append(self.start(nodes, shard, frames, chunk_size, work_dir))
+            for item in items:
+                job = item['job']
+                for index, frames in enumerate(chunk_frames(job['frames'], chunk_size)):
+                    path = chunk_path(job, index)
+                    self.wait(item, lambda: os.path.exists(path))
+                    with np.load(path) as arrays:
+                        sample = {key: arrays[key] for key in arrays.files if key != 'channels'}
+                        channels = arrays['channels'].tolist()
+                    os.remove(path)
+                    sample.update(frames=frames, nodes=nodes, channels=channels)
+                    yield sample
+                self.wait(item, lambda: item['process'].poll() is not None)
+                results[job['shard']] = self.finish(item)
+        finally:
+            for item in items:
+                if item['process'].poll() is None:
+                    item['process'].kill()
+                    item['process'].wait()
+                item['log'].close()
+        self.shard_seconds = [results[shard]['seconds'] for shard in sorted(results)]
+
+    def wait(self, item, done):
+        '''
+        Poll until done() is true, raising when the worker failed, crashed or timed out first.
+        '''
+        while not done():
+            if item['process'].poll() is not None:
+                # The worker may have finished between the two checks
+                if done():
+                    return
+                self.finish(item)
+                raise RuntimeError(f"Bake shard {item['job']['shard']} ended early, "
+                                   f"see {item['job']['log_file']}")
+            if time.perf_counter() - item['start'] > self.timeout:
+                raise RuntimeError(f"Bake shard {item['job']['shard']} timed out, "
+                                   f"see {item['job']['log_file']}")
+            time.sleep(POLL_INTERVAL)
+
+    def finish(self, item):
+        '''
+        Returns the result dict of a finished worker
+        '''
+        job = item['job']
+        if not os.path.exists(job['result_file']):
+            raise RuntimeError(f"Bake shard {job['shard']} crashed, see {job['log_file']}")
+        with open(job['result_file'], 'r') as f:
+            result = json.load(f)
+        if result['status'] != 'success':
+            raise RuntimeError(f"Bake shard {job['shard']} failed: {result.get('error')}, "
+                               f"see {job['log_file']}")
+        return result
+
+
+# MAIN =================================================================
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Bake joint transforms in parallel workers.')
+    parser.add_argument('scene_file', nargs='?')
+    parser.add_argument('--nodes', nargs='+', default=[])
+    parser.add_argument('--start', type=int, default=1)
+    parser.add_argument('--end', type=int, default=120)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--min-shard-frames', type=int, default=MIN_SHARD_FRAMES)
+    parser.add_argument('--output', default='anim_bake.bin')
+    parser.add_argument('--mayapy', default=None, help='Worker interpreter')
+    parser.add_argument('--python-path', action='append', default=[])
+    parser.add_argument('--sampler', default=DEFAULT_SAMPLER)
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.worker:
+        return run_worker(args.worker)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    import adv_scripting.bake_format as bake_format
+    bake = ShardedBake(os.path.abspath(args.scene_file), args.workers, args.min_shard_frames,
+                       interpreter=args.mayapy, python_path=args.python_path,
+                       sampler=args.sampler)
+    frames = range(args.start, args.end + 1)
+    if bake.shard_count(len(frames)) < 2: # Sampled in this process
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+        import maya.cmds as cmds
+        cmds.file(bake.scene_file, open=True, force=True)
+    timer = time.perf_counter()
+    sample = bake.sample(args.nodes, frames)
+    bake_format.write(args.output, sample['frames'], sample['nodes'], sample['channels'],
+                      sample['values'])
+    logger.info(f'Baked {len(sample["frames"])} frames in {time.perf_counter() - timer:.2f}s: '
+                f'{args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+'''
+build_profiler.py
+
+Per-phase profiling of rig builds. Records wall time, number of maya.cmds calls and
+number of nodes created for every Appendage lifecycle phase, and writes a Chrome trace
+(open in chrome://tracing or https://ui.perfetto.dev) plus a summary table.
+
+Disabled by default. Turned on for a rig build with BipedSettings(profile_build=True),
+or around any code with start()/stop():
+
+import adv_scripting.build_profiler as build_profiler
+build_profiler.start('test_build')
+arm.Arm(...)
+profiler = build_profiler.stop('C:/temp/arm_trace.json')
+print(profiler.summary())
+'''
+import contextlib
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Active profiler, None when profiling is off
+_profiler = None
+# Returned by phase() when profiling is off. Reusable and does nothing.
+_NULL_PHASE = contextlib.nullcontext()
+
+
+def wrap_commands(module, make_wrapper):
+    '''
+    Replace every public function of a command module (maya.cmds) with a wrapper.
+    Modules use cmds.<command> at call time, so this reaches every caller.
+    Restore with restore_commands(). Nested wraps must be restored last in, first out.
+
+    Arguments
+    module (module): command module, e.g. maya.cmds
+    make_wrapper (callable): make_wrapper(name, function) returns the replacement function
+
+    Returns dict of the original functions
+    '''
+    originals = dict()
+    for name in dir(module):
+        if name.startswith('_'):
+            continue
+        function = getattr(module, name)
+        if not callable(function) or isinstance(function, type):
+            continue
+        originals[name] = function
+        setattr(module, name, make_wrapper(name, function))
+    return originals
+
+
+def restore_commands(module, originals):
+    for name, function in originals.items():
+        setattr(module, name, function)
+
+
+class BuildProfiler():
+    '''
+    Records one event per profiled phase.
+
+    Arguments
+    name (str): name of the build, used in the trace and summary
+    cmds_module (module/None): command module to count calls of, maya.cmds if None
+    count_nodes (bool): count created nodes with an MDGMessage node added callback
+    '''
+    def __init__(self, name='build', cmds_module=None, count_nodes=True):
+        self.name = name
+        self.cmds_module = cmds_module
+        self.count_nodes = count_nodes
+        self.events = list()
+        self.cmds_calls = 0
+        self.nodes_created = 0
+        # Named counters other modules add to with count(), e.g. node_path lookups
+        self.counters = dict()
+        self._originals = None
+        self._callback_id = None
+        self._start_time = None
+
+    def start(self):
+        if self.cmds_module is None:
+            import maya.cmds as cmds_module
+            self.cmds_module = cmds_module
+        self._originals = wrap_commands(self.cmds_module, self._counted)
+        if self.count_nodes:
+            import maya.api.OpenMaya as om
+            self._callback_id = om.MDGMessage.addNodeAddedCallback(self._node_added, 'dependNode')
+        self._start_time = time.perf_counter()
+
+    def stop(self):
+        if self._originals is not None:
+            restore_commands(self.cmds_module, self._originals)
+            self._originals = None
+        if self._callback_id is not None:
+            import maya.api.OpenMaya as om
+            om.MMessage.removeCallback(self._callback_id)
+            self._callback_id = None
+
+    def _counted(self, name, function):
+        def counted(*args, **kwargs):
+            self.cmds_calls += 1
+            return function(*args, **kwargs)
+        return counted
+
+    def _node_added(self, node, client_data):
+        self.nodes_created += 1
+
+    @contextlib.contextmanager
+    def phase(self, category, name):
+        '''
+        Profile the code run inside the with block.
+
+        Arguments
+        category (str): what is being built, e.g. the appendage name
+        name (str): phase name, e.g. 'setup'
+        '''
+        calls = self.cmds_calls
+        nodes = self.nodes_created
+        counters = dict(self.counters)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            counts = {name: value - counters.get(name, 0)
+                      for name, value in self.counters.items() if value != counters.get(name, 0)}
+            self.events.append({'name': name,
+                                'cat': category,
+                                'ph': 'X', # Complete event
+                                'ts': (start - self._start_time) * 1e6, # microseconds
+                                'dur': (end - start) * 1e6,
+                                'pid': os.getpid(),
+                                'tid': 0,
+                                'args': dict(counts, cmds_calls=self.cmds_calls - calls,
+                                             nodes_created=self.nodes_created - nodes)})
+
+    def trace(self):
+        '''
+        Returns Chrome trace event format dict.
+        '''
+        events = sorted(self.events, key=lambda event: event['ts'])
+        metadata = {'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'tid': 0,
+                    'args': {'name': self.name}}
+        return {'traceEvents': [metadata] + events, 'displayTimeUnit': 'ms'}
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.trace(), f)
+        logger.info(f'Wrote build trace: {path}')
+        return path
+
+    def summary(self):
+        '''
+        Table with one row per profiled phase, in build order.
+        Phases are nested (e.g. 'Arm' contains 'setup'), so their rows are inclusive.
+        '''
+        rows = [(event['cat'], event['name'], event['dur'] / 1000.0,
+                 event['args']['cmds_calls'], event['args']['nodes_created'],
+                 event['args'].get('node_path', 0))
+                for event in sorted(self.events, key=lambda event: event['ts'])]
+        width = max([len(row[0]) for row in rows] + [len('appendage')])
+        lines = [f"{'appendage':<{width}}  {'phase':<26}{'ms':>10}{'cmds':>10}{'nodes':>8}"
+                 f"{'lookups':>9}"]
+        for category, name, duration, calls, nodes, lookups in rows:
+            lines.append(f'{category:<{width}}  {name:<26}{duration:>10.1f}{calls:>10}{nodes:>8}'
+                         f'{lookups:>9}')
+        return f'Build profile: {self.name}\n' + '\n'.join(lines)
+
+
+def get_profiler():
+    return _profiler
+
+
+def start(name='build', **kwargs):
+    '''
+    Start profiling. Keyword arguments are passed to BuildProfiler.
+
+    Returns BuildProfiler
+    '''
+    global _profiler
+    if _profiler is not None:
+        logger.warning(f'Build profiler {_profiler.name} is already running.')
+        return _profiler
+    _profiler = BuildProfiler(name, **kwargs)
+    _profiler.start()
+    return _profiler
+
+
+def stop(trace_path=None):
+    '''
+    Stop profiling, log the summary table and write the trace.
+
+    Arguments
+    trace_path (str/None): Chrome trace JSON file to write. Not written if None.
+
+    Returns the stopped BuildProfiler, None if profiling was not running
+    '''
+    global _profiler
+    profiler = _profiler
+    if profiler is None:
+        return None
+    _profiler = None
+    profiler.stop()
+    if trace_path:
+        profiler.write_trace(trace_path)
+    logger.info(profiler.summary())
+    return profiler
+
+
+def count(name, amount=1):
+    '''
+    Add to a named counter of the active profiler. Does nothing when profiling is off.
+    '''
+    if _profiler is not None:
+        _profiler.counters[name] = _profiler.counters.get(name, 0) + amount
+
+
+def phase(category, name):
+    '''
+    Context manager profiling a build phase on the active profiler.
+    Does nothing when profiling is off.
+    '''
+    if _profiler is None:
+        return _NULL_PHASE
+    return _profiler.phase(category, name)
@@ -0,0 +1,147 @@
+'''
+cmds_tracer.py
+
+Opt-in tracer for maya.cmds round trips. Wraps every command and records the number of
+calls and cumulative time per command and per call site (file, line and function in this
+package). The ranked report shows which loops are worth batching.
+
+e.g.
+import adv_scripting.cmds_tracer as cmds_tracer
+with cmds_tracer.CmdsTracer() as tracer:
+    arm.Arm(...)
+print(tracer.report(limit=20))
+'''
+import logging
+import os
+import sys
+import time
+import adv_scripting.build_profiler as build_profiler
+
+logger = logging.getLogger(__name__)
+
+# Call sites are reported in files under this directory (the adv_scripting package)
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Wrappers, never reported as call sites
+_SKIP_FILES = {os.path.abspath(__file__), os.path.abspath(build_profiler.__file__)}
+
+
+class CmdsTracer():
+    '''
+    Arguments
+    cmds_module (module/None): command module to trace, maya.cmds if None
+    root (str): directory of the code to attribute calls to. The first caller frame in a
+                file under root is the call site, e.g. a utilities function rather than the
+                Maya internals it goes through.
+    '''
+    def __init__(self, cmds_module=None, root=PACKAGE_DIR):
+        self.cmds_module = cmds_module
+        self.root = os.path.abspath(root)
+        # (command, filename, line, function) -> [calls, seconds]
+        self.stats = dict()
+        self.seconds = 0.0
+        self._originals = None
+        self._start_time = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        if self.cmds_module is None:
+            import maya.cmds as cmds_module
+            self.cmds_module = cmds_module
+        self._originals = build_profiler.wrap_commands(self.cmds_module, self._traced)
+        self._start_time = time.perf_counter()
+
+    def stop(self):
+        if self._originals is None:
+            return
+        build_profiler.restore_commands(self.cmds_module, self._originals)
+        self._originals = None
+        self.seconds += time.perf_counter() - self._start_time
+
+    def clear(self):
+        self.stats = dict()
+        self.seconds = 0.0
+
+    def _traced(self, name, function):
+        stats = self.stats
+        call_site = self.call_site
+        def traced(*args, **kwargs):
+            key = (name,) + call_site(sys._getframe(1))
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                record = stats.get(key)
+                if record is None:
+                    record = stats[key] = [0, 0.0]
+                record[0] += 1
+                record[1] += elapsed
+        return traced
+
+    def call_site(self, frame):
+        '''
+        Returns (filename, line, function) of the first frame in code under root.
+        Falls back to the direct caller.
+        '''
+        caller = frame
+        while frame is not None:
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if filename.startswith(self.root) and filename not in _SKIP_FILES:
+                break
+            frame = frame.f_back
+        frame = frame or caller
+        return (frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+
+    def hot_sites(self, sort='seconds'):
+        '''
+        Call sites ranked by cumulative time ('seconds') or number of calls ('calls').
+
+        Returns list of dicts with command, filename, line, function, calls, seconds
+        '''
+        sites = [{'command': command,
+                  'filename': filename,
+                  'line': line,
+                  'function': function,
+                  'calls': calls,
+                  'seconds': seconds}
+                 for (command, filename, line, function), (calls, seconds) in self.stats.items()]
+        return sorted(sites, key=lambda site: site[sort], reverse=True)
+
+    def command_totals(self, sort='seconds'):
+        '''
+        Returns list of dicts with command, calls, seconds, summed over call sites.
+        '''
+        totals = dict()
+        for (command, *_), (calls, seconds) in self.stats.items():
+            total = totals.setdefault(command, {'command': command, 'calls': 0, 'seconds': 0.0})
+            total['calls'] += calls
+            total['seconds'] += seconds
+        return sorted(totals.values(), key=lambda total: total[sort], reverse=True)
+
+    def report(self, limit=25, sort='seconds'):
+        '''
+        Text report of the top commands and call sites.
+        '''
+        calls = sum(record[0] for record in self.stats.values())
+        seconds = sum(record[1] for record in self.stats.values())
+        lines = [f'maya.cmds: {calls} calls, {seconds * 1000.0:.1f} ms'
+                 f' ({self.seconds * 1000.0:.1f} ms traced)', '',
+                 f"{'command':<20}{'calls':>10}{'ms':>12}"]
+        for total in self.command_totals(sort)[:limit]:
+            lines.append(f"{total['command']:<20}{total['calls']:>10}{total['seconds'] * 1000.0:>12.2f}")
+        lines.extend(['', f"{'rank':<6}{'command':<20}{'calls':>10}{'ms':>12}{'us/call':>10}  call site"])
+        for rank, site in enumerate(self.hot_sites(sort)[:limit]):
+            filename = site['filename']
+            if os.path.abspath(filename).startswith(self.root):
+                filename = os.path.relpath(filename, self.root)
+            lines.append(f"{rank + 1:<6}{site['command']:<20}{site['calls']:>10}"
+                         f"{site['seconds'] * 1000.0:>12.2f}"
+                         f"{site['seconds'] * 1e6 / site['calls']:>10.1f}"
+                         f"  {filename}:{site['line']} {site['function']}()")
+        return '\n'.join(lines)
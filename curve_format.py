@@ -0,0 +1,331 @@
+'''
+curve_format.py
+
+Curve-major layout of exported animation curves. Every animated (node, attribute) is one curve
+dict holding parallel lists, one entry per key:
+    node (str), attribute (str)
+    times, values
+    itt, ott (tangent types), iw, ow (tangent weights), ia, oa (tangent angles)
+
+File data:
+    {'schema': SCHEMA, 'version': SCHEMA_VERSION, 'curves': [curve, ...]}
+
+Version 1 is the frame-major layout older exports wrote,
+data[frame][node][attribute] = {'value': value, 'tangent': {'itt': ..., ...}}.
+load() migrates it.
+
+e.g.
+import adv_scripting.curve_format as curve_format
+data = curve_format.load(path)
+for curve in data['curves']:
+    curve_format.keys(curve) # [(time, value, tangent dict), ...]
+
+Exports stream curves to disk with CurveWriter as they are read.
+
+CurveWriter also writes an index into the file after the curves, one entry per curve:
+    node, attribute, role (e.g. 'cameras', None if not given), offset and size (byte range of
+    the curve in the file), keys, start and end (frame span)
+The file ends with the byte offset of the index, padded to a fixed width, so the index is found
+by reading the end of the file:
+    {"schema": ..., "version": 2, "curves": [...],
+    "index": {"curves": [entry, ...]},
+    "index_offset": 123456      }
+load_curves reads only the byte ranges of the curves it selects by node name pattern and role,
+so one camera is read from a shot of many characters without parsing the rest. Files without an
+index (older exports) are loaded whole. Their curves only have a role when node_roles maps the
+node names to roles, e.g. from the scene they are imported into.
+
+curves = curve_format.load_curves(path, nodes=['lt_arm*'], start=100, end=150)
+curves = curve_format.load_curves(path, roles=['cameras'])
+'''
+import bisect
+import fnmatch
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = 'adv_scripting.anim_curves'
+SCHEMA_VERSION = 2
+TANGENT_FIELDS = ('itt', 'ott', 'iw', 'ow', 'ia', 'oa')
+KEY_FIELDS = ('times', 'values') + TANGENT_FIELDS
+INDEX_OFFSET_KEY = '"index_offset": '
+# Digits of the index offset, the end of the file has a fixed size
+INDEX_OFFSET_WIDTH = 16
+INDEX_TRAILER_SIZE = len(INDEX_OFFSET_KEY) + INDEX_OFFSET_WIDTH + 2
+# Selected curves closer than this many bytes are read together, cheaper than another seek
+READ_GAP = 4096
+
+
+# CURVES ===============================================================
+
+def new_curve(node, attribute):
+    curve = {'node': node, 'attribute': attribute}
+    curve.update({field: list() for field in KEY_FIELDS})
+    return curve
+
+
+def key_count(curve):
+    return len(curve['times'])
+
+
+def keys(curve):
+    '''
+    Returns list of (time, value, tangent dict) per key
+    '''
+    tangents = [dict(zip(TANGENT_FIELDS, key))
+                for key in zip(*(curve[field] for field in TANGENT_FIELDS))]
+    return [(time, value, tangents[index] if tangents else dict())
+            for index, (time, value) in enumerate(zip(curve['times'], curve['values']))]
+
+
+def window(curve, start=None, end=None):
+    '''
+    Copy of a curve with the keys in [start, end], plus the nearest key on each side so the
+    curve still evaluates the same inside the window.
+    '''
+    times = curve['times']
+    first = 0 if start is None else max(0, bisect.bisect_left(times, start - 1e-6) - 1)
+    last = len(times) if end is None else \
+        min(len(times), bisect.bisect_right(times, end + 1e-6) + 1)
+    result = dict(curve)
+    result.update({field: curve[field][first:last] for field in KEY_FIELDS})
+    return result
+
+
+def make_data(curves):
+    '''
+    File data of curves, ordered by node and attribute.
+    '''
+    curves = sorted(curves, key=lambda curve: (curve['node'], curve['attribute']))
+    return {'schema': SCHEMA, 'version': SCHEMA_VERSION, 'curves': curves}
+
+
+# MIGRATION ============================================================
+
+def from_frame_major(data):
+    '''
+    Curves of the version 1 layout data[frame][node][attribute] = {'value', 'tangent'}.
+    '''
+    curves = dict()
+    for frame in sorted(data, key=float):
+        for node, attributes in data[frame].items():
+            for attribute, key in attributes.items():
+                curve = curves.get((node, attribute))
+                if curve is None:
+                    curve = curves[(node, attribute)] = new_curve(node, attribute)
+                curve['times'].append(float(frame))
+                curve['values'].append(key['value'])
+                tangent = key.get('tangent') or dict()
+                for field in TANGENT_FIELDS:
+                    curve[field].append(tangent.get(field))
+    return list(curves.values())
+
+
+def migrate(data):
+    '''
+    Returns data in the current version.
+    '''
+    if data.get('schema') != SCHEMA: # Version 1 has no header
+        logger.info('Migrating frame-major animation curves to curve-major.')
+        data = make_data(from_frame_major(data))
+    if data['version'] != SCHEMA_VERSION:
+        raise ValueError(f"Animation curve version {data['version']} is not supported, "
+                         f"expected {SCHEMA_VERSION}.")
+    return data
+
+
+# FILES ================================================================
+
+def load(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    for key in ('index', 'index_offset'):
+        data.pop(key, None)
+    return migrate(data)
+
+
+def save(path, data, role=None):
+    '''
+    One curve per line, so files stay diffable without the size of an indented dump.
+
+    Arguments
+    role (str/None): role of every curve in the index
+    '''
+    with CurveWriter(path) as writer:
+        for curve in data['curves']:
+            writer.write(curve, role)
+    return path
+
+
+class CurveWriter():
+    '''
+    Write a curve file one curve at a time, the same file as save() of all curves. Curves must
+    be written in make_data order, by node and attribute. The index is written on close(), the
+    file is not complete before.
+
+    Arguments
+    path (str): file to write
+    '''
+    def __init__(self, path):
+        self.path = path
+        # Unix newlines so offsets are the same on every platform
+        self.file = open(path, 'w', newline='\n')
+        self.offset = 0
+        self.entries = list()
+        self._write(f'{{"schema": {json.dumps(SCHEMA)}, "version": {SCHEMA_VERSION}, '
+                    f'"curves": [')
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def _write(self, text):
+        # json.dumps escapes non ASCII characters, one byte per character
+        self.file.write(text)
+        self.offset += len(text)
+
+    def write(self, curve, role=None):
+        '''
+        Arguments
+        role (str/None): e.g. 'controls', for load_curves(roles=...)
+        '''
+        self._write(',\n' if self.count else '\n')
+        text = json.dumps(curve, separators=(',', ':'))
+        times = curve['times']
+        self.entries.append({'node': curve['node'], 'attribute': curve['attribute'],
+                             'role': role, 'offset': self.offset, 'size': len(text),
+                             'keys': len(times), 'start': times[0] if times else None,
+                             'end': times[-1] if times else None})
+        self._write(text)
+        self.count += 1
+
+    def close(self):
+        self._write('\n],\n"index": ')
+        index_offset = self.offset
+        self._write(json.dumps({'curves': self.entries}, separators=(',', ':')))
+        self._write(f',\n{INDEX_OFFSET_KEY}{index_offset:<{INDEX_OFFSET_WIDTH}}}}\n')
+        self.file.close()
+
+
+# INDEX ================================================================
+
+def read_index(path):
+    '''
+    Returns index dict of a curve file, None if it has none
+    '''
+    size = os.path.getsize(path)
+    if size < INDEX_TRAILER_SIZE:
+        return None
+    with open(path, 'rb') as f:
+        f.seek(size - INDEX_TRAILER_SIZE)
+        trailer = f.read().decode('ascii', errors='replace')
+        if not trailer.startswith(INDEX_OFFSET_KEY):
+            return None
+        try:
+            index_offset = int(trailer[len(INDEX_OFFSET_KEY):].rstrip('}\n '))
+        except ValueError:
+            index_offset = -1
+        if not 0 <= index_offset < size - INDEX_TRAILER_SIZE:
+            logger.warning(f'Index offset of {path} is invalid, reading the whole file.')
+            return None
+        f.seek(index_offset)
+        text = f.read(size - INDEX_TRAILER_SIZE - index_offset)
+    try:
+        return json.loads(text.rstrip(b',\n'))
+    except ValueError:
+        logger.warning(f'Index of {path} is invalid, reading the whole file.')
+        return None
+
+
+def matches(node, patterns):
+    '''
+    Arguments
+    patterns (list): node names or fnmatch patterns, matched against the full and short name
+    '''
+    short = node.rpartition('|')[2]
+    return any(fnmatch.fnmatchcase(node, pattern) or fnmatch.fnmatchcase(short, pattern)
+               for pattern in patterns)
+
+
+def select(entries, nodes=None, roles=None):
+    '''
+    Returns index entries of the curves matching nodes and roles, None matches all
+    '''
+    return [entry for entry in entries
+            if (nodes is None or matches(entry['node'], nodes)) and
+            (roles is None or entry['role'] in roles)]
+
+
+def node_role(node, node_roles):
+    '''
+    Arguments
+    node_roles (dict): node name -> role, full or short names
+
+    Returns role of node, by its full then its short name, None if it has none
+    '''
+    if node in node_roles:
+        return node_roles[node]
+    return node_roles.get(node.rpartition('|')[2])
+
+
+def read_ranges(path, entries):
+    '''
+    Read the curves of index entries, curves less than READ_GAP bytes apart with one read.
+
+    Returns list of curve dicts in file order
+    '''
+    runs = list() # [start, end, entries]
+    for entry in sorted(entries, key=lambda entry: entry['offset']):
+        end = entry['offset'] + entry['size']
+        if runs and entry['offset'] - runs[-1][1] <= READ_GAP:
+            runs[-1][1] = end
+            runs[-1][2].append(entry)
+        else:
+            runs.append([entry['offset'], end, [entry]])
+    curves = list()
+    with open(path, 'rb') as f:
+        for start, end, run in runs:
+            f.seek(start)
+            data = f.read(end - start)
+            for entry in run:
+                offset = entry['offset'] - start
+                curves.append(json.loads(data[offset:offset + entry['size']]))
+    return curves
+
+
+def load_curves(path, nodes=None, roles=None, start=None, end=None, node_roles=None):
+    '''
+    Arguments
+    nodes (list/None): node names or fnmatch patterns, e.g. ['lt_arm*']
+    roles (list/None): roles given to CurveWriter.write, e.g. ['cameras']
+    start, end (float/None): frame window, see window()
+    node_roles (dict/None): node name -> role for files without an index, see node_role().
+        Selecting roles from such a file without it raises a ValueError.
+
+    Returns list of the curve dicts matching every filter
+    '''
+    index = read_index(path)
+    if index is not None:
+        selected = select(index['curves'], nodes, roles)
+        curves = read_ranges(path, selected)
+        logger.debug(f"Read {len(curves)} of {len(index['curves'])} curves from {path}")
+    else:
+        if roles is not None and node_roles is None:
+            raise ValueError(f'{path} has no index, the roles of its curves are unknown. '
+                             f'Pass node_roles to select {roles} from it.')
+        if roles is not None:
+            logger.info(f'{path} has no index, curve roles are taken from node_roles.')
+        curves = [curve for curve in load(path)['curves']
+                  if (nodes is None or matches(curve['node'], nodes)) and
+                  (roles is None or node_role(curve['node'], node_roles) in roles)]
+    if start is not None or end is not None:
+        curves = [window(curve, start, end) for curve in curves]
+    return curves
@@ -3,15 +3,34 @@ exporter.py
 author: Dayz Lee
 
 AnimExporter
-1. Animation Bake. Copy bnd skeleton to proxy skeleton. Bake animation from bnd to proxy.
-    Get transforms on each joint at every frame.
+1. Animation Bake. Sample the transforms of the bnd skeleton at every frame in a time context
+    (see bake_sampler.py), stored under the proxy joint names.
 2. Animation Export. Get keys and corresponding transform values, animation curves for each key.
-    Also get camera data and camera keys.
+    Also get camera data and camera keys. Curves are stored curve-major, see curve_format.py.
 
 AnimImporter
 1. Animation Import. Import data file for given shot. Get keys and
     corresponding transform values, animation curves for each key.
 2. Animation Bake. Import data file and bake to proxy.
+Keys are grouped by curve and written with one bulk call per animCurve (see
+anim_curves.write_curves). The API edits are put on Maya's undo queue by the advAnimEdit command
+(see anim_undo.py), in one undo chunk: Ctrl+Z reverts the whole import.
+Pass nodes (name patterns), roles (ROLES) or a frame window to AnimImporter to import part of
+an export. The curve file index (see curve_format.load_curves) has the byte range and role of
+every curve, only the selected curves are read. Curves of older exports without an index get
+the role of the node they key in the current scene. The bake is only read for the 'joints' role,
+and only the selected nodes and frames of it.
+
+Baked transforms are written to a columnar binary file (see bake_format.py), which the importer
+reads through a memory map. Pass debug_json=True to AnimExporter to also write the old JSON bake.
+When publishing, the bake is written in chunks of chunk_frames as it is sampled and curves are
+written as they are read, so memory does not grow with the frame range. The memory the export
+uses on top of what the session held before it is logged (see memory_usage.py).
+Pass reduce_keys='linear' or 'bezier' to reduce the bake to the keys needed to rebuild every
+frame within a per channel tolerance (see key_reduction.py). The kept keys, with the measured
+error of each channel, are written as curves to ANIM_BAKE_KEYS_FILENAME instead of the dense bake.
+Pass bake_compression (e.g. {}) for a quantized, delta encoded and compressed bake file with its
+error bounds in the header (see bake_codec.py), for network storage.
 
 In Maya Script Editor, run:
 import adv_scripting.exporter as exporter
@@ -24,25 +43,46 @@ path_to_maya_scene, path_to_baked_anim, path_to_anim_curves
 
 '''
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+import contextlib
 import os
 import json
+import time
+import numpy as np
 import adv_scripting.utilities as utils
+import adv_scripting.bake_format as bake_format
+import adv_scripting.curve_format as curve_format
+import adv_scripting.anim_curves as anim_curves
+import adv_scripting.anim_undo as anim_undo
+import adv_scripting.bake_sampler as bake_sampler
+import adv_scripting.bake_shards as bake_shards
+import adv_scripting.key_reduction as key_reduction
+import adv_scripting.memory_usage as memory_usage
 import adv_scripting.rig_name as rig_name
 import adv_scripting.masterfile as masterfile
 import adv_scripting.publish_animation.publish_data as publish_data
+import adv_scripting.rig.control_registry as control_registry
 import logging
 
 logger = logging.getLogger()
 
 # Filename used for data import/export
-ANIM_BAKE_FILENAME = 'anim_bake.json'
+ANIM_BAKE_FILENAME = 'anim_bake.bin'
+ANIM_BAKE_DEBUG_FILENAME = 'anim_bake.json'
+# Reduced bake, curve-major keys instead of ANIM_BAKE_FILENAME
+ANIM_BAKE_KEYS_FILENAME = 'anim_bake_keys.json'
 ANIM_CURVE_FILENAME = 'anim_curve.json'
+# Frames sampled and written at a time, bounds the memory of long exports
+BAKE_CHUNK_FRAMES = 250
+# Roles of the exported curves in the curve file index, first role wins
+ROLES = ('joints', 'controls', 'cameras')
 
 
 # ANIMATION SETUP BASE CLASS ===========================================
 
 class AnimSetup():
-    def __init__(self, top_node, publish_data, anim_file):
+    def __init__(self, top_node, publish_data, anim_file, proxy=True):
         '''
         Arguments:
         top_node (str): Asset top node
@@ -65,6 +105,7 @@ class AnimSetup():
 
         If publish_data['publish'] is enabled, export file is written to anim_file.baked_anim and anim_file.
         If publish_data['cache'] is enabled, cleanup methods are disabled.
+        proxy (bool): Duplicate the bnd skeleton into a proxy skeleton
         '''
         self.publish_data = publish_data
         self.anim_file = anim_file
@@ -75,10 +116,10 @@ class AnimSetup():
         self.anim_bake_data = dict() # Animation bake data. Transforms for each frame
         self.anim_curve_data = dict() # Animation curve data. Keys and tangents
 
-        self.setup(top_node)
+        self.setup(top_node, proxy=proxy)
 
 
-    def setup(self, top_node):
+    def setup(self, top_node, proxy=True):
         # Get root jnt from top_node
         root_jnt = self.get_root_joint(top_node)
         # Store bnd joints
@@ -88,6 +129,8 @@ class AnimSetup():
         for jnt in self.bnd_jnt:
             utils.unlock_all(jnt)
 
+        if not proxy:
+            return
         # Duplicate skeleton
         skeleton = utils.duplicate_skeleton(root_jnt, tag='BAKE')
         # Rename skeleton to proxy
@@ -126,165 +169,258 @@ class AnimSetup():
 
     def get_controls(self, top_node):
         '''
-        Get list of all controls. Controls are message connections to top_node
+        Get list of all controls from the control registry on top_node. Rigs built before the
+        registry have their controls as message connections to top_node.
         '''
-        controls = cmds.listConnections(top_node, s=True, d=False)
+        if control_registry.has_registry(top_node):
+            controls = control_registry.get_controls(top_node)
+        else:
+            controls = cmds.listConnections(top_node, s=True, d=False)
         if not controls:
             logger.error(f"Controls not found on top node '{top_node}'")
         return controls
 
 
-# ANIMATION EXPORTER ===================================================
+    def camera_export(self):
+        '''
+        Returns list of all cameras in scene, with their shapes for focal length etc.
+        '''
+        cameras = cmds.listCameras()
+        cameras += cmds.listRelatives(cameras, shapes=True, fullPath=True) or []
+        return cameras
 
-class AnimExporter(AnimSetup):
 
-    def __init__(self, top_node, publish_data, anim_file):
-        AnimSetup.__init__(self, top_node, publish_data, anim_file)
+    def role_nodes(self):
+        '''
+        Returns dict of role -> nodes of the asset and scene, for each of ROLES
+        '''
+        return {'joints': self.bnd_jnt, 'controls': self.controls or [],
+                'cameras': self.camera_export()}
 
-        self.animation_bake()
-        self.animation_export()
 
-        if self.publish_data['publish']:
-            self.file_export()
+    def node_roles(self, role_nodes):
+        '''
+        Arguments
+        role_nodes (dict): role -> node list
+
+        Returns dict of long node name -> role, the first of ROLES for nodes in several
+        '''
+        roles = dict()
+        for role in ROLES:
+            for node in cmds.ls(role_nodes[role], long=True) or []:
+                roles.setdefault(node, role)
+        return roles
+
+
+# ANIMATION EXPORTER ===================================================
+
+class AnimExporter(AnimSetup):
+
+    def __init__(self, top_node, publish_data, anim_file, debug_json=False, bake_dtype='float32',
+                 workers=1, chunk_frames=BAKE_CHUNK_FRAMES, reduce_keys=None,
+                 key_tolerances=None, bake_compression=None):
+        '''
+        Arguments:
+        debug_json (bool): Also write the bake as JSON, ANIM_BAKE_DEBUG_FILENAME
+        bake_dtype (str): 'float32' or 'float64' values in the binary bake
+        workers (int): Sample the bake in this many worker processes, see bake_shards.py.
+            The workers open the saved scene, short ranges and scenes with unsaved changes
+            are sampled in process.
+        chunk_frames (int): Frames sampled and written at a time when publishing, each bake
+            worker also samples its shard in chunks of this many frames
+        reduce_keys (str/None): 'linear' or 'bezier' to reduce the bake keys, None keeps a key
+            on every frame
+        key_tolerances (dict/float/None): Reduction tolerance per attribute name prefix, or
+            for all channels. key_reduction.TOLERANCES if None.
+        bake_compression (dict/None): Write a compressed bake with these
+            bake_format.CompressedBakeWriter arguments, e.g. {} or {'bits': 12, 'delta': 2}.
+            'tolerances' may be a dict like key_reduction.TOLERANCES. None writes bake_dtype
+            values.
+        '''
+        self.debug_json = debug_json
+        self.bake_dtype = bake_dtype
+        self.workers = workers
+        self.chunk_frames = chunk_frames
+        self.reduce_keys = reduce_keys
+        self.key_tolerances = key_tolerances
+        self.bake_compression = bake_compression
+        # Bake samples the bnd joints, no proxy skeleton needed
+        AnimSetup.__init__(self, top_node, publish_data, anim_file, proxy=False)
+
+        # Published bake and curves are streamed to the files as they are sampled and read
+        with memory_usage.MemoryMonitor() as self.memory:
+            self.animation_bake()
+            self.animation_export()
+
+            if self.publish_data['publish']:
+                self.file_export()
         if not self.publish_data['cache']:
             self.cleanup()
+        logger.info(f'Animation export memory: {self.memory.summary()}')
         logger.debug('Animation Export Complete!')
 
 
     def animation_bake(self):
         logger.debug('Start Animation Bake..')
 
-        # Constrain proxy to original bnd jnt
-        for bnd, prx in zip(self.bnd_jnt, self.proxy_jnt):
-            cmds.parentConstraint(bnd, prx)
-
         # Get frame range
         start_frame = self.publish_data['start_frame']
         end_frame = self.publish_data['end_frame']
+        self.bake_frames = list(range(start_frame, end_frame+1))
+        # Stored under the proxy names the importer bakes to
+        self.bake_nodes = [self.get_proxy_name(jnt) for jnt in self.bnd_jnt]
+        self.bake_channels = list(bake_sampler.CHANNELS)
 
-        # Get transforms data
-        # transforms = dict()
-        # # Walk through frames in timeslider
-        # for frame in range(start_frame, end_frame+1):
-        #     cmds.currentTime(frame, e=True)
-        #     transforms[frame] = dict()
-        #     for prx in self.proxy_jnt: # Get transform values on each joint
-        #         transforms[frame][prx] = utils.read_transforms_hierarchy(self.proxy_jnt[0], os=1)
-        # self.anim_bake_data = transforms
-
-        # Bake Animation in Maya
-        cmds.bakeResults(self.proxy_jnt, t=(start_frame, end_frame), sm=True, sb=1)
-        for frame in range(start_frame, end_frame+1):
-            self.anim_bake_data[frame] = dict()
-            for jnt in self.proxy_jnt:
-                self.anim_bake_data[frame][jnt] = dict()
-        # Get transforms data
-        for jnt in self.proxy_jnt:
-            self.get_anim_data(jnt, self.anim_bake_data, get_tangents=False)
+        reducer = None
+        if self.reduce_keys:
+            # One column per node channel
+            reducer = key_reduction.KeyReducer(self.bake_channels * len(self.bake_nodes),
+                                               self.key_tolerances, self.reduce_keys)
+
+        if self.publish_data['publish']:
+            with contextlib.ExitStack() as stack:
+                writers = [stack.enter_context(writer) for writer in self.bake_writers(reducer)]
+                for frames, values in self.sample_bake():
+                    for writer in writers:
+                        self.write_bake(writer, frames, values)
+            self.bake_values = self.anim_bake_data = None
+        else:
+            self.bake_values = np.concatenate([values for _, values in self.sample_bake()])
+            self.anim_bake_data = bake_format.frame_dict(self.bake_frames, self.bake_nodes,
+                                                         self.bake_channels, self.bake_values)
+            if reducer:
+                self.write_bake(reducer, self.bake_frames, self.bake_values)
+        self.bake_keys = self.reduced_curves(reducer) if reducer else None
+        if reducer and self.publish_data['publish']:
+            curve_format.save(os.path.join(self.anim_file.baked_anim, ANIM_BAKE_KEYS_FILENAME),
+                              curve_format.make_data(self.bake_keys), role='joints')
 
         logger.debug('Done Animation Bake..')
 
 
-    def animation_export(self):
-        logger.debug('Start Animation Export..')
-        anim_data = dict()
+    def sample_bake(self):
+        '''
+        Sample bnd joints in a time context, no constraints or currentTime changes.
 
-        # Iterate through each object and get animation data
-        for jnt in self.bnd_jnt:
-            self.get_anim_data(jnt, anim_data, get_tangents=True)
-        if self.controls:
-            for ctrl in self.controls:
-                self.get_anim_data(ctrl, anim_data, get_tangents=True)
+        Yields (frames, values) of frame chunks
+        '''
+        chunk_frames = max(1, self.chunk_frames)
+        scene_file = bake_shards.saved_scene() if self.workers > 1 else None
+        if self.workers > 1 and not scene_file:
+            logger.warning('Scene is not saved or has unsaved changes, bake workers would open the '
+                           'saved file. Sampling in process.')
+        if scene_file:
+            # One worker pool for the whole range, each worker opens the scene once
+            bake = bake_shards.ShardedBake(scene_file, self.workers)
+            for sample in bake.iter_chunks(self.bnd_jnt, self.bake_frames, chunk_frames):
+                yield sample['frames'], sample['values']
+            return
+        for start in range(0, len(self.bake_frames), chunk_frames):
+            frames = self.bake_frames[start:start + chunk_frames]
+            yield frames, bake_sampler.sample(self.bnd_jnt, frames)['values']
+
+
+    def bake_writers(self, reducer=None):
+        '''
+        Returns list of the binary bake writer, or the key reducer when reducing, and the JSON
+        bake writer with debug_json
+        '''
+        bake_path = os.path.join(self.anim_file.baked_anim, ANIM_BAKE_FILENAME)
+        keys_path = os.path.join(self.anim_file.baked_anim, ANIM_BAKE_KEYS_FILENAME)
+        # The importer reads the keys file first, remove the bake of an earlier export
+        for path in (bake_path, keys_path):
+            if os.path.exists(path):
+                os.remove(path)
+        if reducer:
+            writers = [contextlib.nullcontext(reducer)]
+        elif self.bake_compression is not None:
+            compression = dict(self.bake_compression)
+            if isinstance(compression.get('tolerances'), dict):
+                compression['tolerances'] = key_reduction.channel_tolerances(
+                    self.bake_channels, compression['tolerances'])
+            writers = [bake_format.CompressedBakeWriter(bake_path, self.bake_frames,
+                                                        self.bake_nodes, self.bake_channels,
+                                                        **compression)]
+        else:
+            writers = [bake_format.BakeWriter(bake_path, self.bake_frames, self.bake_nodes,
+                                              self.bake_channels, dtype=self.bake_dtype)]
+        if self.debug_json:
+            path = os.path.join(self.anim_file.baked_anim, ANIM_BAKE_DEBUG_FILENAME)
+            writers.append(bake_format.JsonBakeWriter(path))
+        return writers
+
+
+    def write_bake(self, writer, frames, values):
+        if isinstance(writer, key_reduction.KeyReducer):
+            writer.add(frames, np.reshape(values, (len(frames), -1)))
+        elif isinstance(writer, bake_format.JsonBakeWriter):
+            writer.write(frames, self.bake_nodes, self.bake_channels, values)
+        else:
+            writer.write(values)
 
-        # Camera export
-        self.camera_export(anim_data)
 
-        # Sort anim_data and store to self.anim_curve_data
-        for frame in sorted(anim_data.keys()):
-            self.anim_curve_data[frame] = dict()
-            for node in sorted(anim_data[frame].keys()):
-                self.anim_curve_data[frame][node] = anim_data[frame][node]
+    def reduced_curves(self, reducer):
+        '''
+        Returns list of curve dicts of the reduced bake keys
+        '''
+        fps = om.MTime(1.0, om.MTime.kSeconds).asUnits(om.MTime.uiUnit())
+        nodes = [node for node in self.bake_nodes for _ in self.bake_channels]
+        curves = reducer.curves(nodes, fps)
+        logger.info(f'Reduced bake from {reducer.frame_count * len(nodes)} to '
+                    f'{reducer.key_count()} keys ({self.reduce_keys}), max error '
+                    f'{max([curve["error"] for curve in curves] or [0.0]):.6f}')
+        return curves
 
-        logger.debug('Done Animation Export..')
 
+    def get_proxy_name(self, jnt):
+        return rig_name.RigName(jnt).rename(control_type='proxy', rig_type='jnt').output()
 
-    def get_anim_data(self, node, data, get_tangents=True):
-        anim_attributes = cmds.listAnimatable(node)
-
-        for attribute in anim_attributes:
-
-            # Get keys for each attribute
-            num_keys = cmds.keyframe(attribute, q=True, kc=True)
-            if num_keys:
-                times = cmds.keyframe(attribute, q=True, index=(0,num_keys), tc=True)
-                # Get attribute value
-                values = cmds.keyframe(attribute, q=True, index=(0,num_keys), vc=True)
-                # Get tangents on each attribute
-                time_start = times[0]
-                time_end = times[-1]
-                if get_tangents:
-                    tangent_itt = cmds.keyTangent(node, at=attribute, q=True, t=(time_start, time_end), itt=True)
-                    tangent_ott = cmds.keyTangent(node, at=attribute, q=True, t=(time_start, time_end), ott=True)
-                    tangent_iw = cmds.keyTangent(node, at=attribute, q=True, t=(time_start, time_end), iw=True)
-                    tangent_ow = cmds.keyTangent(node, at=attribute, q=True, t=(time_start, time_end), ow=True)
-                    tangent_ia = cmds.keyTangent(node, at=attribute, q=True, t=(time_start, time_end), ia=True)
-                    tangent_oa = cmds.keyTangent(node, at=attribute, q=True, t=(time_start, time_end), oa=True)
-
-            for idx in range(0, num_keys):
-                frame = times[idx]
-                if frame not in data.keys():
-                    data[frame] = dict()
-                if node not in data[frame].keys():
-                    data[frame][node] = dict()
-                # Get transform values on each joint
-                attr = attribute.split('.')[-1]
-                if get_tangents:
-                    data[frame][node][attr]['value'] = round(values[idx], 5)
-                    tangent = {
-                               'itt': tangent_itt[idx],
-                               'ott': tangent_ott[idx],
-                               'iw': tangent_iw[idx],
-                               'ow': tangent_ow[idx],
-                               'ia': tangent_ia[idx],
-                               'oa': tangent_oa[idx]
-                              }
-                    data[frame][node][attr]['tangent'] = tangent
-                else:
-                    data[frame][node][attr] = round(values[idx], 5)
-
-    def camera_export(self, data):
-        logger.debug('Start Camera Export..')
-        # Get all cameras in scene
-        cameras = cmds.listCameras()
 
-        # Get animation data on each camera
-        for camera in cameras:
-            self.get_anim_data(camera, data, get_tangents=True)
+    def animation_export(self):
+        logger.debug('Start Animation Export..')
 
-        logger.debug('Done Camera Export..')
+        # Curves of joints, controls and cameras, read one at a time by node and attribute
+        role_nodes = self.role_nodes()
+        nodes = [node for role in ROLES for node in role_nodes[role]]
+        curves = self.get_anim_data(nodes, get_tangents=True)
 
+        if self.publish_data['publish']:
+            export_anim_curve = os.path.join(self.anim_file.anim_curves, ANIM_CURVE_FILENAME)
+            long_roles = self.node_roles(role_nodes)
+            roles = dict() # Curve node name -> role
+            with curve_format.CurveWriter(export_anim_curve) as writer:
+                for curve in curves:
+                    node = curve['node']
+                    if node not in roles:
+                        long_name = cmds.ls(node, long=True)
+                        roles[node] = long_roles.get(long_name[0] if long_name else node)
+                    writer.write(curve, roles[node])
+            self.anim_curve_data = None
+        else:
+            self.anim_curve_data = curve_format.make_data(curves)
+
+        logger.debug('Done Animation Export..')
+
+
+    def get_anim_data(self, nodes, get_tangents=True):
+        '''
+        Curve dicts (see curve_format.py) of the animated attributes of nodes, read one at a
+        time through the animation curve API, see anim_curves.py.
+
+        Returns generator of curve dicts
+        '''
+        return anim_curves.iter_curves(nodes, get_tangents=get_tangents)
 
     def file_export(self):
         logger.debug('Start File Export..')
-        # Write to file
-        anim_bake_data = json.dumps(self.anim_bake_data, indent=4)
-        export_anim_bake = os.path.join(self.anim_file.baked_anim, ANIM_BAKE_FILENAME)
-        with open(export_anim_bake, 'w+') as file_bake:
-            file_bake.write(anim_bake_data)
-        file_bake.close()
-
-        anim_curve_data = json.dumps(self.anim_curve_data, indent=4)
-        export_anim_curve = os.path.join(self.anim_file.anim_curves, ANIM_CURVE_FILENAME)
-        with open(export_anim_curve, 'w+') as file_anim:
-            file_anim.write(anim_curve_data)
-        file_anim.close()
-
+        # Bake and curve files are already written by animation_bake and animation_export
         self.anim_file.create_version()
         logger.debug('Done File Export..')
 
 
     def cleanup(self):
         logger.debug('Exporter Cleanup..')
+        # The sampled bake adds nothing to the scene, only proxies of setup(proxy=True) remain
         for jnt in self.proxy_jnt:
             # Delete all parentConstraints
             cmds.delete(f'{jnt}*Constraint*')
@@ -296,13 +432,34 @@ class AnimExporter(AnimSetup):
 
 class AnimImporter(AnimSetup):
 
-    def __init__(self, top_node, publish_data, anim_file):
-        AnimSetup.__init__(self, top_node, publish_data, anim_file)
-
-        # Import animation from data file
-        self.animation_import()
-        # Bake proxy from imported data file
-        self.animation_bake()
+    def __init__(self, top_node, publish_data, anim_file, nodes=None, roles=None,
+                 start_frame=None, end_frame=None):
+        '''
+        Arguments:
+        nodes (list/None): Only import nodes matching these names or fnmatch patterns,
+            e.g. ['lt_arm*']. Baked nodes are matched by their proxy names.
+        roles (list/None): Only import nodes of these ROLES, e.g. ['cameras']. The bake is
+            imported for 'joints'.
+        start_frame, end_frame (float/None): Only import keys in this frame window, plus the
+            nearest key on each side of it
+        '''
+        self.nodes = nodes
+        self.roles = roles
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        bake = roles is None or 'joints' in roles
+        AnimSetup.__init__(self, top_node, publish_data, anim_file, proxy=bake)
+
+        # One undo for the whole import
+        cmds.undoInfo(openChunk=True, chunkName='AnimImporter')
+        try:
+            # Import animation from data file
+            self.animation_import()
+            # Bake proxy from imported data file
+            if bake:
+                self.animation_bake(nodes, start_frame, end_frame)
+        finally:
+            cmds.undoInfo(closeChunk=True)
         logger.debug('Animation Import Complete!')
 
 
@@ -316,31 +473,85 @@ class AnimImporter(AnimSetup):
     def animation_import(self):
         logger.debug('Start Animation Import..')
         file_anim_curve = os.path.join(self.anim_file.anim_curves, ANIM_CURVE_FILENAME)
-        self.anim_curve_data = self.file_import(file_anim_curve)
-
-        for frame in self.anim_curve_data.keys():
-            for node, attribute in self.anim_curve_data[frame].items():
-                value = self.anim_curve_data[frame][node][attribute]['value']
-                tangent = self.anim_curve_data[frame][node][attribute]['tangent']
-                cmds.setKeyframe(node, at=attribute, t=frame, v=value)
-                cmds.keyTangent(node, e=True, at=attribute, a=True,
-                    itt=tangent['itt'], ott=tangent['ott'],
-                    iw=tangent['iw'], ow=tangent['ow'],
-                    ia=tangent['ia'], oa=tangent['oa'])
+        # Only the selected curves are read. Frame-major files of older exports are migrated.
+        # Older exports have no index, the roles of their curves come from this scene.
+        node_roles = None
+        if self.roles is not None:
+            node_roles = self.node_roles(self.role_nodes())
+            for node, role in list(node_roles.items()):
+                node_roles.setdefault(node.rpartition('|')[2], role)
+        self.anim_curve_data = curve_format.make_data(curve_format.load_curves(
+            file_anim_curve, self.nodes, self.roles, self.start_frame, self.end_frame,
+            node_roles))
+        self.set_keys(self.anim_curve_data['curves'])
 
         logger.debug('Done Animation Import..')
 
 
-    def animation_bake(self):
+    def set_keys(self, curves):
+        '''
+        Key each curve dict (see curve_format.py) with its tangents, one bulk call per curve.
+        The edits are one advAnimEdit command on Maya's undo queue.
+        '''
+        curves = list(curves)
+        timer = time.perf_counter()
+        change, modifier = oma.MAnimCurveChange(), om.MDGModifier()
+        count = anim_curves.write_curves(curves, change, modifier)
+        anim_undo.commit(change, modifier)
+        seconds = time.perf_counter() - timer
+        logger.info(f'Keyed {count} keys on {len(curves)} curves in {seconds:.3f}s'
+                    f'{f" ({count / seconds:.0f} keys/s)" if seconds else ""}')
+        return count
+
+
+    def animation_bake(self, nodes=None, start_frame=None, end_frame=None):
+        '''
+        Key the baked transforms on the proxy joints. Only the requested slice of the bake
+        file is read. Reduced bakes (ANIM_BAKE_KEYS_FILENAME) key only the kept keys.
+
+        Arguments:
+        nodes (list/None): Only the nodes of the bake matching these names or fnmatch patterns
+        start_frame, end_frame (float/None): Only frames in this range
+        '''
         logger.debug('Start Animation Bake..')
-        file_anim_bake = os.path.join(self.anim_file.baked_anim, ANIM_BAKE_FILENAME)
-        self.anim_bake_data = self.file_import(file_anim_bake)
+        file_anim_keys = os.path.join(self.anim_file.baked_anim, ANIM_BAKE_KEYS_FILENAME)
+        if os.path.exists(file_anim_keys): # Reduced bake
+            self.set_keys(curve_format.load_curves(file_anim_keys, nodes, start=start_frame,
+                                                   end=end_frame))
+            logger.debug('Done Animation Bake..')
+            return
 
-        # Get frame range
-        for frame in self.anim_bake_data.keys():
-            for node, attribute in self.anim_bake_data[frame].items():
-                value = self.anim_curve_data[frame][node][attribute]
-                cmds.setKeyframe(node, at=attribute, t=frame, v=value)
+        file_anim_bake = os.path.join(self.anim_file.baked_anim, ANIM_BAKE_FILENAME)
+        if not os.path.exists(file_anim_bake): # Exports older than the binary bake
+            file_anim_bake = os.path.join(self.anim_file.baked_anim, ANIM_BAKE_DEBUG_FILENAME)
+            frames, bake_nodes, channels, values = bake_format.from_frame_dict(
+                self.file_import(file_anim_bake))
+            read_node = lambda index, frames: values[frames, index]
+        else:
+            # Compressed bakes decode only the nodes and frames read
+            bake = bake_format.BakeFile(file_anim_bake)
+            frames, bake_nodes, channels = bake.frames, bake.nodes, bake.channels
+            read_node = bake.node_values
+
+        frame_slice = slice(None)
+        if start_frame is not None or end_frame is not None:
+            frame_slice = bake_format.frame_slice(frames, start_frame, end_frame)
+        frames = np.asarray(frames[frame_slice], dtype=float)
+        curves = list()
+        for node_index, node in enumerate(bake_nodes):
+            if nodes is not None and not curve_format.matches(node, nodes):
+                continue
+            node_values = read_node(node_index, frame_slice)
+            for channel_index, attribute in enumerate(channels):
+                column = node_values[:, channel_index]
+                keep = ~np.isnan(column) # NaN for channels the node does not have
+                if not keep.any():
+                    continue
+                curve = curve_format.new_curve(node, attribute)
+                curve['times'] = frames[keep].tolist()
+                curve['values'] = column[keep].tolist()
+                curves.append(curve)
+        self.set_keys(curves)
 
         logger.debug('Done Animation Bake..')
 
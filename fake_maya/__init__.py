@@ -0,0 +1,87 @@
+'''
+fake_maya
+
+In-memory stand-in for maya.cmds, maya.api.OpenMaya and maya.api.OpenMayaAnim, so the rig code
+and its tests run in plain CPython without mayapy. install() registers the fake modules as maya,
+maya.cmds, maya.api.OpenMaya, maya.api.OpenMayaAnim and maya.standalone in sys.modules; code
+importing Maya afterwards gets the fake engine.
+
+The engine keeps a dependency graph of nodes, attributes and connections with pull
+evaluation of transforms, world matrices, matrix utility nodes (multMatrix, blendMatrix,
+decomposeMatrix, composeMatrix, inverseMatrix), parent / point / orient / scale
+constraints, animation curves and lofted NURBS surfaces. Results are memoized per node until an upstream edit, so
+queries on 10k joint rigs stay fast.
+
+Limitations:
+IK handles, pole vector and aim constraints, uvPin, skinCluster and blendShape nodes are
+created and connected but not solved. Dependency cycles are evaluated with stored values. Pivots and segment scale compensate are ignored.
+Scene files are JSON snapshots, Maya .ma/.mb files cannot be opened. Commands support the
+flags used in this package.
+
+e.g.
+import adv_scripting.fake_maya as fake_maya
+fake_maya.install()
+import maya.cmds as cmds
+cmds.joint(p=(0, 5, 0))
+'''
+import sys
+import types
+import adv_scripting.fake_maya.scene as scene
+import adv_scripting.fake_maya.cmds as cmds
+import adv_scripting.fake_maya.openmaya as openmaya
+import adv_scripting.fake_maya.openmayaanim as openmayaanim
+
+MODULE_NAMES = ('maya', 'maya.cmds', 'maya.api', 'maya.api.OpenMaya', 'maya.api.OpenMayaAnim',
+                'maya.standalone')
+_previous_modules = dict()
+
+
+def _standalone_module():
+    standalone = types.ModuleType('maya.standalone')
+    standalone.initialize = lambda name='python': None
+    standalone.uninitialize = lambda: None
+    return standalone
+
+
+def install():
+    '''
+    Make 'import maya.cmds' and 'import maya.api.OpenMaya' return the fake engine.
+    '''
+    if is_installed():
+        return
+    maya = types.ModuleType('maya')
+    maya.__path__ = []
+    maya.fake = True
+    api = types.ModuleType('maya.api')
+    api.__path__ = []
+    api.OpenMaya = openmaya
+    api.OpenMayaAnim = openmayaanim
+    maya.cmds = cmds
+    maya.api = api
+    maya.standalone = _standalone_module()
+    for name, module in zip(MODULE_NAMES, (maya, cmds, api, openmaya, openmayaanim,
+                                           maya.standalone)):
+        if name in sys.modules:
+            _previous_modules[name] = sys.modules[name]
+        sys.modules[name] = module
+
+
+def uninstall():
+    '''
+    Restore the modules replaced by install().
+    '''
+    for name in MODULE_NAMES:
+        sys.modules.pop(name, None)
+        if name in _previous_modules:
+            sys.modules[name] = _previous_modules.pop(name)
+
+
+def is_installed():
+    return getattr(sys.modules.get('maya'), 'fake', False)
+
+
+def new_scene():
+    '''
+    Start an empty scene, like cmds.file(new=True, force=True).
+    '''
+    return scene.new_scene()
@@ -0,0 +1,191 @@
+'''
+animation.py
+
+Animation curves for the fake Maya engine. Keys live on animCurve nodes connected to the
+animated plug, like in Maya. Curves are evaluated with Hermite interpolation from the key
+tangents; 'step' holds the value and 'linear' interpolates linearly.
+
+Tangent angles are in degrees with time in seconds at FPS frames per second.
+'''
+import bisect
+import math
+
+FPS = 24.0
+DEFAULT_TANGENT = 'auto'
+# Curve node type per attribute type
+CURVE_TYPES = {'doubleLinear': 'animCurveTL', 'doubleAngle': 'animCurveTA', 'time': 'animCurveTT'}
+
+
+class Key():
+    __slots__ = ('time', 'value', 'itt', 'ott', 'ia', 'oa', 'iw', 'ow')
+
+    def __init__(self, time, value, itt=DEFAULT_TANGENT, ott=DEFAULT_TANGENT):
+        self.time = float(time)
+        self.value = float(value)
+        self.itt = itt
+        self.ott = ott
+        # Explicit tangent angles, None computes them from the tangent type
+        self.ia = None
+        self.oa = None
+        self.iw = 1.0
+        self.ow = 1.0
+
+
+def keys(curve):
+    return curve.data.setdefault('keys', [])
+
+
+def find_curve(node, path):
+    '''
+    Returns the animCurve node driving a plug, None if not animated.
+    '''
+    source = node.inputs.get(path)
+    if source is not None and source[0].type.name.startswith('animCurve'):
+        return source[0]
+    return None
+
+
+def get_or_create_curve(scene, node, path, spec):
+    curve = find_curve(node, path)
+    if curve is not None:
+        return curve
+    if path in node.inputs:
+        # Driven by something else, e.g. a constraint
+        return None
+    curve = create_curve(scene, node, path, spec)
+    attach_curve(curve, node, path)
+    return curve
+
+
+def create_curve(scene, node, path, spec):
+    '''
+    Returns a new animCurve node typed by spec, not connected.
+    '''
+    curve_type = CURVE_TYPES.get(spec.type, 'animCurveTU')
+    name = f"{node.name}_{path.replace('[', '_').replace(']', '').replace('.', '_')}"
+    return scene.create_node(curve_type, name)
+
+
+def attach_curve(curve, node, path):
+    curve.scene.connect(curve, 'output', node, path)
+    node.data.setdefault('anim_curves', []).append(curve)
+
+
+def detach_curve(curve, node, path):
+    curve.scene.disconnect(node, path)
+    if curve in node.data.get('anim_curves', []):
+        node.data['anim_curves'].remove(curve)
+
+
+def set_key(curve, time, value, itt=None, ott=None):
+    '''
+    Add or replace the key at time.
+    '''
+    curve_keys = keys(curve)
+    times = [key.time for key in curve_keys]
+    index = bisect.bisect_left(times, float(time))
+    if index < len(curve_keys) and abs(curve_keys[index].time - time) < 1e-9:
+        key = curve_keys[index]
+        key.value = float(value)
+    else:
+        key = Key(time, value)
+        curve_keys.insert(index, key)
+    if itt:
+        key.itt = itt
+    if ott:
+        key.ott = ott
+    curve.scene.changed(curve)
+    return key
+
+
+def key_indices(curve, time=None, index=None):
+    '''
+    Indices of keys in a time range (inclusive) or index range (inclusive).
+
+    Arguments
+    time (float/tuple/None): single time or (start, end)
+    index (int/tuple/None): single index or (start, end)
+    '''
+    count = len(keys(curve))
+    if index is not None:
+        if not isinstance(index, (tuple, list)):
+            index = (index, index)
+        start, end = index[0], index[-1]
+        return [i for i in range(count) if start <= i <= end]
+    if time is not None:
+        if not isinstance(time, (tuple, list)):
+            time = (time, time)
+        start = time[0] if time[0] is not None and time[0] != '' else -math.inf
+        end = time[-1] if time[-1] is not None and time[-1] != '' else math.inf
+        return [i for i, key in enumerate(keys(curve)) if start - 1e-9 <= key.time <= end + 1e-9]
+    return list(range(count))
+
+
+def _neighbour_slope(curve_keys, index, side):
+    key = curve_keys[index]
+    other = index + (1 if side == 'out' else -1)
+    if other < 0 or other >= len(curve_keys):
+        return None
+    neighbour = curve_keys[other]
+    return (neighbour.value - key.value) / (neighbour.time - key.time)
+
+
+def slope(curve_keys, index, side):
+    '''
+    Tangent slope in value per frame.
+
+    Arguments
+    side (str): 'in' or 'out'
+    '''
+    key = curve_keys[index]
+    angle = key.ia if side == 'in' else key.oa
+    if angle is not None:
+        return math.tan(math.radians(angle)) / FPS
+    tangent = key.itt if side == 'in' else key.ott
+    if tangent in ('flat', 'step', 'stepnext'):
+        return 0.0
+    if tangent == 'linear':
+        value = _neighbour_slope(curve_keys, index, side)
+        return value if value is not None else 0.0
+    previous = _neighbour_slope(curve_keys, index, 'in')
+    following = _neighbour_slope(curve_keys, index, 'out')
+    if previous is None or following is None:
+        if tangent in ('spline', 'fixed'):
+            return previous if previous is not None else (following or 0.0)
+        return 0.0
+    if tangent in ('auto', 'clamped', 'plateau') and previous * following <= 0.0:
+        # Flat at local extremes so the curve does not overshoot
+        return 0.0
+    before = curve_keys[index - 1]
+    after = curve_keys[index + 1]
+    return (after.value - before.value) / (after.time - before.time)
+
+
+def angle(curve_keys, index, side):
+    return math.degrees(math.atan(slope(curve_keys, index, side) * FPS))
+
+
+def evaluate(curve, time):
+    curve_keys = keys(curve)
+    if not curve_keys:
+        return 0.0
+    if time <= curve_keys[0].time:
+        return curve_keys[0].value
+    if time >= curve_keys[-1].time:
+        return curve_keys[-1].value
+    times = [key.time for key in curve_keys]
+    index = bisect.bisect_right(times, time) - 1
+    left = curve_keys[index]
+    right = curve_keys[index + 1]
+    if left.ott == 'step':
+        return left.value
+    if left.ott == 'stepnext':
+        return right.value
+    span = right.time - left.time
+    s = (time - left.time) / span
+    m0 = slope(curve_keys, index, 'out') * span
+    m1 = slope(curve_keys, index + 1, 'in') * span
+    s2 = s * s
+    s3 = s2 * s
+    return ((2 * s3 - 3 * s2 + 1) * left.value + (s3 - 2 * s2 + s) * m0 +
+            (-2 * s3 + 3 * s2) * right.value + (s3 - s2) * m1)
@@ -0,0 +1,1851 @@
+'''
+cmds.py
+
+maya.cmds subset for the fake Maya engine. Installed as maya.cmds by fake_maya.install().
+
+Commands follow Maya's flag names (long and short), return values and errors: ValueError
+for names that match no object, RuntimeError for invalid edits. Only the flags used in this
+package are supported, others are ignored.
+'''
+import importlib.util
+import math
+import os
+import adv_scripting.fake_maya.mmath as mmath
+import adv_scripting.fake_maya.nurbs as nurbs
+import adv_scripting.fake_maya.scene as scene_module
+import adv_scripting.fake_maya.animation as animation
+import adv_scripting.fake_maya.constraints as constraints
+import adv_scripting.fake_maya.files as files
+import adv_scripting.fake_maya.openmaya as openmaya
+
+# Maya's default color index palette (index 1-31), index 0 uses the default color
+COLOR_INDEX = [None, (0.0, 0.0, 0.0), (0.25, 0.25, 0.25), (0.6, 0.6, 0.6), (0.61, 0.0, 0.16),
+               (0.0, 0.02, 0.38), (0.0, 0.0, 1.0), (0.0, 0.27, 0.1), (0.15, 0.0, 0.26),
+               (0.78, 0.0, 0.78), (0.54, 0.28, 0.2), (0.25, 0.14, 0.12), (0.6, 0.15, 0.0),
+               (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.25, 0.6), (1.0, 1.0, 1.0),
+               (1.0, 1.0, 0.0), (0.39, 0.86, 1.0), (0.26, 1.0, 0.64), (1.0, 0.69, 0.69),
+               (0.89, 0.67, 0.47), (1.0, 1.0, 0.39), (0.0, 0.6, 0.33), (0.63, 0.41, 0.19),
+               (0.62, 0.63, 0.19), (0.41, 0.63, 0.19), (0.19, 0.63, 0.36), (0.19, 0.63, 0.63),
+               (0.19, 0.4, 0.63), (0.44, 0.19, 0.63), (0.63, 0.19, 0.41)]
+SECONDARY_AXES = {'xup': (1, 0, 0), 'xdown': (-1, 0, 0), 'yup': (0, 1, 0), 'ydown': (0, -1, 0),
+                  'zup': (0, 0, 1), 'zdown': (0, 0, -1)}
+_plugins = dict() # Loaded Python plugins, name -> module
+
+
+# HELPERS ==============================================================
+
+def _scene():
+    return scene_module.current()
+
+
+def _flag(kwargs, *names, default=None):
+    for name in names:
+        if name in kwargs:
+            return kwargs[name]
+    return default
+
+
+def _flatten(objects):
+    names = list()
+    for item in objects:
+        if isinstance(item, (list, tuple, set)):
+            names.extend(_flatten(item))
+        elif item is not None:
+            names.append(item)
+    return names
+
+
+def _nodes(objects, selection=True):
+    '''
+    Nodes for command arguments, the selection if there are none.
+    '''
+    scene = _scene()
+    names = _flatten(objects)
+    if not names:
+        return list(scene.selection) if selection else list()
+    nodes = list()
+    for name in names:
+        if isinstance(name, scene_module.Node):
+            nodes.append(name)
+            continue
+        name = str(name)
+        if any(char in name for char in '*?') or name.endswith(']') and '.' not in name:
+            matches = scene.find(name)
+            if not matches:
+                raise ValueError(f'No object matches name: {name}')
+            nodes.extend(matches)
+        else:
+            nodes.append(scene.node(name.split('.', 1)[0]))
+    return nodes
+
+
+def _plug(text, default_index=0):
+    '''
+    Returns node, canonical attribute path and AttrSpec of 'node.attribute'.
+    '''
+    if '.' not in text:
+        raise ValueError(f'No attribute given: {text}')
+    node_name, path = text.split('.', 1)
+    node = _scene().node(node_name)
+    try:
+        path, spec = scene_module.resolve_path(node, path, default_index)
+    except scene_module.PlugError:
+        raise ValueError(f'No object matches name: {text}')
+    return node, path, spec
+
+
+def _plug_name(node, path, long=False):
+    return f'{node.long_name() if long else node.display_name()}.{path}'
+
+
+def _names(nodes, long=False):
+    return [node.long_name() if long else node.display_name() for node in nodes]
+
+
+def _output(spec, value):
+    if spec.type == 'matrix':
+        return list(value)
+    if spec.is_numeric_compound():
+        return [tuple(value)]
+    if spec.type == 'bool':
+        return bool(value)
+    if spec.type in ('long', 'short', 'byte', 'enum'):
+        return int(value)
+    if spec.type in scene_module.NUMERIC_TYPES:
+        return float(value)
+    return value
+
+
+def _vector(value, count=3):
+    if value is True:
+        return None
+    return [float(v) for v in list(value)[:count]]
+
+
+def _is_keyable(node, path, spec):
+    return node.keyable.get(path, spec.keyable)
+
+
+def _is_transform(node):
+    return node.is_a('transform')
+
+
+# NODES ================================================================
+
+def createNode(node_type, name=None, n=None, parent=None, p=None, skipSelect=False, ss=False,
+               shared=False):
+    scene = _scene()
+    parent = parent or p
+    node = scene.create_node(node_type, name or n, scene.node(parent) if parent else None,
+                             select=not (skipSelect or ss))
+    return node.display_name()
+
+
+def objExists(name):
+    scene = _scene()
+    if '.' in str(name):
+        try:
+            _plug(str(name))
+        except ValueError:
+            return False
+        return True
+    return bool(scene.find(str(name)))
+
+
+def nodeType(node, inherited=False, i=False, apiType=False, api=False, isTypeName=False):
+    if isTypeName:
+        return node if node in scene_module.NODE_TYPES else None
+    if '.' in str(node):
+        node = _plug(node)[0]
+    node = _scene().node(node)
+    if inherited or i:
+        return [name for name in node.type.inherited if not scene_module.NODE_TYPES[name].abstract
+                or name in ('dagNode', 'shape', 'constraint')]
+    return node.type.name
+
+
+def objectType(node, isType=None, isAType=None, i=None, isa=None):
+    node = _scene().node(node)
+    if isType or i:
+        return node.type.name == (isType or i)
+    if isAType or isa:
+        return node.is_a(isAType or isa)
+    return node.type.name
+
+
+def rename(*args, ignoreShape=False, ignoreShapes=False, uuid=False):
+    scene = _scene()
+    if len(args) == 1:
+        if not scene.selection:
+            raise RuntimeError('rename: Nothing selected.')
+        node, name = scene.selection[0], args[0]
+    else:
+        node, name = scene.node(args[0]), args[1]
+    if '|' in name or not name:
+        raise RuntimeError(f"New name '{name}' is invalid.")
+    scene.rename(node, name)
+    return node.display_name()
+
+
+def delete(*objects, **kwargs):
+    scene = _scene()
+    names = _flatten(objects)
+    if _flag(kwargs, 'constructionHistory', 'ch'):
+        for node in _nodes(names):
+            for history in list(_history(node)):
+                scene.delete(history)
+        return
+    if _flag(kwargs, 'channels', 'c') or _flag(kwargs, 'attribute', 'at'):
+        return
+    for node in _nodes(names):
+        scene.delete(node)
+
+
+def _history(node):
+    '''
+    Construction history nodes (circle, loft, ...) feeding a transform or its shapes.
+    '''
+    for item in [node] + list(node.children):
+        for source, _ in item.inputs.values():
+            if source.is_a('makeNurbCircle') or source.is_a('loft'):
+                yield source
+
+
+def duplicate(*objects, **kwargs):
+    scene = _scene()
+    parent_only = _flag(kwargs, 'parentOnly', 'po', default=False)
+    rename_children = _flag(kwargs, 'renameChildren', 'rc', default=False)
+    roots_only = _flag(kwargs, 'returnRootsOnly', 'rr', default=False)
+    name = _flag(kwargs, 'name', 'n')
+    result = list()
+    for node in _nodes(objects):
+        copies = list()
+        copy = _copy_node(scene, node, node.parent, name or node.name, copies)
+        if not parent_only:
+            for child in node.children:
+                _copy_tree(scene, child, copy, rename_children, copies)
+        # Like Maya, copied shapes are not listed
+        result.extend([copy] if roots_only else
+                      [item for item in copies if item is copy or not item.type.shape])
+    scene.selection = [node for node in result if node.parent is None or node in result[:1]]
+    return [node.display_name() for node in result]
+
+
+def _copy_node(scene, node, parent, name, copies):
+    copy = scene.create_node(node.type.name, name, parent)
+    copy.values = dict(node.values)
+    copy.dynamic = {key: _copy_spec(spec) for key, spec in node.dynamic.items()}
+    copy.locked = set(node.locked)
+    copy.keyable = dict(node.keyable)
+    copy.channel_box = dict(node.channel_box)
+    for key in ('cvs', 'degree', 'form', 'knots', 'limits', 'wire_color'):
+        if key in node.data:
+            copy.data[key] = node.data[key]
+    copies.append(copy)
+    return copy
+
+
+def _copy_spec(spec):
+    copy = scene_module.AttrSpec(spec.name, spec.short, spec.type, spec.default,
+                                 [_copy_spec(child) for child in spec.children], spec.multi,
+                                 spec.output, spec.keyable, spec.dynamic)
+    copy.enum_names = spec.enum_names
+    copy.min = spec.min
+    copy.max = spec.max
+    copy.nice_name = spec.nice_name
+    copy.data_type = spec.data_type
+    copy.hidden = spec.hidden
+    return copy
+
+
+def _copy_tree(scene, node, parent, rename_children, copies):
+    if node.is_a('constraint'):
+        return
+    name = node.name
+    if rename_children or not node.type.dag:
+        name = scene.unique_name(name, None, False)
+    copy = _copy_node(scene, node, parent, name, copies)
+    for child in node.children:
+        _copy_tree(scene, child, copy, rename_children, copies)
+
+
+def select(*objects, **kwargs):
+    scene = _scene()
+    if _flag(kwargs, 'clear', 'cl'):
+        scene.selection = list()
+        return
+    if _flag(kwargs, 'all', 'all'):
+        nodes = [node for node in scene.world
+                 if not any(child.is_a('camera') for child in node.children)]
+    else:
+        nodes = _nodes(objects, selection=False)
+        if _flag(kwargs, 'hierarchy', 'hi'):
+            nodes = [item for node in nodes for item in [node] + list(node.descendants())]
+    if _flag(kwargs, 'deselect', 'd'):
+        scene.selection = [node for node in scene.selection if node not in nodes]
+    elif _flag(kwargs, 'add', 'af', 'addFirst'):
+        scene.selection.extend(node for node in nodes if node not in scene.selection)
+    elif _flag(kwargs, 'toggle', 'tgl'):
+        for node in nodes:
+            if node in scene.selection:
+                scene.selection.remove(node)
+            else:
+                scene.selection.append(node)
+    else:
+        scene.selection = list(dict.fromkeys(nodes))
+
+
+def ls(*objects, **kwargs):
+    scene = _scene()
+    if _flag(kwargs, 'nodeTypes', 'nt'):
+        return scene_module.node_type_names()
+    if _flag(kwargs, 'defaultNodes', 'dn'):
+        # No default DG nodes (time1, lambert1, ...) are created
+        return list()
+    long = _flag(kwargs, 'long', 'l')
+    plugs = list()
+    names = _flatten(objects)
+    if names:
+        nodes = list()
+        for name in names:
+            if isinstance(name, scene_module.Node):
+                nodes.append(name)
+            elif '.' in str(name):
+                if objExists(name):
+                    node, path, spec = _plug(str(name))
+                    plugs.append(_plug_name(node, path, long))
+            else:
+                nodes.extend(scene.find(str(name)))
+    elif _flag(kwargs, 'selection', 'sl'):
+        nodes = list(scene.selection)
+    else:
+        nodes = list(scene.nodes)
+    if _flag(kwargs, 'dag'):
+        if names or _flag(kwargs, 'selection', 'sl'):
+            nodes = [item for node in nodes if node.type.dag
+                     for item in [node] + list(node.descendants())]
+        else:
+            nodes = [node for node in nodes if node.type.dag]
+    if _flag(kwargs, 'assemblies'):
+        nodes = [node for node in nodes if node.type.dag and node.parent is None]
+    if _flag(kwargs, 'shapes', 's') or _flag(kwargs, 'geometry', 'g'):
+        nodes = [node for node in nodes if node.is_a('shape')]
+    if _flag(kwargs, 'transforms', 'tr'):
+        nodes = [node for node in nodes if node.is_a('transform')]
+    if _flag(kwargs, 'cameras', 'ca'):
+        nodes = [node for node in nodes if node.is_a('camera')]
+    node_types = _flag(kwargs, 'type', 'typ')
+    if node_types:
+        node_types = [node_types] if isinstance(node_types, str) else node_types
+        nodes = [node for node in nodes if any(node.is_a(item) for item in node_types)]
+    exact_type = _flag(kwargs, 'exactType', 'et')
+    if exact_type:
+        exact_type = [exact_type] if isinstance(exact_type, str) else exact_type
+        nodes = [node for node in nodes if node.type.name in exact_type]
+    nodes = list(dict.fromkeys(node for node in nodes if node.alive))
+    if _flag(kwargs, 'uuid'):
+        return [node.uuid for node in nodes]
+    result = _names(nodes, long)
+    if _flag(kwargs, 'showType', 'st'):
+        result = [item for node, name in zip(nodes, result) for item in (name, node.type.name)]
+    return result + plugs
+
+
+def listRelatives(*objects, **kwargs):
+    nodes = _nodes(objects)
+    node_types = _flag(kwargs, 'type', 'typ')
+    if isinstance(node_types, str):
+        node_types = [node_types]
+    shapes = _flag(kwargs, 'shapes', 's')
+    result = list()
+    for node in nodes:
+        if _flag(kwargs, 'parent', 'p'):
+            relatives = [node.parent] if node.parent else []
+        elif _flag(kwargs, 'allParents', 'ap'):
+            relatives = list(node.ancestors())
+        elif _flag(kwargs, 'allDescendents', 'ad'):
+            # Maya lists descendants leaves first: a reversed depth first walk
+            relatives = list(node.descendants())[::-1]
+        else:
+            relatives = list(node.children)
+        if shapes:
+            relatives = [item for item in relatives if item.is_a('shape')]
+        if node_types:
+            relatives = [item for item in relatives if any(item.is_a(t) for t in node_types)]
+        result.extend(relatives)
+    if not result:
+        return None
+    return _names(result, _flag(kwargs, 'fullPath', 'f'))
+
+
+# ATTRIBUTES ===========================================================
+
+def getAttr(plug, **kwargs):
+    scene = _scene()
+    time = _flag(kwargs, 'time', 't')
+    size = _flag(kwargs, 'size', 's')
+    node, path, spec = _plug(plug, default_index=None if size or _flag(
+        kwargs, 'multiIndices', 'mi') else 0)
+    if _flag(kwargs, 'lock', 'l'):
+        return path in node.locked
+    if _flag(kwargs, 'keyable', 'k'):
+        return _is_keyable(node, path, spec)
+    if _flag(kwargs, 'channelBox', 'cb'):
+        return node.channel_box.get(path, False)
+    if _flag(kwargs, 'type'):
+        return spec.type if spec.type != 'string' else 'string'
+    if _flag(kwargs, 'settable', 'se'):
+        return not spec.output and path not in node.locked and \
+            scene.connection_source(node, path, spec) is None
+    if size:
+        return len(scene.multi_indices(node, path)) if spec.multi else 1
+    if _flag(kwargs, 'multiIndices', 'mi'):
+        return scene.multi_indices(node, path) or None
+    if spec.type == 'message':
+        raise RuntimeError(f'getAttr: Message attributes have no data values: {plug}')
+    if time is not None:
+        current = scene.time
+        scene.time = float(time)
+        scene.changed()
+        try:
+            return _output(spec, scene.get(node, path, spec))
+        finally:
+            scene.time = current
+            scene.changed()
+    if spec.type == 'enum' and _flag(kwargs, 'asString', 'asString'):
+        names = (spec.enum_names or '').split(':')
+        index = int(scene.get(node, path, spec))
+        return names[index] if index < len(names) else str(index)
+    return _output(spec, scene.get(node, path, spec))
+
+
+def setAttr(plug, *values, **kwargs):
+    scene = _scene()
+    node, path, spec = _plug(plug)
+    children = [scene_module.child_plug(path, child) for child in spec.children]
+    lock = _flag(kwargs, 'lock', 'l')
+    keyable = _flag(kwargs, 'keyable', 'k')
+    channel_box = _flag(kwargs, 'channelBox', 'cb')
+    if values:
+        value_type = _flag(kwargs, 'type', 'typ')
+        if value_type == 'matrix' or spec.type == 'matrix':
+            value = list(values[0]) if len(values) == 1 else list(values)
+            if len(value) == 4 and not isinstance(value[0], (int, float)):
+                value = [v for row in value for v in row]
+        elif value_type == 'string' or spec.type == 'string':
+            value = values[0]
+        elif spec.children and spec.type != 'compound':
+            value = list(values[0]) if len(values) == 1 else list(values)
+        else:
+            value = values[0]
+        if path in node.locked and lock is None:
+            raise RuntimeError(f"setAttr: The attribute '{plug}' is locked or connected and "
+                               f"cannot be modified.")
+        scene.set(node, path, value, spec)
+    for flag_value, store in ((keyable, node.keyable), (channel_box, node.channel_box)):
+        if flag_value is not None:
+            for item in [path] + children:
+                store[item] = bool(flag_value)
+    if lock is not None:
+        for item in [path] + children:
+            if lock:
+                node.locked.add(item)
+            else:
+                node.locked.discard(item)
+    scene.changed(node)
+
+
+_ATTRIBUTE_TYPES = {'float3': 'float3', 'double3': 'double3', 'matrix': 'matrix', 'fltMatrix': 'matrix',
+                    'string': 'string', 'stringArray': 'stringArray', 'doubleArray': 'doubleArray',
+                    'nurbsCurve': 'nurbsCurve', 'mesh': 'mesh'}
+
+
+def addAttr(*objects, **kwargs):
+    scene = _scene()
+    if _flag(kwargs, 'query', 'q') or _flag(kwargs, 'edit', 'e'):
+        return _add_attr_edit(objects, kwargs)
+    name = _flag(kwargs, 'longName', 'ln')
+    short = _flag(kwargs, 'shortName', 'sn')
+    name = name or short
+    attribute_type = _flag(kwargs, 'attributeType', 'at')
+    data_type = _flag(kwargs, 'dataType', 'dt')
+    attr_type = attribute_type or _ATTRIBUTE_TYPES.get(data_type, data_type) or 'double'
+    if attr_type == 'float3' and _flag(kwargs, 'usedAsColor', 'uac'):
+        attr_type = 'float3'
+    for node in _nodes(objects):
+        spec = scene.add_attr(node, name, attr_type, _flag(kwargs, 'defaultValue', 'dv'),
+                              short, _flag(kwargs, 'parent', 'p'),
+                              bool(_flag(kwargs, 'multi', 'm')),
+                              bool(_flag(kwargs, 'keyable', 'k')))
+        spec.data_type = data_type
+        spec.nice_name = _flag(kwargs, 'niceName', 'nn')
+        spec.hidden = bool(_flag(kwargs, 'hidden', 'h'))
+        if _flag(kwargs, 'minValue', 'min') is not None:
+            spec.min = float(_flag(kwargs, 'minValue', 'min'))
+        if _flag(kwargs, 'maxValue', 'max') is not None:
+            spec.max = float(_flag(kwargs, 'maxValue', 'max'))
+        if _flag(kwargs, 'enumName', 'en'):
+            spec.enum_names = _flag(kwargs, 'enumName', 'en')
+        if spec.parent is not None:
+            spec.keyable = spec.keyable or spec.parent.keyable
+
+
+def _add_attr_edit(objects, kwargs):
+    names = _flatten(objects)
+    node, path, spec = _plug(names[0]) if '.' in names[0] else (
+        _scene().node(names[0]), None, None)
+    if spec is None:
+        attribute = _flag(kwargs, 'longName', 'ln')
+        node, path, spec = _plug(f'{names[0]}.{attribute}')
+    if _flag(kwargs, 'query', 'q'):
+        if _flag(kwargs, 'enumName', 'en'):
+            return spec.enum_names
+        if _flag(kwargs, 'minValue', 'min'):
+            return spec.min
+        if _flag(kwargs, 'maxValue', 'max'):
+            return spec.max
+        if _flag(kwargs, 'defaultValue', 'dv'):
+            return spec.default
+        if _flag(kwargs, 'niceName', 'nn'):
+            return spec.nice_name
+        if _flag(kwargs, 'attributeType', 'at'):
+            return spec.type
+        return spec.name
+    for names_, field in ((('minValue', 'min'), 'min'), (('maxValue', 'max'), 'max'),
+                          (('defaultValue', 'dv'), 'default'), (('enumName', 'en'), 'enum_names'),
+                          (('niceName', 'nn'), 'nice_name'), (('keyable', 'k'), 'keyable')):
+        value = _flag(kwargs, *names_)
+        if value is not None:
+            setattr(spec, field, value)
+    _scene().changed()
+
+
+def deleteAttr(*objects, attribute=None, at=None):
+    for name in _flatten(objects):
+        if '.' in name:
+            node_name, attribute_name = name.split('.', 1)
+        else:
+            node_name, attribute_name = name, attribute or at
+        node = _scene().node(node_name)
+        spec = node.spec(attribute_name)
+        if spec is None:
+            raise ValueError(f'No object matches name: {node_name}.{attribute_name}')
+        _scene().delete_attr(node, spec.name)
+
+
+def attributeQuery(attribute, node=None, n=None, **kwargs):
+    scene = _scene()
+    node = scene.node(node or n)
+    spec = node.spec(attribute.split('[', 1)[0]) if '.' not in attribute else None
+    if spec is None and '.' in attribute:
+        try:
+            spec = scene_module.resolve_path(node, attribute)[1]
+        except scene_module.PlugError:
+            spec = None
+    if _flag(kwargs, 'exists', 'ex'):
+        return spec is not None
+    if spec is None:
+        raise RuntimeError(f'attributeQuery: Node {node.display_name()} has no attribute '
+                           f'{attribute}.')
+    if _flag(kwargs, 'attributeType', 'at'):
+        return 'typed' if spec.data_type or spec.type == 'string' else spec.type
+    if _flag(kwargs, 'hidden', 'h'):
+        return spec.hidden
+    if _flag(kwargs, 'listChildren', 'lc'):
+        return [child.name for child in spec.children] or None
+    if _flag(kwargs, 'listParent', 'lp'):
+        return [spec.parent.name] if spec.parent else None
+    if _flag(kwargs, 'listEnum', 'le'):
+        return [spec.enum_names] if spec.enum_names else None
+    if _flag(kwargs, 'keyable', 'k'):
+        return _is_keyable(node, spec.name, spec)
+    if _flag(kwargs, 'multi', 'm'):
+        return spec.multi
+    if _flag(kwargs, 'longName', 'ln'):
+        return spec.name
+    if _flag(kwargs, 'shortName', 'sn'):
+        return spec.short
+    if _flag(kwargs, 'niceName', 'nn'):
+        return spec.nice_name or spec.name
+    if _flag(kwargs, 'minExists', 'mne'):
+        return spec.min is not None
+    if _flag(kwargs, 'maxExists', 'mxe'):
+        return spec.max is not None
+    if _flag(kwargs, 'minimum', 'min'):
+        return [spec.min]
+    if _flag(kwargs, 'maximum', 'max'):
+        return [spec.max]
+    if _flag(kwargs, 'range', 'r'):
+        return [spec.min, spec.max]
+    if _flag(kwargs, 'message', 'msg'):
+        return spec.type == 'message'
+    if _flag(kwargs, 'writable', 'w'):
+        return not spec.output
+    if _flag(kwargs, 'readable', 'r'):
+        return True
+    if _flag(kwargs, 'usesMultiBuilder', 'umb'):
+        return False
+    return None
+
+
+def _list_plugs(scene, node, spec, multi, prefix=''):
+    '''
+    (path, AttrSpec) of an attribute and its children. Multi attributes list their existing
+    elements when multi is set, otherwise 'parent.child' names.
+    '''
+    path = f'{prefix}.{spec.name}' if prefix else spec.name
+    if spec.multi and multi:
+        paths = [f'{path}[{index}]' for index in scene.multi_indices(node, path)]
+    else:
+        paths = [path]
+    for item in paths:
+        yield item, spec
+        for child in spec.children:
+            if spec.multi or prefix:
+                yield from _list_plugs(scene, node, child, multi, item)
+            else:
+                yield from _list_plugs(scene, node, child, multi)
+
+
+def listAttr(*objects, **kwargs):
+    scene = _scene()
+    user_defined = _flag(kwargs, 'userDefined', 'ud')
+    keyable = _flag(kwargs, 'keyable', 'k')
+    channel_box = _flag(kwargs, 'channelBox', 'cb')
+    locked = _flag(kwargs, 'locked', 'l')
+    scalar = _flag(kwargs, 'scalar', 's')
+    multi = _flag(kwargs, 'multi', 'm')
+    settable = _flag(kwargs, 'settable', 'w', 'write')
+    result = list()
+    for name in _flatten(objects) or [node.display_name() for node in scene.selection]:
+        if '.' in name:
+            node, path, spec = _plug(name)
+            specs = [spec]
+        else:
+            node = scene.node(name)
+            specs = list(node.dynamic.values()) if user_defined else \
+                list(node.type.attrs.values()) + list(node.dynamic.values())
+        for spec in specs:
+            for path, item in _list_plugs(scene, node, spec, multi):
+                if keyable and not _is_keyable(node, path, item):
+                    continue
+                if channel_box and not node.channel_box.get(path, False):
+                    continue
+                if locked and path not in node.locked:
+                    continue
+                if scalar and (item.children or item.multi or item.type not in
+                               scene_module.NUMERIC_TYPES):
+                    continue
+                if settable and (item.output or item.type in ('compound', 'message')):
+                    continue
+                result.append(path)
+    return result or None
+
+
+# CONNECTIONS ==========================================================
+
+def connectAttr(source, destination, force=False, f=False, nextAvailable=False, na=False,
+                lock=False, l=False):
+    scene = _scene()
+    source_node, source_path, _ = _plug(source)
+    if nextAvailable or na:
+        node, path, spec = _plug(destination, default_index=None)
+        if spec.multi and not path.endswith(']'):
+            indices = scene.multi_indices(node, path)
+            used = set(index for index in indices if f'{path}[{index}]' in node.inputs)
+            index = next(i for i in range(len(used) + 1) if i not in used)
+            path = f'{path}[{index}]'
+        destination_node, destination_path = node, path
+    else:
+        destination_node, destination_path, spec = _plug(destination)
+    if destination_path in destination_node.inputs and \
+            destination_node.inputs[destination_path] == (source_node, source_path):
+        raise RuntimeError(f"connectAttr: '{source}' is already connected to '{destination}'.")
+    scene.connect(source_node, source_path, destination_node, destination_path, force or f)
+
+
+def disconnectAttr(source, destination, nextAvailable=False, na=False):
+    scene = _scene()
+    source_node, source_path, _ = _plug(source)
+    destination_node, destination_path, _ = _plug(destination)
+    if destination_node.inputs.get(destination_path) != (source_node, source_path):
+        raise RuntimeError(f"disconnectAttr: There is no connection from '{source}' to "
+                           f"'{destination}' to disconnect.")
+    scene.disconnect(destination_node, destination_path)
+
+
+def isConnected(source, destination, ignoreUnitConversion=False, iuc=False):
+    source_node, source_path, _ = _plug(source)
+    destination_node, destination_path, _ = _plug(destination)
+    return destination_node.inputs.get(destination_path) == (source_node, source_path)
+
+
+def _plug_matches(path, query, spec):
+    if query is None:
+        return True
+    if path == query or path.startswith(query + '[') or path.startswith(query + '.'):
+        return True
+    return bool(spec and spec.children and path in
+                {scene_module.child_plug(query, child) for child in spec.children})
+
+
+def listConnections(*objects, **kwargs):
+    source = _flag(kwargs, 'source', 's', default=True)
+    destination = _flag(kwargs, 'destination', 'd', default=True)
+    plugs = _flag(kwargs, 'plugs', 'p')
+    connections = _flag(kwargs, 'connections', 'c')
+    node_types = _flag(kwargs, 'type', 't')
+    exact_type = _flag(kwargs, 'exactType', 'et')
+    full = _flag(kwargs, 'fullNodeName', 'fnn')
+    result = list()
+    for name in _flatten(objects):
+        query = spec = None
+        if '.' in str(name):
+            node, query, spec = _plug(str(name), default_index=None)
+        else:
+            node = _scene().node(name)
+        items = list()
+        if source:
+            items.extend((path, other, other_path)
+                         for path, (other, other_path) in node.inputs.items())
+        if destination:
+            items.extend((path, other, other_path)
+                         for path, destinations in node.outputs.items()
+                         for other, other_path in destinations)
+        for path, other, other_path in items:
+            if not _plug_matches(path, query, spec):
+                continue
+            if node_types and not (other.type.name == node_types if exact_type
+                                   else other.is_a(node_types)):
+                continue
+            if connections:
+                result.append(_plug_name(node, path, full))
+            result.append(_plug_name(other, other_path, full) if plugs else
+                          _names([other], full)[0])
+    return result
+
+
+# TRANSFORMS ===========================================================
+
+def _world_rotation(scene, node):
+    return mmath.rotation_matrix(mmath.decompose(scene.world_matrix(node))[1])
+
+
+def _set_world_rotation(scene, node, rotation):
+    space = scene.parent_space(node)
+    local = mmath.mult(rotation, mmath.transpose(mmath.rotation_matrix(mmath.decompose(space)[1])))
+    if node.is_a('joint'):
+        orient = mmath.euler_matrix([math.radians(v) for v in scene.get(node, 'jointOrient')])
+        local = mmath.mult(local, mmath.transpose(orient))
+    order = scene.get(node, 'rotateOrder')
+    scene._set_vector(node, 'rotate', [math.degrees(v) for v in
+                                       mmath.matrix_to_euler(local, order)])
+
+
+def _set_world_position(scene, node, position):
+    scene._set_vector(node, 'translate',
+                      mmath.transform_point(position, mmath.inverse(scene.parent_space(node))))
+
+
+def xform(*objects, **kwargs):
+    scene = _scene()
+    nodes = _nodes(objects)
+    query = _flag(kwargs, 'query', 'q')
+    world = _flag(kwargs, 'worldSpace', 'ws')
+    relative = _flag(kwargs, 'relative', 'r')
+    translate = _flag(kwargs, 'translation', 't')
+    rotate = _flag(kwargs, 'rotation', 'ro')
+    scale = _flag(kwargs, 'scale', 's')
+    matrix = _flag(kwargs, 'matrix', 'm')
+    rotate_order = _flag(kwargs, 'rotateOrder', 'roo')
+    pivots = _flag(kwargs, 'pivots', 'piv')
+    rotate_pivot = _flag(kwargs, 'rotatePivot', 'rp')
+    scale_pivot = _flag(kwargs, 'scalePivot', 'sp')
+    if query:
+        node = nodes[0]
+        if translate:
+            if world:
+                return list(mmath.translation(scene.world_matrix(node)))
+            return list(scene.get(node, 'translate'))
+        if rotate:
+            if world:
+                order = scene.get(node, 'rotateOrder')
+                return [math.degrees(v) for v in
+                        mmath.matrix_to_euler(scene.world_matrix(node), order)]
+            return list(scene.get(node, 'rotate'))
+        if scale:
+            if world:
+                return list(mmath.decompose(scene.world_matrix(node))[2])
+            return list(scene.get(node, 'scale'))
+        if matrix:
+            if world:
+                return list(scene.world_matrix(node))
+            return list(scene.local_matrix(node))
+        if rotate_order:
+            return mmath.ROTATE_ORDERS[scene.get(node, 'rotateOrder')]
+        if pivots or rotate_pivot or scale_pivot:
+            if world:
+                position = list(mmath.translation(scene.world_matrix(node)))
+            else:
+                position = list(scene.get(node, 'rotatePivot'))
+            return position + position if pivots else position
+        if _flag(kwargs, 'boundingBox', 'bb'):
+            return _bounding_box(scene, node)
+        if _flag(kwargs, 'shear', 'sh'):
+            return list(scene.get(node, 'shear'))
+        return None
+
+    for node in nodes:
+        if rotate_order is not None:
+            order = mmath.ROTATE_ORDERS.index(rotate_order) if isinstance(rotate_order, str) \
+                else int(rotate_order)
+            world_matrix = scene.world_matrix(node)
+            node.values['rotateOrder'] = order
+            scene.changed(node)
+            if _flag(kwargs, 'preserve', 'p'):
+                scene.set_world_matrix(node, world_matrix, components='r')
+        if matrix is not None:
+            matrix_values = tuple(float(v) for v in matrix)
+            if world:
+                scene.set_world_matrix(node, matrix_values)
+            else:
+                scene.set_local_matrix(node, matrix_values)
+        if translate is not None:
+            values = _vector(translate)
+            if world:
+                if relative:
+                    values = [a + b for a, b in
+                              zip(mmath.translation(scene.world_matrix(node)), values)]
+                _set_world_position(scene, node, values)
+            else:
+                if relative:
+                    values = [a + b for a, b in zip(scene.get(node, 'translate'), values)]
+                scene._set_vector(node, 'translate', values)
+        if rotate is not None:
+            values = _vector(rotate)
+            if world:
+                rotation = mmath.euler_matrix([math.radians(v) for v in values],
+                                              scene.get(node, 'rotateOrder'))
+                if relative:
+                    rotation = mmath.mult(_world_rotation(scene, node), rotation)
+                _set_world_rotation(scene, node, rotation)
+            else:
+                if relative:
+                    values = [a + b for a, b in zip(scene.get(node, 'rotate'), values)]
+                scene._set_vector(node, 'rotate', values)
+        if scale is not None:
+            values = _vector(scale)
+            if relative:
+                values = [a * b for a, b in zip(scene.get(node, 'scale'), values)]
+            elif world:
+                space_scale = mmath.decompose(scene.parent_space(node))[2]
+                values = [a / (b or 1.0) for a, b in zip(values, space_scale)]
+            scene._set_vector(node, 'scale', values)
+        for flag_value, names in ((pivots, ('rotatePivot', 'scalePivot')),
+                                  (rotate_pivot, ('rotatePivot',)),
+                                  (scale_pivot, ('scalePivot',))):
+            if flag_value is not None and flag_value is not True:
+                for name in names:
+                    scene._set_vector(node, name, _vector(flag_value))
+
+
+def _bounding_box(scene, node):
+    points = list()
+    for item in [node] + list(node.descendants()):
+        if item.is_a('nurbsCurve'):
+            world = scene.world_matrix(item)
+            points.extend(mmath.transform_point(cv, world) for cv in item.data.get('cvs', ()))
+        elif item.is_a('transform'):
+            points.append(mmath.translation(scene.world_matrix(item)))
+    return [min(p[0] for p in points), min(p[1] for p in points), min(p[2] for p in points),
+            max(p[0] for p in points), max(p[1] for p in points), max(p[2] for p in points)]
+
+
+def move(*args, **kwargs):
+    scene = _scene()
+    values = [float(arg) for arg in args if isinstance(arg, (int, float))]
+    objects = [arg for arg in args if not isinstance(arg, (int, float))]
+    relative = _flag(kwargs, 'relative', 'r')
+    object_space = _flag(kwargs, 'objectSpace', 'os') or _flag(kwargs, 'localSpace', 'ls')
+    for node in _nodes(objects):
+        if object_space:
+            current = scene.get(node, 'translate')
+            position = [a + b for a, b in zip(current, values)] if relative else values
+            scene._set_vector(node, 'translate', position)
+            continue
+        current = mmath.translation(scene.world_matrix(node))
+        position = [a + b for a, b in zip(current, values)] if relative else values
+        _set_world_position(scene, node, position)
+
+
+def makeIdentity(*objects, **kwargs):
+    scene = _scene()
+    apply = _flag(kwargs, 'apply', 'a')
+    flags = [_flag(kwargs, 'translate', 't'), _flag(kwargs, 'rotate', 'r'),
+             _flag(kwargs, 'scale', 's')]
+    if not any(flags):
+        flags = [True, True, True]
+    components = ''.join(letter for letter, flag in zip('trs', flags) if flag)
+    for node in _nodes(objects):
+        if not node.is_a('transform'):
+            continue
+        if not apply:
+            _reset(scene, node, components)
+            if _flag(kwargs, 'jointOrient', 'jo') and node.is_a('joint'):
+                scene._set_vector(node, 'jointOrient', (0, 0, 0))
+            continue
+        _freeze(scene, node, components)
+
+
+def _reset(scene, node, components):
+    for letter, name, value in (('t', 'translate', 0.0), ('r', 'rotate', 0.0), ('s', 'scale', 1.0)):
+        if letter in components:
+            scene._set_vector(node, name, (value, value, value))
+
+
+def _freeze(scene, node, components):
+    '''
+    makeIdentity -apply: bake transform values into shapes, children and joint orient.
+    '''
+    if node.is_a('joint'):
+        if 'r' in components:
+            rotation = mmath.mult(
+                mmath.euler_matrix([math.radians(v) for v in scene.get(node, 'rotate')],
+                                   scene.get(node, 'rotateOrder')),
+                mmath.euler_matrix([math.radians(v) for v in scene.get(node, 'jointOrient')]))
+            scene._set_vector(node, 'jointOrient',
+                              [math.degrees(v) for v in mmath.matrix_to_euler(rotation)])
+            scene._set_vector(node, 'rotate', (0, 0, 0))
+        components = components.replace('t', '').replace('r', '')
+        if not components:
+            return
+    translate = scene.get(node, 'translate') if 't' in components else (0, 0, 0)
+    rotate = scene.get(node, 'rotate') if 'r' in components else (0, 0, 0)
+    scale = scene.get(node, 'scale') if 's' in components else (1, 1, 1)
+    frozen = mmath.compose(translate, [math.radians(v) for v in rotate], scale,
+                           scene.get(node, 'rotateOrder'))
+    if frozen == mmath.IDENTITY:
+        return
+    children = [(child, mmath.mult(scene.local_matrix(child), frozen))
+                for child in node.children if child.is_a('transform')]
+    for child in node.children:
+        if child.is_a('nurbsCurve') and 'cvs' in child.data:
+            child.data['cvs'] = [mmath.transform_point(cv, frozen) for cv in child.data['cvs']]
+    _reset(scene, node, components)
+    for child, local in children:
+        scene.set_local_matrix(child, local)
+    scene.changed()
+
+
+def matchTransform(*objects, **kwargs):
+    scene = _scene()
+    nodes = _nodes(objects)
+    target = scene.world_matrix(nodes[-1])
+    flags = [_flag(kwargs, 'position', 'pos'), _flag(kwargs, 'rotation', 'rot'),
+             _flag(kwargs, 'scale', 'scl')]
+    if not any(flags):
+        flags = [True, True, True]
+    target_translate, target_rotation, target_scale, _ = mmath.decompose(target)
+    for node in nodes[:-1]:
+        translate, rotation, scale, _ = mmath.decompose(scene.world_matrix(node))
+        if flags[0]:
+            _set_world_position(scene, node, target_translate)
+        if flags[1]:
+            _set_world_rotation(scene, node, mmath.rotation_matrix(target_rotation))
+        if flags[2]:
+            space_scale = mmath.decompose(scene.parent_space(node))[2]
+            scene._set_vector(node, 'scale', [a / (b or 1.0) for a, b in
+                                              zip(target_scale, space_scale)])
+
+
+def parent(*args, **kwargs):
+    scene = _scene()
+    names = _flatten(args)
+    to_world = _flag(kwargs, 'world', 'w')
+    relative = _flag(kwargs, 'relative', 'r') or _flag(kwargs, 'shape', 's')
+    if to_world:
+        children = _nodes(names)
+        new_parent = None
+    else:
+        if len(names) < 2:
+            selection = list(scene.selection)
+            names = names + selection if names else selection
+        nodes = _nodes(names)
+        children, new_parent = nodes[:-1], nodes[-1]
+    result = list()
+    for child in children:
+        if child.parent is new_parent:
+            result.append(child.display_name())
+            continue
+        if new_parent is None and child.parent is None:
+            continue
+        world = scene.world_matrix(child) if child.is_a('transform') else None
+        if child.is_a('joint') and child.parent is not None and child.parent.is_a('joint'):
+            scene.disconnect(child, 'inverseScale')
+        scene.set_parent(child, new_parent)
+        if child.is_a('joint') and new_parent is not None and new_parent.is_a('joint'):
+            scene.connect(new_parent, 'scale', child, 'inverseScale', force=True)
+        if world is not None and not relative:
+            scene.set_world_matrix(child, world, joint_orient=child.is_a('joint'))
+        result.append(child.display_name())
+    return result
+
+
+def group(*objects, **kwargs):
+    scene = _scene()
+    parent_name = _flag(kwargs, 'parent', 'p')
+    node = scene.create_node('transform', _flag(kwargs, 'name', 'n') or 'group#',
+                             scene.node(parent_name) if parent_name else None)
+    if not _flag(kwargs, 'empty', 'em'):
+        nodes = _nodes(objects)
+        if nodes:
+            parent(nodes, node)
+    scene.selection = [node]
+    return node.display_name()
+
+
+# JOINTS ===============================================================
+
+def joint(*objects, **kwargs):
+    scene = _scene()
+    edit = _flag(kwargs, 'edit', 'e')
+    query = _flag(kwargs, 'query', 'q')
+    position = _flag(kwargs, 'position', 'p')
+    orientation = _flag(kwargs, 'orientation', 'o')
+    if query:
+        node = _nodes(objects)[0]
+        if orientation:
+            return list(scene.get(node, 'jointOrient'))
+        if position:
+            if _flag(kwargs, 'relative', 'r'):
+                return list(scene.get(node, 'translate'))
+            return list(mmath.translation(scene.world_matrix(node)))
+        if _flag(kwargs, 'radius', 'rad'):
+            return [scene.get(node, 'radius')]
+        return None
+    if edit:
+        for node in _nodes(objects):
+            _edit_joint(scene, node, kwargs)
+        return None
+
+    parent_node = next((node for node in scene.selection if node.is_a('joint')), None)
+    node = scene.create_node('joint', _flag(kwargs, 'name', 'n') or 'joint#', parent_node)
+    if parent_node is not None:
+        scene.connect(parent_node, 'scale', node, 'inverseScale')
+    if orientation is not None:
+        scene._set_vector(node, 'jointOrient', _vector(orientation))
+    if position is not None:
+        if _flag(kwargs, 'relative', 'r'):
+            scene._set_vector(node, 'translate', _vector(position))
+        else:
+            _set_world_position(scene, node, _vector(position))
+    if _flag(kwargs, 'radius', 'rad') is not None:
+        scene.set(node, 'radius', _flag(kwargs, 'radius', 'rad'))
+    rotate_order = _flag(kwargs, 'rotationOrder', 'roo')
+    if rotate_order:
+        node.values['rotateOrder'] = mmath.ROTATE_ORDERS.index(rotate_order)
+    scene.selection = [node]
+    return node.display_name()
+
+
+def _edit_joint(scene, node, kwargs):
+    if _flag(kwargs, 'orientation', 'o') is not None:
+        scene._set_vector(node, 'jointOrient', _vector(_flag(kwargs, 'orientation', 'o')))
+    position = _flag(kwargs, 'position', 'p')
+    if position is not None:
+        children = [(child, scene.world_matrix(child)) for child in node.children
+                    if child.is_a('transform')]
+        if _flag(kwargs, 'relative', 'r'):
+            scene._set_vector(node, 'translate', _vector(position))
+        else:
+            _set_world_position(scene, node, _vector(position))
+        if _flag(kwargs, 'component', 'co'):
+            for child, world in children:
+                scene.set_world_matrix(child, world, joint_orient=child.is_a('joint'))
+    if _flag(kwargs, 'radius', 'rad') is not None:
+        scene.set(node, 'radius', _flag(kwargs, 'radius', 'rad'))
+    orient_joint = _flag(kwargs, 'orientJoint', 'oj')
+    if orient_joint:
+        _orient_joint(scene, node, orient_joint,
+                      _flag(kwargs, 'secondaryAxisOrient', 'sao', default='yup'))
+        if _flag(kwargs, 'children', 'ch'):
+            for child in node.descendants():
+                if child.is_a('joint'):
+                    _orient_joint(scene, child, orient_joint,
+                                  _flag(kwargs, 'secondaryAxisOrient', 'sao', default='yup'))
+
+
+def _normalize(vector):
+    length = math.sqrt(sum(v * v for v in vector))
+    return [v / length for v in vector] if length > 1e-12 else None
+
+
+def _orient_joint(scene, node, orient_joint, secondary_axis):
+    '''
+    joint -e -oj: aim the first axis at the first child joint, the second axis towards
+    secondary_axis. The joint's rotation goes into jointOrient, children keep their world
+    transforms.
+    '''
+    children = [(child, scene.world_matrix(child)) for child in node.children
+                if child.is_a('transform')]
+    joint_children = [child for child, _ in children if child.is_a('joint')]
+    world = scene.world_matrix(node)
+    scene._set_vector(node, 'rotate', (0, 0, 0))
+    if orient_joint == 'none' or not joint_children:
+        if orient_joint == 'none':
+            scene._set_vector(node, 'jointOrient', (0, 0, 0))
+        else:
+            # End joints take the orientation of their parent
+            scene._set_vector(node, 'jointOrient', (0, 0, 0))
+    else:
+        position = mmath.translation(world)
+        child_position = mmath.translation(scene.world_matrix(joint_children[0]))
+        aim = _normalize([b - a for a, b in zip(position, child_position)])
+        if aim is not None:
+            up = list(SECONDARY_AXES.get(secondary_axis, (0, 1, 0)))
+            secondary = _normalize([u - mmath._dot(up, aim) * a for u, a in zip(up, aim)])
+            if secondary is None:
+                # Up axis parallel to the aim, use the world Z axis instead
+                secondary = _normalize(mmath._cross((0, 0, 1), aim)) or \
+                    _normalize(mmath._cross((0, 1, 0), aim))
+            first, second = orient_joint[0], orient_joint[1]
+            if first + second in ('xy', 'yz', 'zx'):
+                third = mmath._cross(aim, secondary)
+            else:
+                third = mmath._cross(secondary, aim)
+            axes = {first: aim, second: secondary, orient_joint[2]: third}
+            rotation = mmath.rotation_matrix((axes['x'], axes['y'], axes['z']))
+            space = scene.parent_space(node)
+            local = mmath.mult(rotation, mmath.transpose(
+                mmath.rotation_matrix(mmath.decompose(space)[1])))
+            scene._set_vector(node, 'jointOrient',
+                              [math.degrees(v) for v in mmath.matrix_to_euler(local)])
+    for child, child_world in children:
+        scene.set_world_matrix(child, child_world, joint_orient=child.is_a('joint'))
+
+
+# CURVES ===============================================================
+
+def _create_curve(scene, name, cvs, degree=1, form='open', parent=None):
+    transform = parent or scene.create_node('transform', name)
+    shape = scene.create_node('nurbsCurve', f'{transform.name}Shape', transform)
+    shape.data.update({'cvs': [tuple(float(v) for v in cv) for cv in cvs],
+                       'degree': degree, 'form': form})
+    return transform, shape
+
+
+def circle(**kwargs):
+    scene = _scene()
+    normal = _vector(_flag(kwargs, 'normal', 'nr', default=(0, 0, 1)))
+    center = _vector(_flag(kwargs, 'center', 'c', default=(0, 0, 0)))
+    radius = float(_flag(kwargs, 'radius', 'r', default=1.0))
+    sections = int(_flag(kwargs, 'sections', 's', default=8))
+    normal = _normalize(normal) or [0, 0, 1]
+    reference = (0, 0, 1) if abs(normal[2]) < 0.9 else (1, 0, 0)
+    u = _normalize(mmath._cross(normal, reference))
+    v = mmath._cross(normal, u)
+    cvs = [[center[axis] + radius * (math.cos(angle) * u[axis] + math.sin(angle) * v[axis])
+            for axis in range(3)]
+           for angle in (2 * math.pi * index / sections for index in range(sections))]
+    transform, shape = _create_curve(scene, _flag(kwargs, 'name', 'n') or 'nurbsCircle#', cvs,
+                                     int(_flag(kwargs, 'degree', 'd', default=3)), 'periodic')
+    scene.selection = [transform]
+    if _flag(kwargs, 'constructionHistory', 'ch', default=True):
+        history = scene.create_node('makeNurbCircle', 'makeNurbCircle#')
+        history.values['radius'] = radius
+        scene.connect(history, 'outputCurve', shape, 'create')
+        return [transform.display_name(), history.display_name()]
+    return [transform.display_name()]
+
+
+def curve(**kwargs):
+    scene = _scene()
+    points = _flag(kwargs, 'point', 'p', default=[])
+    degree = int(_flag(kwargs, 'degree', 'd', default=3))
+    periodic = _flag(kwargs, 'periodic', 'per')
+    transform, shape = _create_curve(scene, _flag(kwargs, 'name', 'n') or 'curve#', points, degree,
+                                     'periodic' if periodic else 'open')
+    if _flag(kwargs, 'knot', 'k'):
+        shape.data['knots'] = list(_flag(kwargs, 'knot', 'k'))
+    scene.selection = [transform]
+    return transform.display_name()
+
+
+def attachCurve(*objects, **kwargs):
+    '''
+    Joins curves by appending their world space CVs.
+    '''
+    scene = _scene()
+    transforms = _nodes(objects)
+    cvs = list()
+    degree = 1
+    for transform in transforms:
+        shapes = [transform] if transform.is_a('nurbsCurve') else \
+            [child for child in transform.children if child.is_a('nurbsCurve')]
+        for shape in shapes:
+            world = scene.world_matrix(shape)
+            cvs.extend(mmath.transform_point(cv, world) for cv in shape.data.get('cvs', ()))
+            degree = max(degree, shape.data.get('degree', 1))
+    if _flag(kwargs, 'replaceOriginal', 'rpo', default=True):
+        target = next(child for child in transforms[0].children if child.is_a('nurbsCurve'))
+        inverse = mmath.inverse(scene.world_matrix(target))
+        target.data['cvs'] = [mmath.transform_point(cv, inverse) for cv in cvs]
+        scene.changed()
+        return [transforms[0].display_name()]
+    transform, _ = _create_curve(scene, _flag(kwargs, 'name', 'n') or 'attachedCurve#', cvs,
+                                 degree)
+    return [transform.display_name()]
+
+
+def spaceLocator(**kwargs):
+    scene = _scene()
+    transform = scene.create_node('transform', _flag(kwargs, 'name', 'n') or 'locator#')
+    shape = scene.create_node('locator', f'{transform.name}Shape', transform)
+    position = _flag(kwargs, 'position', 'p')
+    if position:
+        scene._set_vector(shape, 'localPosition', _vector(position))
+    scene.selection = [transform]
+    return [transform.display_name()]
+
+
+def loft(*objects, **kwargs):
+    scene = _scene()
+    curves = _nodes(objects)
+    transform = scene.create_node('transform', _flag(kwargs, 'name', 'n') or 'loftedSurface#')
+    shape = scene.create_node('nurbsSurface', f'{transform.name}Shape', transform)
+    sections = list()
+    for item in curves:
+        curve = item if item.is_a('nurbsCurve') else next(
+            (child for child in item.children if child.is_a('nurbsCurve')), None)
+        if curve is None or not curve.data.get('cvs'):
+            raise RuntimeError(f'loft: {item.display_name()} is not a curve.')
+        world = scene.world_matrix(curve)
+        sections.append(dict(curve.data, cvs=[mmath.transform_point(cv, world)
+                                              for cv in curve.data['cvs']]))
+    shape.data.update(nurbs.loft(sections))
+    result = [transform.display_name()]
+    if _flag(kwargs, 'constructionHistory', 'ch', default=True):
+        history = scene.create_node('loft', 'loft#')
+        for index, item in enumerate(curves):
+            shapes = [child for child in item.children if child.is_a('nurbsCurve')]
+            if shapes:
+                scene.connect(shapes[0], 'worldSpace[0]', history, f'inputCurve[{index}]')
+        result.append(history.display_name())
+    return result
+
+
+def CenterPivot(*args, **kwargs):
+    return None
+
+
+def color(*objects, **kwargs):
+    rgb = _flag(kwargs, 'rgbColor', 'rgb')
+    for node in _nodes(objects):
+        node.data['wire_color'] = tuple(rgb) if rgb else None
+
+
+def colorIndex(index, *args, query=False, q=False, **kwargs):
+    if query or q:
+        value = COLOR_INDEX[int(index)] if 0 < int(index) < len(COLOR_INDEX) else None
+        return list(value) if value else None
+    return None
+
+
+def transformLimits(*objects, **kwargs):
+    '''
+    Limits are stored per node, they do not clamp evaluation.
+    '''
+    query = _flag(kwargs, 'query', 'q')
+    for node in _nodes(objects):
+        limits = node.data.setdefault('limits', dict())
+        if query:
+            for key in kwargs:
+                if key not in ('query', 'q'):
+                    return list(limits.get(key, (False, False) if key.startswith('e')
+                                           else (-1.0, 1.0)))
+            return None
+        if _flag(kwargs, 'remove', 'rm'):
+            limits.clear()
+        for key, value in kwargs.items():
+            if key not in ('remove', 'rm'):
+                limits[key] = tuple(value) if isinstance(value, (list, tuple)) else value
+    return None
+
+
+# IK / DEFORMERS =======================================================
+
+def ikHandle(*args, **kwargs):
+    '''
+    Creates the handle, effector and solver nodes. Handles are not solved.
+    '''
+    scene = _scene()
+    start_joint = scene.node(_flag(kwargs, 'startJoint', 'sj'))
+    end_joint = scene.node(_flag(kwargs, 'endEffector', 'ee'))
+    solver_name = _flag(kwargs, 'solver', 'sol', default='ikRPsolver')
+    solver = next(iter(scene.find(solver_name)), None) or \
+        scene.create_node(solver_name if solver_name in scene_module.NODE_TYPES else 'ikRPsolver',
+                          solver_name)
+    handle = scene.create_node('ikHandle', _flag(kwargs, 'name', 'n') or 'ikHandle#')
+    _set_world_position(scene, handle, mmath.translation(scene.world_matrix(end_joint)))
+    effector = scene.create_node('ikEffector', 'effector#', end_joint.parent or start_joint)
+    scene._set_vector(effector, 'translate', scene.get(end_joint, 'translate'))
+    scene.connect(start_joint, 'message', handle, 'startJoint')
+    scene.connect(effector, 'message', handle, 'endEffector')
+    scene.connect(solver, 'message', handle, 'ikSolver')
+    handle.data.update({'start_joint': start_joint, 'end_joint': end_joint})
+    result = [handle.display_name(), effector.display_name()]
+    if _flag(kwargs, 'createCurve', 'ccv', default=solver_name == 'ikSplineSolver') and \
+            solver_name == 'ikSplineSolver':
+        chain = [end_joint] + [node for node in end_joint.ancestors()]
+        chain = chain[:chain.index(start_joint) + 1][::-1] if start_joint in chain else [start_joint]
+        points = [mmath.translation(scene.world_matrix(node)) for node in chain]
+        transform, _ = _create_curve(scene, 'curve#', points, min(3, len(points) - 1))
+        result.append(transform.display_name())
+    scene.selection = [handle]
+    return result
+
+
+def skinCluster(*objects, **kwargs):
+    scene = _scene()
+    if _flag(kwargs, 'edit', 'e'):
+        node = scene.node(_flatten(objects)[0])
+        if _flag(kwargs, 'maximumInfluences', 'mi') is not None:
+            node.values['maxInfluences'] = int(_flag(kwargs, 'maximumInfluences', 'mi'))
+        return None
+    nodes = _nodes(objects)
+    node = scene.create_node('skinCluster', _flag(kwargs, 'name', 'n') or 'skinCluster#')
+    influences = [item for item in nodes if item.is_a('joint')]
+    for index, influence in enumerate(influences):
+        scene.connect(influence, 'worldMatrix[0]', node, f'matrix[{index}]')
+    for geometry in nodes:
+        if not geometry.is_a('joint'):
+            _original_shape(scene, geometry)
+    if _flag(kwargs, 'maximumInfluences', 'mi') is not None:
+        node.values['maxInfluences'] = int(_flag(kwargs, 'maximumInfluences', 'mi'))
+    return [node.display_name()]
+
+
+def _original_shape(scene, geometry):
+    '''
+    Deformers keep the undeformed geometry in an intermediate '<shape>Orig' sibling shape.
+    '''
+    shapes = [geometry] if geometry.is_a('shape') else \
+        [child for child in geometry.children if child.is_a('shape')]
+    if not shapes or any(scene.get(shape, 'intermediateObject') for shape in shapes):
+        return
+    shape = shapes[0]
+    original = scene.create_node(shape.type.name, f'{shape.name}Orig', shape.parent)
+    original.data = {key: value for key, value in shape.data.items()}
+    original.values['intermediateObject'] = True
+
+
+def blendShape(*objects, **kwargs):
+    scene = _scene()
+    nodes = _nodes(objects)
+    node = scene.create_node('blendShape', _flag(kwargs, 'name', 'n') or 'blendShape#')
+    _original_shape(scene, nodes[-1])
+    return [node.display_name()]
+
+
+def UVPin(*args, **kwargs):
+    '''
+    Pins the selected transforms to the first selected surface. Pins are not evaluated.
+    '''
+    scene = _scene()
+    selection = list(scene.selection)
+    if len(selection) < 2:
+        raise RuntimeError('UVPin: Select a surface and transforms to pin.')
+    surface = selection[0]
+    pin = scene.create_node('uvPin', 'uvPin#')
+    shapes = [child for child in surface.children if child.is_a('shape')]
+    pin.data['surface'] = shapes[0] if shapes else surface
+    for index, node in enumerate(selection[1:]):
+        scene.connect(pin, f'outputMatrix[{index}]', node, 'offsetParentMatrix', force=True)
+    return [pin.display_name()]
+
+
+def _constraint(constraint_type, objects, kwargs):
+    scene = _scene()
+    nodes = _nodes(objects)
+    if _flag(kwargs, 'query', 'q'):
+        constraint = nodes[-1] if nodes[-1].is_a('constraint') else next(
+            child for child in nodes[-1].children if child.is_a(constraint_type))
+        if _flag(kwargs, 'targetList', 'tl'):
+            return [target.display_name() for target in constraints.targets(constraint)]
+        if _flag(kwargs, 'weightAliasList', 'wal'):
+            return list(constraint.data['weights'])
+        return None
+    if _flag(kwargs, 'edit', 'e') or _flag(kwargs, 'remove', 'rm'):
+        driven = nodes[-1]
+        constraint = next(child for child in driven.children if child.is_a(constraint_type))
+        weight = _flag(kwargs, 'weight', 'w')
+        for target in nodes[:-1]:
+            index = constraint.data['targets'].index(target)
+            if _flag(kwargs, 'remove', 'rm'):
+                scene.set(constraint, constraint.data['weights'][index], 0.0)
+            elif weight is not None:
+                scene.set(constraint, constraint.data['weights'][index], weight)
+        return [constraint.display_name()]
+    skip = list()
+    for flag, channel in ((('skip', 'sk'), None), (('skipTranslate', 'st'), 'translate'),
+                          (('skipRotate', 'sr'), 'rotate')):
+        value = _flag(kwargs, *flag)
+        if value:
+            for axis in [value] if isinstance(value, str) else value:
+                skip.append(f'{channel}{axis.upper()}' if channel else axis)
+    constraint = constraints.create(scene, constraint_type, nodes[:-1], nodes[-1],
+                                    _flag(kwargs, 'maintainOffset', 'mo', default=False),
+                                    _flag(kwargs, 'name', 'n'),
+                                    _flag(kwargs, 'weight', 'w', default=1.0), skip)
+    return [constraint.display_name()]
+
+
+def parentConstraint(*objects, **kwargs):
+    return _constraint('parentConstraint', objects, kwargs)
+
+
+def pointConstraint(*objects, **kwargs):
+    return _constraint('pointConstraint', objects, kwargs)
+
+
+def orientConstraint(*objects, **kwargs):
+    return _constraint('orientConstraint', objects, kwargs)
+
+
+def scaleConstraint(*objects, **kwargs):
+    return _constraint('scaleConstraint', objects, kwargs)
+
+
+def aimConstraint(*objects, **kwargs):
+    return _constraint('aimConstraint', objects, kwargs)
+
+
+def poleVectorConstraint(*objects, **kwargs):
+    return _constraint('poleVectorConstraint', objects, kwargs)
+
+
+# ANIMATION ============================================================
+
+def currentTime(*args, **kwargs):
+    scene = _scene()
+    if _flag(kwargs, 'query', 'q') or not args:
+        return scene.time
+    scene.time = float(args[0])
+    scene.changed()
+    return scene.time
+
+
+def playbackOptions(**kwargs):
+    scene = _scene()
+    start, end = scene.playback_range
+    if _flag(kwargs, 'query', 'q'):
+        if _flag(kwargs, 'minTime', 'min') or _flag(kwargs, 'animationStartTime', 'ast'):
+            return start
+        return end
+    start = _flag(kwargs, 'minTime', 'min', 'animationStartTime', 'ast', default=start)
+    end = _flag(kwargs, 'maxTime', 'max', 'animationEndTime', 'aet', default=end)
+    scene.playback_range = (float(start), float(end))
+
+
+def _animated_plugs(objects, kwargs, keyable_only=True):
+    '''
+    (node, path, spec) of plug arguments, or of node arguments with the attribute flag.
+    '''
+    attributes = _flag(kwargs, 'attribute', 'at')
+    if isinstance(attributes, str):
+        attributes = [attributes]
+    plugs = list()
+    for name in _flatten(objects) or [node.display_name() for node in _scene().selection]:
+        if '.' in str(name):
+            plugs.append(_plug(str(name)))
+            continue
+        node = _scene().node(name)
+        if attributes:
+            plugs.extend(_plug(f'{node.long_name()}.{attribute}') for attribute in attributes)
+        else:
+            plugs.extend(_keyable_plugs(node) if keyable_only else [])
+    expanded = list()
+    for node, path, spec in plugs:
+        if spec.children and spec.type != 'compound':
+            expanded.extend((node, scene_module.child_plug(path, child), child)
+                            for child in spec.children)
+        else:
+            expanded.append((node, path, spec))
+    return expanded
+
+
+def _keyable_plugs(node):
+    plugs = list()
+    for spec in list(node.type.attrs.values()) + list(node.dynamic.values()):
+        for item in spec.walk():
+            if item.children or item.multi or item.type not in scene_module.NUMERIC_TYPES:
+                continue
+            if item.parent is not None and item.parent.multi:
+                continue
+            if _is_keyable(node, item.name, item) and item.name not in node.locked:
+                plugs.append((node, item.name, item))
+    return plugs
+
+
+def listAnimatable(*objects):
+    result = list()
+    for node in _nodes(objects):
+        for item_node, path, spec in _keyable_plugs(node):
+            source = item_node.inputs.get(path)
+            if source is not None and not source[0].type.name.startswith('animCurve'):
+                continue
+            result.append(_plug_name(item_node, path, long=True))
+    return result or None
+
+
+def setKeyframe(*objects, **kwargs):
+    scene = _scene()
+    times = _flag(kwargs, 'time', 't')
+    if times is None:
+        times = [scene.time]
+    elif not isinstance(times, (list, tuple)):
+        times = [times]
+    value = _flag(kwargs, 'value', 'v')
+    in_tangent = _flag(kwargs, 'inTangentType', 'itt')
+    out_tangent = _flag(kwargs, 'outTangentType', 'ott')
+    count = 0
+    for node, path, spec in _animated_plugs(objects, kwargs):
+        curve = animation.get_or_create_curve(scene, node, path, spec)
+        if curve is None:
+            continue
+        for time in times:
+            key_value = value if value is not None else scene.get(node, path, spec)
+            animation.set_key(curve, float(time), key_value, in_tangent, out_tangent)
+            count += 1
+    return count
+
+
+def _curves(objects, kwargs):
+    result = list()
+    for node, path, spec in _animated_plugs(objects, kwargs):
+        curve = animation.find_curve(node, path)
+        if curve is not None:
+            result.append(curve)
+    if not result and _flatten(objects):
+        # Curve nodes given directly
+        for name in _flatten(objects):
+            if '.' not in str(name):
+                for node in _scene().find(str(name)):
+                    if node.type.name.startswith('animCurve'):
+                        result.append(node)
+    return result
+
+
+def keyframe(*objects, **kwargs):
+    scene = _scene()
+    time = _flag(kwargs, 'time', 't')
+    index = _flag(kwargs, 'index', 'in')
+    curves = _curves(objects, kwargs)
+    if _flag(kwargs, 'query', 'q'):
+        if _flag(kwargs, 'keyframeCount', 'kc'):
+            return sum(len(animation.key_indices(curve, time, index)) for curve in curves)
+        if _flag(kwargs, 'name', 'n'):
+            return [curve.display_name() for curve in curves] or None
+        result = list()
+        for curve in curves:
+            curve_keys = animation.keys(curve)
+            for key_index in animation.key_indices(curve, time, index):
+                key = curve_keys[key_index]
+                if _flag(kwargs, 'timeChange', 'tc'):
+                    result.append(key.time)
+                if _flag(kwargs, 'valueChange', 'vc'):
+                    result.append(key.value)
+        return result or None
+    if _flag(kwargs, 'edit', 'e'):
+        relative = _flag(kwargs, 'relative', 'r')
+        time_change = _flag(kwargs, 'timeChange', 'tc')
+        value_change = _flag(kwargs, 'valueChange', 'vc')
+        for curve in curves:
+            curve_keys = animation.keys(curve)
+            for key_index in animation.key_indices(curve, time, index):
+                key = curve_keys[key_index]
+                if value_change is not None:
+                    key.value = key.value + value_change if relative else float(value_change)
+                if time_change is not None:
+                    key.time = key.time + time_change if relative else float(time_change)
+            curve_keys.sort(key=lambda key: key.time)
+        scene.changed()
+        return len(curves)
+    return None
+
+
+_TANGENT_FIELDS = (('inTangentType', 'itt'), ('outTangentType', 'ott'), ('inAngle', 'ia'),
+                   ('outAngle', 'oa'), ('inWeight', 'iw'), ('outWeight', 'ow'))
+
+
+def keyTangent(*objects, **kwargs):
+    scene = _scene()
+    time = _flag(kwargs, 'time', 't')
+    index = _flag(kwargs, 'index', 'in')
+    curves = _curves(objects, kwargs)
+    if _flag(kwargs, 'query', 'q'):
+        result = list()
+        for curve in curves:
+            curve_keys = animation.keys(curve)
+            for key_index in animation.key_indices(curve, time, index):
+                key = curve_keys[key_index]
+                for names in _TANGENT_FIELDS:
+                    if not _flag(kwargs, *names):
+                        continue
+                    field = names[1]
+                    if field in ('ia', 'oa'):
+                        result.append(animation.angle(curve_keys, key_index,
+                                                      'in' if field == 'ia' else 'out'))
+                    else:
+                        result.append(getattr(key, field))
+        return result or None
+    if _flag(kwargs, 'edit', 'e') or any(_flag(kwargs, *names) is not None
+                                         for names in _TANGENT_FIELDS):
+        for curve in curves:
+            curve_keys = animation.keys(curve)
+            for key_index in animation.key_indices(curve, time, index):
+                key = curve_keys[key_index]
+                for names in _TANGENT_FIELDS:
+                    value = _flag(kwargs, *names)
+                    if value is None:
+                        continue
+                    field = names[1]
+                    setattr(key, field, float(value) if field in ('ia', 'oa', 'iw', 'ow')
+                            else value)
+                    if field in ('ia', 'oa'):
+                        key.itt = 'fixed' if field == 'ia' and key.itt != 'fixed' else key.itt
+                        key.ott = 'fixed' if field == 'oa' and key.ott != 'fixed' else key.ott
+        scene.changed()
+    return None
+
+
+def cutKey(*objects, **kwargs):
+    scene = _scene()
+    time = _flag(kwargs, 'time', 't')
+    index = _flag(kwargs, 'index', 'in')
+    count = 0
+    for curve in _curves(objects, kwargs):
+        curve_keys = animation.keys(curve)
+        remove = set(animation.key_indices(curve, time, index))
+        count += len(remove)
+        curve.data['keys'] = [key for i, key in enumerate(curve_keys) if i not in remove]
+        if not curve.data['keys']:
+            scene.delete(curve)
+    scene.changed()
+    return count
+
+
+def bakeResults(*objects, **kwargs):
+    '''
+    Sample the evaluated channels at every frame and replace their inputs with keys.
+    '''
+    scene = _scene()
+    time = _flag(kwargs, 'time', 't', default=scene.playback_range)
+    start, end = (time, time) if not isinstance(time, (list, tuple)) else (time[0], time[-1])
+    step = float(_flag(kwargs, 'sampleBy', 'sb', default=1.0))
+    attributes = _flag(kwargs, 'attribute', 'at')
+    plugs = list()
+    for node in _nodes(objects):
+        if attributes:
+            plugs.extend(_animated_plugs([node.long_name()], {'at': attributes}))
+        else:
+            plugs.extend(_keyable_plugs(node))
+    frames = list()
+    frame = float(start)
+    while frame <= float(end) + 1e-9:
+        frames.append(frame)
+        frame += step
+    current = scene.time
+    samples = {plug[:2]: list() for plug in plugs}
+    for frame in frames:
+        scene.time = frame
+        scene.changed()
+        for node, path, spec in plugs:
+            samples[(node, path)].append(scene.get(node, path, spec))
+    scene.time = current
+    for node, path, spec in plugs:
+        source = node.inputs.get(path)
+        if source is not None and not source[0].type.name.startswith('animCurve'):
+            scene.disconnect(node, path)
+        curve = animation.get_or_create_curve(scene, node, path, spec)
+        for frame, value in zip(frames, samples[(node, path)]):
+            animation.set_key(curve, frame, value)
+    scene.changed()
+    return len(plugs)
+
+
+def listCameras(**kwargs):
+    scene = _scene()
+    cameras = [node.parent for node in scene.nodes if node.is_a('camera') and node.parent]
+    if _flag(kwargs, 'perspective', 'p'):
+        cameras = [node for node in cameras if not _scene().get(
+            next(c for c in node.children if c.is_a('camera')), 'orthographic')]
+    return [node.display_name() for node in cameras]
+
+
+# SCENE / ENVIRONMENT ==================================================
+
+def file(*args, **kwargs):
+    scene = _scene()
+    path = args[0] if args else None
+    if _flag(kwargs, 'query', 'q'):
+        if _flag(kwargs, 'exists', 'ex'):
+            return bool(path) and os.path.isfile(path)
+        if _flag(kwargs, 'sceneName', 'sn'):
+            return scene.filename
+        if _flag(kwargs, 'modified', 'mf'):
+            return scene.modified
+        return scene.filename
+    if _flag(kwargs, 'new'):
+        scene_module.new_scene()
+        return None
+    rename_to = _flag(kwargs, 'rename', 'rn')
+    if rename_to:
+        scene.filename = rename_to
+        return rename_to
+    if _flag(kwargs, 'open', 'o'):
+        new = files.read(path)
+        new.filename = path
+        new.modified = False
+        scene_module._current = new
+        return path
+    if _flag(kwargs, 'i', 'import'):
+        nodes = files.import_file(scene, path)
+        if _flag(kwargs, 'returnNewNodes', 'rnn'):
+            return _names(nodes, long=True)
+        return path
+    if _flag(kwargs, 'save', 's'):
+        if path:
+            scene.filename = path
+        files.write(scene, scene.filename, list(scene.nodes))
+        scene.modified = False
+        return scene.filename
+    if _flag(kwargs, 'exportSelected', 'es') or _flag(kwargs, 'exportSelectedStrict', 'ess'):
+        nodes = list(scene.selection)
+        if _flag(kwargs, 'exportSelected', 'es'):
+            nodes = [item for node in nodes for item in [node] + list(node.descendants())]
+        files.write(scene, path, nodes)
+        return path
+    if _flag(kwargs, 'exportAll', 'ea'):
+        files.write(scene, path, list(scene.nodes))
+        return path
+    return None
+
+
+def workspace(*args, **kwargs):
+    if _flag(kwargs, 'query', 'q'):
+        return os.getcwd().replace('\\', '/') + '/'
+    return None
+
+
+def loadPlugin(*names, quiet=False, qt=False):
+    '''
+    Python plugin files are imported and initialized, other plugins are assumed built in.
+    '''
+    for name in names:
+        if name.endswith('.py') and os.path.isfile(name):
+            _load_python_plugin(name)
+    return [os.path.splitext(os.path.basename(name))[0] for name in names]
+
+
+def _load_python_plugin(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    if name in _plugins:
+        return
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.initializePlugin(openmaya.MObject())
+    _plugins[name] = module
+
+
+def unloadPlugin(*names, force=False):
+    for name in names:
+        module = _plugins.pop(name, None)
+        if module is not None:
+            module.uninitializePlugin(openmaya.MObject())
+    return list(names)
+
+
+def pluginInfo(*args, **kwargs):
+    return True
+
+
+def register_command(name, creator):
+    '''
+    Add a plugin command (MPxCommand creator) as a cmds function.
+    '''
+    def command(*args, **kwargs):
+        instance = creator()
+        instance.doIt(openmaya.MArgList(args))
+        if instance.isUndoable():
+            _add_undo(instance)
+    command.__name__ = name
+    globals()[name] = command
+
+
+def deregister_command(name):
+    globals().pop(name, None)
+
+
+def refresh(*args, **kwargs):
+    return None
+
+
+def about(**kwargs):
+    if _flag(kwargs, 'batch', 'b'):
+        return True
+    return 'fake_maya'
+
+
+# UNDO =================================================================
+# Only undoable plugin commands are on the undo queue, other commands are not undoable.
+
+def _add_undo(command):
+    scene = _scene()
+    scene.redo_queue = list()
+    if scene.undo_chunk is not None:
+        scene.undo_chunk.append(command)
+    else:
+        scene.undo_queue.append([command])
+
+
+def undoInfo(**kwargs):
+    scene = _scene()
+    if _flag(kwargs, 'openChunk', 'ock'):
+        scene.undo_chunk_depth += 1
+        if scene.undo_chunk is None:
+            scene.undo_chunk = list()
+    if _flag(kwargs, 'closeChunk', 'cck') and scene.undo_chunk_depth:
+        scene.undo_chunk_depth -= 1
+        if not scene.undo_chunk_depth:
+            chunk, scene.undo_chunk = scene.undo_chunk, None
+            if chunk:
+                scene.undo_queue.append(chunk)
+    if _flag(kwargs, 'query', 'q'):
+        return True
+    return None
+
+
+def undo():
+    scene = _scene()
+    if not scene.undo_queue:
+        print('# Warning: There are no more commands to undo.')
+        return None
+    commands = scene.undo_queue.pop()
+    for command in reversed(commands):
+        command.undoIt()
+    scene.redo_queue.append(commands)
+    return None
+
+
+def redo():
+    scene = _scene()
+    if not scene.redo_queue:
+        print('# Warning: There are no more commands to redo.')
+        return None
+    commands = scene.redo_queue.pop()
+    for command in commands:
+        command.redoIt()
+    scene.undo_queue.append(commands)
+    return None
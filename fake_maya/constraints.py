@@ -0,0 +1,151 @@
+'''
+constraints.py
+
+Constraint nodes for the fake Maya engine. parent, point, orient and scale constraints are
+evaluated from the world matrices of their targets. Pole vector and aim constraints are
+created and connected but not solved.
+'''
+import math
+import adv_scripting.fake_maya.mmath as mmath
+
+# Driven channels connected for each constraint type
+CHANNELS = {'parentConstraint': ('translate', 'rotate'),
+            'pointConstraint': ('translate',),
+            'orientConstraint': ('rotate',),
+            'scaleConstraint': ('scale',),
+            'aimConstraint': ('rotate',),
+            'poleVectorConstraint': ()}
+OUTPUTS = {'translate': 'constraintTranslate', 'rotate': 'constraintRotate',
+           'scale': 'constraintScale'}
+
+
+def create(scene, constraint_type, targets, driven, maintain_offset=False, name=None,
+           weight=1.0, skip=()):
+    '''
+    Create a constraint or add targets to the existing one of the same type on driven.
+
+    Arguments
+    targets (Node list): driver nodes
+    driven (Node): constrained node
+    skip (str list): channel children to leave unconnected, e.g. ['translateX']
+
+    Returns constraint Node
+    '''
+    driven_world = scene.world_matrix(driven)
+    constraint = next((child for child in driven.children if child.is_a(constraint_type)), None)
+    if constraint is None:
+        constraint = scene.create_node(constraint_type, name or f'{driven.name}_{constraint_type}1',
+                                       parent=driven)
+        constraint.data.update({'driven': driven, 'targets': [], 'weights': [], 'offsets': []})
+        for channel in CHANNELS[constraint_type]:
+            for axis in 'XYZ':
+                if channel + axis in skip or channel[0] + axis.lower() in skip:
+                    continue
+                scene.connect(constraint, OUTPUTS[channel] + axis, driven, channel + axis,
+                              force=True)
+        if constraint_type == 'poleVectorConstraint':
+            scene.connect(constraint, 'constraintTranslate', driven, 'poleVector', force=True)
+        if driven.is_a('transform'):
+            scene.connect(driven, 'parentInverseMatrix[0]', constraint,
+                          'constraintParentInverseMatrix')
+    for target in targets:
+        index = len(constraint.data['targets'])
+        weight_name = scene.unique_attr_name(constraint, f'{target.name}W{index}')
+        spec = scene.add_attr(constraint, weight_name, 'double', default=1.0, keyable=True)
+        spec.min = 0.0
+        constraint.values[weight_name] = float(weight)
+        offset = mmath.IDENTITY
+        if maintain_offset and constraint_type == 'pointConstraint':
+            offset = point_offset_matrix(driven_world, scene.world_matrix(target))
+        elif maintain_offset:
+            offset = mmath.mult(driven_world, mmath.inverse(scene.world_matrix(target)))
+        constraint.data['targets'].append(target)
+        constraint.data['weights'].append(weight_name)
+        constraint.data['offsets'].append(offset)
+        scene.connect(target, 'parentMatrix[0]', constraint, f'target[{index}].targetParentMatrix')
+        scene.connect(constraint, weight_name, constraint, f'target[{index}].targetWeight')
+    scene.changed(constraint)
+    return constraint
+
+
+def targets(constraint):
+    return [target for target in constraint.data.get('targets', []) if target.alive]
+
+
+def read_data(constraint):
+    '''
+    Evaluation data of a constraint. A constraint created by node type (e.g. through an
+    MDGModifier) has none, it is read from its parent and target[i] inputs, with identity
+    offsets.
+    '''
+    if 'driven' in constraint.data:
+        return constraint.data
+    data = {'driven': constraint.parent, 'targets': [], 'weights': [], 'offsets': []}
+    for index in constraint.scene.multi_indices(constraint, 'target'):
+        source = constraint.inputs.get(f'target[{index}].targetParentMatrix')
+        if source is None:
+            continue
+        data['targets'].append(source[0])
+        data['weights'].append(f'target[{index}].targetWeight')
+        data['offsets'].append(mmath.IDENTITY)
+    if data['targets']:
+        # Keep it once connected, until then targets may still be added
+        constraint.data.update(data)
+    return data
+
+
+def evaluate(constraint, path):
+    scene = constraint.scene
+    data = read_data(constraint)
+    driven = data['driven']
+    kind = constraint.type.name
+    items = [(target, scene.get(constraint, weight), offset)
+             for target, weight, offset in zip(data['targets'], data['weights'], data['offsets'])
+             if target.alive]
+    total = sum(weight for _, weight, _ in items)
+    leaf = path.split('[', 1)[0]
+    if not items or total <= 0.0:
+        # Rest position: the values stored on the driven node
+        for channel, output in OUTPUTS.items():
+            if output == leaf:
+                default = 1.0 if channel == 'scale' else 0.0
+                return tuple(driven.values.get(channel + axis, default) for axis in 'XYZ')
+        return (0.0, 0.0, 0.0)
+
+    worlds = [(mmath.mult(offset, scene.world_matrix(target)) if kind != 'pointConstraint'
+               else scene.world_matrix(target), weight / total, offset)
+              for target, weight, offset in items]
+    space = scene.parent_space(driven)
+    if leaf == 'constraintTranslate':
+        if kind == 'poleVectorConstraint':
+            return mmath.translation(worlds[0][0])
+        position = [sum(mmath.translation(world)[axis] * weight for world, weight, _ in worlds)
+                    for axis in range(3)]
+        if kind == 'pointConstraint':
+            offset = worlds[0][2]
+            if offset != mmath.IDENTITY:
+                position = [value + offset_value for value, offset_value in
+                            zip(position, mmath.translation(offset))]
+        return mmath.transform_point(position, mmath.inverse(space))
+    if leaf == 'constraintRotate':
+        quaternions = [mmath.rotation_to_quaternion(mmath.decompose(world)[1])
+                       for world, _, _ in worlds]
+        rotation = mmath.quaternion_to_rotation(
+            mmath.average_quaternions(quaternions, [weight for _, weight, _ in worlds]))
+        space_rotation = mmath.rotation_matrix(mmath.decompose(space)[1])
+        local = mmath.mult(mmath.rotation_matrix(rotation), mmath.transpose(space_rotation))
+        if driven.is_a('joint'):
+            orient = mmath.euler_matrix([math.radians(v) for v in scene.get(driven, 'jointOrient')])
+            local = mmath.mult(local, mmath.transpose(orient))
+        order = scene.get(driven, 'rotateOrder')
+        return tuple(math.degrees(v) for v in mmath.matrix_to_euler(local, order))
+    scales = [mmath.decompose(world)[2] for world, _, _ in worlds]
+    space_scale = mmath.decompose(space)[2]
+    return tuple(sum(scale[axis] * weight for scale, (_, weight, _) in zip(scales, worlds)) /
+                 (space_scale[axis] or 1.0) for axis in range(3))
+
+
+def point_offset_matrix(driven_world, target_world):
+    delta = [a - b for a, b in zip(mmath.translation(driven_world),
+                                   mmath.translation(target_world))]
+    return mmath.translate_matrix(delta)
@@ -0,0 +1,175 @@
+'''
+files.py
+
+Scene files for the fake Maya engine. Scenes are saved as a JSON snapshot of nodes, values,
+dynamic attributes, connections and node data (curve CVs, keys, constraint targets), whatever
+extension the path has. Maya .ma/.mb files cannot be read.
+'''
+import json
+import adv_scripting.fake_maya.animation as animation
+import adv_scripting.fake_maya.scene as scene_module
+
+FORMAT_KEY = 'fake_maya_scene'
+FORMAT_VERSION = 1
+DEFAULT_CAMERAS = ('persp', 'top', 'front', 'side')
+
+
+# ENCODING =============================================================
+
+def _encode_spec(spec):
+    return {'name': spec.name, 'short': spec.short, 'type': spec.type,
+            'default': _encode(spec.default, {}), 'multi': spec.multi, 'output': spec.output,
+            'keyable': spec.keyable, 'enum_names': spec.enum_names, 'min': spec.min,
+            'max': spec.max, 'nice_name': spec.nice_name, 'data_type': spec.data_type,
+            'hidden': spec.hidden, 'children': [_encode_spec(child) for child in spec.children]}
+
+
+def _decode_spec(data):
+    spec = scene_module.AttrSpec(data['name'], data['short'], data['type'],
+                                 _decode(data['default'], []),
+                                 [_decode_spec(child) for child in data['children']],
+                                 data['multi'], data['output'], data['keyable'], dynamic=True)
+    for field in ('enum_names', 'min', 'max', 'nice_name', 'data_type', 'hidden'):
+        setattr(spec, field, data[field])
+    return spec
+
+
+def _encode(value, indices):
+    '''
+    JSON value for node data. Nodes outside the export are dropped.
+    '''
+    if isinstance(value, scene_module.Node):
+        return {'__node__': indices[value]} if value in indices else None
+    if isinstance(value, animation.Key):
+        return {'__key__': [getattr(value, field) for field in animation.Key.__slots__]}
+    if isinstance(value, dict):
+        return {key: _encode(item, indices) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item, indices) for item in value]
+    return value
+
+
+def _decode(value, nodes):
+    if isinstance(value, dict):
+        if '__node__' in value:
+            return nodes[value['__node__']]
+        if '__key__' in value:
+            key = animation.Key(0.0, 0.0)
+            for field, item in zip(animation.Key.__slots__, value['__key__']):
+                setattr(key, field, item)
+            return key
+        return {key: _decode(item, nodes) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [_decode(item, nodes) for item in value]
+        if items and all(isinstance(item, (int, float)) and not isinstance(item, bool)
+                         for item in items):
+            # Vectors and matrices are tuples in the engine
+            return tuple(float(item) for item in items)
+        return [item for item in items if item is not None]
+    return value
+
+
+# WRITE ================================================================
+
+def _default_camera(node):
+    '''
+    The default cameras every new scene has are not saved.
+    '''
+    transform = node.parent if node.is_a('camera') else node
+    return transform is not None and transform.parent is None and \
+        transform.name in DEFAULT_CAMERAS and \
+        any(child.is_a('camera') for child in transform.children)
+
+
+def write(scene, path, nodes):
+    '''
+    Save nodes with the connections between them.
+    '''
+    nodes = [node for node in dict.fromkeys(nodes) if node.alive and not _default_camera(node)]
+    # Parents before their children, reparenting can change the creation order
+    exported = set(nodes)
+    ordered = dict()
+    for node in nodes:
+        for item in reversed([node] + [parent for parent in node.ancestors()
+                                       if parent in exported]):
+            ordered[item] = None
+    nodes = list(ordered)
+    indices = {node: index for index, node in enumerate(nodes)}
+    records = list()
+    for node in nodes:
+        parent = node.parent
+        while parent is not None and parent not in indices:
+            parent = parent.parent
+        records.append({
+            'type': node.type.name,
+            'name': node.name,
+            'uuid': node.uuid,
+            'parent': indices[parent] if parent is not None else None,
+            'values': _encode(node.values, indices),
+            'dynamic': [_encode_spec(spec) for spec in node.dynamic.values()],
+            'locked': sorted(node.locked),
+            'keyable': node.keyable,
+            'channel_box': node.channel_box,
+            'data': _encode(node.data, indices)})
+    connections = [(indices[source], source_path, indices[node], path)
+                   for node in nodes for path, (source, source_path) in node.inputs.items()
+                   if source in indices]
+    with open(path, 'w') as handle:
+        json.dump({FORMAT_KEY: FORMAT_VERSION, 'time': scene.time,
+                   'playback_range': scene.playback_range, 'nodes': records,
+                   'connections': connections}, handle)
+
+
+# READ =================================================================
+
+def _load(path):
+    with open(path) as handle:
+        try:
+            data = json.load(handle)
+        except ValueError:
+            data = None
+    if not isinstance(data, dict) or FORMAT_KEY not in data:
+        raise RuntimeError(f'Unable to read file: {path} is not a fake Maya scene.')
+    return data
+
+
+def import_file(scene, path):
+    '''
+    Add the nodes of a saved scene to scene. Returns the new nodes.
+    '''
+    data = _load(path)
+    nodes = list()
+    for record in data['nodes']:
+        parent = nodes[record['parent']] if record['parent'] is not None else None
+        node = scene.create_node(record['type'], record['name'], parent)
+        if record['uuid'] not in scene.by_uuid:
+            del scene.by_uuid[node.uuid]
+            node.uuid = record['uuid']
+            scene.by_uuid[node.uuid] = node
+        nodes.append(node)
+    for node, record in zip(nodes, data['nodes']):
+        node.values = _decode(record['values'], nodes)
+        for spec_data in record['dynamic']:
+            spec = _decode_spec(spec_data)
+            node.dynamic[spec.name] = spec
+        node.locked = set(record['locked'])
+        node.keyable = dict(record['keyable'])
+        node.channel_box = dict(record['channel_box'])
+        node.data = _decode(record['data'], nodes)
+    for source, source_path, destination, path in data['connections']:
+        scene.connect(nodes[source], source_path, nodes[destination], path, force=True)
+    scene.changed()
+    return nodes
+
+
+def read(path):
+    '''
+    Returns a new Scene from a saved file.
+    '''
+    data = _load(path)
+    scene = scene_module.Scene()
+    scene.time = data['time']
+    scene.playback_range = tuple(data['playback_range'])
+    import_file(scene, path)
+    scene.selection = list()
+    return scene
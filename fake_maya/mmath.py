@@ -0,0 +1,331 @@
+'''
+mmath.py
+
+Matrix math for the fake scene engine. Matrices are flat tuples of 16 floats in Maya's
+row-vector convention (translation in elements 12, 13, 14). Angles are radians unless a
+function says otherwise.
+'''
+import math
+
+IDENTITY = (1.0, 0.0, 0.0, 0.0,
+            0.0, 1.0, 0.0, 0.0,
+            0.0, 0.0, 1.0, 0.0,
+            0.0, 0.0, 0.0, 1.0)
+
+ROTATE_ORDERS = ('xyz', 'yzx', 'zxy', 'xzy', 'yxz', 'zyx')
+_AXIS = {'x': 0, 'y': 1, 'z': 2}
+
+
+def mult(a, b):
+    '''
+    Returns a * b
+    '''
+    a0, a1, a2, a3, a4, a5, a6, a7, a8, a9, a10, a11, a12, a13, a14, a15 = a
+    b0, b1, b2, b3, b4, b5, b6, b7, b8, b9, b10, b11, b12, b13, b14, b15 = b
+    return (a0*b0 + a1*b4 + a2*b8 + a3*b12, a0*b1 + a1*b5 + a2*b9 + a3*b13,
+            a0*b2 + a1*b6 + a2*b10 + a3*b14, a0*b3 + a1*b7 + a2*b11 + a3*b15,
+            a4*b0 + a5*b4 + a6*b8 + a7*b12, a4*b1 + a5*b5 + a6*b9 + a7*b13,
+            a4*b2 + a5*b6 + a6*b10 + a7*b14, a4*b3 + a5*b7 + a6*b11 + a7*b15,
+            a8*b0 + a9*b4 + a10*b8 + a11*b12, a8*b1 + a9*b5 + a10*b9 + a11*b13,
+            a8*b2 + a9*b6 + a10*b10 + a11*b14, a8*b3 + a9*b7 + a10*b11 + a11*b15,
+            a12*b0 + a13*b4 + a14*b8 + a15*b12, a12*b1 + a13*b5 + a14*b9 + a15*b13,
+            a12*b2 + a13*b6 + a14*b10 + a15*b14, a12*b3 + a13*b7 + a14*b11 + a15*b15)
+
+
+def mult_all(matrices):
+    result = IDENTITY
+    for matrix in matrices:
+        result = mult(result, matrix)
+    return result
+
+
+def inverse(m):
+    '''
+    General 4x4 inverse. Returns identity for a singular matrix.
+    '''
+    (a00, a01, a02, a03, a10, a11, a12, a13,
+     a20, a21, a22, a23, a30, a31, a32, a33) = m
+    b00 = a00 * a11 - a01 * a10
+    b01 = a00 * a12 - a02 * a10
+    b02 = a00 * a13 - a03 * a10
+    b03 = a01 * a12 - a02 * a11
+    b04 = a01 * a13 - a03 * a11
+    b05 = a02 * a13 - a03 * a12
+    b06 = a20 * a31 - a21 * a30
+    b07 = a20 * a32 - a22 * a30
+    b08 = a20 * a33 - a23 * a30
+    b09 = a21 * a32 - a22 * a31
+    b10 = a21 * a33 - a23 * a31
+    b11 = a22 * a33 - a23 * a32
+    det = b00 * b11 - b01 * b10 + b02 * b09 + b03 * b08 - b04 * b07 + b05 * b06
+    if abs(det) < 1e-12:
+        return IDENTITY
+    d = 1.0 / det
+    return ((a11 * b11 - a12 * b10 + a13 * b09) * d,
+            (a02 * b10 - a01 * b11 - a03 * b09) * d,
+            (a31 * b05 - a32 * b04 + a33 * b03) * d,
+            (a22 * b04 - a21 * b05 - a23 * b03) * d,
+            (a12 * b08 - a10 * b11 - a13 * b07) * d,
+            (a00 * b11 - a02 * b08 + a03 * b07) * d,
+            (a32 * b02 - a30 * b05 - a33 * b01) * d,
+            (a20 * b05 - a22 * b02 + a23 * b01) * d,
+            (a10 * b10 - a11 * b08 + a13 * b06) * d,
+            (a01 * b08 - a00 * b10 - a03 * b06) * d,
+            (a30 * b04 - a31 * b02 + a33 * b00) * d,
+            (a21 * b02 - a20 * b04 - a23 * b00) * d,
+            (a11 * b07 - a10 * b09 - a12 * b06) * d,
+            (a00 * b09 - a01 * b07 + a02 * b06) * d,
+            (a31 * b01 - a30 * b03 - a32 * b00) * d,
+            (a20 * b03 - a21 * b01 + a22 * b00) * d)
+
+
+def transpose(m):
+    return tuple(m[column * 4 + row] for row in range(4) for column in range(4))
+
+
+def translation(m):
+    return (m[12], m[13], m[14])
+
+
+def transform_point(point, m):
+    x, y, z = point
+    return (x * m[0] + y * m[4] + z * m[8] + m[12],
+            x * m[1] + y * m[5] + z * m[9] + m[13],
+            x * m[2] + y * m[6] + z * m[10] + m[14])
+
+
+def transform_vector(vector, m):
+    x, y, z = vector
+    return (x * m[0] + y * m[4] + z * m[8],
+            x * m[1] + y * m[5] + z * m[9],
+            x * m[2] + y * m[6] + z * m[10])
+
+
+def is_equivalent(a, b, tolerance=1e-9):
+    return all(abs(x - y) <= tolerance for x, y in zip(a, b))
+
+
+# BUILDING MATRICES ====================================================
+
+def translate_matrix(t):
+    return (1.0, 0.0, 0.0, 0.0,
+            0.0, 1.0, 0.0, 0.0,
+            0.0, 0.0, 1.0, 0.0,
+            float(t[0]), float(t[1]), float(t[2]), 1.0)
+
+
+def scale_matrix(s):
+    return (float(s[0]), 0.0, 0.0, 0.0,
+            0.0, float(s[1]), 0.0, 0.0,
+            0.0, 0.0, float(s[2]), 0.0,
+            0.0, 0.0, 0.0, 1.0)
+
+
+def shear_matrix(sh):
+    xy, xz, yz = sh
+    return (1.0, 0.0, 0.0, 0.0,
+            float(xy), 1.0, 0.0, 0.0,
+            float(xz), float(yz), 1.0, 0.0,
+            0.0, 0.0, 0.0, 1.0)
+
+
+def axis_rotation(axis, angle):
+    c = math.cos(angle)
+    s = math.sin(angle)
+    if axis == 0:
+        return (1.0, 0.0, 0.0, 0.0, 0.0, c, s, 0.0, 0.0, -s, c, 0.0, 0.0, 0.0, 0.0, 1.0)
+    if axis == 1:
+        return (c, 0.0, -s, 0.0, 0.0, 1.0, 0.0, 0.0, s, 0.0, c, 0.0, 0.0, 0.0, 0.0, 1.0)
+    return (c, s, 0.0, 0.0, -s, c, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0)
+
+
+def euler_matrix(rotation, order=0):
+    '''
+    Arguments
+    rotation (float list): x, y, z angles in radians
+    order (int/str): rotate order index or name, the first axis is applied first
+    '''
+    if isinstance(order, int):
+        order = ROTATE_ORDERS[order]
+    result = IDENTITY
+    for letter in order:
+        axis = _AXIS[letter]
+        if rotation[axis]:
+            result = mult(result, axis_rotation(axis, rotation[axis]))
+    return result
+
+
+def compose(translate=(0, 0, 0), rotate=(0, 0, 0), scale=(1, 1, 1), order=0,
+            shear=(0, 0, 0), orient=None):
+    '''
+    Local matrix of a transform: [S] * [SH] * [R] * [JO] * [T]. Pivots are not modelled.
+    rotate and orient (joint orient) in radians.
+    '''
+    m = mult(scale_matrix(scale), shear_matrix(shear)) if any(shear) else scale_matrix(scale)
+    m = mult(m, euler_matrix(rotate, order))
+    if orient is not None and any(orient):
+        m = mult(m, euler_matrix(orient, 0))
+    m = list(m)
+    m[12], m[13], m[14] = float(translate[0]), float(translate[1]), float(translate[2])
+    return tuple(m)
+
+
+# DECOMPOSING MATRICES =================================================
+
+def _length(v):
+    return math.sqrt(v[0] * v[0] + v[1] * v[1] + v[2] * v[2])
+
+
+def _cross(a, b):
+    return (a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0])
+
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def rows(m):
+    return (m[0:3], m[4:7], m[8:11])
+
+
+def decompose(m):
+    '''
+    Split a matrix into translate, rotation rows (orthonormal 3x3), scale and shear.
+    Negative determinants flip the x scale.
+
+    Returns translate, rotation_rows, scale, shear
+    '''
+    x, y, z = rows(m)
+    sx = _length(x)
+    x = tuple(v / sx for v in x) if sx else (1.0, 0.0, 0.0)
+    xy = _dot(x, y)
+    y = tuple(a - xy * b for a, b in zip(y, x))
+    sy = _length(y)
+    y = tuple(v / sy for v in y) if sy else (0.0, 1.0, 0.0)
+    xz = _dot(x, z)
+    yz = _dot(y, z)
+    z = tuple(a - xz * b - yz * c for a, b, c in zip(z, x, y))
+    sz = _length(z)
+    z = tuple(v / sz for v in z) if sz else (0.0, 0.0, 1.0)
+    if _dot(_cross(x, y), z) < 0:
+        sx = -sx
+        x = tuple(-v for v in x)
+    shear = (xy / sy if sy else 0.0, xz / sz if sz else 0.0, yz / sz if sz else 0.0)
+    return (m[12], m[13], m[14]), (x, y, z), (sx, sy, sz), shear
+
+
+def rotation_to_euler(r, order=0):
+    '''
+    Arguments
+    r (3 rows): orthonormal rotation, row-vector convention
+    order (int/str): rotate order
+
+    Returns x, y, z angles in radians
+    '''
+    if isinstance(order, int):
+        order = ROTATE_ORDERS[order]
+    i, j, k = (_AXIS[letter] for letter in order)
+    parity = 1.0 if order in ('xyz', 'yzx', 'zxy') else -1.0
+    # Column-vector form C = Rk * Rj * Ri, C[a][b] == r[b][a]
+    c = lambda a, b: r[b][a]
+    sin_j = max(-1.0, min(1.0, -parity * c(k, i)))
+    angles = [0.0, 0.0, 0.0]
+    angles[j] = math.asin(sin_j)
+    if abs(sin_j) < 1.0 - 1e-9:
+        angles[i] = math.atan2(parity * c(k, j), c(k, k))
+        angles[k] = math.atan2(parity * c(j, i), c(i, i))
+    else:
+        # Gimbal lock, put the whole remaining rotation on the first axis
+        angles[i] = math.atan2(-parity * c(j, k), c(j, j))
+    return tuple(angles)
+
+
+def matrix_to_euler(m, order=0):
+    return rotation_to_euler(decompose(m)[1], order)
+
+
+def rotation_matrix(r):
+    '''
+    4x4 matrix from 3 rotation rows.
+    '''
+    (a, b, c), (d, e, f), (g, h, i) = r
+    return (a, b, c, 0.0, d, e, f, 0.0, g, h, i, 0.0, 0.0, 0.0, 0.0, 1.0)
+
+
+# QUATERNIONS ==========================================================
+
+def rotation_to_quaternion(r):
+    '''
+    Returns (x, y, z, w) quaternion of rotation rows.
+    '''
+    (m00, m01, m02), (m10, m11, m12), (m20, m21, m22) = r
+    trace = m00 + m11 + m22
+    if trace > 0.0:
+        s = math.sqrt(trace + 1.0) * 2.0
+        return ((m12 - m21) / s, (m20 - m02) / s, (m01 - m10) / s, 0.25 * s)
+    if m00 > m11 and m00 > m22:
+        s = math.sqrt(1.0 + m00 - m11 - m22) * 2.0
+        return (0.25 * s, (m10 + m01) / s, (m20 + m02) / s, (m12 - m21) / s)
+    if m11 > m22:
+        s = math.sqrt(1.0 + m11 - m00 - m22) * 2.0
+        return ((m10 + m01) / s, 0.25 * s, (m21 + m12) / s, (m20 - m02) / s)
+    s = math.sqrt(1.0 + m22 - m00 - m11) * 2.0
+    return ((m20 + m02) / s, (m21 + m12) / s, 0.25 * s, (m01 - m10) / s)
+
+
+def quaternion_to_rotation(q):
+    x, y, z, w = normalize_quaternion(q)
+    return ((1 - 2 * (y * y + z * z), 2 * (x * y + z * w), 2 * (x * z - y * w)),
+            (2 * (x * y - z * w), 1 - 2 * (x * x + z * z), 2 * (y * z + x * w)),
+            (2 * (x * z + y * w), 2 * (y * z - x * w), 1 - 2 * (x * x + y * y)))
+
+
+def normalize_quaternion(q):
+    length = math.sqrt(sum(v * v for v in q))
+    if not length:
+        return (0.0, 0.0, 0.0, 1.0)
+    return tuple(v / length for v in q)
+
+
+def slerp(a, b, weight):
+    dot = sum(x * y for x, y in zip(a, b))
+    if dot < 0.0:
+        b = tuple(-v for v in b)
+        dot = -dot
+    if dot > 0.9995:
+        return normalize_quaternion(tuple(x + (y - x) * weight for x, y in zip(a, b)))
+    theta = math.acos(dot)
+    sin_theta = math.sin(theta)
+    wa = math.sin((1.0 - weight) * theta) / sin_theta
+    wb = math.sin(weight * theta) / sin_theta
+    return tuple(x * wa + y * wb for x, y in zip(a, b))
+
+
+def average_quaternions(quaternions, weights):
+    '''
+    Weighted average, quaternions are flipped into the hemisphere of the first one.
+    '''
+    first = quaternions[0]
+    total = [0.0, 0.0, 0.0, 0.0]
+    for q, weight in zip(quaternions, weights):
+        if sum(x * y for x, y in zip(first, q)) < 0.0:
+            q = tuple(-v for v in q)
+        for index in range(4):
+            total[index] += q[index] * weight
+    return normalize_quaternion(total)
+
+
+def blend(a, b, weight):
+    '''
+    Blend two matrices by translate, rotation (slerp) and scale.
+    '''
+    if weight <= 0.0:
+        return a
+    if weight >= 1.0:
+        return b
+    ta, ra, sa, _ = decompose(a)
+    tb, rb, sb, _ = decompose(b)
+    q = slerp(rotation_to_quaternion(ra), rotation_to_quaternion(rb), weight)
+    lerp = lambda x, y: tuple(i + (j - i) * weight for i, j in zip(x, y))
+    m = mult(scale_matrix(lerp(sa, sb)), rotation_matrix(quaternion_to_rotation(q)))
+    return m[:12] + lerp(ta, tb) + (1.0,)
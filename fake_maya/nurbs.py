@@ -0,0 +1,151 @@
+'''
+nurbs.py
+
+Non-rational B-spline curves and surfaces for the fake Maya engine. Knot lists use Maya's
+convention: CVs + degree - 1 knots, the first and last knot of the full vector left out.
+
+Curve data (nurbsCurve node data): cvs, degree, form, knots
+Surface data (nurbsSurface node data): cvs as rows of V CVs per U, degree_u, degree_v,
+knots_u, knots_v
+'''
+import math
+
+CLOSEST_POINT_ITERATIONS = 30
+
+
+def uniform_knots(count, degree, periodic=False):
+    '''
+    Maya knots for count CVs, clamped at both ends unless periodic.
+    '''
+    knot_count = count + degree - 1
+    if periodic:
+        return [float(i - degree + 1) for i in range(knot_count)]
+    spans = max(1, count - degree)
+    return [float(min(max(i - degree + 1, 0), spans)) for i in range(knot_count)]
+
+
+def curve_knots(data):
+    if data.get('knots'):
+        return list(data['knots'])
+    return uniform_knots(len(data.get('cvs', ())), data.get('degree', 3),
+                         data.get('form') == 'periodic')
+
+
+def domain(knots, degree):
+    return knots[degree - 1], knots[-degree]
+
+
+def _span(full, degree, param, count):
+    '''
+    Index of the knot span containing param in the full knot vector.
+    '''
+    if param >= full[count]:
+        return count - 1
+    low = degree
+    while low < count - 1 and param >= full[low + 1]:
+        low += 1
+    return low
+
+
+def point(cvs, knots, degree, param):
+    '''
+    de Boor evaluation of a curve at param. cvs are tuples of any length.
+    '''
+    degree = min(degree, len(cvs) - 1)
+    if degree < 1:
+        return tuple(cvs[0])
+    full = [knots[0]] + list(knots) + [knots[-1]]
+    start, end = domain(knots, degree)
+    param = min(max(param, start), end)
+    span = _span(full, degree, param, len(cvs))
+    points = [list(cvs[span - degree + index]) for index in range(degree + 1)]
+    for level in range(1, degree + 1):
+        for index in range(degree, level - 1, -1):
+            knot = span - degree + index
+            denominator = full[knot + degree - level + 1] - full[knot]
+            alpha = (param - full[knot]) / denominator if denominator else 0.0
+            points[index] = [(1 - alpha) * a + alpha * b
+                             for a, b in zip(points[index - 1], points[index])]
+    return tuple(points[degree])
+
+
+def curve_point(data, param):
+    return point(data['cvs'], curve_knots(data), data.get('degree', 3), param)
+
+
+def loft(curves):
+    '''
+    Surface data through curve data sections, U along the curves and V across them.
+    Curves with different CV counts are resampled to the first curve's count.
+    '''
+    count = len(curves[0]['cvs'])
+    degree_u = min(curves[0].get('degree', 3), count - 1)
+    rows = list()
+    for curve in curves:
+        if len(curve['cvs']) == count:
+            rows.append([tuple(cv) for cv in curve['cvs']])
+            continue
+        start, end = domain(curve_knots(curve), curve.get('degree', 3))
+        rows.append([curve_point(curve, start + (end - start) * index / max(count - 1, 1))
+                     for index in range(count)])
+    degree_v = max(1, min(3, len(curves) - 1))
+    return {'cvs': [[row[index] for row in rows] for index in range(count)],
+            'degree_u': degree_u,
+            'degree_v': degree_v,
+            'knots_u': curve_knots(dict(curves[0], degree=degree_u)),
+            'knots_v': uniform_knots(len(curves), degree_v)}
+
+
+def surface_domain(data):
+    return (domain(data['knots_u'], data['degree_u']),
+            domain(data['knots_v'], data['degree_v']))
+
+
+def surface_point(data, u, v):
+    column = [point(row, data['knots_v'], data['degree_v'], v) for row in data['cvs']]
+    return point(column, data['knots_u'], data['degree_u'], u)
+
+
+def closest_parameters(data, target, u_start=None, v_start=None, transform=None):
+    '''
+    Parameters of the point on a surface closest to target, by Gauss-Newton iterations with
+    numeric derivatives from (u_start, v_start).
+
+    Arguments
+    transform (callable/None): maps surface points before measuring, e.g. to world space
+
+    Returns (point, u, v)
+    '''
+    (u_min, u_max), (v_min, v_max) = surface_domain(data)
+    evaluate = (lambda u, v: transform(surface_point(data, u, v))) if transform else \
+        (lambda u, v: surface_point(data, u, v))
+    u = (u_min + u_max) / 2.0 if u_start is None else u_start
+    v = (v_min + v_max) / 2.0 if v_start is None else v_start
+    step = 1e-4 * max(u_max - u_min, v_max - v_min, 1e-9)
+    def derivative(position, forward, backward, inside):
+        if inside:
+            return [(a - b) / step for a, b in zip(forward(), position)]
+        return [(b - a) / step for a, b in zip(backward(), position)]
+
+    for _ in range(CLOSEST_POINT_ITERATIONS):
+        position = evaluate(u, v)
+        delta = [t - p for t, p in zip(target, position)]
+        du = derivative(position, lambda: evaluate(u + step, v), lambda: evaluate(u - step, v),
+                        u + step <= u_max)
+        dv = derivative(position, lambda: evaluate(u, v + step), lambda: evaluate(u, v - step),
+                        v + step <= v_max)
+        uu = sum(a * a for a in du)
+        vv = sum(a * a for a in dv)
+        uv = sum(a * b for a, b in zip(du, dv))
+        determinant = uu * vv - uv * uv
+        if abs(determinant) < 1e-18:
+            break
+        ru = sum(a * b for a, b in zip(du, delta))
+        rv = sum(a * b for a, b in zip(dv, delta))
+        step_u = (vv * ru - uv * rv) / determinant
+        step_v = (uu * rv - uv * ru) / determinant
+        u = min(max(u + step_u, u_min), u_max)
+        v = min(max(v + step_v, v_min), v_max)
+        if math.hypot(step_u, step_v) < 1e-9:
+            break
+    return evaluate(u, v), u, v
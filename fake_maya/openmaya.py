@@ -0,0 +1,1654 @@
+'''
+openmaya.py
+
+maya.api.OpenMaya subset for the fake Maya engine. Installed as maya.api.OpenMaya by
+fake_maya.install().
+
+Math classes (MVector, MPoint, MMatrix, MTransformationMatrix, MEulerRotation) are complete
+enough for rig math. Scene access goes through MObject / MDagPath / MPlug wrappers of the
+fake scene nodes. Geometry function sets other than MFnNurbsCurve are not available.
+'''
+import math
+import adv_scripting.fake_maya.mmath as mmath
+import adv_scripting.fake_maya.nurbs as nurbs
+import adv_scripting.fake_maya.scene as scene_module
+
+
+# MATH =================================================================
+
+class MVector():
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, *args):
+        if len(args) == 1:
+            args = tuple(args[0])
+        values = (tuple(float(v) for v in args) + (0.0, 0.0, 0.0))[:3]
+        self.x, self.y, self.z = values
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __len__(self):
+        return 3
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z)[index]
+
+    def __repr__(self):
+        return f'({self.x}, {self.y}, {self.z})'
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __add__(self, other):
+        return MVector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        return MVector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __neg__(self):
+        return MVector(-self.x, -self.y, -self.z)
+
+    def __mul__(self, other):
+        if isinstance(other, MVector):
+            return self.x * other.x + self.y * other.y + self.z * other.z
+        if isinstance(other, MMatrix):
+            return MVector(mmath.transform_vector(tuple(self), other._values))
+        return MVector(self.x * other, self.y * other, self.z * other)
+
+    def __rmul__(self, other):
+        return MVector(self.x * other, self.y * other, self.z * other)
+
+    def __truediv__(self, other):
+        return MVector(self.x / other, self.y / other, self.z / other)
+
+    def __xor__(self, other):
+        return MVector(mmath._cross(tuple(self), tuple(other)))
+
+    def length(self):
+        return math.sqrt(self.x * self.x + self.y * self.y + self.z * self.z)
+
+    def normal(self):
+        length = self.length()
+        return MVector(self) / length if length else MVector(self)
+
+    def normalize(self):
+        normal = self.normal()
+        self.x, self.y, self.z = normal.x, normal.y, normal.z
+        return self
+
+    def angle(self, other):
+        lengths = self.length() * other.length()
+        if not lengths:
+            return 0.0
+        return math.acos(max(-1.0, min(1.0, (self * other) / lengths)))
+
+    def isEquivalent(self, other, tolerance=1e-10):
+        return all(abs(a - b) <= tolerance for a, b in zip(self, other))
+
+
+MVector.kXaxisVector = MVector(1, 0, 0)
+MVector.kYaxisVector = MVector(0, 1, 0)
+MVector.kZaxisVector = MVector(0, 0, 1)
+MVector.kZeroVector = MVector(0, 0, 0)
+
+
+class MPoint():
+    __slots__ = ('x', 'y', 'z', 'w')
+
+    def __init__(self, *args):
+        if len(args) == 1:
+            args = tuple(args[0])
+        values = (tuple(float(v) for v in args) + (0.0, 0.0, 0.0, 1.0)[len(args):])[:4]
+        self.x, self.y, self.z, self.w = values
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z, self.w))
+
+    def __len__(self):
+        return 4
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z, self.w)[index]
+
+    def __repr__(self):
+        return f'({self.x}, {self.y}, {self.z}, {self.w})'
+
+    def __eq__(self, other):
+        return tuple(self)[:3] == tuple(other)[:3]
+
+    def __add__(self, other):
+        return MPoint(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        if isinstance(other, MPoint):
+            return MVector(self.x - other.x, self.y - other.y, self.z - other.z)
+        return MPoint(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __mul__(self, other):
+        if isinstance(other, MMatrix):
+            return MPoint(mmath.transform_point((self.x, self.y, self.z), other._values))
+        return MPoint(self.x * other, self.y * other, self.z * other)
+
+    def distanceTo(self, other):
+        return math.sqrt((self.x - other.x)**2 + (self.y - other.y)**2 + (self.z - other.z)**2)
+
+    def isEquivalent(self, other, tolerance=1e-10):
+        return all(abs(a - b) <= tolerance for a, b in zip(tuple(self)[:3], tuple(other)[:3]))
+
+
+MPoint.kOrigin = MPoint(0, 0, 0)
+
+
+class MMatrix():
+    '''
+    4x4 row-vector matrix. Indexing and iteration use the 16 flat values like Maya.
+    '''
+    __slots__ = ('_values',)
+
+    def __init__(self, values=None):
+        if values is None:
+            self._values = mmath.IDENTITY
+        elif isinstance(values, MMatrix):
+            self._values = values._values
+        else:
+            values = list(values)
+            if len(values) == 4:
+                values = [v for row in values for v in row]
+            self._values = tuple(float(v) for v in values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return 16
+
+    def __getitem__(self, index):
+        return self._values[index]
+
+    def __setitem__(self, index, value):
+        values = list(self._values)
+        values[index] = float(value)
+        self._values = tuple(values)
+
+    def __repr__(self):
+        rows = [self._values[i:i + 4] for i in range(0, 16, 4)]
+        return '(' + ', '.join(str(row) for row in rows) + ')'
+
+    def __eq__(self, other):
+        return isinstance(other, MMatrix) and self._values == other._values
+
+    def __mul__(self, other):
+        if isinstance(other, MMatrix):
+            return MMatrix(mmath.mult(self._values, other._values))
+        return MMatrix(v * other for v in self._values)
+
+    def __add__(self, other):
+        return MMatrix(a + b for a, b in zip(self._values, other._values))
+
+    def getElement(self, row, column):
+        return self._values[row * 4 + column]
+
+    def setElement(self, row, column, value):
+        self[row * 4 + column] = value
+        return self
+
+    def inverse(self):
+        return MMatrix(mmath.inverse(self._values))
+
+    def transpose(self):
+        return MMatrix(mmath.transpose(self._values))
+
+    def setToIdentity(self):
+        self._values = mmath.IDENTITY
+        return self
+
+    def isEquivalent(self, other, tolerance=1e-10):
+        return mmath.is_equivalent(self._values, tuple(other), tolerance)
+
+    def det3x3(self):
+        m = self._values
+        return (m[0] * (m[5] * m[10] - m[6] * m[9]) - m[1] * (m[4] * m[10] - m[6] * m[8]) +
+                m[2] * (m[4] * m[9] - m[5] * m[8]))
+
+
+MMatrix.kIdentity = MMatrix()
+
+
+class MSpace():
+    kInvalid = 0
+    kTransform = 1
+    kPreTransform = 2
+    kPostTransform = 3
+    kWorld = 4
+    kObject = kPreTransform
+
+
+class MEulerRotation():
+    kXYZ, kYZX, kZXY, kXZY, kYXZ, kZYX = range(6)
+
+    def __init__(self, x=0.0, y=0.0, z=0.0, order=0):
+        if isinstance(x, (list, tuple, MVector)):
+            x, y, z = tuple(x)[:3]
+        self.x = float(x)
+        self.y = float(y)
+        self.z = float(z)
+        self.order = order
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __getitem__(self, index):
+        return (self.x, self.y, self.z)[index]
+
+    def __repr__(self):
+        return f'({self.x}, {self.y}, {self.z}, {self.order})'
+
+    def asMatrix(self):
+        return MMatrix(mmath.euler_matrix((self.x, self.y, self.z), self.order))
+
+    def asVector(self):
+        return MVector(self.x, self.y, self.z)
+
+    def reorder(self, order):
+        return MEulerRotation(*mmath.matrix_to_euler(self.asMatrix()._values, order), order)
+
+    @staticmethod
+    def decompose(matrix, order):
+        return MEulerRotation(*mmath.matrix_to_euler(tuple(matrix), order), order)
+
+
+class MQuaternion():
+    def __init__(self, x=0.0, y=0.0, z=0.0, w=1.0):
+        self.x, self.y, self.z, self.w = float(x), float(y), float(z), float(w)
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z, self.w))
+
+    def asMatrix(self):
+        return MMatrix(mmath.rotation_matrix(mmath.quaternion_to_rotation(tuple(self))))
+
+    def asEulerRotation(self):
+        return MEulerRotation(*mmath.matrix_to_euler(self.asMatrix()._values))
+
+    @staticmethod
+    def slerp(a, b, weight, spin=0):
+        return MQuaternion(*mmath.slerp(tuple(a), tuple(b), weight))
+
+
+class MTransformationMatrix():
+    '''
+    Translate / rotate / scale view of a matrix. Pivots are not supported.
+    '''
+    def __init__(self, matrix=None):
+        matrix = tuple(matrix) if matrix is not None else mmath.IDENTITY
+        translate, rotation, scale, shear = mmath.decompose(matrix)
+        self._translate = MVector(translate)
+        self._rotation = mmath.rotation_matrix(rotation)
+        self._scale = list(scale)
+        self._shear = list(shear)
+        self._order = MEulerRotation.kXYZ
+
+    def asMatrix(self):
+        matrix = mmath.mult(mmath.mult(mmath.scale_matrix(self._scale),
+                                       mmath.shear_matrix(self._shear)), self._rotation)
+        return MMatrix(matrix[:12] + tuple(self._translate) + (1.0,))
+
+    def translation(self, space=MSpace.kTransform):
+        return MVector(self._translate)
+
+    def setTranslation(self, vector, space=MSpace.kTransform):
+        self._translate = MVector(vector)
+        return self
+
+    def rotation(self, asQuaternion=False):
+        if asQuaternion:
+            return MQuaternion(*mmath.rotation_to_quaternion(mmath.decompose(self._rotation)[1]))
+        return MEulerRotation(*mmath.matrix_to_euler(self._rotation, self._order), self._order)
+
+    def setRotation(self, rotation):
+        if isinstance(rotation, MQuaternion):
+            self._rotation = rotation.asMatrix()._values
+        else:
+            self._rotation = rotation.asMatrix()._values
+        return self
+
+    def rotationOrder(self):
+        return self._order
+
+    def scale(self, space=MSpace.kTransform):
+        return list(self._scale)
+
+    def setScale(self, scale, space=MSpace.kTransform):
+        self._scale = [float(v) for v in scale]
+        return self
+
+    def shear(self, space=MSpace.kTransform):
+        return list(self._shear)
+
+
+class _Unit():
+    '''
+    MDistance / MAngle / MTime: values are kept in the UI unit.
+    '''
+    kInvalid = 0
+
+    def __init__(self, value=0.0, unit=None):
+        self.value = float(value)
+        self.unit = unit if unit is not None else self.uiUnit()
+
+    @classmethod
+    def uiUnit(cls):
+        return cls._ui_unit
+
+    def asUnits(self, unit):
+        return self.value
+
+
+class MDistance(_Unit):
+    kCentimeters = 6
+    _ui_unit = kCentimeters
+
+
+class MAngle(_Unit):
+    kRadians = 1
+    kDegrees = 2
+    _ui_unit = kDegrees
+
+    def asUnits(self, unit):
+        if unit == self.unit:
+            return self.value
+        return self.asDegrees() if unit == self.kDegrees else self.asRadians()
+
+    def asDegrees(self):
+        return self.value if self.unit == self.kDegrees else math.degrees(self.value)
+
+    def asRadians(self):
+        return self.value if self.unit == self.kRadians else math.radians(self.value)
+
+
+class MTimeArray(list):
+    pass
+
+
+class MDoubleArray(list):
+    pass
+
+
+class MTime(_Unit):
+    kSeconds = 3
+    kFilm = 6
+    _ui_unit = kFilm
+    # Units per second
+    _RATES = {kSeconds: 1.0, kFilm: 24.0}
+
+    def asUnits(self, unit):
+        return self.value * self._RATES[unit] / self._RATES[self.unit]
+
+
+# OBJECTS ==============================================================
+
+class MFn():
+    kInvalid = 0
+    kBase = 1
+    kDependencyNode = 4
+    kDagNode = 107
+    kTransform = 110
+    kJoint = 121
+    kIkHandle = 120
+    kIkEffector = 119
+    kConstraint = 917
+    kShape = 248
+    kNurbsCurve = 267
+    kNurbsSurface = 294
+    kMesh = 296
+    kLocator = 281
+    kCamera = 250
+    kAnimCurve = 7
+    kMultMatrix = 1130
+    kAttribute = 554
+    kMatrixData = 575
+
+
+# MFn constant -> node types it matches
+_FN_TYPES = {MFn.kDependencyNode: 'dependNode', MFn.kDagNode: 'dagNode',
+             MFn.kTransform: 'transform', MFn.kJoint: 'joint', MFn.kIkHandle: 'ikHandle',
+             MFn.kIkEffector: 'ikEffector', MFn.kConstraint: 'constraint', MFn.kShape: 'shape',
+             MFn.kNurbsCurve: 'nurbsCurve', MFn.kNurbsSurface: 'nurbsSurface',
+             MFn.kMesh: 'mesh', MFn.kLocator: 'locator', MFn.kCamera: 'camera',
+             MFn.kMultMatrix: 'multMatrix'}
+_ANIM_CURVE_TYPES = ('animCurveTL', 'animCurveTA', 'animCurveTU', 'animCurveTT')
+
+
+class MObject():
+    '''
+    Handle to a fake scene node, attribute definition or data value.
+    '''
+    __slots__ = ('_node', '_attribute', '_data')
+
+    def __init__(self, other=None):
+        self._node = other._node if isinstance(other, MObject) else other
+        self._attribute = other._attribute if isinstance(other, MObject) else None
+        self._data = other._data if isinstance(other, MObject) else None
+
+    def __eq__(self, other):
+        if not isinstance(other, MObject):
+            return False
+        if self._node is not None or other._node is not None:
+            return self._node is other._node
+        return self._attribute is other._attribute and self._data is other._data
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return id(self._node)
+
+    def __repr__(self):
+        return f'MObject({self._node!r})'
+
+    def isNull(self):
+        return self._node is None and self._attribute is None and self._data is None
+
+    def hasFn(self, fn):
+        if self._node is None:
+            return (fn == MFn.kAttribute and self._attribute is not None or
+                    fn == MFn.kMatrixData and self._data is not None)
+        if fn == MFn.kBase:
+            return True
+        if fn == MFn.kAnimCurve:
+            return self._node.type.name in _ANIM_CURVE_TYPES
+        type_name = _FN_TYPES.get(fn)
+        return type_name is not None and self._node.is_a(type_name)
+
+    def apiType(self):
+        if self._node is None:
+            return MFn.kAttribute if self._attribute is not None else MFn.kInvalid
+        for fn in sorted(_FN_TYPES, reverse=True):
+            if self._node.type.name == _FN_TYPES[fn]:
+                return fn
+        return MFn.kDagNode if self._node.type.dag else MFn.kDependencyNode
+
+
+MObject.kNullObj = MObject()
+
+
+def _wrap(node):
+    return MObject(node) if node is not None else MObject()
+
+
+def _node(obj):
+    '''
+    Scene node of an MObject / MDagPath, RuntimeError for null or deleted objects.
+    '''
+    node = obj._node if isinstance(obj, (MObject, MDagPath)) else obj
+    if node is None or not node.alive:
+        raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+    return node
+
+
+class MObjectHandle():
+    def __init__(self, obj=None):
+        self._object = MObject(obj) if obj is not None else MObject()
+
+    def isValid(self):
+        return self._object._node is not None and self._object._node.alive
+
+    def isAlive(self):
+        return self.isValid()
+
+    def object(self):
+        return self._object if self.isValid() else MObject()
+
+    def objectRef(self):
+        return self.object()
+
+    def hashCode(self):
+        return id(self._object._node)
+
+    def __eq__(self, other):
+        return isinstance(other, MObjectHandle) and self._object == other._object
+
+    def __hash__(self):
+        return self.hashCode()
+
+
+class MUuid():
+    def __init__(self, value=None):
+        self._value = value
+
+    def asString(self):
+        return self._value
+
+    def valid(self):
+        return self._value is not None
+
+    def __eq__(self, other):
+        return isinstance(other, MUuid) and self._value == other._value
+
+
+class MDagPath():
+    __slots__ = ('_node',)
+
+    def __init__(self, other=None):
+        self._node = other._node if isinstance(other, (MDagPath, MObject)) else other
+
+    def __eq__(self, other):
+        return isinstance(other, MDagPath) and self._node is other._node
+
+    def __hash__(self):
+        return id(self._node)
+
+    def __repr__(self):
+        return self.fullPathName()
+
+    @staticmethod
+    def getAPathTo(obj):
+        node = _node(obj)
+        if not node.type.dag:
+            raise RuntimeError('(kInvalidParameter): Object is not a DAG node')
+        return MDagPath(node)
+
+    def isValid(self):
+        return self._node is not None and self._node.alive
+
+    def node(self):
+        return _wrap(self._node)
+
+    def transform(self):
+        node = _node(self)
+        return _wrap(node if node.is_a('transform') else node.parent)
+
+    def fullPathName(self):
+        return _node(self).long_name() if self._node is not None else ''
+
+    def partialPathName(self):
+        return _node(self).display_name() if self._node is not None else ''
+
+    def length(self):
+        return len(list(_node(self).ancestors())) + 1
+
+    def hasFn(self, fn):
+        return self.node().hasFn(fn)
+
+    def apiType(self):
+        return self.node().apiType()
+
+    def childCount(self):
+        return len(_node(self).children)
+
+    def child(self, index):
+        return _wrap(list(_node(self).children)[index])
+
+    def pop(self, count=1):
+        node = _node(self)
+        for _ in range(count):
+            node = node.parent
+        self._node = node
+        return self
+
+    def extendToShape(self):
+        node = _node(self)
+        shapes = [child for child in node.children
+                  if child.is_a('shape') and not node.scene.get(child, 'intermediateObject')]
+        if len(shapes) != 1:
+            raise RuntimeError('(kFailure): Object does not have exactly one shape')
+        self._node = shapes[0]
+        return self
+
+    def inclusiveMatrix(self):
+        node = _node(self)
+        return MMatrix(node.scene.world_matrix(node))
+
+    def exclusiveMatrix(self):
+        node = _node(self)
+        return MMatrix(node.scene.get(node, 'parentMatrix[0]'))
+
+    def inclusiveMatrixInverse(self):
+        return self.inclusiveMatrix().inverse()
+
+    def exclusiveMatrixInverse(self):
+        return self.exclusiveMatrix().inverse()
+
+
+class MSelectionList():
+    def __init__(self, other=None):
+        self._items = list(other._items) if isinstance(other, MSelectionList) else list()
+
+    def add(self, item, mergeWithExisting=True):
+        '''
+        Add a node or plug by name, or an MObject / MDagPath / MPlug / MUuid. Like Maya, a
+        string is matched as a name, UUID strings are not resolved.
+        '''
+        if isinstance(item, (MObject, MDagPath)):
+            entry = (_node(item), None)
+        elif isinstance(item, MUuid):
+            node = scene_module.current().by_uuid.get(item.asString())
+            if node is None:
+                raise RuntimeError('(kInvalidParameter): Object does not exist')
+            entry = (node, None)
+        elif isinstance(item, MPlug):
+            entry = (item._node, item._path)
+        else:
+            scene = scene_module.current()
+            name, _, attribute = str(item).partition('.')
+            matches = scene.find(name) if name not in scene.by_uuid else []
+            if not matches:
+                raise RuntimeError('(kInvalidParameter): Object does not exist')
+            if attribute:
+                try:
+                    path, _ = scene_module.resolve_path(matches[0], attribute)
+                except scene_module.PlugError:
+                    raise RuntimeError('(kInvalidParameter): Object does not exist')
+                entry = (matches[0], path)
+            else:
+                for node in matches[1:]:
+                    self._items.append((node, None))
+                entry = (matches[0], None)
+        if not mergeWithExisting or entry not in self._items:
+            self._items.append(entry)
+        return self
+
+    def length(self):
+        return len(self._items)
+
+    def isEmpty(self):
+        return not self._items
+
+    def clear(self):
+        self._items = list()
+        return self
+
+    def _item(self, index):
+        try:
+            return self._items[index]
+        except IndexError:
+            raise IndexError('list index out of range')
+
+    def getDependNode(self, index):
+        return MObject(self._item(index)[0])
+
+    def getDagPath(self, index):
+        node = self._item(index)[0]
+        if not node.type.dag:
+            raise TypeError('item is not a DAG path')
+        return MDagPath(node)
+
+    def getPlug(self, index):
+        node, path = self._item(index)
+        if path is None:
+            raise TypeError('item is not a plug')
+        return MPlug(node, path)
+
+    def getSelectionStrings(self, index=None):
+        items = self._items if index is None else [self._item(index)]
+        return [node.display_name() + (f'.{path}' if path else '') for node, path in items]
+
+
+# PLUGS ================================================================
+
+class MPlug():
+    __slots__ = ('_node', '_path', '_spec')
+
+    def __init__(self, node=None, path=None):
+        if isinstance(node, MPlug):
+            node, path = node._node, node._path
+        self._node = node._node if isinstance(node, MObject) else node
+        self._spec = None
+        self._path = path
+        if self._node is not None and path is not None:
+            self._path, self._spec = scene_module.resolve_path(self._node, path, None)
+
+    def __eq__(self, other):
+        return isinstance(other, MPlug) and self._node is other._node and \
+            self._path == other._path
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self._node), self._path))
+
+    def __repr__(self):
+        return self.name()
+
+    @property
+    def isNull(self):
+        return self._node is None
+
+    @property
+    def isArray(self):
+        return self._spec.multi and not self._path.endswith(']')
+
+    @property
+    def isElement(self):
+        return self._spec.multi and self._path.endswith(']')
+
+    @property
+    def isCompound(self):
+        return bool(self._spec.children)
+
+    @property
+    def isChild(self):
+        return self._spec.parent is not None
+
+    @property
+    def isLocked(self):
+        return self._path in self._node.locked
+
+    @isLocked.setter
+    def isLocked(self, value):
+        (self._node.locked.add if value else self._node.locked.discard)(self._path)
+
+    @property
+    def isKeyable(self):
+        return self._node.keyable.get(self._path, self._spec.keyable)
+
+    @property
+    def isDestination(self):
+        return self._path in self._node.inputs
+
+    @property
+    def isSource(self):
+        return bool(self._node.outputs.get(self._path))
+
+    @property
+    def isConnected(self):
+        return self.isDestination or self.isSource
+
+    @property
+    def isDynamic(self):
+        return self._spec.dynamic
+
+    def node(self):
+        return MObject(self._node)
+
+    def attribute(self):
+        obj = MObject()
+        obj._attribute = self._spec
+        return obj
+
+    def name(self):
+        return f'{self._node.display_name()}.{self._path}'
+
+    def partialName(self, includeNodeName=False, *args, **kwargs):
+        path = self._path
+        return f'{self._node.display_name()}.{path}' if includeNodeName else path
+
+    def logicalIndex(self):
+        return int(self._path.rsplit('[', 1)[1].rstrip(']'))
+
+    def elementByLogicalIndex(self, index):
+        return MPlug(self._node, f'{self._path}[{index}]')
+
+    def getExistingArrayAttributeIndices(self):
+        return self._node.scene.multi_indices(self._node, self._path)
+
+    def numElements(self):
+        return len(self.getExistingArrayAttributeIndices())
+
+    def evaluateNumElements(self):
+        return self.numElements()
+
+    def numChildren(self):
+        return len(self._spec.children)
+
+    def child(self, index):
+        child = self._spec.children[index] if isinstance(index, int) else next(
+            item for item in self._spec.children if item is index._attribute)
+        return MPlug(self._node, scene_module.child_plug(self._path, child))
+
+    def parent(self):
+        return MPlug(self._node, scene_module.parent_plug(self._path, self._spec))
+
+    def array(self):
+        return MPlug(self._node, self._path.rsplit('[', 1)[0])
+
+    def source(self):
+        source = self._node.inputs.get(self._path)
+        return MPlug(*source) if source else MPlug()
+
+    def destinations(self):
+        return [MPlug(node, path) for node, path in self._node.outputs.get(self._path, ())]
+
+    def connectedTo(self, asDst, asSrc):
+        plugs = list()
+        if asDst and self.isDestination:
+            plugs.append(self.source())
+        if asSrc:
+            plugs.extend(self.destinations())
+        return plugs
+
+    # Values -----------------------------------------------------------
+
+    def _get(self):
+        return self._node.scene.get(self._node, self._path, self._spec)
+
+    def _set(self, value):
+        self._node.scene.set(self._node, self._path, value, self._spec)
+
+    def asDouble(self):
+        return float(self._get())
+
+    def asFloat(self):
+        return float(self._get())
+
+    def asInt(self):
+        return int(self._get())
+
+    def asShort(self):
+        return int(self._get())
+
+    def asBool(self):
+        return bool(self._get())
+
+    def asString(self):
+        value = self._get()
+        return '' if value is None else str(value)
+
+    def asMDistance(self):
+        return MDistance(self._get())
+
+    def asMAngle(self):
+        return MAngle(math.radians(self._get()), MAngle.kRadians)
+
+    def asMTime(self):
+        return MTime(self._get())
+
+    def asMObject(self):
+        value = self._get()
+        if self._spec.type == 'matrix':
+            return MFnMatrixData().create(MMatrix(value))
+        obj = MObject()
+        obj._data = value
+        return obj
+
+    def setDouble(self, value):
+        self._set(float(value))
+
+    def setFloat(self, value):
+        self._set(float(value))
+
+    def setInt(self, value):
+        self._set(int(value))
+
+    def setShort(self, value):
+        self._set(int(value))
+
+    def setBool(self, value):
+        self._set(bool(value))
+
+    def setString(self, value):
+        self._set(value)
+
+    def setMDistance(self, value):
+        self._set(value.value)
+
+    def setMAngle(self, value):
+        self._set(value.asDegrees())
+
+    def setMTime(self, value):
+        self._set(value.value)
+
+    def setMObject(self, value):
+        self._set(value._data)
+
+
+class MDGContext():
+    '''
+    Evaluation context at a time. makeCurrent() makes the fake scene evaluate at that time,
+    without changing the current time.
+    '''
+    _current = None
+
+    def __init__(self, time=None):
+        self._time = time.value if isinstance(time, MTime) else time
+
+    def isNormal(self):
+        return self._time is None
+
+    def getTime(self):
+        return MTime(self._time if self._time is not None else scene_module.current().time)
+
+    @staticmethod
+    def current():
+        return MDGContext._current or MDGContext.kNormal
+
+    def makeCurrent(self):
+        '''
+        Returns the previous context
+        '''
+        previous = MDGContext.current()
+        MDGContext._current = self
+        scene_module.current().set_context_time(self._time)
+        return previous
+
+
+MDGContext.kNormal = MDGContext()
+
+
+class MFnMatrixData():
+    def __init__(self, obj=None):
+        self._object = obj
+
+    def create(self, matrix=None):
+        self._object = MObject()
+        self._object._data = tuple(matrix) if matrix is not None else mmath.IDENTITY
+        return self._object
+
+    def matrix(self):
+        return MMatrix(self._object._data)
+
+    def set(self, matrix):
+        self._object._data = tuple(matrix)
+        return self
+
+
+# FUNCTION SETS ========================================================
+
+class MFnBase():
+    def __init__(self, obj=None):
+        self._node = None
+        if obj is not None:
+            self.setObject(obj)
+
+    def setObject(self, obj):
+        self._node = _node(obj)
+        return self
+
+    def object(self):
+        return MObject(self._node)
+
+
+class MFnDependencyNode(MFnBase):
+    def name(self):
+        return self._node.display_name() if self._node.type.dag else self._node.name
+
+    def absoluteName(self):
+        return ':' + self._node.name
+
+    def setName(self, name):
+        self._node.scene.rename(self._node, name)
+        return self._node.name
+
+    def typeName(self):
+        return self._node.type.name
+
+    def uuid(self):
+        return MUuid(self._node.uuid)
+
+    def hasAttribute(self, name):
+        return self._node.spec(name) is not None
+
+    def attribute(self, name):
+        spec = self._node.spec(name)
+        if spec is None:
+            raise RuntimeError(f'(kInvalidParameter): No attribute {name}')
+        obj = MObject()
+        obj._attribute = spec
+        return obj
+
+    def findPlug(self, attribute, wantNetworkedPlug=True):
+        name = attribute._attribute.name if isinstance(attribute, MObject) else attribute
+        try:
+            return MPlug(self._node, name)
+        except scene_module.PlugError:
+            raise RuntimeError(f'(kInvalidParameter): Cannot find plug {name}')
+
+    def attributeCount(self):
+        return len(self._node.type.attrs) + len(self._node.dynamic)
+
+    def isLocked(self):
+        return False
+
+    def getConnections(self):
+        return [MPlug(self._node, path) for path in
+                list(self._node.inputs) + list(self._node.outputs)]
+
+
+class MFnDagNode(MFnDependencyNode):
+    def setObject(self, obj):
+        node = _node(obj)
+        if not node.type.dag:
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        self._node = node
+        return self
+
+    def create(self, type_name, name=None, parent=MObject.kNullObj):
+        scene = scene_module.current()
+        parent_node = parent._node if isinstance(parent, MObject) else None
+        node = scene.create_node(type_name, name, parent_node)
+        self._node = node
+        return MObject(node.parent if node.type.shape and parent_node is None else node)
+
+    def fullPathName(self):
+        return self._node.long_name()
+
+    def partialPathName(self):
+        return self._node.display_name()
+
+    def getPath(self):
+        return MDagPath(self._node)
+
+    def dagPath(self):
+        return MDagPath(self._node)
+
+    def parentCount(self):
+        return 1
+
+    def parent(self, index=0):
+        return _wrap(self._node.parent)
+
+    def childCount(self):
+        return len(self._node.children)
+
+    def child(self, index):
+        return MObject(list(self._node.children)[index])
+
+    def transformationMatrix(self):
+        return MMatrix(self._node.scene.local_matrix(self._node))
+
+
+class MFnTransform(MFnDagNode):
+    def translation(self, space=MSpace.kTransform):
+        scene = self._node.scene
+        if space == MSpace.kWorld:
+            return MVector(mmath.translation(scene.world_matrix(self._node)))
+        return MVector(scene.get(self._node, 'translate'))
+
+    def setTranslation(self, vector, space=MSpace.kTransform):
+        scene = self._node.scene
+        if space == MSpace.kWorld:
+            vector = mmath.transform_point(tuple(vector)[:3],
+                                           mmath.inverse(scene.parent_space(self._node)))
+        scene._set_vector(self._node, 'translate', tuple(vector)[:3])
+        return self
+
+    def rotation(self, space=MSpace.kTransform, asQuaternion=False):
+        values = [math.radians(v) for v in self._node.scene.get(self._node, 'rotate')]
+        rotation = MEulerRotation(*values, self._node.scene.get(self._node, 'rotateOrder'))
+        if asQuaternion:
+            return MTransformationMatrix(rotation.asMatrix()).rotation(True)
+        return rotation
+
+    def setRotation(self, rotation, space=MSpace.kTransform):
+        if isinstance(rotation, MQuaternion):
+            rotation = rotation.asEulerRotation()
+        self._node.scene._set_vector(self._node, 'rotate', [math.degrees(v) for v in rotation])
+        return self
+
+    def scale(self):
+        return list(self._node.scene.get(self._node, 'scale'))
+
+    def setScale(self, scale):
+        self._node.scene._set_vector(self._node, 'scale', scale)
+        return self
+
+
+class MFnNurbsCurve(MFnDagNode):
+    kInvalid = 0
+    kOpen = 1
+    kClosed = 2
+    kPeriodic = 3
+
+    def setObject(self, obj):
+        node = _node(obj)
+        if node.is_a('transform'):
+            shapes = [child for child in node.children if child.is_a('nurbsCurve')]
+            node = shapes[0] if shapes else node
+        if not node.is_a('nurbsCurve'):
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        self._node = node
+        return self
+
+    def create(self, cvs, knots, degree, form, is2D=False, rational=True, parent=MObject.kNullObj):
+        '''
+        Returns the new transform when parent is null, otherwise the new shape.
+        '''
+        scene = scene_module.current()
+        parent_node = parent._node if isinstance(parent, MObject) else None
+        transform = parent_node or scene.create_node('transform', 'curve#')
+        shape = scene.create_node('nurbsCurve', f'{transform.name}Shape', transform)
+        shape.data.update({'cvs': [tuple(p)[:3] for p in cvs], 'degree': int(degree),
+                           'form': 'periodic' if form == self.kPeriodic else 'open',
+                           'knots': [float(k) for k in knots]})
+        self._node = shape
+        return MObject(shape if parent_node is not None else transform)
+
+    @property
+    def degree(self):
+        return self._node.data.get('degree', 3)
+
+    @property
+    def form(self):
+        return self.kPeriodic if self._node.data.get('form') == 'periodic' else self.kOpen
+
+    @property
+    def numCVs(self):
+        return len(self._node.data.get('cvs', ()))
+
+    @property
+    def numSpans(self):
+        return self._node.scene.get(self._node, 'spans')
+
+    def cvPositions(self, space=MSpace.kObject):
+        cvs = self._node.data.get('cvs', ())
+        if space == MSpace.kWorld:
+            world = self._node.scene.world_matrix(self._node)
+            cvs = [mmath.transform_point(cv, world) for cv in cvs]
+        return [MPoint(cv) for cv in cvs]
+
+    def setCVPositions(self, points, space=MSpace.kObject):
+        cvs = [tuple(p)[:3] for p in points]
+        if space == MSpace.kWorld:
+            inverse = mmath.inverse(self._node.scene.world_matrix(self._node))
+            cvs = [mmath.transform_point(cv, inverse) for cv in cvs]
+        self._node.data['cvs'] = cvs
+        self._node.scene.changed(self._node)
+
+    def knots(self):
+        return nurbs.curve_knots(self._node.data)
+
+    def knotDomain(self):
+        return nurbs.domain(self.knots(), self.degree)
+
+    def getPointAtParam(self, param, space=MSpace.kObject):
+        point = nurbs.curve_point(self._node.data, param)
+        if space == MSpace.kWorld:
+            point = mmath.transform_point(point, self._node.scene.world_matrix(self._node))
+        return MPoint(point)
+
+    def updateCurve(self):
+        self._node.scene.changed(self._node)
+
+
+class MFnNurbsSurface(MFnDagNode):
+    '''
+    Surfaces made by cmds.loft. U runs along the lofted curves, V across them.
+    '''
+    def setObject(self, obj):
+        node = _node(obj)
+        if node.is_a('transform'):
+            shapes = [child for child in node.children if child.is_a('nurbsSurface')
+                      and not node.scene.get(child, 'intermediateObject')]
+            node = shapes[0] if shapes else node
+        if not node.is_a('nurbsSurface') or 'cvs' not in node.data:
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        self._node = node
+        return self
+
+    @property
+    def knotDomainInU(self):
+        return nurbs.surface_domain(self._node.data)[0]
+
+    @property
+    def knotDomainInV(self):
+        return nurbs.surface_domain(self._node.data)[1]
+
+    @property
+    def degreeInU(self):
+        return self._node.data['degree_u']
+
+    @property
+    def degreeInV(self):
+        return self._node.data['degree_v']
+
+    @property
+    def numCVsInU(self):
+        return len(self._node.data['cvs'])
+
+    @property
+    def numCVsInV(self):
+        return len(self._node.data['cvs'][0])
+
+    def _world(self, space):
+        if space == MSpace.kWorld:
+            world = self._node.scene.world_matrix(self._node)
+            return lambda point: mmath.transform_point(point, world)
+        return None
+
+    def getPointAtParam(self, u, v, space=MSpace.kObject):
+        point = nurbs.surface_point(self._node.data, u, v)
+        transform = self._world(space)
+        return MPoint(transform(point) if transform else point)
+
+    def closestPoint(self, point, uStart=None, vStart=None, ignoreTrimBoundaries=False,
+                     tolerance=1e-6, space=MSpace.kObject):
+        '''
+        Returns (MPoint, u, v)
+        '''
+        closest, u, v = nurbs.closest_parameters(self._node.data, tuple(point)[:3], uStart,
+                                                 vStart, self._world(space))
+        return MPoint(closest), u, v
+
+
+# ATTRIBUTE FUNCTION SETS ==============================================
+
+class MFnAttribute():
+    def __init__(self, obj=None):
+        self._spec = obj._attribute if isinstance(obj, MObject) else None
+
+    def _create(self, name, short, attr_type, default):
+        self._spec = scene_module.AttrSpec(name, short, attr_type, default, dynamic=True)
+        obj = MObject()
+        obj._attribute = self._spec
+        return obj
+
+    @property
+    def name(self):
+        return self._spec.name
+
+    @property
+    def keyable(self):
+        return self._spec.keyable
+
+    @keyable.setter
+    def keyable(self, value):
+        self._spec.keyable = bool(value)
+
+    @property
+    def hidden(self):
+        return self._spec.hidden
+
+    @hidden.setter
+    def hidden(self, value):
+        self._spec.hidden = bool(value)
+
+    @property
+    def array(self):
+        return self._spec.multi
+
+    @array.setter
+    def array(self, value):
+        self._spec.multi = bool(value)
+
+    @property
+    def writable(self):
+        return not self._spec.output
+
+    @writable.setter
+    def writable(self, value):
+        self._spec.output = not value
+
+    # Flags without an effect in the fake engine
+    readable = storable = connectable = channelBox = True
+
+    def setNiceNameOverride(self, name):
+        self._spec.nice_name = name
+
+
+class MFnMessageAttribute(MFnAttribute):
+    def create(self, name, short):
+        return self._create(name, short, 'message', None)
+
+
+class MFnMatrixAttribute(MFnAttribute):
+    kFloat = 0
+    kDouble = 1
+
+    def create(self, name, short, matrix_type=kDouble):
+        return self._create(name, short, 'matrix', mmath.IDENTITY)
+
+
+class MFnData():
+    kInvalid = 0
+    kNumeric = 1
+    kString = 4
+    kMatrix = 5
+    kStringArray = 6
+    kNurbsCurve = 9
+    kMesh = 13
+
+
+_DATA_TYPES = {MFnData.kString: 'string', MFnData.kMatrix: 'matrix',
+               MFnData.kStringArray: 'stringArray', MFnData.kNurbsCurve: 'nurbsCurve',
+               MFnData.kMesh: 'mesh'}
+
+
+class MFnTypedAttribute(MFnAttribute):
+    def create(self, name, short, data_type, default=MObject.kNullObj):
+        type_name = _DATA_TYPES.get(data_type, 'string')
+        obj = self._create(name, short, type_name,
+                           mmath.IDENTITY if type_name == 'matrix' else None)
+        self._spec.data_type = type_name
+        return obj
+
+
+class MFnEnumAttribute(MFnAttribute):
+    def create(self, name, short, default=0):
+        obj = self._create(name, short, 'enum', int(default))
+        self._fields = list()
+        return obj
+
+    def addField(self, field, value):
+        self._fields.append(f'{field}={value}' if value != len(self._fields) else field)
+        self._spec.enum_names = ':'.join(self._fields)
+
+
+class MFnNumericData():
+    kInvalid = 0
+    kBoolean = 1
+    kByte = 2
+    kChar = 3
+    kShort = 4
+    kInt = 7
+    kLong = kInt
+    kFloat = 11
+    kDouble = 14
+    k3Double = 20
+    k3Float = 18
+
+
+_NUMERIC_TYPES = {MFnNumericData.kBoolean: 'bool', MFnNumericData.kByte: 'byte',
+                  MFnNumericData.kChar: 'byte', MFnNumericData.kShort: 'short',
+                  MFnNumericData.kInt: 'long', MFnNumericData.kFloat: 'float',
+                  MFnNumericData.kDouble: 'double'}
+
+
+class MFnNumericAttribute(MFnAttribute):
+    def create(self, name, short, numeric_type, default=0.0):
+        type_name = _NUMERIC_TYPES.get(numeric_type, 'double')
+        if type_name == 'bool':
+            default = bool(default)
+        elif type_name in ('byte', 'short', 'long'):
+            default = int(default)
+        return self._create(name, short, type_name, default)
+
+    def setMin(self, value):
+        self._spec.min = float(value)
+
+    def setMax(self, value):
+        self._spec.max = float(value)
+
+    def getMin(self):
+        return self._spec.min
+
+    def getMax(self):
+        return self._spec.max
+
+
+class MFnUnitAttribute(MFnNumericAttribute):
+    kInvalid = 0
+    kAngle = 1
+    kDistance = 2
+    kTime = 3
+
+    def create(self, name, short, unit_type, default=0.0):
+        type_name = {self.kAngle: 'doubleAngle', self.kDistance: 'doubleLinear',
+                     self.kTime: 'time'}[unit_type]
+        return self._create(name, short, type_name, float(getattr(default, 'value', default)))
+
+
+class MFnCompoundAttribute(MFnAttribute):
+    def create(self, name, short):
+        return self._create(name, short, 'compound', None)
+
+    def addChild(self, attribute):
+        child = attribute._attribute
+        child.parent = self._spec
+        self._spec.children.append(child)
+
+
+# MODIFIERS ============================================================
+
+class MDGModifier():
+    '''
+    Node creation is immediate, every other edit is queued until doIt(). undoIt() reverts
+    connections, values, renames and created nodes, doIt() after undoIt() redoes them.
+    '''
+    def __init__(self):
+        self._operations = list()
+        self._undo = list()
+        self._done = list()
+
+    def _scene(self):
+        return scene_module.current()
+
+    def _created(self, node):
+        def restore():
+            node.scene.restore(node)
+            self._undo.append(lambda: node.scene.delete(node))
+        self._undo.append(lambda: node.scene.delete(node))
+        self._done.append(restore)
+
+    def createNode(self, type_name):
+        node = self._scene().create_node(type_name if not isinstance(type_name, MObject)
+                                         else 'transform')
+        self._created(node)
+        return MObject(node)
+
+    def renameNode(self, obj, name):
+        node = _node(obj)
+
+        def rename():
+            previous = node.name
+            node.scene.rename(node, name)
+            self._undo.append(lambda: node.scene.rename(node, previous))
+        self._operations.append(rename)
+        return self
+
+    def deleteNode(self, obj):
+        node = _node(obj)
+        self._operations.append(lambda: node.scene.delete(node))
+        return self
+
+    def connect(self, source, destination):
+        def connect():
+            destination._node.scene.connect(source._node, source._path,
+                                            destination._node, destination._path)
+            self._undo.append(lambda: destination._node.scene.disconnect(destination._node,
+                                                                          destination._path))
+        self._operations.append(connect)
+        return self
+
+    def disconnect(self, source, destination):
+        def disconnect():
+            destination._node.scene.disconnect(destination._node, destination._path)
+            self._undo.append(lambda: destination._node.scene.connect(
+                source._node, source._path, destination._node, destination._path))
+        self._operations.append(disconnect)
+        return self
+
+    def addAttribute(self, obj, attribute):
+        node = _node(obj)
+        spec = attribute._attribute
+
+        def add():
+            if node.spec(spec.name) is not None:
+                raise RuntimeError(f"Found existing attribute '{spec.name}' on "
+                                   f"{node.display_name()}.")
+            node.dynamic[spec.name] = spec
+            node.scene.changed(node)
+            self._undo.append(lambda: node.scene.delete_attr(node, spec.name))
+        self._operations.append(add)
+        return self
+
+    def _new_value(self, plug, value):
+        def set_value():
+            previous = plug._node.values.get(plug._path)
+            plug._node.scene.set(plug._node, plug._path, value, plug._spec)
+            self._undo.append(lambda: plug._node.values.__setitem__(plug._path, previous)
+                              if previous is not None else plug._node.values.pop(plug._path, None))
+        self._operations.append(set_value)
+        return self
+
+    def newPlugValue(self, plug, obj):
+        return self._new_value(plug, obj._data)
+
+    def newPlugValueDouble(self, plug, value):
+        return self._new_value(plug, float(value))
+
+    def newPlugValueFloat(self, plug, value):
+        return self._new_value(plug, float(value))
+
+    def newPlugValueInt(self, plug, value):
+        return self._new_value(plug, int(value))
+
+    def newPlugValueShort(self, plug, value):
+        return self._new_value(plug, int(value))
+
+    def newPlugValueBool(self, plug, value):
+        return self._new_value(plug, bool(value))
+
+    def newPlugValueString(self, plug, value):
+        return self._new_value(plug, value)
+
+    def newPlugValueMDistance(self, plug, value):
+        return self._new_value(plug, value.value)
+
+    def newPlugValueMAngle(self, plug, value):
+        return self._new_value(plug, value.asDegrees())
+
+    def newPlugValueMTime(self, plug, value):
+        return self._new_value(plug, value.value)
+
+    def commandToExecute(self, command):
+        raise RuntimeError('MEL commands are not supported by the fake Maya engine.')
+
+    def pythonCommandToExecute(self, command):
+        self._operations.append(lambda: exec(command, {}))
+        return self
+
+    def doIt(self):
+        operations, self._operations = self._operations, list()
+        for operation in operations:
+            operation()
+            self._done.append(operation)
+
+    def undoIt(self):
+        undo, self._undo = self._undo, list()
+        for operation in reversed(undo):
+            operation()
+        # Queued again for the next doIt()
+        self._operations = self._done + self._operations
+        self._done = list()
+        scene_module.current().changed()
+
+
+class MDagModifier(MDGModifier):
+    def createNode(self, type_name, parent=MObject.kNullObj):
+        parent_node = parent._node if isinstance(parent, MObject) else None
+        node = self._scene().create_node(type_name, None, parent_node)
+        self._created(node)
+        # Shapes created without a parent return their new transform
+        return MObject(node.parent if node.type.shape and parent_node is None else node)
+
+    def reparentNode(self, obj, parent=MObject.kNullObj):
+        node = _node(obj)
+        parent_node = parent._node if isinstance(parent, MObject) else None
+
+        def reparent():
+            previous = node.parent
+            node.scene.set_parent(node, parent_node)
+            self._undo.append(lambda: node.scene.set_parent(node, previous))
+        self._operations.append(reparent)
+        return self
+
+
+# MESSAGES =============================================================
+
+class MMessage():
+    @staticmethod
+    def removeCallback(callback_id):
+        if scene_module._node_added_callbacks.pop(callback_id, None) is None:
+            raise RuntimeError('(kInvalidParameter): Invalid callback id')
+
+    @staticmethod
+    def removeCallbacks(callback_ids):
+        for callback_id in callback_ids:
+            MMessage.removeCallback(callback_id)
+
+
+class MDGMessage(MMessage):
+    @staticmethod
+    def addNodeAddedCallback(function, node_type='dependNode', clientData=None):
+        '''
+        function(MObject, clientData) runs for every node created in any scene.
+        '''
+        callback_id = next(scene_module._callback_ids)
+        scene_module._node_added_callbacks[callback_id] = (
+            lambda node, data: function(MObject(node), data), node_type, clientData)
+        return callback_id
+
+
+class MGlobal():
+    kReplaceList = 0
+    kAddToList = 2
+
+    @staticmethod
+    def displayInfo(message):
+        print(message)
+
+    @staticmethod
+    def displayWarning(message):
+        print(f'# Warning: {message}')
+
+    @staticmethod
+    def displayError(message):
+        print(f'# Error: {message}')
+
+    @staticmethod
+    def getActiveSelectionList():
+        selection = MSelectionList()
+        for node in scene_module.current().selection:
+            selection.add(MObject(node))
+        return selection
+
+    @staticmethod
+    def getSelectionListByName(name):
+        return MSelectionList().add(name)
+
+    @staticmethod
+    def mayaState():
+        return 1 # kBatch
+
+
+# PLUGINS ==============================================================
+
+class MArgList():
+    def __init__(self, args=()):
+        self._args = list(args)
+
+    def __len__(self):
+        return len(self._args)
+
+    def length(self):
+        return len(self._args)
+
+
+class MPxCommand():
+    '''
+    Base of plugin commands. Undoable commands go on the undo queue, see cmds.undo().
+    '''
+    def __init__(self):
+        pass
+
+    def doIt(self, args):
+        pass
+
+    def undoIt(self):
+        pass
+
+    def redoIt(self):
+        pass
+
+    def isUndoable(self):
+        return False
+
+
+class MFnPlugin():
+    '''
+    Registers commands of a plugin loaded by cmds.loadPlugin() as cmds functions.
+    '''
+    def __init__(self, obj=None, vendor='Unknown', version='Unknown', apiVersion='Any'):
+        self.obj = obj
+        self.vendor = vendor
+        self.version = version
+
+    def registerCommand(self, name, creator, syntax=None):
+        import adv_scripting.fake_maya.cmds as cmds
+        cmds.register_command(name, creator)
+
+    def deregisterCommand(self, name):
+        import adv_scripting.fake_maya.cmds as cmds
+        cmds.deregister_command(name)
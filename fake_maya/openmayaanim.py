@@ -0,0 +1,202 @@
+'''
+openmayaanim.py
+
+Fake maya.api.OpenMayaAnim: MFnAnimCurve on the animCurve nodes of the fake engine
+(see animation.py). Like in Maya, values of angular curves are in radians and times are
+MTime in the UI unit. Key edits are reverted by an MAnimCurveChange.
+'''
+import math
+import adv_scripting.fake_maya.animation as animation
+import adv_scripting.fake_maya.openmaya as openmaya
+
+
+class MAnimCurveChange():
+    '''
+    Records the keys of every curve before its first edit, undoIt() restores them and redoIt()
+    restores the keys undoIt() found.
+    '''
+    def __init__(self):
+        self._keys = dict()
+        self._redo_keys = dict()
+
+    def _record(self, curve):
+        if id(curve) not in self._keys:
+            self._keys[id(curve)] = (curve, [_copy_key(key) for key in animation.keys(curve)])
+
+    @staticmethod
+    def _restore(curves):
+        for curve, curve_keys in curves.values():
+            curve.data['keys'] = [_copy_key(key) for key in curve_keys]
+            curve.scene.changed(curve)
+
+    def undoIt(self):
+        self._redo_keys = {curve_id: (curve, [_copy_key(key) for key in animation.keys(curve)])
+                           for curve_id, (curve, _) in self._keys.items()}
+        self._restore(self._keys)
+
+    def redoIt(self):
+        self._restore(self._redo_keys)
+
+
+def _copy_key(key):
+    copy = animation.Key(key.time, key.value, key.itt, key.ott)
+    copy.ia, copy.oa, copy.iw, copy.ow = key.ia, key.oa, key.iw, key.ow
+    return copy
+
+
+class MFnAnimCurve(openmaya.MFnDependencyNode):
+    kAnimCurveTA = 0
+    kAnimCurveTL = 1
+    kAnimCurveTT = 2
+    kAnimCurveTU = 3
+    kAnimCurveUnknown = 8
+
+    kTangentGlobal = 0
+    kTangentFixed = 1
+    kTangentLinear = 2
+    kTangentFlat = 3
+    kTangentSmooth = 4
+    kTangentStep = 5
+    kTangentSlow = 6
+    kTangentFast = 7
+    kTangentClamped = 8
+    kTangentPlateau = 9
+    kTangentStepNext = 10
+    kTangentAuto = 11
+
+    _CURVE_TYPES = {'animCurveTA': kAnimCurveTA, 'animCurveTL': kAnimCurveTL,
+                    'animCurveTT': kAnimCurveTT, 'animCurveTU': kAnimCurveTU}
+    _TANGENT_TYPES = {'global': kTangentGlobal, 'fixed': kTangentFixed, 'linear': kTangentLinear,
+                      'flat': kTangentFlat, 'spline': kTangentSmooth, 'step': kTangentStep,
+                      'slow': kTangentSlow, 'fast': kTangentFast, 'clamped': kTangentClamped,
+                      'plateau': kTangentPlateau, 'stepnext': kTangentStepNext,
+                      'auto': kTangentAuto}
+
+    def create(self, plug, animCurveType=None, modifier=None):
+        '''
+        New curve connected to plug, typed by the plug. With a modifier the connection is
+        queued until its doIt(), undoIt() deletes the curve.
+        '''
+        node = plug._node
+        if animation.find_curve(node, plug._path) is not None or plug._path in node.inputs:
+            raise RuntimeError('(kInvalidParameter): Plug is already connected')
+        if modifier is None:
+            curve = animation.get_or_create_curve(node.scene, node, plug._path, plug._spec)
+        else:
+            curve = animation.create_curve(node.scene, node, plug._path, plug._spec)
+            modifier._created(curve)
+
+            def attach():
+                animation.attach_curve(curve, node, plug._path)
+                modifier._undo.append(lambda: animation.detach_curve(curve, node, plug._path))
+            modifier._operations.append(attach)
+        self._node = curve
+        return openmaya.MObject(curve)
+
+    def _internal(self, value):
+        return math.degrees(value) if self._angular() else value
+
+    def addKeys(self, times, values, tangentInType=kTangentGlobal, tangentOutType=kTangentGlobal,
+                keepExistingKeys=False, change=None):
+        if change is not None:
+            change._record(self._node)
+        if not keepExistingKeys:
+            self._node.data['keys'] = list()
+        itt, ott = self._tangent_name(tangentInType), self._tangent_name(tangentOutType)
+        for time, value in zip(times, values):
+            animation.set_key(self._node, time.value, self._internal(value), itt, ott)
+
+    def _tangent_name(self, tangentType):
+        '''
+        Returns tangent type name, None for kTangentGlobal (keeps the default)
+        '''
+        if tangentType == self.kTangentGlobal:
+            return None
+        return next(name for name, value in self._TANGENT_TYPES.items() if value == tangentType)
+
+    def find(self, time):
+        for index, key in enumerate(self._keys()):
+            if abs(key.time - time.value) < 1e-9:
+                return index
+        return None
+
+    def setInTangentType(self, index, tangentType, change=None):
+        self._set_tangent_type(index, tangentType, 'itt', change)
+
+    def setOutTangentType(self, index, tangentType, change=None):
+        self._set_tangent_type(index, tangentType, 'ott', change)
+
+    def _set_tangent_type(self, index, tangentType, field, change):
+        if change is not None:
+            change._record(self._node)
+        setattr(self._key(index), field, self._tangent_name(tangentType) or
+                animation.DEFAULT_TANGENT)
+        self._node.scene.changed(self._node)
+
+    def setTangent(self, index, xOrAngle, yOrWeight, isInTangent, change=None,
+                   convertUnits=True):
+        '''
+        Fixed tangent from an MAngle and weight.
+        '''
+        if change is not None:
+            change._record(self._node)
+        key = self._key(index)
+        if isInTangent:
+            key.ia, key.iw, key.itt = xOrAngle.asDegrees(), float(yOrWeight), 'fixed'
+        else:
+            key.oa, key.ow, key.ott = xOrAngle.asDegrees(), float(yOrWeight), 'fixed'
+        self._node.scene.changed(self._node)
+
+    def setObject(self, obj):
+        node = openmaya._node(obj)
+        if node.type.name not in self._CURVE_TYPES:
+            raise RuntimeError('(kInvalidParameter): Object is incompatible with this method')
+        self._node = node
+        return self
+
+    def _keys(self):
+        return animation.keys(self._node)
+
+    def _key(self, index):
+        curve_keys = self._keys()
+        if not 0 <= index < len(curve_keys):
+            raise IndexError('(kInvalidParameter): Key index out of range')
+        return curve_keys[index]
+
+    @property
+    def numKeys(self):
+        return len(self._keys())
+
+    @property
+    def animCurveType(self):
+        return self._CURVE_TYPES[self._node.type.name]
+
+    @property
+    def isWeighted(self):
+        return bool(self._node.scene.get(self._node, 'weightedTangents'))
+
+    def _angular(self):
+        return self._node.type.name == 'animCurveTA'
+
+    def input(self, index):
+        return openmaya.MTime(self._key(index).time)
+
+    def value(self, index):
+        value = self._key(index).value
+        return math.radians(value) if self._angular() else value
+
+    def inTangentType(self, index):
+        return self._TANGENT_TYPES.get(self._key(index).itt, self.kTangentAuto)
+
+    def outTangentType(self, index):
+        return self._TANGENT_TYPES.get(self._key(index).ott, self.kTangentAuto)
+
+    def getTangentAngleWeight(self, index, isInTangent):
+        '''
+        Returns (MAngle, weight)
+        '''
+        key = self._key(index)
+        side = 'in' if isInTangent else 'out'
+        angle = animation.angle(self._keys(), index, side)
+        weight = key.iw if isInTangent else key.ow
+        return openmaya.MAngle(math.radians(angle), openmaya.MAngle.kRadians), weight
@@ -0,0 +1,1251 @@
+'''
+scene.py
+
+In-memory dependency graph for the fake Maya engine: nodes, DAG hierarchy, names, UUIDs,
+attributes, connections and evaluation.
+
+Evaluation is pull based. Computed plugs are memoized per node and an edit only drops the
+cache of the edited node and of what is downstream of it (DAG children and connections), so
+building a rig and reading its world matrices is linear in the number of nodes. Angles are stored and returned in degrees (Maya's default UI unit).
+'''
+import fnmatch
+import itertools
+import logging
+import math
+import re
+import uuid as uuid_module
+import adv_scripting.fake_maya.mmath as mmath
+
+logger = logging.getLogger(__name__)
+
+# Node added callbacks: id -> (function, node type, client data). Kept across new scenes.
+_node_added_callbacks = dict()
+_callback_ids = itertools.count(1)
+
+_INDEX_RE = re.compile(r'^(.*)\[(-?\d+|\*)\]$')
+_TRAILING_DIGITS = re.compile(r'^(.*?)(\d*)$')
+
+
+# ATTRIBUTE SCHEMA =====================================================
+
+NUMERIC_TYPES = {'double', 'doubleLinear', 'doubleAngle', 'float', 'long', 'short', 'byte',
+                 'bool', 'enum', 'time'}
+NUMERIC_COMPOUND_TYPES = {'double3', 'float3', 'double2', 'float2', 'long3', 'long2', 'short2',
+                          'short3', 'double4'}
+
+
+class AttrSpec():
+    '''
+    Description of one attribute.
+
+    Arguments
+    name (str): long name
+    short (str): short name
+    attr_type (str): e.g. 'double', 'doubleAngle', 'matrix', 'double3', 'compound', 'message'
+    default: default value
+    children (AttrSpec list): compound children
+    multi (bool): array attribute
+    output (bool): computed by the node, not writable
+    keyable (bool): shown in the channel box and listed by listAnimatable
+    '''
+    __slots__ = ('name', 'short', 'type', 'default', 'children', 'parent', 'multi', 'output',
+                 'keyable', 'dynamic', 'enum_names', 'min', 'max', 'nice_name', 'data_type',
+                 'hidden')
+
+    def __init__(self, name, short=None, attr_type='double', default=0.0, children=(),
+                 multi=False, output=False, keyable=False, dynamic=False):
+        self.name = name
+        self.short = short or name
+        self.type = attr_type
+        self.default = default
+        self.children = list(children)
+        self.parent = None
+        self.multi = multi
+        self.output = output
+        self.keyable = keyable
+        self.dynamic = dynamic
+        self.enum_names = None
+        self.min = None
+        self.max = None
+        self.nice_name = None
+        self.data_type = None
+        self.hidden = False
+        for child in self.children:
+            child.parent = self
+
+    def is_numeric_compound(self):
+        return bool(self.children) and all(child.type in NUMERIC_TYPES for child in self.children)
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def vector(name, short, child_type='double', default=0.0, output=False, keyable=False,
+           axes='XYZ', compound_type='double3', multi=False):
+    children = [AttrSpec(name + axis, short + axis.lower(), child_type, default,
+                         output=output, keyable=keyable) for axis in axes]
+    return AttrSpec(name, short, compound_type, None, children, multi=multi, output=output,
+                    keyable=keyable)
+
+
+def matrix(name, short, output=False, multi=False):
+    return AttrSpec(name, short, 'matrix', mmath.IDENTITY, multi=multi, output=output)
+
+
+class NodeType():
+    '''
+    Arguments
+    name (str): node type name
+    parent (NodeType/None): inherited type, e.g. transform for joint
+    attrs (AttrSpec list): attributes added by this type
+    compute (dict) (str->function): compute(node, path) for computed attributes
+    dag (bool): DAG node
+    shape (bool): shape node, created under a new transform by createNode
+    abstract (bool): not creatable
+    '''
+    def __init__(self, name, parent=None, attrs=(), compute=None, dag=None, shape=False,
+                 abstract=False):
+        self.name = name
+        self.parent = parent
+        self.attrs = dict(parent.attrs) if parent else dict()
+        self.compute = dict(parent.compute) if parent else dict()
+        self.dag = parent.dag if dag is None and parent else bool(dag)
+        self.shape = shape or (parent.shape if parent else False)
+        self.abstract = abstract
+        self.inherited = (parent.inherited if parent else []) + [name]
+        for spec in attrs:
+            self.attrs[spec.name] = spec
+        self.compute.update(compute or dict())
+        # Every attribute and compound child by long and short name
+        self.lookup = dict()
+        for spec in self.attrs.values():
+            for item in spec.walk():
+                self.lookup.setdefault(item.name, item)
+                self.lookup.setdefault(item.short, item)
+
+    def is_a(self, type_name):
+        return type_name in self.inherited
+
+
+NODE_TYPES = dict()
+
+
+def register(node_type):
+    NODE_TYPES[node_type.name] = node_type
+    return node_type
+
+
+# NODE =================================================================
+
+class Node():
+    __slots__ = ('scene', 'name', 'type', 'parent', 'children', 'values', 'dynamic', 'uuid',
+                 'inputs', 'outputs', 'locked', 'keyable', 'channel_box', 'data', 'alive',
+                 '__weakref__')
+
+    def __init__(self, scene, name, node_type):
+        self.scene = scene
+        self.name = name
+        self.type = node_type
+        self.parent = None
+        # Ordered set of DAG children
+        self.children = dict()
+        # plug path -> value for plugs set away from their default
+        self.values = dict()
+        # Dynamic attributes added with addAttr, long name -> AttrSpec
+        self.dynamic = dict()
+        self.uuid = str(uuid_module.uuid4()).upper()
+        # plug path -> (source node, source path)
+        self.inputs = dict()
+        # plug path -> [(destination node, destination path)]
+        self.outputs = dict()
+        # Plug paths with non default lock / keyable / channel box state
+        self.locked = set()
+        self.keyable = dict()
+        self.channel_box = dict()
+        # Type specific data, e.g. curve CVs, constraint targets, animation keys
+        self.data = dict()
+        self.alive = True
+
+    def __repr__(self):
+        return f'<Node {self.long_name()} ({self.type.name})>'
+
+    @property
+    def is_dag(self):
+        return self.type.dag
+
+    def is_a(self, type_name):
+        return self.type.is_a(type_name)
+
+    def ancestors(self):
+        node = self.parent
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def long_name(self):
+        if not self.type.dag:
+            return self.name
+        names = [self.name]
+        names.extend(node.name for node in self.ancestors())
+        return '|' + '|'.join(reversed(names))
+
+    def display_name(self):
+        '''
+        Shortest unique partial path, the name commands return.
+        '''
+        if not self.type.dag or len(self.scene.by_name.get(self.name, ())) == 1:
+            return self.name
+        path = self.long_name()
+        parts = path[1:].split('|')
+        for count in range(2, len(parts) + 1):
+            partial = '|'.join(parts[-count:])
+            if len(self.scene.find(partial)) == 1:
+                return partial
+        return path
+
+    def spec(self, name):
+        spec = self.dynamic.get(name)
+        if spec is not None:
+            return spec
+        spec = self.type.lookup.get(name)
+        if spec is None:
+            for dynamic in self.dynamic.values():
+                for item in dynamic.walk():
+                    if name in (item.name, item.short):
+                        return item
+        return spec
+
+    def descendants(self):
+        '''
+        Depth first, parents before children.
+        '''
+        stack = list(reversed(list(self.children)))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(list(node.children)))
+
+
+# PLUGS ================================================================
+
+def split_path(path):
+    '''
+    'target[0].targetMatrix' -> [('target', 0), ('targetMatrix', None)]
+    '''
+    segments = list()
+    for part in path.split('.'):
+        match = _INDEX_RE.match(part)
+        if match:
+            index = match.group(2)
+            segments.append((match.group(1), index if index == '*' else int(index)))
+        else:
+            segments.append((part, None))
+    return segments
+
+
+def join_path(segments):
+    return '.'.join(name if index is None else f'{name}[{index}]' for name, index in segments)
+
+
+class PlugError(ValueError):
+    pass
+
+
+class EvaluationCycle(RuntimeError):
+    '''
+    A plug depends on itself. Caught at the connection closing the cycle.
+    '''
+
+
+def resolve_path(node, path, default_index=0):
+    '''
+    Canonical plug path (long names, explicit indices) and the leaf AttrSpec.
+    A multi attribute given without an index uses default_index, None keeps it unindexed.
+    '''
+    segments = list()
+    spec = None
+    for name, index in split_path(path):
+        if spec is None:
+            spec = node.spec(name)
+        else:
+            spec = next((item for child in spec.children for item in child.walk()
+                         if name in (item.name, item.short)), None)
+        if spec is None:
+            raise PlugError(f"No object matches name: {node.display_name()}.{path}")
+        if spec.multi and index is None and default_index is not None:
+            index = default_index
+        segments.append((spec.name, index))
+    return join_path(segments), spec
+
+
+def parent_plug(path, spec):
+    '''
+    Path of the compound parent, 'target[0].targetMatrix' -> 'target[0]',
+    'translateX' -> 'translate'. Children of top level compounds are addressed by name only.
+    '''
+    if spec.parent.multi:
+        return path.rsplit('.', 1)[0]
+    prefix = path.rsplit('.', 1)[0] + '.' if '.' in path else ''
+    return prefix + spec.parent.name
+
+
+def child_plug(path, child):
+    if path.endswith(']'):
+        return f'{path}.{child.name}'
+    prefix = path.rsplit('.', 1)[0] + '.' if '.' in path else ''
+    return prefix + child.name
+
+
+# SCENE ================================================================
+
+class Scene():
+    def __init__(self):
+        self.nodes = dict() # Ordered set of live nodes, in creation order
+        self.by_name = dict() # short name -> node list
+        self.by_uuid = dict()
+        self.world = dict() # Ordered set of top level DAG nodes
+        self.selection = list()
+        self.time = 1.0
+        self.playback_range = (1.0, 120.0)
+        self.filename = ''
+        self.modified = False # Edited since the last save or open, see cmds.file(q=True, modified=True)
+        self._cache = dict() # node -> {path: value}
+        # MDGContext evaluation: time -> cache, and the normal (time, cache) while in a context
+        self._context_caches = dict()
+        self._normal = None
+        self._evaluating = set() # (node, path) being evaluated, to detect cycles
+        self._name_counters = dict()
+        # Undoable commands: lists of commands undone together, see cmds.undo()
+        self.undo_queue = list()
+        self.redo_queue = list()
+        self.undo_chunk = None # Commands of the open undoInfo chunk
+        self.undo_chunk_depth = 0
+        self.create_default_nodes()
+
+    def create_default_nodes(self):
+        for name, position, rotation in (('persp', (28, 21, 28), (-27.938, 45, 0)),
+                                         ('top', (0, 1000.1, 0), (-90, 0, 0)),
+                                         ('front', (0, 0, 1000.1), (0, 0, 0)),
+                                         ('side', (1000.1, 0, 0), (0, 90, 0))):
+            camera = self.create_node('transform', name)
+            camera.values.update({'translateX': float(position[0]),
+                                  'translateY': float(position[1]),
+                                  'translateZ': float(position[2]),
+                                  'rotateX': float(rotation[0]),
+                                  'rotateY': float(rotation[1]),
+                                  'rotateZ': float(rotation[2]),
+                                  'visibility': False})
+            self.create_node('camera', f'{name}Shape', parent=camera)
+        self.selection = list()
+
+    def changed(self, *nodes):
+        '''
+        Drop cached values of nodes and everything downstream of them, or of every node when
+        no nodes are given (time changes, bulk edits). Caches of other context times are dropped.
+        '''
+        self._context_caches = {time: cache for time, cache in self._context_caches.items()
+                                if cache is self._cache}
+        if self._normal is not None:
+            self._normal[1].clear()
+        if not nodes:
+            self._cache.clear()
+            return
+        stack = [(node, True) for node in nodes]
+        while stack:
+            node, force = stack.pop()
+            # A node without a cache has nothing cached downstream of it either
+            if self._cache.pop(node, None) is None and not force:
+                continue
+            stack.extend((child, False) for child in node.children)
+            for destinations in node.outputs.values():
+                stack.extend((destination, False) for destination, _ in destinations)
+
+    def set_context_time(self, time=None):
+        '''
+        Evaluate at time instead of the current time, for MDGContext.makeCurrent. None goes back
+        to the normal context. Each context time keeps its own cache until the next edit.
+        '''
+        if self._normal is not None:
+            self.time, self._cache = self._normal
+            self._normal = None
+        if time is not None and float(time) != self.time:
+            self._normal = (self.time, self._cache)
+            self.time = float(time)
+            self._cache = self._context_caches.setdefault(self.time, dict())
+
+    def context_time(self):
+        return None if self._normal is None else self.time
+
+    # NAMES ------------------------------------------------------------
+
+    def name_taken(self, name, parent=None, dag=True, ignore=None):
+        for node in self.by_name.get(name, ()):
+            if node is ignore:
+                continue
+            if not dag or not node.type.dag or node.parent is parent:
+                return True
+        return False
+
+    def unique_name(self, name, parent=None, dag=True, ignore=None):
+        '''
+        Maya style unique naming: '#' is replaced by a number, a clashing name gets its trailing
+        number incremented (joint1 -> joint2) or a number appended. Like maya.cmds, any object
+        is used by its string value.
+        '''
+        name = str(name)
+        if '#' not in name and not self.name_taken(name, parent, dag, ignore):
+            return name
+        if '#' in name:
+            base, suffix = name.split('#', 1)
+            suffix = suffix.replace('#', '')
+            number = 1
+        else:
+            base, digits = _TRAILING_DIGITS.match(name).groups()
+            suffix = ''
+            number = int(digits) + 1 if digits else 1
+        number = max(number, self._name_counters.get(base + '#' + suffix, 0) + 1)
+        while self.name_taken(f'{base}{number}{suffix}', parent, dag, ignore):
+            number += 1
+        self._name_counters[base + '#' + suffix] = number
+        return f'{base}{number}{suffix}'
+
+    def find(self, name):
+        '''
+        All nodes matching a name: short name, partial or full DAG path, UUID or wildcard.
+        '''
+        if not name:
+            return list()
+        node = self.by_uuid.get(name)
+        if node is not None:
+            return [node]
+        if any(char in name for char in '*?['):
+            return self.match(name)
+        if '|' not in name:
+            return list(self.by_name.get(name, ()))
+        absolute = name.startswith('|')
+        parts = name.strip('|').split('|')
+        matches = list()
+        for node in self.by_name.get(parts[-1], ()):
+            path = node.long_name()[1:].split('|')
+            if absolute and path == parts or not absolute and path[-len(parts):] == parts:
+                matches.append(node)
+        return matches
+
+    def match(self, pattern):
+        if '|' in pattern:
+            pattern = pattern if pattern.startswith('|') else '*|' + pattern
+            return [node for node in self.nodes
+                    if fnmatch.fnmatchcase(node.long_name(), pattern)
+                    or fnmatch.fnmatchcase('|' + node.long_name().lstrip('|'), pattern)]
+        return [node for node in self.nodes if fnmatch.fnmatchcase(node.name, pattern)]
+
+    def node(self, name):
+        '''
+        Returns the single node matching name. Raises ValueError like Maya commands do.
+        '''
+        if isinstance(name, Node):
+            return name
+        matches = self.find(str(name))
+        if not matches:
+            raise ValueError(f'No object matches name: {name}')
+        if len(matches) > 1:
+            raise ValueError(f'More than one object matches name: {name}')
+        return matches[0]
+
+    # NODES ------------------------------------------------------------
+
+    def create_node(self, type_name, name=None, parent=None, select=False):
+        self.modified = True
+        node_type = NODE_TYPES.get(type_name)
+        if node_type is None or node_type.abstract:
+            raise RuntimeError(f'Unknown object type: {type_name}')
+        if node_type.shape and parent is None:
+            transform_name = name.replace('Shape', '') if name and 'Shape' in name else None
+            parent = self.create_node('transform', transform_name or f'{type_name}#')
+            name = name or f'{parent.name}Shape'
+        if not node_type.dag:
+            parent = None
+        name = self.unique_name(name or f'{type_name}#', parent, node_type.dag)
+        node = Node(self, name, node_type)
+        self.nodes[node] = None
+        self.by_name.setdefault(name, []).append(node)
+        self.by_uuid[node.uuid] = node
+        if node_type.dag:
+            node.parent = parent
+            (parent.children if parent else self.world)[node] = None
+        if select:
+            self.selection = [node]
+        for function, callback_type, client_data in list(_node_added_callbacks.values()):
+            if callback_type in ('dependNode', None) or node.is_a(callback_type):
+                function(node, client_data)
+        return node
+
+    def rename(self, node, name):
+        self.modified = True
+        parent = node.parent if node.type.dag else None
+        name = self.unique_name(name, parent, node.type.dag, ignore=node)
+        self.by_name[node.name].remove(node)
+        if not self.by_name[node.name]:
+            del self.by_name[node.name]
+        node.name = name
+        self.by_name.setdefault(name, []).append(node)
+        return node
+
+    def set_parent(self, node, parent):
+        '''
+        Move node in the DAG, without keeping its world transform. parent None is the world.
+        '''
+        self.modified = True
+        if parent is node or parent is not None and node in parent.ancestors():
+            raise RuntimeError(f'Cannot parent {node.name} under its own descendant.')
+        (node.parent.children if node.parent else self.world).pop(node, None)
+        node.parent = parent
+        (parent.children if parent else self.world)[node] = None
+        if self.name_taken(node.name, parent, True, ignore=node):
+            self.rename(node, node.name)
+        self.changed(node)
+
+    def delete(self, node):
+        if not node.alive:
+            return
+        self.modified = True
+        for child in list(node.children):
+            self.delete(child)
+        # The end effector goes with its IK handle
+        effector = node.inputs.get('endEffector', (None,))[0] if node.is_a('ikHandle') else None
+        for path in list(node.inputs):
+            self.disconnect(node, path)
+        for path, destinations in list(node.outputs.items()):
+            for destination, destination_path in list(destinations):
+                self.disconnect(destination, destination_path)
+        if node.type.dag:
+            (node.parent.children if node.parent else self.world).pop(node, None)
+        self.nodes.pop(node, None)
+        self.by_name[node.name].remove(node)
+        if not self.by_name[node.name]:
+            del self.by_name[node.name]
+        self.by_uuid.pop(node.uuid, None)
+        if node in self.selection:
+            self.selection.remove(node)
+        node.alive = False
+        self.changed(node)
+        if effector is not None:
+            self.delete(effector)
+        # Animation curves and constraints only driving this node go with it
+        for curve in node.data.pop('anim_curves', ()):
+            if curve.alive and not any(curve.outputs.values()):
+                self.delete(curve)
+
+    def restore(self, node):
+        '''
+        Bring back a deleted node, without its children and connections.
+        '''
+        if node.alive:
+            return
+        self.modified = True
+        node.alive = True
+        self.nodes[node] = None
+        self.by_name.setdefault(node.name, []).append(node)
+        self.by_uuid[node.uuid] = node
+        if node.type.dag:
+            if node.parent is not None and not node.parent.alive:
+                node.parent = None
+            (node.parent.children if node.parent else self.world)[node] = None
+        self.changed(node)
+
+    # CONNECTIONS ------------------------------------------------------
+
+    def connect(self, source, source_path, destination, destination_path, force=False):
+        self.modified = True
+        existing = destination.inputs.get(destination_path)
+        if existing is not None:
+            if existing == (source, source_path):
+                return
+            if not force:
+                raise RuntimeError(f'{destination.display_name()}.{destination_path} is already '
+                                   f'connected to {existing[0].display_name()}.{existing[1]}.')
+            self.disconnect(destination, destination_path)
+        if destination_path in destination.locked:
+            raise RuntimeError(f'The destination attribute {destination.display_name()}.'
+                               f'{destination_path} is locked.')
+        destination.inputs[destination_path] = (source, source_path)
+        source.outputs.setdefault(source_path, []).append((destination, destination_path))
+        self.changed(destination)
+
+    def disconnect(self, destination, destination_path):
+        source = destination.inputs.pop(destination_path, None)
+        if source is None:
+            return False
+        self.modified = True
+        destinations = source[0].outputs.get(source[1], [])
+        if (destination, destination_path) in destinations:
+            destinations.remove((destination, destination_path))
+        if not destinations:
+            source[0].outputs.pop(source[1], None)
+        self.changed(destination)
+        return True
+
+    def connection_source(self, node, path, spec):
+        '''
+        Source plug feeding path directly or through a connected compound parent.
+
+        Returns (source node, source path, component index or None) or None
+        '''
+        source = node.inputs.get(path)
+        if source is not None:
+            return source + (None,)
+        if spec is not None and spec.parent is not None and not spec.parent.multi:
+            source = node.inputs.get(parent_plug(path, spec))
+            if source is not None:
+                return source + (spec.parent.children.index(spec),)
+        return None
+
+    # VALUES -----------------------------------------------------------
+
+    def get(self, node, path, spec=None):
+        '''
+        Evaluated value of a canonical plug path. Numeric compounds are tuples.
+        '''
+        cache = self._cache.get(node)
+        if cache is not None and path in cache:
+            return cache[path]
+        key = (node, path)
+        if key in self._evaluating:
+            raise EvaluationCycle(f'Cycle on {node.display_name()}.{path}')
+        self._evaluating.add(key)
+        try:
+            value = self._evaluate(node, path, spec)
+        finally:
+            self._evaluating.discard(key)
+        self._cache.setdefault(node, {})[path] = value
+        return value
+
+    def _evaluate(self, node, path, spec):
+        if spec is None:
+            spec = resolve_path(node, path)[1]
+        source = self.connection_source(node, path, spec)
+        if source is not None:
+            source_node, source_path, component = source
+            try:
+                value = self.get(source_node, source_path)
+            except EvaluationCycle as error:
+                # Like Maya, warn and use the last value set on the plug
+                logger.warning(f'{error}, using the stored value of {node.display_name()}.{path}')
+                return self._stored(node, path, spec)
+            if component is not None:
+                return value[component]
+            return value
+        leaf = path.rsplit('.', 1)[-1]
+        leaf = leaf.split('[', 1)[0]
+        compute = node.type.compute.get(leaf)
+        if compute is not None:
+            return compute(node, path)
+        if spec.parent is not None and spec.parent.name in node.type.compute:
+            return self.get(node, parent_plug(path, spec),
+                            spec.parent)[spec.parent.children.index(spec)]
+        if spec.is_numeric_compound():
+            return tuple(self.get(node, child_plug(path, child), child) for child in spec.children)
+        return self._stored(node, path, spec)
+
+    def _stored(self, node, path, spec):
+        if spec.is_numeric_compound():
+            return tuple(self._stored(node, child_plug(path, child), child)
+                         for child in spec.children)
+        value = node.values.get(path)
+        if value is None:
+            return spec.default
+        return value
+
+    def value(self, node, name):
+        '''
+        Evaluated value of an attribute given by name, e.g. 'translate' or 'worldMatrix[0]'.
+        '''
+        path, spec = resolve_path(node, name)
+        return self.get(node, path, spec)
+
+    def set(self, node, path, value, spec=None):
+        self.modified = True
+        if spec is None:
+            path, spec = resolve_path(node, path)
+        if spec.output and not spec.dynamic:
+            raise RuntimeError(f'setAttr: {node.display_name()}.{path} is a computed attribute.')
+        if path in node.locked or self.connection_source(node, path, spec) is not None:
+            raise RuntimeError(f'setAttr: The attribute \'{node.display_name()}.{path}\' is '
+                               f'locked or connected and cannot be modified.')
+        if spec.children and spec.type != 'compound':
+            for child, child_value in zip(spec.children, value):
+                self.set(node, child_plug(path, child), child_value, child)
+            return
+        if spec.type in ('double', 'doubleLinear', 'doubleAngle', 'float', 'time'):
+            value = float(value)
+        elif spec.type in ('long', 'short', 'byte', 'enum'):
+            value = int(value)
+        elif spec.type == 'bool':
+            value = bool(value)
+        elif spec.type == 'matrix':
+            value = tuple(float(v) for v in value)
+        if spec.min is not None and value < spec.min or spec.max is not None and value > spec.max:
+            value = min(max(value, spec.min if spec.min is not None else value),
+                        spec.max if spec.max is not None else value)
+        node.values[path] = value
+        self.changed(node)
+
+    def add_attr(self, node, name, attr_type='double', default=None, short=None, parent=None,
+                 multi=False, keyable=False):
+        '''
+        Add a dynamic attribute. Children of a compound name their parent.
+
+        Returns AttrSpec
+        '''
+        if node.spec(name) is not None or short and node.spec(short) is not None:
+            raise RuntimeError(f"Found existing attribute '{name}' on {node.display_name()}.")
+        self.modified = True
+        if default is None:
+            default = {'matrix': mmath.IDENTITY, 'bool': False, 'string': None,
+                       'message': None, 'compound': None}.get(attr_type, 0.0)
+            if attr_type in NUMERIC_COMPOUND_TYPES:
+                default = None
+        spec = AttrSpec(name, short, attr_type, default, multi=multi, keyable=keyable, dynamic=True)
+        if parent:
+            parent_spec = node.spec(parent)
+            if parent_spec is None:
+                raise RuntimeError(f"Parent attribute '{parent}' not found on {node.display_name()}.")
+            parent_spec.children.append(spec)
+            spec.parent = parent_spec
+        else:
+            node.dynamic[name] = spec
+        self.changed(node)
+        return spec
+
+    def delete_attr(self, node, name):
+        spec = node.dynamic.pop(name, None)
+        if spec is None:
+            raise RuntimeError(f"'{name}' is not a dynamic attribute of {node.display_name()}.")
+        names = {item.name for item in spec.walk()}
+        for path in list(node.inputs):
+            if path.split('[', 1)[0].split('.', 1)[0] in names:
+                self.disconnect(node, path)
+        for path, destinations in list(node.outputs.items()):
+            if path.split('[', 1)[0].split('.', 1)[0] in names:
+                for destination, destination_path in list(destinations):
+                    self.disconnect(destination, destination_path)
+        for path in list(node.values):
+            if path.split('[', 1)[0].split('.', 1)[0] in names:
+                del node.values[path]
+        self.changed(node)
+
+    def unique_attr_name(self, node, name):
+        if node.spec(name) is None:
+            return name
+        base, digits = _TRAILING_DIGITS.match(name).groups()
+        number = int(digits) + 1 if digits else 1
+        while node.spec(f'{base}{number}') is not None:
+            number += 1
+        return f'{base}{number}'
+
+    def multi_indices(self, node, name):
+        '''
+        Logical indices in use on a multi attribute, from set values and connections.
+        '''
+        indices = set()
+        prefix = name + '['
+        for path in itertools.chain(node.values, node.inputs, node.outputs):
+            if path.startswith(prefix):
+                indices.add(int(path[len(prefix):].split(']', 1)[0]))
+        return sorted(indices)
+
+    # TRANSFORMS -------------------------------------------------------
+
+    def local_matrix(self, node):
+        if not node.is_a('transform'):
+            return mmath.IDENTITY
+        radians = math.radians
+        rotate = self.get(node, 'rotate')
+        orient = None
+        if node.is_a('joint'):
+            orient = [radians(v) for v in self.get(node, 'jointOrient')]
+        return mmath.compose(self.get(node, 'translate'),
+                             [radians(v) for v in rotate],
+                             self.get(node, 'scale'),
+                             self.get(node, 'rotateOrder'),
+                             self.get(node, 'shear'),
+                             orient)
+
+    def parent_space(self, node):
+        '''
+        offsetParentMatrix * parentMatrix, the space translate / rotate / scale are in.
+        '''
+        parent_matrix = self.get(node, 'parentMatrix[0]')
+        if not node.is_a('transform'):
+            return parent_matrix
+        offset = self.get(node, 'offsetParentMatrix')
+        if offset == mmath.IDENTITY:
+            return parent_matrix
+        return mmath.mult(offset, parent_matrix)
+
+    def world_matrix(self, node):
+        return self.get(node, 'worldMatrix[0]')
+
+    def set_local_matrix(self, node, matrix, joint_orient=False, components='trs'):
+        '''
+        Set translate / rotate / scale from a local matrix.
+
+        Arguments
+        joint_orient (bool): for joints, keep rotate and solve jointOrient instead of keeping
+                             jointOrient and solving rotate
+        components (str): subset of 'trs' to set
+        '''
+        translate, rotation, scale, shear = mmath.decompose(matrix)
+        rotation = mmath.rotation_matrix(rotation)
+        if node.is_a('joint'):
+            rotate = [math.radians(v) for v in self.get(node, 'rotate')]
+            order = self.get(node, 'rotateOrder')
+            orient = [math.radians(v) for v in self.get(node, 'jointOrient')]
+            if joint_orient:
+                # rotation = R * JO
+                rotate_matrix = mmath.euler_matrix(rotate, order)
+                orient_matrix = mmath.mult(mmath.inverse(rotate_matrix), rotation)
+                if 'r' in components:
+                    self._set_vector(node, 'jointOrient', [
+                        math.degrees(v) for v in mmath.matrix_to_euler(orient_matrix, 0)])
+            else:
+                rotation = mmath.mult(rotation, mmath.transpose(mmath.euler_matrix(orient, 0)))
+        if 't' in components:
+            self._set_vector(node, 'translate', translate)
+        if 'r' in components and not (node.is_a('joint') and joint_orient):
+            order = self.get(node, 'rotateOrder')
+            self._set_vector(node, 'rotate', [math.degrees(v)
+                                              for v in mmath.matrix_to_euler(rotation, order)])
+        if 's' in components:
+            self._set_vector(node, 'scale', scale)
+
+    def _set_vector(self, node, name, values):
+        spec = node.spec(name)
+        for child, value in zip(spec.children, values):
+            if child.name in node.locked or self.connection_source(node, child.name, child):
+                continue
+            node.values[child.name] = float(value)
+        self.changed(node)
+
+    def set_world_matrix(self, node, matrix, joint_orient=False, components='trs'):
+        local = mmath.mult(matrix, mmath.inverse(self.parent_space(node)))
+        self.set_local_matrix(node, local, joint_orient, components)
+
+
+# COMPUTE ==============================================================
+
+def _scene(node):
+    return node.scene
+
+
+def compute_local(node, path):
+    return node.scene.local_matrix(node)
+
+
+def compute_inverse_local(node, path):
+    return mmath.inverse(node.scene.local_matrix(node))
+
+
+def compute_parent_matrix(node, path):
+    scene = node.scene
+    if node.parent is None or not scene.get(node, 'inheritsTransform'):
+        return mmath.IDENTITY
+    return _world_matrix(node.parent)
+
+
+def compute_parent_inverse(node, path):
+    return mmath.inverse(node.scene.get(node, 'parentMatrix[0]'))
+
+
+def _world_matrix(node):
+    '''
+    World matrix without recursion, so very deep hierarchies evaluate.
+    '''
+    scene = node.scene
+    chain = list()
+    current = node
+    while current is not None and 'worldMatrix[0]' not in scene._cache.get(current, ()):
+        chain.append(current)
+        current = current.parent if scene.get(current, 'inheritsTransform') else None
+    for item in reversed(chain):
+        world = mmath.IDENTITY
+        if item.is_a('transform'):
+            world = scene.local_matrix(item)
+            offset = scene.get(item, 'offsetParentMatrix')
+            if offset != mmath.IDENTITY:
+                world = mmath.mult(world, offset)
+        if item.parent is not None and scene.get(item, 'inheritsTransform'):
+            world = mmath.mult(world, scene._cache[item.parent]['worldMatrix[0]'])
+        scene._cache.setdefault(item, {})['worldMatrix[0]'] = world
+    return scene._cache[node]['worldMatrix[0]']
+
+
+def compute_world_matrix(node, path):
+    return _world_matrix(node)
+
+
+def compute_world_inverse(node, path):
+    return mmath.inverse(_world_matrix(node))
+
+
+def _get(node, name):
+    return node.scene.value(node, name)
+
+
+def compute_mult_matrix(node, path):
+    scene = node.scene
+    return mmath.mult_all(scene.get(node, f'matrixIn[{index}]')
+                          for index in scene.multi_indices(node, 'matrixIn'))
+
+
+def compute_blend_matrix(node, path):
+    scene = node.scene
+    result = scene.get(node, 'inputMatrix')
+    envelope = scene.get(node, 'envelope')
+    for index in scene.multi_indices(node, 'target'):
+        target = scene.get(node, f'target[{index}].targetMatrix')
+        weight = scene.get(node, f'target[{index}].weight') * envelope
+        result = mmath.blend(result, target, weight)
+    return result
+
+
+def compute_decompose(node, path):
+    scene = node.scene
+    matrix = scene.get(node, 'inputMatrix')
+    translate, rotation, scale, shear = mmath.decompose(matrix)
+    leaf = path.split('[', 1)[0]
+    if leaf == 'outputTranslate':
+        return translate
+    if leaf == 'outputRotate':
+        order = scene.get(node, 'inputRotateOrder')
+        return tuple(math.degrees(v) for v in mmath.rotation_to_euler(rotation, order))
+    if leaf == 'outputScale':
+        return scale
+    if leaf == 'outputShear':
+        return shear
+    return mmath.rotation_to_quaternion(rotation)
+
+
+def compute_compose(node, path):
+    scene = node.scene
+    if scene.get(node, 'useEulerRotation'):
+        rotation = mmath.euler_matrix([math.radians(v) for v in scene.get(node, 'inputRotate')],
+                                      scene.get(node, 'inputRotateOrder'))
+    else:
+        rotation = mmath.rotation_matrix(mmath.quaternion_to_rotation(scene.get(node, 'inputQuat')))
+    matrix = mmath.mult(mmath.mult(mmath.scale_matrix(scene.get(node, 'inputScale')),
+                                   mmath.shear_matrix(scene.get(node, 'inputShear'))), rotation)
+    return matrix[:12] + tuple(scene.get(node, 'inputTranslate')) + (1.0,)
+
+
+def compute_inverse_matrix(node, path):
+    return mmath.inverse(node.scene.get(node, 'inputMatrix'))
+
+
+def compute_mult_double_linear(node, path):
+    return node.scene.get(node, 'input1') * node.scene.get(node, 'input2')
+
+
+def compute_reverse(node, path):
+    return tuple(1.0 - v for v in node.scene.get(node, 'input'))
+
+
+def compute_quat_normalize(node, path):
+    return mmath.normalize_quaternion(node.scene.get(node, 'inputQuat'))
+
+
+def compute_uv_pin(node, path):
+    # Surfaces are not evaluated, pins stay at the origin
+    return mmath.IDENTITY
+
+
+def compute_anim_curve(node, path):
+    import adv_scripting.fake_maya.animation as animation
+    return animation.evaluate(node, node.scene.time)
+
+
+def compute_constraint(node, path):
+    import adv_scripting.fake_maya.constraints as constraints
+    return constraints.evaluate(node, path)
+
+
+# NODE TYPES ===========================================================
+
+_depend = register(NodeType('dependNode', None, [
+    AttrSpec('message', 'msg', 'message', None),
+    AttrSpec('caching', 'cch', 'bool', False),
+    AttrSpec('frozen', 'fzn', 'bool', False),
+    AttrSpec('nodeState', 'nds', 'enum', 0),
+    ], abstract=True))
+
+_color = AttrSpec('overrideColorRGB', 'ovrgb', 'float3', None, [
+    AttrSpec('overrideColorR', 'ovcr', 'float', 0.0),
+    AttrSpec('overrideColorG', 'ovcg', 'float', 0.0),
+    AttrSpec('overrideColorB', 'ovcb', 'float', 0.0)])
+
+_dag = register(NodeType('dagNode', _depend, [
+    AttrSpec('visibility', 'v', 'bool', True, keyable=True),
+    AttrSpec('inheritsTransform', 'it', 'bool', True),
+    matrix('worldMatrix', 'wm', output=True, multi=True),
+    matrix('worldInverseMatrix', 'wim', output=True, multi=True),
+    matrix('parentMatrix', 'pm', output=True, multi=True),
+    matrix('parentInverseMatrix', 'pim', output=True, multi=True),
+    AttrSpec('overrideEnabled', 'ove', 'bool', False),
+    AttrSpec('overrideDisplayType', 'ovdt', 'enum', 0),
+    AttrSpec('overrideRGBColors', 'ovrgbf', 'bool', False),
+    AttrSpec('overrideColor', 'ovc', 'byte', 0),
+    _color,
+    AttrSpec('useOutlinerColor', 'uoc', 'bool', False),
+    AttrSpec('template', 'tmp', 'bool', False),
+    AttrSpec('lodVisibility', 'lodv', 'bool', True),
+    AttrSpec('instObjGroups', 'iog', 'compound', None, multi=True),
+    ], compute={'worldMatrix': compute_world_matrix,
+                'worldInverseMatrix': compute_world_inverse,
+                'parentMatrix': compute_parent_matrix,
+                'parentInverseMatrix': compute_parent_inverse},
+    dag=True, abstract=True))
+
+_transform = register(NodeType('transform', _dag, [
+    vector('translate', 't', 'doubleLinear', keyable=True),
+    vector('rotate', 'r', 'doubleAngle', keyable=True),
+    vector('scale', 's', 'double', 1.0, keyable=True),
+    vector('shear', 'sh', 'double', axes=('XY', 'XZ', 'YZ')),
+    AttrSpec('rotateOrder', 'ro', 'enum', 0),
+    vector('rotateAxis', 'ra', 'doubleAngle'),
+    vector('rotatePivot', 'rp', 'doubleLinear'),
+    vector('scalePivot', 'sp', 'doubleLinear'),
+    vector('rotatePivotTranslate', 'rpt', 'doubleLinear'),
+    vector('scalePivotTranslate', 'spt', 'doubleLinear'),
+    matrix('offsetParentMatrix', 'opm'),
+    matrix('matrix', 'm', output=True),
+    matrix('inverseMatrix', 'im', output=True),
+    matrix('xformMatrix', 'xm', output=True),
+    AttrSpec('displayHandle', 'dh', 'bool', False),
+    AttrSpec('displayLocalAxis', 'dla', 'bool', False),
+    AttrSpec('displayRotatePivot', 'drp', 'bool', False),
+    AttrSpec('displayScalePivot', 'dsp', 'bool', False),
+    vector('outlinerColor', 'oclr', 'float', compound_type='float3', axes='RGB'),
+    ], compute={'matrix': compute_local,
+                'xformMatrix': compute_local,
+                'inverseMatrix': compute_inverse_local}))
+
+register(NodeType('joint', _transform, [
+    vector('jointOrient', 'jo', 'doubleAngle'),
+    vector('preferredAngle', 'pa', 'doubleAngle'),
+    vector('stiffness', 'st', 'double'),
+    AttrSpec('segmentScaleCompensate', 'ssc', 'bool', True),
+    vector('inverseScale', 'is', 'double', 1.0),
+    AttrSpec('radius', 'radi', 'double', 1.0),
+    AttrSpec('drawStyle', 'ds', 'enum', 0),
+    AttrSpec('side', 'sd', 'enum', 0),
+    AttrSpec('type', 'typ', 'enum', 0),
+    AttrSpec('otherType', 'otp', 'string', 'jaw'),
+    AttrSpec('drawLabel', 'dl', 'bool', False),
+    ]))
+
+register(NodeType('ikHandle', _transform, [
+    AttrSpec('startJoint', 'hsj', 'message', None),
+    AttrSpec('endEffector', 'hee', 'message', None),
+    AttrSpec('ikSolver', 'hsv', 'message', None),
+    vector('poleVector', 'pv', 'double', keyable=True),
+    AttrSpec('twist', 'twi', 'doubleAngle', 0.0, keyable=True),
+    AttrSpec('ikBlend', 'ikb', 'double', 1.0, keyable=True),
+    AttrSpec('stickiness', 'sti', 'enum', 0),
+    AttrSpec('snapEnable', 'snen', 'bool', True),
+    AttrSpec('dTwistControlEnable', 'dtce', 'bool', False),
+    AttrSpec('dWorldUpType', 'dwut', 'enum', 0),
+    ]))
+register(NodeType('ikEffector', _transform, [vector('handlePath', 'hp', 'double')]))
+for _solver in ('ikRPsolver', 'ikSCsolver', 'ikSplineSolver'):
+    register(NodeType(_solver, _depend))
+
+_shape = register(NodeType('shape', _dag, [AttrSpec('intermediateObject', 'io', 'bool', False)],
+                           shape=True, abstract=True))
+register(NodeType('nurbsCurve', _shape, [
+    AttrSpec('degree', 'd', 'long', 3, output=True),
+    AttrSpec('spans', 'sps', 'long', 1, output=True),
+    AttrSpec('form', 'f', 'enum', 0, output=True),
+    AttrSpec('create', 'cr', 'nurbsCurve', None),
+    AttrSpec('local', 'l', 'nurbsCurve', None, output=True),
+    AttrSpec('worldSpace', 'ws', 'nurbsCurve', None, multi=True, output=True),
+    vector('controlPoints', 'cp', 'double', multi=True),
+    AttrSpec('lineWidth', 'lw', 'float', -1.0),
+    ], compute={'degree': lambda node, path: node.data.get('degree', 3),
+                'spans': lambda node, path: max(1, len(node.data.get('cvs', ())) -
+                                                (0 if node.data.get('form') == 'periodic'
+                                                 else node.data.get('degree', 3))),
+                'form': lambda node, path: 2 if node.data.get('form') == 'periodic' else 0,
+                'controlPoints': lambda node, path: tuple(
+                    node.data.get('cvs', ())[int(path.split('[')[1].split(']')[0])])}))
+for _name, _attrs in (('nurbsSurface', [
+                          AttrSpec('create', 'cr', 'nurbsSurface', None),
+                          AttrSpec('local', 'l', 'nurbsSurface', None, output=True),
+                          AttrSpec('worldSpace', 'ws', 'nurbsSurface', None, multi=True,
+                                   output=True)]),
+                      ('mesh', [AttrSpec('outMesh', 'o', 'mesh', None, output=True),
+                                AttrSpec('inMesh', 'i', 'mesh', None)]),
+                      ('locator', [vector('localPosition', 'lp', 'double'),
+                                   vector('localScale', 'los', 'double', 1.0)]),
+                      ('camera', [AttrSpec('focalLength', 'fl', 'double', 35.0, keyable=True),
+                                  AttrSpec('orthographic', 'o', 'bool', False)])):
+    register(NodeType(_name, _shape, _attrs))
+
+register(NodeType('multMatrix', _depend, [
+    matrix('matrixIn', 'i', multi=True),
+    matrix('matrixSum', 'o', output=True),
+    ], compute={'matrixSum': compute_mult_matrix}))
+
+register(NodeType('blendMatrix', _depend, [
+    matrix('inputMatrix', 'imat'),
+    AttrSpec('envelope', 'env', 'double', 1.0, keyable=True),
+    AttrSpec('target', 'tgt', 'compound', None, [
+        matrix('targetMatrix', 'tmat'),
+        AttrSpec('weight', 'wgt', 'double', 1.0),
+        AttrSpec('useMatrix', 'umt', 'bool', False),
+        AttrSpec('translateWeight', 'tw', 'double', 1.0),
+        AttrSpec('rotateWeight', 'rw', 'double', 1.0),
+        AttrSpec('scaleWeight', 'sw', 'double', 1.0),
+        AttrSpec('shearWeight', 'shw', 'double', 1.0)], multi=True),
+    matrix('outputMatrix', 'omat', output=True),
+    ], compute={'outputMatrix': compute_blend_matrix}))
+
+register(NodeType('decomposeMatrix', _depend, [
+    matrix('inputMatrix', 'imat'),
+    AttrSpec('inputRotateOrder', 'ro', 'enum', 0),
+    vector('outputTranslate', 'ot', 'doubleLinear', output=True),
+    vector('outputRotate', 'or', 'doubleAngle', output=True),
+    vector('outputScale', 'os', 'double', 1.0, output=True),
+    vector('outputShear', 'osh', 'double', output=True),
+    vector('outputQuat', 'oq', 'double', output=True, axes='XYZW', compound_type='double4'),
+    ], compute={'outputTranslate': compute_decompose,
+                'outputRotate': compute_decompose,
+                'outputScale': compute_decompose,
+                'outputShear': compute_decompose,
+                'outputQuat': compute_decompose}))
+
+register(NodeType('composeMatrix', _depend, [
+    vector('inputTranslate', 'it', 'doubleLinear'),
+    vector('inputRotate', 'ir', 'doubleAngle'),
+    vector('inputScale', 'is', 'double', 1.0),
+    vector('inputShear', 'ish', 'double'),
+    vector('inputQuat', 'iq', 'double', axes='XYZW', compound_type='double4'),
+    AttrSpec('inputRotateOrder', 'ro', 'enum', 0),
+    AttrSpec('useEulerRotation', 'uer', 'bool', True),
+    matrix('outputMatrix', 'omat', output=True),
+    ], compute={'outputMatrix': compute_compose}))
+NODE_TYPES['composeMatrix'].attrs['inputQuat'].children[3].default = 1.0
+
+register(NodeType('inverseMatrix', _depend, [
+    matrix('inputMatrix', 'imat'),
+    matrix('outputMatrix', 'omat', output=True),
+    ], compute={'outputMatrix': compute_inverse_matrix}))
+
+register(NodeType('multDoubleLinear', _depend, [
+    AttrSpec('input1', 'i1', 'double', 0.0, keyable=True),
+    AttrSpec('input2', 'i2', 'double', 0.0, keyable=True),
+    AttrSpec('output', 'o', 'double', 0.0, output=True),
+    ], compute={'output': compute_mult_double_linear}))
+
+register(NodeType('reverse', _depend, [
+    vector('input', 'i', 'double', keyable=True),
+    vector('output', 'o', 'double', output=True),
+    ], compute={'output': compute_reverse}))
+
+register(NodeType('quatNormalize', _depend, [
+    vector('inputQuat', 'iq', 'double', axes='XYZW', compound_type='double4'),
+    vector('outputQuat', 'oq', 'double', output=True, axes='XYZW', compound_type='double4'),
+    ], compute={'outputQuat': compute_quat_normalize}))
+NODE_TYPES['quatNormalize'].attrs['inputQuat'].children[3].default = 1.0
+
+register(NodeType('uvPin', _depend, [
+    AttrSpec('deformedGeometry', 'dg', 'geometry', None),
+    AttrSpec('originalGeometry', 'og', 'geometry', None),
+    AttrSpec('coordinate', 'c', 'compound', None, [
+        AttrSpec('coordinateU', 'cu', 'double', 0.0),
+        AttrSpec('coordinateV', 'cv', 'double', 0.0)], multi=True),
+    AttrSpec('tangentAxis', 'tan', 'enum', 0),
+    AttrSpec('normalAxis', 'nrm', 'enum', 0),
+    matrix('outputMatrix', 'om', output=True, multi=True),
+    ], compute={'outputMatrix': compute_uv_pin}))
+
+_anim_curve = register(NodeType('animCurve', _depend, [
+    AttrSpec('input', 'i', 'time', 0.0),
+    AttrSpec('output', 'o', 'double', 0.0, output=True),
+    AttrSpec('preInfinity', 'pre', 'enum', 0),
+    AttrSpec('postInfinity', 'pst', 'enum', 0),
+    AttrSpec('weightedTangents', 'wgt', 'bool', False),
+    ], compute={'output': compute_anim_curve}, abstract=True))
+for _name in ('animCurveTL', 'animCurveTA', 'animCurveTU', 'animCurveTT'):
+    register(NodeType(_name, _anim_curve))
+
+_constraint_target = AttrSpec('target', 'tg', 'compound', None, [
+    vector('targetTranslate', 'tt', 'doubleLinear'),
+    vector('targetRotate', 'tr', 'doubleAngle'),
+    matrix('targetParentMatrix', 'tpm'),
+    AttrSpec('targetWeight', 'tw', 'double', 1.0),
+    vector('targetOffsetTranslate', 'tot', 'doubleLinear'),
+    vector('targetOffsetRotate', 'tor', 'doubleAngle')], multi=True)
+_constraint = register(NodeType('constraint', _transform, [
+    _constraint_target,
+    matrix('constraintParentInverseMatrix', 'cpim'),
+    AttrSpec('constraintRotateOrder', 'cro', 'enum', 0),
+    vector('constraintJointOrient', 'cjo', 'doubleAngle'),
+    vector('constraintTranslate', 'ct', 'doubleLinear', output=True),
+    vector('constraintRotate', 'cr', 'doubleAngle', output=True),
+    vector('constraintScale', 'cs', 'double', 1.0, output=True),
+    AttrSpec('interpType', 'int', 'enum', 1),
+    AttrSpec('enableRestPosition', 'erp', 'bool', True),
+    ], compute={'constraintTranslate': compute_constraint,
+                'constraintRotate': compute_constraint,
+                'constraintScale': compute_constraint}, abstract=True))
+for _name in ('parentConstraint', 'pointConstraint', 'orientConstraint', 'scaleConstraint',
+              'aimConstraint', 'poleVectorConstraint'):
+    register(NodeType(_name, _constraint))
+
+# Nodes created by commands that are not evaluated by the engine
+for _name, _attrs in (('makeNurbCircle', [AttrSpec('radius', 'r', 'double', 1.0),
+                                         AttrSpec('outputCurve', 'oc', 'nurbsCurve', None,
+                                                  output=True)]),
+                      ('loft', [AttrSpec('inputCurve', 'ic', 'nurbsCurve', None, multi=True),
+                                AttrSpec('outputSurface', 'os', 'nurbsSurface', None,
+                                         output=True)]),
+                      ('skinCluster', [matrix('matrix', 'ma', multi=True),
+                                       AttrSpec('maxInfluences', 'mi', 'long', 5),
+                                       AttrSpec('envelope', 'en', 'double', 1.0)]),
+                      ('blendShape', [AttrSpec('envelope', 'en', 'double', 1.0),
+                                      AttrSpec('weight', 'w', 'double', 0.0, multi=True)]),
+                      ('network', []),
+                      ('controller', [AttrSpec('controllerObject', 'ctrl', 'message', None)]),
+                      ('time', [AttrSpec('outTime', 'o', 'time', 1.0)]),
+                      ('plusMinusAverage', [AttrSpec('operation', 'op', 'enum', 1)]),
+                      ('multiplyDivide', [AttrSpec('operation', 'op', 'enum', 1)]),
+                      ('condition', [AttrSpec('operation', 'op', 'enum', 0)]),
+                      ('pairBlend', [AttrSpec('weight', 'w', 'double', 1.0)]),
+                      ('shadingEngine', []),
+                      ('aiStandardSurface', []),
+                      ('particleSamplerInfo', [])):
+    register(NodeType(_name, _depend, _attrs))
+
+
+def node_type_names():
+    return [name for name, node_type in NODE_TYPES.items() if not node_type.abstract]
+
+
+# CURRENT SCENE ========================================================
+
+_current = None
+
+
+def current():
+    global _current
+    if _current is None:
+        _current = Scene()
+    return _current
+
+
+def new_scene():
+    global _current
+    _current = Scene()
+    return _current
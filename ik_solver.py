@@ -0,0 +1,250 @@
+'''
+ik_solver.py
+
+Analytic two-bone IK solver used to validate and preview limbs before the rig is built.
+Works on plain positions (no maya nodes), so bad skeletons can be caught before
+TwoBoneFKIK creates any ikHandles.
+
+e.g.
+import adv_scripting.ik_solver as ik_solver
+report = ik_solver.validate_chain([(0,10,0), (5,10,-1), (10,10,0)])
+solve = ik_solver.solve_two_bone((0,10,0), (5,10,-1), (10,10,0), (5,10,-10), targets)
+'''
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Positions closer than EPSILON are treated as coincident.
+EPSILON = 1e-6
+# Default tolerances are relative to the total length of the chain.
+PLANAR_TOLERANCE = 1e-3
+STRAIGHT_TOLERANCE = 1e-3
+FLIP_TOLERANCE = 0.05
+# Knee direction change (degrees) between two consecutive targets that counts as a flip.
+FLIP_ANGLE = 90.0
+
+
+def _normalize(vectors):
+    '''
+    Normalize an array of vectors along the last axis.
+    Returns (unit vectors, lengths). Zero length vectors are returned unchanged.
+    '''
+    lengths = np.linalg.norm(vectors, axis=-1)
+    safe = np.where(lengths > EPSILON, lengths, 1.0)
+    return vectors / safe[..., None], lengths
+
+
+def pole_position(root, mid, end):
+    '''
+    Pole vector position for a chain. Matches pole_vector.calculate_pole_vector_position,
+    the mid joint pushed away from the root->end line.
+
+    Arguments:
+    root, mid, end (float tuple): world space positions
+
+    Returns numpy array (3,)
+    '''
+    root, mid, end = (np.asarray(p, dtype=float) for p in (root, mid, end))
+    start_end = end - root
+    start_mid = mid - root
+    length = np.linalg.norm(start_end)
+    if length < EPSILON:
+        return mid.copy()
+    proj_vector = start_end / length * (np.dot(start_mid, start_end) / length)
+    return (start_mid - proj_vector) + mid
+
+
+def chain_planarity(positions, mid_index=None):
+    '''
+    Measure how far a joint chain is from the plane through its root, mid and end joints.
+
+    Arguments:
+    positions (float list): (M,3) world positions of every joint in the chain, twist joints included
+    mid_index (int/None): index of the middle joint. Defaults to the halfway joint.
+
+    Returns dict
+        'normal': unit plane normal, or None for a straight chain
+        'error': largest distance of any joint from the plane
+        'straight': True if root, mid and end are collinear (plane is undefined)
+    '''
+    positions = np.asarray(positions, dtype=float)
+    if mid_index is None:
+        mid_index = (len(positions) - 1) // 2
+    root, mid, end = positions[0], positions[mid_index], positions[-1]
+    chain_length = _chain_length(positions)
+
+    normal = np.cross(mid - root, end - root)
+    area = np.linalg.norm(normal)
+    # |cross| is twice the triangle area, compare its height against the chain length
+    straight = area / max(np.linalg.norm(end - root), EPSILON) < STRAIGHT_TOLERANCE * chain_length
+    if straight:
+        # Distance from the root->end line instead of a plane
+        axis, _ = _normalize(end - root)
+        offsets = positions - root
+        error = np.linalg.norm(offsets - np.outer(offsets @ axis, axis), axis=-1).max()
+        return {'normal': None, 'error': float(error), 'straight': True}
+
+    normal = normal / area
+    error = np.abs((positions - root) @ normal).max()
+    return {'normal': normal, 'error': float(error), 'straight': False}
+
+
+def _chain_length(positions):
+    return float(np.linalg.norm(np.diff(positions, axis=0), axis=-1).sum())
+
+
+def solve_two_bone(root, mid, end, pole, targets, clamp=True):
+    '''
+    Solve a two-bone chain for a batch of targets, the same setup as an ikRPsolver with a
+    pole vector constraint.
+
+    Arguments:
+    root, mid, end (float tuple): rest positions of the start, middle and end joints
+    pole (float tuple): world position of the pole vector
+    targets (float list): (N,3) world positions for the end joint
+    clamp (bool): clamp targets to the reachable range of the chain
+
+    Returns dict of numpy arrays
+        'mid': (N,3) solved middle joint positions
+        'end': (N,3) solved end joint positions
+        'upper_rotation': (N,3,3) world orientation of the upper bone, rows are x/y/z axes
+        'lower_rotation': (N,3,3) world orientation of the lower bone
+        'root_angle': (N,) angle (degrees) between the bone and root->target at the root
+        'mid_angle': (N,) interior angle (degrees) at the middle joint
+        'unreachable': (N,) bool, target further than the chain can stretch
+        'too_close': (N,) bool, target closer than the chain can fold
+        'flip': (N,) bool, pole is (almost) on the root->target line or the knee flipped
+                from the previous target
+    '''
+    root, mid, end, pole = (np.asarray(p, dtype=float) for p in (root, mid, end, pole))
+    targets = np.atleast_2d(np.asarray(targets, dtype=float))
+    upper = np.linalg.norm(mid - root)
+    lower = np.linalg.norm(end - mid)
+    if upper < EPSILON or lower < EPSILON:
+        raise ValueError('Two-bone chain has a zero length bone.')
+
+    # Direction and distance to each target
+    direction, distance = _normalize(targets - root)
+    max_reach = upper + lower
+    min_reach = abs(upper - lower)
+    unreachable = distance > max_reach
+    too_close = distance < min_reach
+    if clamp:
+        distance = np.clip(distance, min_reach + EPSILON, max_reach - EPSILON)
+
+    # Knee direction is the pole projected onto the plane perpendicular to root->target
+    pole_vector = pole - root
+    pole_length = max(np.linalg.norm(pole_vector), EPSILON)
+    knee = pole_vector - (direction @ pole_vector)[:, None] * direction
+    knee, knee_length = _normalize(knee)
+    flip = knee_length / pole_length < FLIP_TOLERANCE
+
+    # Fall back to the rest pose bend where the pole gives no direction
+    if flip.any():
+        rest = np.cross(np.cross(direction[flip], mid - root), direction[flip])
+        rest, _ = _normalize(rest)
+        knee[flip] = rest
+    # Consecutive targets whose knee swings past FLIP_ANGLE flip the chain visually
+    if len(knee) > 1:
+        swing = np.einsum('ij,ij->i', knee[1:], knee[:-1])
+        flip[1:] |= swing < np.cos(np.radians(FLIP_ANGLE))
+
+    # Law of cosines
+    cos_root = (upper**2 + distance**2 - lower**2) / (2.0 * upper * distance)
+    cos_mid = (upper**2 + lower**2 - distance**2) / (2.0 * upper * lower)
+    cos_root = np.clip(cos_root, -1.0, 1.0)
+    cos_mid = np.clip(cos_mid, -1.0, 1.0)
+    sin_root = np.sqrt(1.0 - cos_root**2)
+
+    mid_solved = root + upper * (cos_root[:, None] * direction + sin_root[:, None] * knee)
+    end_solved = root + distance[:, None] * direction
+
+    normal, _ = _normalize(np.cross(direction, knee))
+    upper_rotation = _aim_rotation(mid_solved - root, normal)
+    lower_rotation = _aim_rotation(end_solved - mid_solved, normal)
+
+    return {'mid': mid_solved,
+            'end': end_solved,
+            'upper_rotation': upper_rotation,
+            'lower_rotation': lower_rotation,
+            'root_angle': np.degrees(np.arccos(cos_root)),
+            'mid_angle': np.degrees(np.arccos(cos_mid)),
+            'unreachable': unreachable,
+            'too_close': too_close,
+            'flip': flip}
+
+
+def _aim_rotation(aim, normal):
+    '''
+    Build (N,3,3) rotation matrices with x down the bone and z along the bend plane normal,
+    the same layout as joints oriented 'xyz' that bend around rz.
+    '''
+    x_axis, _ = _normalize(aim)
+    y_axis, _ = _normalize(np.cross(normal, x_axis))
+    z_axis = np.cross(x_axis, y_axis)
+    return np.stack([x_axis, y_axis, z_axis], axis=1)
+
+
+def validate_chain(positions,
+                   mid_index=None,
+                   pole=None,
+                   targets=None,
+                   planar_tolerance=PLANAR_TOLERANCE):
+    '''
+    Check a two-bone chain before rigging it.
+
+    Arguments:
+    positions (float list): (M,3) world positions of the chain, start to end, twist joints included
+    mid_index (int/None): index of the middle joint. Defaults to the halfway joint.
+    pole (float tuple/None): pole vector position. Defaults to pole_position() of the chain.
+    targets (float list/None): (N,3) end positions to preview, e.g. an animation path
+    planar_tolerance (float): allowed distance off the plane, relative to the chain length
+
+    Returns dict
+        'errors' (str list): problems that will break the rig
+        'warnings' (str list): problems that may pop or flip the rig
+        'planarity': result of chain_planarity()
+        'solve': result of solve_two_bone() for the targets, or None
+    '''
+    positions = np.asarray(positions, dtype=float)
+    errors = list()
+    warnings = list()
+    if len(positions) < 3:
+        errors.append(f'Need at least 3 joints. start, middle, end. Currently only {len(positions)} joints.')
+        return {'errors': errors, 'warnings': warnings, 'planarity': None, 'solve': None}
+    if mid_index is None:
+        mid_index = (len(positions) - 1) // 2
+    root, mid, end = positions[0], positions[mid_index], positions[-1]
+    chain_length = _chain_length(positions)
+
+    bone_lengths = np.linalg.norm(np.diff(positions, axis=0), axis=-1)
+    if (bone_lengths < EPSILON).any():
+        errors.append(f'Zero length bone at joint index {int(np.argmax(bone_lengths < EPSILON)) + 1}.')
+        return {'errors': errors, 'warnings': warnings, 'planarity': None, 'solve': None}
+
+    planarity = chain_planarity(positions, mid_index)
+    if planarity['straight']:
+        warnings.append('Chain is straight. The bend direction depends on the preferred angle.')
+    if planarity['error'] > planar_tolerance * chain_length:
+        errors.append(f"Chain is not planar. Joint off the root/mid/end plane by {planarity['error']:.4f}.")
+
+    solve = None
+    if not planarity['straight']:
+        if pole is None:
+            pole = pole_position(root, mid, end)
+        # Solving the rest pose must give back the rest pose, otherwise the chain pops on build
+        rest = solve_two_bone(root, mid, end, pole, [end], clamp=False)
+        if rest['flip'][0]:
+            warnings.append('Pole vector is on the root/end line. The chain may flip.')
+        elif np.linalg.norm(rest['mid'][0] - mid) > planar_tolerance * chain_length:
+            warnings.append('Pole vector is off the chain plane. The middle joint will pop on build.')
+        if targets is not None:
+            solve = solve_two_bone(root, mid, end, pole, targets)
+            if solve['unreachable'].any():
+                warnings.append(f"{int(solve['unreachable'].sum())} target(s) out of reach.")
+            if solve['flip'].any():
+                flips = np.flatnonzero(solve['flip']).tolist()
+                warnings.append(f'Pole flip at target index {flips}.')
+
+    return {'errors': errors, 'warnings': warnings, 'planarity': planarity, 'solve': solve}
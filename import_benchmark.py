@@ -0,0 +1,105 @@
+'''
+import_benchmark.py
+
+Animation import speed on a full Biped rig plus cameras: the bulk curve writer the importer uses
+(anim_curves.write_curves, one addKeys call per curve) against the command importer it replaced
+(anim_curves.write_curves_commands, setKeyframe and keyTangent per key). The keyed scene of
+anim_curve_benchmark is read into curve dicts, then for each writer the keys are cut and written
+back. Both must leave the same curves.
+
+Run:
+mayapy -m adv_scripting.import_benchmark --frames 200 --cameras 4
+python -m adv_scripting.import_benchmark --fake-maya
+'''
+import argparse
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+WRITERS = ('bulk', 'commands')
+
+
+# RUN ==================================================================
+
+def time_writer(writer, nodes, curves, repeat=3):
+    '''
+    Returns (fastest seconds, keys written, curves read back)
+    '''
+    import maya.cmds as cmds
+    import adv_scripting.anim_curves as anim_curves
+    best = None
+    keys = 0
+    for _ in range(repeat):
+        cmds.cutKey(nodes, clear=True)
+        start = time.perf_counter()
+        keys = writer(curves)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, keys, anim_curves.read_curves(nodes)
+
+
+def run(frames=100, key_step=4, cameras=2, repeat=3):
+    '''
+    Returns dict of writer -> dict with curves, keys, seconds and keys_per_second
+    '''
+    import adv_scripting.anim_curves as anim_curves
+    import adv_scripting.anim_curve_benchmark as anim_curve_benchmark
+    nodes = anim_curve_benchmark.build_scene(frames, key_step, cameras)
+    curves = anim_curves.read_curves(nodes)
+    writers = {'bulk': anim_curves.write_curves, 'commands': anim_curves.write_curves_commands}
+    results = dict()
+    written = dict()
+    for name in WRITERS:
+        seconds, keys, read = time_writer(writers[name], nodes, curves, repeat)
+        written[name] = {anim_curve_benchmark.curve_key(curve): curve for curve in read}
+        results[name] = {'curves': len(read), 'keys': keys, 'seconds': seconds,
+                         'keys_per_second': keys / seconds if seconds else 0.0}
+    for key, curve in written['commands'].items():
+        other = written['bulk'].get(key)
+        if other is None or any(other[field] != curve[field] for field in
+                                ('times', 'values', 'itt', 'ott')):
+            raise RuntimeError(f'Curve writers differ on {key[0]}.{key[1]}')
+    return results
+
+
+def format_results(results):
+    lines = [f"{'writer':<10}{'curves':>10}{'keys':>10}{'seconds':>10}{'keys/s':>14}"]
+    for name, result in results.items():
+        lines.append(f"{name:<10}{result['curves']:>10}{result['keys']:>10}"
+                     f"{result['seconds']:>10.3f}{result['keys_per_second']:>14.0f}")
+    if results['bulk']['seconds']:
+        lines.append(f"speedup: {results['commands']['seconds'] / results['bulk']['seconds']:.1f}x")
+    return '\n'.join(lines)
+
+
+# MAIN =================================================================
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmark animation curve import.')
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--key-step', type=int, default=4, help='Frames between keys')
+    parser.add_argument('--cameras', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fake-maya', action='store_true',
+                        help='Run on the in-memory fake Maya engine instead of mayapy')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if args.fake_maya:
+        import adv_scripting.fake_maya as fake_maya
+        fake_maya.install()
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+
+    results = run(args.frames, args.key_step, args.cameras, args.repeat)
+    print(format_results(results))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
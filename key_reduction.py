@@ -0,0 +1,318 @@
+'''
+key_reduction.py
+
+Keyframe reduction of baked animation. A bake holds a value on every frame for every channel;
+most channels are static or move in long smooth runs, so most of those keys can be rebuilt
+from their neighbours. For a frames x channels array of samples:
+    constant channels (range within the tolerance) keep a single key
+    'linear': keys are dropped while linear interpolation between the kept keys stays within
+        the channel tolerance of every sample (swing door: the slopes from the last key that
+        pass all samples since are narrowed frame by frame)
+    'bezier': keys are dropped while a Hermite segment between the kept keys, with tangents
+        from the sampled slopes, stays within the tolerance of every sample
+
+Both run one frame at a time over all channels at once with NumPy. The maximum error of every
+reduced channel against the samples is measured and returned, never above its tolerance.
+
+Bakes are reduced in frame chunks with KeyReducer, so a streamed export stays streamed; every
+chunk keeps its first and last frame.
+
+e.g.
+import adv_scripting.key_reduction as key_reduction
+reducer = key_reduction.KeyReducer(channels, method='linear')
+reducer.add(frames, values) # frames x len(channels), repeat for following chunks
+curves = reducer.curves(nodes, fps=24.0) # curve dicts, see curve_format.py
+'''
+import logging
+import math
+import numpy as np
+import adv_scripting.curve_format as curve_format
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('linear', 'bezier')
+# Tolerance per channel, by attribute name prefix, in UI units (cm, degrees)
+TOLERANCES = {'translate': 1e-3, 'rotate': 1e-2, 'scale': 1e-4}
+DEFAULT_TOLERANCE = 1e-4
+# Longest bezier segment in frames, bounds the samples checked per frame
+MAX_SPAN = 64
+
+
+def channel_tolerances(channels, tolerances=None):
+    '''
+    Arguments
+    channels (str list): attribute name per channel
+    tolerances (dict/float/None): attribute name prefix -> tolerance, or one tolerance for all.
+        TOLERANCES if None.
+
+    Returns array of tolerance per channel
+    '''
+    if isinstance(tolerances, (int, float)):
+        return np.full(len(channels), float(tolerances))
+    tolerances = TOLERANCES if tolerances is None else tolerances
+    return np.array([next((tolerance for prefix, tolerance in tolerances.items()
+                           if channel.startswith(prefix)), DEFAULT_TOLERANCE)
+                     for channel in channels])
+
+
+# REDUCTION ============================================================
+
+def sample_slopes(frames, values):
+    '''
+    Returns array of frames x channels slopes in value per frame
+    '''
+    if len(frames) < 2:
+        return np.zeros_like(values)
+    return np.gradient(values, frames, axis=0)
+
+
+def reduce_linear(frames, values, tolerances):
+    '''
+    Arguments
+    frames (array): n frame numbers, increasing
+    values (array): n x channels
+    tolerances (array): per channel
+
+    Returns n x channels bool array of the kept keys
+    '''
+    count, channel_count = values.shape
+    keep = np.zeros(values.shape, dtype=bool)
+    if not count:
+        return keep
+    keep[0] = keep[-1] = True
+    columns = np.arange(channel_count)
+    anchor = np.zeros(channel_count, dtype=int)
+    low = np.full(channel_count, -np.inf)
+    high = np.full(channel_count, np.inf)
+    for index in range(1, count):
+        span = frames[index] - frames[anchor]
+        slope = (values[index] - values[anchor, columns]) / span
+        # Channels whose segment from the anchor misses a sample key the previous frame
+        restart = (slope < low) | (slope > high)
+        keep[index - 1, restart] = True
+        anchor[restart] = index - 1
+        low[restart] = -np.inf
+        high[restart] = np.inf
+        # Slopes from the anchor that pass this sample
+        span = frames[index] - frames[anchor]
+        base = values[anchor, columns]
+        low = np.maximum(low, (values[index] - tolerances - base) / span)
+        high = np.minimum(high, (values[index] + tolerances - base) / span)
+    return keep
+
+
+def hermite(start, end, start_value, end_value, start_slope, end_slope, frames):
+    '''
+    Hermite segments evaluated at frames, all arguments broadcast.
+    '''
+    span = end - start
+    s = (frames - start) / span
+    s2 = s * s
+    s3 = s2 * s
+    return ((2 * s3 - 3 * s2 + 1) * start_value + (s3 - 2 * s2 + s) * start_slope * span +
+            (-2 * s3 + 3 * s2) * end_value + (s3 - s2) * end_slope * span)
+
+
+def reduce_bezier(frames, values, tolerances, slopes, max_span=MAX_SPAN):
+    '''
+    Arguments
+    frames (array): n frame numbers, increasing
+    values (array): n x channels
+    tolerances (array): per channel
+    slopes (array): n x channels tangent slopes, see sample_slopes
+    max_span (int): longest segment in frames
+
+    Returns n x channels bool array of the kept keys
+    '''
+    count, channel_count = values.shape
+    keep = np.zeros(values.shape, dtype=bool)
+    if not count:
+        return keep
+    keep[0] = keep[-1] = True
+    columns = np.arange(channel_count)
+    anchor = np.zeros(channel_count, dtype=int)
+    offsets = np.arange(1, max_span)[:, None]
+    for index in range(2, count):
+        # Samples between the anchor and this frame, padded to max_span
+        between = anchor + offsets
+        inside = between < index
+        between = np.minimum(between, index)
+        curve = hermite(frames[anchor], frames[index], values[anchor, columns],
+                        values[index], slopes[anchor, columns], slopes[index],
+                        frames[between])
+        error = np.where(inside, np.abs(curve - values[between, columns]), 0.0).max(axis=0)
+        restart = (error > tolerances) | (index - anchor >= max_span)
+        keep[index - 1, restart] = True
+        anchor[restart] = index - 1
+    return keep
+
+
+def rebuild(frames, values, keep, slopes=None):
+    '''
+    Values at every frame from the kept keys, linear if slopes is None, else Hermite.
+    Frames after the last key of a channel hold its value.
+
+    Returns n x channels array
+    '''
+    count = len(frames)
+    rows = np.arange(count)[:, None]
+    columns = np.arange(values.shape[1])
+    previous = np.maximum.accumulate(np.where(keep, rows, 0), axis=0)
+    following = np.minimum.accumulate(np.where(keep, rows, count - 1)[::-1], axis=0)[::-1]
+    following = np.where(keep.any(axis=0) & (following > previous), following, previous)
+    start = frames[previous]
+    span = frames[following] - start
+    flat = span == 0
+    span = np.where(flat, 1.0, span)
+    start_value = values[previous, columns]
+    end_value = values[following, columns]
+    if slopes is None:
+        rebuilt = start_value + (end_value - start_value) * (frames[:, None] - start) / span
+    else:
+        rebuilt = hermite(start, start + span, start_value, end_value,
+                          slopes[previous, columns], slopes[following, columns],
+                          frames[:, None] + np.zeros_like(start))
+    return np.where(flat, start_value, rebuilt)
+
+
+def reduce(frames, values, tolerances, method='linear', max_span=MAX_SPAN):
+    '''
+    Arguments
+    frames (array like): n frame numbers, increasing
+    values (array like): n x channels
+    tolerances (array like): per channel
+    method (str): 'linear' or 'bezier'
+
+    Returns dict with 'keep' (n x channels bool), 'slopes' (n x channels for bezier, else None)
+    and 'error' (max error per channel)
+    '''
+    if method not in METHODS:
+        raise ValueError(f"Unknown key reduction method '{method}', use one of {METHODS}.")
+    frames = np.asarray(frames, dtype=float)
+    values = np.asarray(values, dtype=float)
+    tolerances = np.broadcast_to(np.asarray(tolerances, dtype=float), values.shape[1:])
+    if method == 'linear':
+        slopes = None
+        keep = reduce_linear(frames, values, tolerances)
+    else:
+        slopes = sample_slopes(frames, values)
+        keep = reduce_bezier(frames, values, tolerances, slopes, max_span)
+    error = np.abs(rebuild(frames, values, keep, slopes) - values).max(axis=0) \
+        if len(frames) else np.zeros(values.shape[1:])
+    return {'keep': keep, 'slopes': slopes, 'error': error}
+
+
+# CHUNKED REDUCTION ====================================================
+
+class KeyReducer():
+    '''
+    Reduce a bake added in frame chunks and collect the kept keys per channel.
+
+    Arguments
+    channels (str list): attribute name per column, e.g. every bake channel of every node
+    tolerances (dict/float/None): see channel_tolerances
+    method (str): 'linear' or 'bezier'
+    '''
+    def __init__(self, channels, tolerances=None, method='linear'):
+        if method not in METHODS:
+            raise ValueError(f"Unknown key reduction method '{method}', use one of {METHODS}.")
+        self.channels = list(channels)
+        self.tolerances = channel_tolerances(self.channels, tolerances)
+        self.method = method
+        self.frame_count = 0
+        self.first = None
+        self.minimum = None
+        self.maximum = None
+        self.error = np.zeros(len(self.channels))
+        # Per channel lists of kept key arrays, one per chunk
+        self.times = [list() for _ in self.channels]
+        self.values = [list() for _ in self.channels]
+        self.slopes = [list() for _ in self.channels]
+
+    def add(self, frames, values):
+        '''
+        Arguments
+        frames (list): frame numbers following the frames of the previous chunk
+        values (array like): frames x channels, NaN for missing channels
+        '''
+        frames = np.asarray(frames, dtype=float)
+        values = np.asarray(values, dtype=float).reshape(len(frames), len(self.channels))
+        if not len(frames):
+            return
+        if self.first is None:
+            self.first = values[0].copy()
+            self.minimum = np.nanmin(values, axis=0)
+            self.maximum = np.nanmax(values, axis=0)
+        else:
+            self.minimum = np.fmin(self.minimum, np.nanmin(values, axis=0))
+            self.maximum = np.fmax(self.maximum, np.nanmax(values, axis=0))
+        result = reduce(frames, values, self.tolerances, self.method)
+        self.error = np.fmax(self.error, result['error'])
+        slopes = result['slopes'] if result['slopes'] is not None else np.zeros_like(values)
+        for column in range(len(self.channels)):
+            kept = result['keep'][:, column]
+            self.times[column].append(frames[kept])
+            self.values[column].append(values[kept, column])
+            self.slopes[column].append(slopes[kept, column])
+        self.frame_count += len(frames)
+
+    def constant(self):
+        '''
+        Returns bool array of the channels within their tolerance of the first value
+        '''
+        deviation = np.fmax(self.maximum - self.first, self.first - self.minimum)
+        return deviation <= self.tolerances
+
+    def channel_keys(self, column):
+        '''
+        Returns (times, values, slopes) arrays of the kept keys of a channel
+        '''
+        if self.first is None:
+            return np.zeros(0), np.zeros(0), np.zeros(0)
+        if self.constant()[column]:
+            return self.times[column][0][:1], self.first[column:column + 1], np.zeros(1)
+        return tuple(np.concatenate(keys) for keys in
+                     (self.times[column], self.values[column], self.slopes[column]))
+
+    def key_count(self):
+        return sum(len(self.channel_keys(column)[0]) for column in range(len(self.channels)))
+
+    def curves(self, nodes, fps):
+        '''
+        Curve dicts of the kept keys with fixed tangents, ordered by node and attribute.
+        Channels that are NaN on every frame (missing on the node) are left out.
+
+        Arguments
+        nodes (str list): node name per column
+        fps (float): frames per second, tangent angles are measured in seconds
+
+        Returns list of curve dicts, see curve_format.py
+        '''
+        constant = self.constant() if self.first is not None else None
+        curves = list()
+        for column, (node, channel) in enumerate(zip(nodes, self.channels)):
+            times, values, slopes = self.channel_keys(column)
+            if not len(times) or np.isnan(values).all():
+                continue
+            if self.method == 'linear' or constant[column]:
+                # Tangents along the segments to the neighbouring keys
+                segments = np.diff(values) / np.diff(times) if len(times) > 1 else np.zeros(0)
+                in_slopes = np.concatenate([segments[:1], segments]) if len(segments) else slopes
+                out_slopes = np.concatenate([segments, segments[-1:]]) if len(segments) else slopes
+                tangent_type = 'linear'
+            else:
+                in_slopes = out_slopes = slopes
+                tangent_type = 'fixed'
+            curve = curve_format.new_curve(node, channel)
+            curve['times'] = times.tolist()
+            curve['values'] = values.tolist()
+            curve['itt'] = curve['ott'] = [tangent_type] * len(times)
+            curve['iw'] = curve['ow'] = [1.0] * len(times)
+            curve['ia'] = [math.degrees(math.atan(slope * fps)) for slope in in_slopes.tolist()]
+            curve['oa'] = [math.degrees(math.atan(slope * fps)) for slope in out_slopes.tolist()]
+            curve['tolerance'] = float(self.tolerances[column])
+            curve['error'] = float(self.error[column]) if not constant[column] else \
+                float(max(self.maximum[column] - self.first[column],
+                          self.first[column] - self.minimum[column]))
+            curves.append(curve)
+        return sorted(curves, key=lambda curve: (curve['node'], curve['attribute']))
@@ -0,0 +1,149 @@
+'''
+memory_usage.py
+
+Memory used by a block of code, e.g. an animation export inside a Maya session. The process
+high-water mark (ru_maxrss) is usually the scene load, so it says nothing about the block.
+MemoryMonitor takes the resident memory at the start as a baseline and samples it on a
+background thread while the block runs. Where the resident memory cannot be read, or with
+trace_python=True, the peak of Python allocations (numpy arrays included) is traced with
+tracemalloc, which slows allocation heavy code down.
+
+import adv_scripting.memory_usage as memory_usage
+with memory_usage.MemoryMonitor() as monitor:
+    export()
+print(monitor.summary())
+'''
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# Seconds between resident memory samples
+SAMPLE_INTERVAL = 0.05
+
+
+def current_memory():
+    '''
+    Resident memory of this process, from /proc on Linux and the process memory counters on
+    Windows.
+
+    Returns bytes, None if it cannot be read
+    '''
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/statm', 'r') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == 'win32':
+        return _windows_memory()
+    return None
+
+
+def _windows_memory():
+    try:
+        import ctypes
+        import ctypes.wintypes as wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + \
+                [(name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                    'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage',
+                    'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters),
+                                                        counters.cb):
+            return None
+        return counters.WorkingSetSize
+    except (AttributeError, ImportError, OSError):
+        return None
+
+
+def format_bytes(size):
+    if size is None:
+        return 'unknown'
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GB'
+
+
+class MemoryMonitor():
+    '''
+    Context manager measuring the memory a block uses on top of what the process used before.
+
+    Arguments
+    trace_python (bool/None): trace Python allocations with tracemalloc, None only when the
+        resident memory cannot be read
+    interval (float): seconds between resident memory samples
+
+    After the block:
+    baseline (int/None): resident bytes at the start
+    peak (int/None): peak resident bytes over the baseline
+    python_peak (int/None): peak bytes of Python allocations made in the block, when traced
+    '''
+    def __init__(self, trace_python=None, interval=SAMPLE_INTERVAL):
+        self.trace_python = trace_python
+        self.interval = interval
+        self.baseline = None
+        self.peak = None
+        self.python_peak = None
+        self._highest = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_tracing = False
+        self._traced_start = 0
+
+    def __enter__(self):
+        self.baseline = self._highest = current_memory()
+        if self.trace_python or self.trace_python is None and self.baseline is None:
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            if hasattr(tracemalloc, 'reset_peak'): # Python 3.9+
+                tracemalloc.reset_peak()
+            self._traced_start = tracemalloc.get_traced_memory()[0]
+            self.python_peak = 0
+        if self.baseline is not None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self._record()
+
+    def _record(self):
+        memory = current_memory()
+        if memory is not None and memory > self._highest:
+            self._highest = memory
+
+    def __exit__(self, *args):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self._record()
+            self.peak = self._highest - self.baseline
+        if self.python_peak is not None:
+            self.python_peak = max(0, tracemalloc.get_traced_memory()[1] - self._traced_start)
+            if self._started_tracing:
+                tracemalloc.stop()
+
+    def summary(self):
+        parts = list()
+        if self.peak is not None:
+            parts.append(f'{format_bytes(self.peak)} resident over the '
+                         f'{format_bytes(self.baseline)} at the start')
+        if self.python_peak is not None:
+            parts.append(f'{format_bytes(self.python_peak)} peak Python allocations')
+        return ', '.join(parts) or 'unknown'
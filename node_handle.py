@@ -0,0 +1,115 @@
+'''
+node_handle.py
+
+Persistent handles to scene nodes. A NodeHandle keeps the node's MObjectHandle and, for DAG
+nodes, its MDagPath, so getting the current name of the node does not search the scene by name
+or UUID. The name follows renames and reparenting; a DAG path made invalid by reparenting is
+rebuilt from the node once.
+
+Lookups are counted, per kind:
+    path: name read from the cached MObjectHandle / MDagPath
+    refresh: DAG path rebuilt after the node was reparented
+    resolve: name or UUID searched in the scene to make a handle
+Counts are added to the active build_profiler phase as 'node_<kind>' counters.
+
+e.g.
+import adv_scripting.node_handle as node_handle
+handle = node_handle.NodeHandle.from_name(cmds.createNode('transform', n='output_grp'))
+cmds.parent(handle.name, 'rig_grp')
+handle.name # '|rig_grp|output_grp'
+'''
+import logging
+import maya.api.OpenMaya as om
+import adv_scripting.build_profiler as build_profiler
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_KINDS = ('path', 'refresh', 'resolve')
+# Lookup kind -> number of lookups since the module was loaded
+lookup_counts = dict.fromkeys(LOOKUP_KINDS, 0)
+
+
+def count(kind):
+    lookup_counts[kind] += 1
+    build_profiler.count(f'node_{kind}')
+
+
+def get_counts():
+    '''
+    Returns copy of the lookup counts, subtract two copies for the lookups in between.
+    '''
+    return dict(lookup_counts)
+
+
+def counts_since(counts):
+    return {kind: lookup_counts[kind] - counts.get(kind, 0) for kind in LOOKUP_KINDS}
+
+
+class NodeHandle():
+    '''
+    Arguments
+    node (MObject): node to keep a handle to
+    '''
+    def __init__(self, node):
+        self.handle = om.MObjectHandle(node)
+        self.dag_path = om.MDagPath.getAPathTo(node) if node.hasFn(om.MFn.kDagNode) else None
+
+    @classmethod
+    def from_name(cls, name):
+        '''
+        Handle to a node by name, e.g. the name cmds.createNode returned.
+        '''
+        count('resolve')
+        selection = om.MSelectionList()
+        try:
+            selection.add(str(name))
+        except RuntimeError:
+            raise ValueError(f'No node matches {name}')
+        return cls(selection.getDependNode(0))
+
+    @classmethod
+    def from_uuid(cls, uuid):
+        '''
+        Handle to a node by UUID string. MSelectionList matches strings as names, the UUID
+        goes in as an MUuid.
+        '''
+        count('resolve')
+        selection = om.MSelectionList()
+        try:
+            selection.add(om.MUuid(uuid))
+        except (RuntimeError, ValueError):
+            raise ValueError(f'No node matches {uuid}')
+        return cls(selection.getDependNode(0))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}('{self.name if self.is_valid() else None}')"
+
+    def __str__(self):
+        return self.name
+
+    def is_valid(self):
+        return self.handle.isValid()
+
+    @property
+    def node(self):
+        if not self.handle.isValid():
+            raise RuntimeError('Node of the handle was deleted.')
+        return self.handle.object()
+
+    @property
+    def name(self):
+        '''
+        Full path of a DAG node, name of a DG node.
+        '''
+        node = self.node
+        count('path')
+        if self.dag_path is None:
+            return om.MFnDependencyNode(node).name()
+        if not self.dag_path.isValid():
+            count('refresh')
+            self.dag_path = om.MDagPath.getAPathTo(node)
+        return self.dag_path.fullPathName()
+
+    @property
+    def uuid(self):
+        return om.MFnDependencyNode(self.node).uuid().asString()
@@ -21,10 +21,15 @@ def get_publishable_assests():
 
 def build_publish_data(publishable_assests):
     import maya.cmds as mc
+    import adv_scripting.rig.control_registry as control_registry
     publish_data = list()
     for asset in publishable_assests:
         asset_name = mc.getAttr('{}.asset_name'.format(asset))
         rig_version = mc.getAttr('{}.rig_version'.format(asset))
+        # Nothing to publish on assets without animation controls
+        if control_registry.has_registry(asset) and not control_registry.get_controls(asset):
+            logging.info('{} has no registered controls, skipping'.format(asset))
+            continue
         publish_data.append(pd.PublishData(asset_name=asset_name, rig_version=rig_version))
 
     logging.info('publishable_data: {}'.format(publish_data))
@@ -2,6 +2,8 @@ from abc import ABC, abstractmethod
 import logging
 import maya.cmds as cmds
 import adv_scripting.rig_name as rig_name
+import adv_scripting.build_profiler as build_profiler
+import adv_scripting.node_handle as node_handle
 
 logger = logging.getLogger()
 
@@ -36,15 +38,18 @@ class Appendage(ABC):
         '''
         self.skeleton = cmds.listRelatives(self.start_joint, ad=True)
 
-        # Run methods
-        self.create_appendage_container()
-        self.setup()
-        self.create_output_attributes()
-        self.build()
-        self.connect_inputs()
-        self.connect_outputs()
-        self.cleanup()
-        self.finish()
+        # Run methods. Each is a profiled phase when build_profiler is running.
+        with build_profiler.phase(self.appendage_name, self.__class__.__name__):
+            for method in (self.create_appendage_container,
+                           self.setup,
+                           self.create_output_attributes,
+                           self.build,
+                           self.connect_inputs,
+                           self.connect_outputs,
+                           self.cleanup,
+                           self.finish):
+                with build_profiler.phase(self.appendage_name, method.__name__):
+                    method()
 
     def __str__(self):
         return self.controls
@@ -62,16 +67,20 @@ class Appendage(ABC):
         self.controls_grp = cmds.createNode('transform', name=rig_name.RigName(
                                                         element='controls',
                                                         rig_type='grp').output())
-        self._input = cmds.ls(cmds.createNode('transform', name=rig_name.RigName(
+        # Input/output names are not unique between appendages. Keep handles to the nodes, and
+        # their UUIDs for the build cache.
+        self._input_handle = node_handle.NodeHandle.from_name(cmds.createNode('transform',
+                                                        name=rig_name.RigName(
                                                         element='input',
-                                                        rig_type='grp').output()),
-                                                        uuid=True)[0]
+                                                        rig_type='grp').output()))
+        self._input = self._input_handle.uuid
         cmds.addAttr(self.input, longName='input_matrix', attributeType='matrix')
 
-        self._output = cmds.ls(cmds.createNode('transform', name=rig_name.RigName(
+        self._output_handle = node_handle.NodeHandle.from_name(cmds.createNode('transform',
+                                                        name=rig_name.RigName(
                                                         element='output',
-                                                        rig_type='grp').output()),
-                                                        uuid=True)[0]
+                                                        rig_type='grp').output()))
+        self._output = self._output_handle.uuid
         if self.input_matrix:
             cmds.connectAttr(self.input_matrix, f'{self.input}.input_matrix')
 
@@ -139,13 +148,11 @@ class Appendage(ABC):
 
     @property
     def input(self):
-        return cmds.ls(self._input, uuid=True, l=True)[0]
-        logger.info(f'input: {self.input}')
+        return self._input_handle.name
 
     @property
     def output(self):
-        return cmds.ls(self._output, uuid=True, l=True)[0]
-        logger.info(f'output: {self.output}')
+        return self._output_handle.name
 
     @property
     def result_matrix(self):
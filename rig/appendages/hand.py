@@ -132,7 +132,7 @@ class Hand(appendage.Appendage):
 
         # Freeze and orient joints
         self.freeze_joint(self.wrist_bnd)
-        children = cmds.listRelatives(self.hand_bnd, typ='joint') or []
+        children = self.skeleton_index.get(self.hand_bnd, [])
         for child in children:
             self.orient_joint(child)
 
@@ -258,6 +258,8 @@ class Hand(appendage.Appendage):
         '''
         Read current hand skeleton.
         Build list called skeleton_hand consisting of each finger joint chain.
+        The hierarchy is read once into self.skeleton_index (see utils.read_children_index)
+        and walked without any further maya queries.
 
         Arguments
         joint: starting joint to read skeleton
@@ -271,34 +273,15 @@ class Hand(appendage.Appendage):
         ['rt_index_bnd_jnt_01', 'rt_index_bnd_jnt_02', 'rt_index_bnd_jnt_03'],
         ['rt_thumb_bnd_jnt_01', 'rt_thumb_bnd_jnt_02', 'rt_thumb_bnd_jnt_03']]
         '''
-        skeleton_hand = list()
-        children = cmds.listRelatives(joint, typ='joint') or []
-
-        if len(children) == 0: # End joint
-            return skeleton_hand
-        elif len(children) == 1: # Walk down joint chain
-            skeleton_hand = self.read_skeleton(children[0])
-        elif len(children) == 2: # Branch split
-            split_branch0 = self.has_split_skeleton_branch(children[0])
-            split_branch1 = self.has_split_skeleton_branch(children[1])
-            # Check if thumb branch splits before hand joint
-            if split_branch0: # branch1 is thumb
-                self.thumb_bnd= children[1]
-                skeleton_hand = self.read_skeleton(children[0])
-                skeleton_hand.append(self.read_skeleton_branch(children[1]))
-            elif split_branch1: # branch0 is thumb
-                self.thumb_bnd = children[0]
-                skeleton_hand = self.read_skeleton(children[1])
-                skeleton_hand.append(self.read_skeleton_branch(children[0]))
-            else: # Hand only consists of two branches
-                self.hand_bnd = joint
-                skeleton_hand.append(self.read_skeleton_branch(children[0]))
-                skeleton_hand.append(self.read_skeleton_branch(children[1]))
-        elif len(children) > 2: # Hand joint
-            self.hand_bnd = joint
-            for child in children:
-                skeleton_hand.append(self.read_skeleton_branch(child))
-
+        self.skeleton_index = utils.read_children_index(joint)
+        self.split_index = get_split_index(self.skeleton_index)
+        skeleton_hand, hand_bnd, thumb_bnd = read_hand_branches(self.skeleton_index,
+                                                                joint,
+                                                                self.split_index)
+        if hand_bnd:
+            self.hand_bnd = hand_bnd
+        if thumb_bnd:
+            self.thumb_bnd = thumb_bnd
         return skeleton_hand
 
 
@@ -306,24 +289,12 @@ class Hand(appendage.Appendage):
         '''
         Read finger, or single branch, assumed to be a linear joint chain.
         '''
-        skeleton_branch = [joint]
-        children = cmds.listRelatives(joint, typ='joint')
-        if not children: # End joint
-            return []
-        elif len(children) > 1:
-            logger.warning(f'{joint} has multiple children. Expected linear joint chain.')
-
-        skeleton_branch.extend(self.read_skeleton_branch(children[0]))
-        return skeleton_branch
+        return read_branch(self.skeleton_index, joint)
 
 
     def has_split_skeleton_branch(self, joint):
         if not joint: return False
-        children = cmds.listRelatives(joint, typ='joint') or []
-        if len(children) == 1:
-            return self.has_split_skeleton_branch(children[0])
-        elif len(children) > 1:
-            return True
+        return self.split_index.get(joint, False)
 
 
     def freeze_joint(self, jnt):
@@ -677,6 +648,179 @@ class Hand(appendage.Appendage):
         cmds.parent(self.blend_switch, self.appendage_grp)
 
 
+# SKELETON TRAVERSAL ===================================================
+# Work on a children index, {joint: [child, ...]}, from utils.read_children_index.
+
+def get_split_index(children_index):
+    '''
+    For every joint, whether the chain below it splits into more than one branch.
+    Computed bottom-up in one pass instead of re-walking each branch.
+
+    Returns dict (str->bool)
+    '''
+    # Depth first order, so reversed every child is visited before its parent
+    order = list()
+    roots = set(children_index) - {c for children in children_index.values() for c in children}
+    stack = list(roots)
+    while stack:
+        joint = stack.pop()
+        order.append(joint)
+        stack.extend(children_index.get(joint, []))
+
+    split_index = dict()
+    for joint in reversed(order):
+        children = children_index.get(joint, [])
+        if len(children) > 1:
+            split_index[joint] = True
+        elif len(children) == 1:
+            split_index[joint] = split_index[children[0]]
+        else:
+            split_index[joint] = False
+    return split_index
+
+
+def read_branch(children_index, joint):
+    '''
+    Read a linear chain starting at joint. The end (leaf) joint is not included.
+
+    Returns list of joints
+    '''
+    branch = list()
+    children = children_index.get(joint, [])
+    while children:
+        if len(children) > 1:
+            logger.warning(f'{joint} has multiple children. Expected linear joint chain.')
+        branch.append(joint)
+        joint = children[0]
+        children = children_index.get(joint, [])
+    return branch
+
+
+def read_hand_branches(children_index, joint, split_index=None):
+    '''
+    Walk down from joint to the joint where the fingers split (hand joint).
+    A branch that splits off above the hand joint without splitting itself is a thumb.
+
+    Arguments
+    children_index (dict): {joint: [child, ...]} of the hand hierarchy
+    joint (str): starting joint, e.g. wrist
+    split_index (dict/None): result of get_split_index, computed if None
+
+    Returns (branches, hand_bnd, thumb_bnd)
+        branches: 2D list of finger branches, fingers at the hand joint first,
+                  thumbs after in the order found walking up from the hand joint.
+        hand_bnd: branch split joint, None if the chain never splits
+        thumb_bnd: first joint of the thumb, None if there is no separate thumb
+    '''
+    if split_index is None:
+        split_index = get_split_index(children_index)
+    branches = list()
+    thumbs = list()
+    hand_bnd = None
+    thumb_bnd = None
+
+    while True:
+        children = children_index.get(joint, [])
+        if len(children) == 0: # End joint
+            break
+        elif len(children) == 1: # Walk down joint chain
+            joint = children[0]
+        elif len(children) == 2: # Branch split
+            # Check if thumb branch splits before hand joint
+            if split_index[children[0]]: # branch1 is thumb
+                thumb_bnd = children[1]
+                thumbs.append(read_branch(children_index, children[1]))
+                joint = children[0]
+            elif split_index[children[1]]: # branch0 is thumb
+                thumb_bnd = children[0]
+                thumbs.append(read_branch(children_index, children[0]))
+                joint = children[1]
+            else: # Hand only consists of two branches
+                hand_bnd = joint
+                branches = [read_branch(children_index, child) for child in children]
+                break
+        else: # Hand joint
+            hand_bnd = joint
+            branches = [read_branch(children_index, child) for child in children]
+            break
+
+    branches.extend(reversed(thumbs))
+    return branches, hand_bnd, thumb_bnd
+
+
+def benchmark_read_skeleton(num_digits=12, num_segments=8, repeat=10):
+    '''
+    Build a synthetic hand (wrist -> hand -> num_digits fingers of num_segments joints, plus a
+    thumb off the wrist) and time reading it, against a per-joint listRelatives walk like the
+    previous recursive implementation.
+
+    In Maya Script Editor (python), run:
+    import adv_scripting.rig.appendages.hand as hand
+    hand.benchmark_read_skeleton()
+
+    Returns dict of timings and listRelatives call counts.
+    '''
+    import time
+    wrist = cmds.createNode('joint', n='lt_wrist_bnd_jnt')
+    hand_jnt = cmds.createNode('joint', n='lt_hand_bnd_jnt', p=wrist)
+    cmds.setAttr(f'{hand_jnt}.translateX', 2)
+    thumb_parent = wrist
+    for segment in range(num_segments):
+        thumb_parent = cmds.createNode('joint', n=f'lt_thumb_bnd_jnt_{segment+1:02}', p=thumb_parent)
+        cmds.setAttr(f'{thumb_parent}.translate', 1, 0, 1)
+    for digit in range(num_digits):
+        parent = hand_jnt
+        for segment in range(num_segments):
+            parent = cmds.createNode('joint', n=f'lt_digit{digit+1}_bnd_jnt_{segment+1:02}', p=parent)
+            cmds.setAttr(f'{parent}.translate', 1, 0, digit * 0.5 if segment == 0 else 0)
+
+    calls = {'count': 0}
+    list_relatives = cmds.listRelatives
+    def counted(*args, **kwargs):
+        calls['count'] += 1
+        return list_relatives(*args, **kwargs)
+
+    def legacy_has_split(joint):
+        children = cmds.listRelatives(joint, typ='joint') or []
+        if len(children) == 1:
+            return legacy_has_split(children[0])
+        return len(children) > 1
+
+    def legacy_branch(joint):
+        children = cmds.listRelatives(joint, typ='joint')
+        return [joint] + legacy_branch(children[0]) if children else []
+
+    def legacy_read(joint):
+        children = cmds.listRelatives(joint, typ='joint') or []
+        if len(children) == 1:
+            return legacy_read(children[0])
+        if len(children) == 2 and (legacy_has_split(children[0]) or legacy_has_split(children[1])):
+            hand, thumb = children if legacy_has_split(children[0]) else children[::-1]
+            return legacy_read(hand) + [legacy_branch(thumb)]
+        return [legacy_branch(child) for child in children]
+
+    results = dict()
+    reader = Hand.__new__(Hand)
+    reader.hand_bnd = None
+    reader.thumb_bnd = None
+    try:
+        cmds.listRelatives = counted
+        for label, read in (('index', reader.read_skeleton), ('legacy', legacy_read)):
+            calls['count'] = 0
+            timer = time.perf_counter()
+            for _ in range(repeat):
+                branches = read(wrist)
+            results[label] = {'seconds': (time.perf_counter() - timer) / repeat,
+                              'listRelatives': calls['count'] // repeat,
+                              'branches': len(branches)}
+    finally:
+        cmds.listRelatives = list_relatives
+        cmds.delete(wrist)
+
+    logger.info(f'read_skeleton benchmark ({num_digits} digits, {num_segments} segments): {results}')
+    return results
+
+
 def test():
     '''
     In Maya Script Editor (python), run:
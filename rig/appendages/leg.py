@@ -73,29 +73,17 @@ class Leg(two_bone_fkik.TwoBoneFKIK):
 
 		cmds.addAttr(self.output, longName='ball_matrix', attributeType='matrix')
 
-		# WARNING: Begin hack.  Running the code without creating the skeleton and deleting it
-		# results in the ankle joint positioned at the knee.  I suspect that something is selected
-		# when a joint gets created somewhere in the code?
-		workaround_garbage = utils.create_control_joints_from_skeleton(self.bnd_joints['end_joint'],
-		                                                    self.toeEnd_joint,
-		                                                    rig_name.ControlType('switch'),
-		                                                    0,
-															0)
-		cmds.delete(workaround_garbage[0])
-		# WARNING: End hack.  (soooo annoying)
-
-	    # Extract a control skeleton for the fk
-		self.fk_foot_skeleton = utils.create_control_joints_from_skeleton(self.bnd_joints['end_joint'],
-					                                                    self.toeEnd_joint,
-					                                                    rig_name.ControlType('fk'),
-					                                                    0,
-																		0)
-		# Extract a control skeleton for the ik
-		self.ik_foot_skeleton = utils.create_control_joints_from_skeleton(self.bnd_joints['end_joint'],
-					                                                    self.toeEnd_joint,
-					                                                    rig_name.ControlType('ik'),
-					                                                    0,
-																		0)
+		# Extract the fk and ik control skeletons for the foot in one batch.  World positions are
+		# read before any joint is duplicated, so the ankle no longer needs a throwaway 'switch'
+		# chain to land in the right place.
+		foot_chains = utils.create_control_chains(self.bnd_joints['end_joint'],
+		                                          self.toeEnd_joint,
+		                                          [rig_name.ControlType('fk'),
+		                                           rig_name.ControlType('ik')],
+		                                          0,
+		                                          0)
+		self.fk_foot_skeleton = foot_chains['fk']
+		self.ik_foot_skeleton = foot_chains['ik']
 
 	def build_fk_foot(self):
 		logger.debug('build_fk_foot')
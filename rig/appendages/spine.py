@@ -3,8 +3,8 @@ import adv_scripting.rig_name as rig_name
 import adv_scripting.matrix_tools as matrix_tools
 import adv_scripting.rig.appendages.appendage as appendage
 import adv_scripting.utilities as utils
+import adv_scripting.surface_query as surface_query
 import logging
-import pymel.core as pm
 
 import importlib as il
 
@@ -145,20 +145,20 @@ class Spine(appendage.Appendage):
 
         cmds.delete(tempBS)
 
+        # Closest point uv on the surface for all joints in one query, before the pin moves them
+        spine_uvs = surface_query.get_surface_coordinates(curve_loft[0], root_joint)
+
         for i, joint in enumerate(root_joint):
             cmds.setAttr(f'{joint}.inheritsTransform', 0)
             cmds.connectAttr(f'spineUvPin.outputMatrix[{i}]', f'{joint}.offsetParentMatrix')
-            cmds.setAttr(f'{sPin}.coordinate[{i}].coordinateU', 0.5)
+            cmds.setAttr(f'{sPin}.coordinate[{i}].coordinateU', spine_uvs[i][0])
+            cmds.setAttr(f'{sPin}.coordinate[{i}].coordinateV', spine_uvs[i][1])
             cmds.setAttr(f'{joint}.translateX', 0)
             cmds.setAttr(f'{joint}.translateY', 0)
             cmds.setAttr(f'{joint}.translateZ', 0)
             cmds.setAttr(f'{joint}.jointOrientX', 0)
             cmds.setAttr(f'{joint}.jointOrientY', 0)
             cmds.setAttr(f'{joint}.jointOrientZ', 0)
-        cmds.setAttr(f'{sPin}.coordinate[1].coordinateV', 0.182)
-        cmds.setAttr(f'{sPin}.coordinate[2].coordinateV', 0.470)
-        cmds.setAttr(f'{sPin}.coordinate[3].coordinateV', 0.751)
-        cmds.setAttr(f'{sPin}.coordinate[4].coordinateV', 1)
 
         dv_spine_joints_list = cmds.ls(type='joint')
         dv_spine_joints_list = [joint for joint in dv_spine_joints_list if not fk_prefix in joint]
@@ -5,7 +5,6 @@ import adv_scripting.matrix_tools as matrix_tools
 import adv_scripting.rig.appendages.appendage as rap
 import adv_scripting.utilities as utils
 import logging
-import pymel.core as pm
 logger = logging.getLogger(__name__)
 
 import importlib as il
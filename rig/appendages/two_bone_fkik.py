@@ -10,6 +10,8 @@ import adv_scripting.rig_name as rig_name
 import adv_scripting.matrix_tools as matrix_tools
 import adv_scripting.rig.appendages.appendage as appendage
 import adv_scripting.pole_vector as pole_vector
+import adv_scripting.ik_solver as ik_solver
+import adv_scripting.twist as twist
 import adv_scripting.utilities as utils
 
 import logging
@@ -19,6 +21,8 @@ import importlib as il
 il.reload(appendage)
 il.reload(matrix_tools)
 il.reload(pole_vector)
+il.reload(ik_solver)
+il.reload(twist)
 il.reload(rig_name)
 il.reload(utils)
 
@@ -61,20 +65,33 @@ class TwoBoneFKIK(appendage.Appendage):
                 self.bnd_joints[f'low_twist_{index+1}'] = skeleton[self.num_upperTwist_joints + index+1]
         self.bnd_joints['end_joint'] = skeleton[self.num_upperTwist_joints + self.num_lowerTwist_joints + 1]
 
-        # Extract a control skeleton for the fk
-        self.fk_skeleton = utils.create_control_joints_from_skeleton(self.bnd_joints['start_joint'],
-                                                                self.bnd_joints['end_joint'],
-                                                                rig_name.ControlType('fk'),
-                                                                self.num_upperTwist_joints,
-                                                                self.num_lowerTwist_joints)
+        # Fail before any control joints or ik handles get created
+        self.validate_chain()
 
-        # Extract a control skeleton for the ik
-        self.ik_skeleton = utils.create_control_joints_from_skeleton( self.bnd_joints['start_joint'],
-                                                                self.bnd_joints['end_joint'],
-                                                                rig_name.ControlType('ik'),
-                                                                self.num_upperTwist_joints,
-                                                                self.num_lowerTwist_joints)
+        # Extract the fk and ik control skeletons in one batch
+        control_chains = utils.create_control_chains(self.bnd_joints['start_joint'],
+                                                     self.bnd_joints['end_joint'],
+                                                     [rig_name.ControlType('fk'),
+                                                      rig_name.ControlType('ik')],
+                                                     self.num_upperTwist_joints,
+                                                     self.num_lowerTwist_joints)
+        self.fk_skeleton = control_chains['fk']
+        self.ik_skeleton = control_chains['ik']
 
+    def validate_chain(self):
+        '''
+        Run the analytic two-bone solver on the bnd chain (twist joints included) and check for
+        non-planar chains and pole flips.  Warnings are logged, errors raise a ValueError.
+        '''
+        positions = [cmds.xform(joint, q=True, ws=True, t=True) for joint in self.bnd_joints.values()]
+        report = ik_solver.validate_chain(positions, mid_index=self.num_upperTwist_joints + 1)
+        for warning in report['warnings']:
+            logger.warning(f'{self.appendage_name}: {warning}')
+        if report['errors']:
+            for error in report['errors']:
+                logger.error(f'{self.appendage_name}: {error}')
+            raise ValueError(f"{self.appendage_name} failed chain validation: {report['errors']}")
+        return report
 
     def build(self):
         #FK setup
@@ -87,7 +104,6 @@ class TwoBoneFKIK(appendage.Appendage):
                                     self.control_to_local_orient)
 
         # Create blended output
-         #TODO : twist joint blending
         name_FKIK_switch = rig_name.RigName(element=self.appendage_name, side=self.side,
             control_type='switch', rig_type='grp')
         self.FKIK_switch = cmds.createNode('transform', n=str(name_FKIK_switch))
@@ -102,6 +118,9 @@ class TwoBoneFKIK(appendage.Appendage):
                                                    element=self.appendage_name,
                                                    side=self.side))
 
+        # Drive the twist joints from the blended start/middle/end matrices
+        self.twist_nodes = self.build_twist(result_matricies)
+
         bnd_joints_list = [self.bnd_joints['start_joint'],self.bnd_joints['middle_joint'],self.bnd_joints['end_joint']]
 
         for mult_matrix_node, bnd_jnt in zip(result_matricies,bnd_joints_list):
@@ -112,6 +131,52 @@ class TwoBoneFKIK(appendage.Appendage):
             cmds.xform(bnd_jnt, t = [0, 0, 0], os=True)
 
 
+    def build_twist(self, result_matricies):
+        '''
+        Create one twist network per segment (start->middle, middle->end) and connect each twist
+        joint's result to its matrix on the output node.  Weights come from the twist joint
+        positions along the segment.  See twist.create_twist_network.
+
+        Returns dict of created nodes per segment ('up', 'low').
+        '''
+        # World space blended matrix feeding each result multMatrix
+        world_matrices = [cmds.listConnections(f'{mult}.matrixIn[0]', s=True, d=False, plugs=True)[0]
+                          for mult in result_matricies]
+        # Read all positions up front, zeroing the joints below moves their children.
+        positions = {key: cmds.xform(joint, q=True, ws=True, t=True)
+                     for key, joint in self.bnd_joints.items()}
+
+        segments = [('up', 'start_joint', 'middle_joint', self.num_upperTwist_joints),
+                    ('low', 'middle_joint', 'end_joint', self.num_lowerTwist_joints)]
+        twist_nodes = dict()
+        for index, (prefix, start_key, end_key, num_twist) in enumerate(segments):
+            if not num_twist:
+                continue
+            keys = [f'{prefix}_twist_{i+1}' for i in range(num_twist)]
+            weights = twist.twist_weights(positions[start_key],
+                                          positions[end_key],
+                                          [positions[key] for key in keys])
+            name = rig_name.RigName(element=f'{self.appendage_name}_{prefix}_twist',
+                                    side=self.side,
+                                    rig_type='util').output()
+            network = twist.create_twist_network(world_matrices[index],
+                                                 world_matrices[index + 1],
+                                                 weights,
+                                                 name)
+            for key, output in zip(keys, network['outputs']):
+                bnd_jnt = self.bnd_joints[key]
+                parent = cmds.listRelatives(bnd_jnt, parent=True)
+                mult_matrix_node = cmds.createNode('multMatrix', n=f'{name}_{key}_multMatrix')
+                cmds.connectAttr(output, f'{mult_matrix_node}.matrixIn[0]')
+                cmds.connectAttr(f'{parent[0]}.worldInverseMatrix[0]', f'{mult_matrix_node}.matrixIn[1]')
+                cmds.connectAttr(f'{mult_matrix_node}.matrixSum', f'{self.output}.{key}_matrix')
+                cmds.xform(bnd_jnt, t=[0, 0, 0], os=True)
+                network['nodes'].append(mult_matrix_node)
+            twist_nodes[prefix] = network['nodes']
+            logger.debug(f'{name} weights: {weights}')
+
+        return twist_nodes
+
     def connect_inputs(self):
         logger.debug('connect_inputs()')
         '''
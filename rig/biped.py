@@ -1,5 +1,7 @@
 import maya.cmds as cmds
 import logging
+import os
+import tempfile
 import adv_scripting.rig_name as rig_name
 import adv_scripting.rig.appendages.root as root
 import adv_scripting.rig.appendages.spine as spine
@@ -8,8 +10,15 @@ import adv_scripting.rig.appendages.leg as leg
 import adv_scripting.rig.appendages.arm as arm
 import adv_scripting.rig.appendages.hand_rev2 as hand
 import adv_scripting.rig.settings as rig_settings
+import adv_scripting.rig.build_graph as build_graph
+import adv_scripting.rig.build_cache as build_cache
+import adv_scripting.rig.rig_description as rig_description
+import adv_scripting.rig.control_registry as control_registry
 import adv_scripting.utilities as utils
 import adv_scripting.matrix_tools as matrix_tools
+import adv_scripting.build_profiler as build_profiler
+import adv_scripting.cmds_tracer as cmds_tracer
+import adv_scripting.node_handle as node_handle
 import importlib as il
 il.reload(root)
 il.reload(head)
@@ -18,6 +27,12 @@ il.reload(leg)
 il.reload(arm)
 il.reload(hand)
 il.reload(rig_settings)
+il.reload(build_graph)
+il.reload(build_cache)
+il.reload(rig_description)
+il.reload(control_registry)
+il.reload(build_profiler)
+il.reload(cmds_tracer)
 
 logger = logging.getLogger(__name__)
 
@@ -33,9 +48,29 @@ class Rig():
         self.name = name
         self.settings = settings
 
-        self.setup()
-        self.build()
-        # self.connect_control_shapes()
+        # Tracer wraps maya.cmds first so the profiler's wrappers are restored before it
+        self.cmds_tracer = cmds_tracer.CmdsTracer() if self.settings.trace_cmds else None
+        if self.cmds_tracer:
+            self.cmds_tracer.start()
+        if self.settings.profile_build:
+            build_profiler.start(self.name)
+        lookup_counts = node_handle.get_counts()
+        try:
+            with build_profiler.phase(self.name, 'setup'):
+                self.setup()
+            with build_profiler.phase(self.name, 'build'):
+                self.build()
+            # self.connect_control_shapes()
+        finally:
+            # Appendage input/output names read through node handles during the build
+            self.node_lookups = node_handle.counts_since(lookup_counts)
+            logger.info(f'Node handle lookups: {self.node_lookups}')
+            if self.settings.profile_build:
+                self.profiler = build_profiler.stop(self.settings.profile_trace_path or
+                    os.path.join(tempfile.gettempdir(), f'{self.name}_build_trace.json'))
+            if self.cmds_tracer:
+                self.cmds_tracer.stop()
+                logger.info(self.cmds_tracer.report())
 
     def setup(self):
         logger.debug('build')
@@ -78,19 +113,102 @@ class Biped(Rig):
 
     def build(self):
         logger.debug('build')
-        self.build_root()
-        self.build_spine()
-        self.build_head()
-        self.build_arms()
-        self.build_legs()
-        self.build_hands()
+        self.arms = dict()
+        self.legs = dict()
+        self.hands = dict()
+        # Appendages in the order they were built
+        self.appendages = list()
+
+        # Unchanged appendages are re-imported from the cache instead of rebuilt
+        self.build_cache = None
+        if self.settings.cache_dir:
+            self.build_cache = build_cache.BuildCache(os.path.join(self.settings.cache_dir, self.name))
+
+        self.scheduler = self.create_scheduler()
+        self.build_plan = self.scheduler.plan()
+        self.scheduler.run(self.build_plan)
+        if self.build_cache:
+            logger.info(self.build_cache.report())
+        control_registry.register_appendages(self.rig_grp, self.appendages)
+        # Description of the finished rig for rig_description.replay_file
+        if self.settings.capture_path:
+            rig_description.save(rig_description.capture(self.rig_grp), self.settings.capture_path)
+
+    def create_scheduler(self):
+        '''
+        Declare each appendage with the appendages it takes its input matrix from.
+        The scheduler derives the build order from these dependencies.
+        '''
+        scheduler = build_graph.BuildScheduler()
+        self.add_step(scheduler, 'root', self.build_root, [], 'root_', root.Root)
+        self.add_step(scheduler, 'spine', self.build_spine, ['root'], 'spine_', spine.Spine)
+        self.add_step(scheduler, 'head', self.build_head, ['spine'], 'head_', head.Head)
+        for side in self.sides:
+            self.add_step(scheduler, f'{side}_arm', lambda side=side: self.build_arm(side),
+                          ['spine'], 'arm_', arm.Arm)
+        for side in self.sides:
+            self.add_step(scheduler, f'{side}_leg', lambda side=side: self.build_leg(side),
+                          ['root'], 'leg_', leg.Leg)
+        for side in self.sides:
+            self.add_step(scheduler, f'{side}_hand', lambda side=side: self.build_hand(side),
+                          [f'{side}_arm'], 'hand_', hand.Hand)
+        scheduler.disable(self.settings.disabled_appendages)
+        return scheduler
+
+    def add_step(self, scheduler, name, build, dependencies, settings_prefix, appendage_class):
+        '''
+        Add an appendage build step, wrapped by the build cache when caching is on.
+
+        Arguments
+        settings_prefix (str): BipedSettings fields of the appendage start with this, e.g. 'arm_'
+        appendage_class (class): Appendage subclass the step builds
+        '''
+        if self.build_cache:
+            start_joints = self.start_joints()
+            build = self.build_cache.cached_build(name, build,
+                        build_cache.settings_fields(self.settings, settings_prefix),
+                        start_joints[name],
+                        appendage_class,
+                        dependencies,
+                        stop_joints=[joint for step, joint in start_joints.items() if step != name],
+                        get_appendage=lambda: self.appendages[-1],
+                        set_appendage=lambda appendage: self.set_appendage(name, appendage))
+        scheduler.add(name, build, dependencies=dependencies)
+
+    def start_joints(self):
+        '''
+        Returns dict of build step name -> start joint of its source skeleton
+        '''
+        start_joints = {'root': rig_name.RigName(full_name=self.settings.root_start_joint).output(),
+                        'spine': rig_name.RigName(full_name=self.settings.spine_start_joint).output(),
+                        'head': rig_name.RigName(full_name=self.settings.head_start_joint).output()}
+        for side in self.sides:
+            for step, joint in (('arm', self.settings.arm_start_joint),
+                                ('leg', self.settings.leg_start_joint),
+                                ('hand', self.settings.hand_start_joint)):
+                start_joints[f'{side}_{step}'] = rig_name.RigName(full_name=joint).rename(
+                                                    side=side).output()
+        return start_joints
+
+    def set_appendage(self, step, appendage):
+        '''
+        Store an appendage restored from the build cache where its build method would have.
+        '''
+        sided = dict()
+        for side in self.sides:
+            sided[f'{side}_arm'] = (self.arms, side)
+            sided[f'{side}_leg'] = (self.legs, side)
+            sided[f'{side}_hand'] = (self.hands, side)
+        if step in sided:
+            appendages, side = sided[step]
+            appendages[side] = appendage
+        else:
+            setattr(self, step, appendage)
+        self.appendages.append(appendage)
 
     def connect_control_shapes(self):
         # List all appendages
-        appendages = [self.root, self.spine, self.head,
-            self.arms[self.sides[0]], self.arms[self.sides[1]],
-            self.legs[self.sides[0]], self.legs[self.sides[1]],
-            self.hands[self.sides[0]], self.hands[self.sides[1]]]
+        appendages = self.appendages
 
         # List of all controls
         controls = list()
@@ -126,10 +244,7 @@ class Biped(Rig):
                 ctrlswitch = utils.create_control(ctrl, parent=self.global_control, size=1, name=ctrlname)
                 utils.display_color(ctrlswitch, 22) # Yellow display color
 
-        # Connect controls as message to top node rig_grp
-        for control in controls:
-            cmds.addAttr(self.rig_grp, ln=control, at='message')
-            cmds.connectAttr(f'{control}.message', f'{self.rig_grp}.{control}')
+        # Controls are registered on rig_grp by build(), see control_registry
 
         # self.shape_grp = rig_name.RigName(side=None,
         #                             element="shape",
@@ -157,6 +272,7 @@ class Biped(Rig):
                               rig_name.RigName(full_name=self.settings.root_start_joint).output(),
                               input_matrix=f'{self.global_control}.worldMatrix[0]')
         cmds.parent(self.root.appendage_grp, self.rig_grp)
+        self.appendages.append(self.root)
         utils.rename_hierarchy(rig_name.RigName(full_name=self.settings.root_start_joint).output(),
                                 end_joint=None,
                                 unlock=True)
@@ -167,6 +283,7 @@ class Biped(Rig):
                                  rig_name.RigName(full_name=self.settings.spine_start_joint).output(),
                                  input_matrix= self.root.result_matrix)
         cmds.parent(self.spine.appendage_grp, self.rig_grp)
+        self.appendages.append(self.spine)
 
     def build_head(self):
         logger.debug('build_head')
@@ -175,55 +292,68 @@ class Biped(Rig):
                                          self.settings.head_num_twist_joints,
                                          input_matrix= self.spine.controls['ik']['spine_fk_5'] + ".worldMatrix[0]")
         cmds.parent(self.head.appendage_grp, self.rig_grp)
+        self.appendages.append(self.head)
 
     def build_arms(self):
         logger.debug('build_arms')
-        self.arms  = dict()
         for side in self.sides:
-            self.arms[side] = arm.Arm(rig_name.RigName(
-                                      full_name=self.settings.arm_appendage_name).rename(
-                                      side=side).output(),
-                                    rig_name.RigName(
-                                      full_name=self.settings.arm_start_joint).rename(
-                                      side=side).output(),
-                                    side,
-                                    self.settings.arm_num_upperTwist_joints,
-                                    self.settings.arm_num_lowerTwist_joints,
-                                    input_matrix= self.spine.controls['ik']['spine_fk_5'] + ".worldMatrix[0]")
-            cmds.parent(self.arms[side].appendage_grp, self.rig_grp)
+            self.build_arm(side)
+
+    def build_arm(self, side):
+        logger.debug(f'build_arm {side}')
+        self.arms[side] = arm.Arm(rig_name.RigName(
+                                  full_name=self.settings.arm_appendage_name).rename(
+                                  side=side).output(),
+                                rig_name.RigName(
+                                  full_name=self.settings.arm_start_joint).rename(
+                                  side=side).output(),
+                                side,
+                                self.settings.arm_num_upperTwist_joints,
+                                self.settings.arm_num_lowerTwist_joints,
+                                input_matrix= self.spine.controls['ik']['spine_fk_5'] + ".worldMatrix[0]")
+        cmds.parent(self.arms[side].appendage_grp, self.rig_grp)
+        self.appendages.append(self.arms[side])
 
     def build_legs(self):
         logger.debug('build_legs')
-
-        self.legs = dict()
         for side in self.sides:
-            self.legs[side] = leg.Leg(rig_name.RigName(
-                                        full_name=self.settings.leg_appendage_name).rename(
-                                        side=side).output(),
-                                    rig_name.RigName(
-                                        full_name=self.settings.leg_start_joint).rename(
-                                        side=side).output(),
-                                    side,
-                                    self.settings.leg_num_upperTwist_joints,
-                                    self.settings.leg_num_lowerTwist_joints,
-                                    input_matrix = self.root.result_matrix)
+            self.build_leg(side)
 
-            cmds.parent(self.legs[side].appendage_grp, self.rig_grp)
+    def build_leg(self, side):
+        logger.debug(f'build_leg {side}')
+        self.legs[side] = leg.Leg(rig_name.RigName(
+                                    full_name=self.settings.leg_appendage_name).rename(
+                                    side=side).output(),
+                                rig_name.RigName(
+                                    full_name=self.settings.leg_start_joint).rename(
+                                    side=side).output(),
+                                side,
+                                self.settings.leg_num_upperTwist_joints,
+                                self.settings.leg_num_lowerTwist_joints,
+                                input_matrix = self.root.result_matrix)
+
+        cmds.parent(self.legs[side].appendage_grp, self.rig_grp)
+        self.appendages.append(self.legs[side])
 
     def build_hands(self):
         logger.debug('build_hand')
-        self.hands = dict()
         for side in self.sides:
-            self.hands[side] = hand.Hand(self.settings.hand_appendage_name,
-                                        rig_name.RigName(
-                                            full_name=self.settings.hand_start_joint).rename(
-                                            side=side).output(),
-                                        side,
-                                        input_matrix = self.arms[side].result_matrix)
-            cmds.parent(self.hands[side].appendage_grp, self.rig_grp)
+            self.build_hand(side)
+
+    def build_hand(self, side):
+        logger.debug(f'build_hand {side}')
+        self.hands[side] = hand.Hand(self.settings.hand_appendage_name,
+                                    rig_name.RigName(
+                                        full_name=self.settings.hand_start_joint).rename(
+                                        side=side).output(),
+                                    side,
+                                    input_matrix = self.arms[side].result_matrix)
+        cmds.parent(self.hands[side].appendage_grp, self.rig_grp)
+        self.appendages.append(self.hands[side])
 
 def build_biped(rig_settings):
     logging.info(f'Building {rig_settings.asset_name} rig......')
 
     rig = Biped(rig_settings.asset_name)
     logging.info(f'Finished building rig: {rig}')
+    return rig
@@ -0,0 +1,404 @@
+'''
+build_cache.py
+
+Incremental rig rebuilds. The nodes each appendage build step creates are exported as a
+node fragment (.ma) and stored under a key made from
+    - the BipedSettings fields of the appendage
+    - a hash of the appendage's source skeleton (joint names, parents and transforms)
+    - the code version (source of the appendage classes and shared modules)
+    - the keys of the steps it depends on
+On the next build, steps whose key is unchanged re-import their fragment instead of running
+the procedural build, and only the changed appendages are rebuilt.
+
+Meant for rebuilding into a fresh scene (e.g. the skeleton file reopened). Besides its own
+nodes, a fragment records the connections to nodes outside it (input matrices, skeleton
+offsetParentMatrix), the parent of its top nodes, and the renames and transform changes the
+step made to its skeleton joints. Nodes are recorded by long name and UUID, appendages share
+short names (input_grp, output_grp, ...), so short names alone are ambiguous.
+
+e.g.
+BipedSettings(cache_dir='C:/temp/rig_cache')
+'''
+import hashlib
+import inspect
+import json
+import logging
+import os
+import time
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import adv_scripting.utilities as utils
+import adv_scripting.matrix_tools as matrix_tools
+import adv_scripting.rig_name as rig_name
+import adv_scripting.node_handle as node_handle
+
+logger = logging.getLogger(__name__)
+
+# Bump when the fragment or metadata layout changes
+CACHE_FORMAT = 2
+# Modules every appendage build goes through. Changing their source invalidates the cache.
+SHARED_MODULES = [utils, matrix_tools, rig_name]
+SKELETON_ATTRIBUTES = ['translate', 'rotate', 'scale', 'jointOrient']
+# Decimals kept when hashing transforms, so float noise does not miss the cache
+PRECISION = 5
+
+
+def normalize(values):
+    '''
+    Rounded to PRECISION. Adding 0.0 turns -0.0 into 0.0, which json.dumps writes differently.
+    '''
+    return [round(value, PRECISION) + 0.0 for value in values]
+
+
+def hash_data(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def settings_fields(settings, prefix):
+    '''
+    Settings of one appendage, e.g. every 'arm_' field of BipedSettings.
+
+    Returns dict
+    '''
+    return {field: value for field, value in vars(settings).items() if field.startswith(prefix)}
+
+
+def code_version(appendage_class):
+    '''
+    Hash of the source files of appendage_class, its base classes and SHARED_MODULES.
+    '''
+    files = list()
+    for cls in appendage_class.__mro__:
+        try:
+            files.append(inspect.getsourcefile(cls))
+        except TypeError: # builtins (object, ABC)
+            continue
+    files.extend(inspect.getsourcefile(module) for module in SHARED_MODULES)
+    digest = hashlib.sha1(str(CACHE_FORMAT).encode('utf-8'))
+    for path in sorted(set(file for file in files if file)):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def read_skeleton(start_joint, stop_joints=()):
+    '''
+    Snapshot of the joints from start_joint down, not entering stop_joints (the start joints
+    of other appendages). Stop joints and the parent joint of start_joint are included without
+    their children, a build may move them (e.g. the arm zeroes the clavicle and places the hand
+    joint).
+
+    Returns dict joint -> {'parent': str, 'uuid': str, <attribute>: value}
+    '''
+    children_index = utils.read_children_index(start_joint)
+    skeleton = dict()
+    stack = [(start_joint, None)]
+    parent = cmds.listRelatives(start_joint, parent=True, type='joint')
+    if parent:
+        stack.append((parent[0], None))
+        stop_joints = list(stop_joints) + parent
+    while stack:
+        joint, parent = stack.pop()
+        values = {'parent': parent, 'uuid': cmds.ls(joint, uuid=True)[0]}
+        for attribute in SKELETON_ATTRIBUTES:
+            if cmds.attributeQuery(attribute, node=joint, exists=True):
+                values[attribute] = normalize(cmds.getAttr(f'{joint}.{attribute}')[0])
+        skeleton[joint] = values
+        if joint in stop_joints and joint != start_joint:
+            continue
+        stack.extend((child, joint) for child in children_index.get(joint, []))
+    return skeleton
+
+
+def skeleton_hash(skeleton):
+    # UUIDs change between scenes, only names, parenting and transforms count
+    return hash_data({joint: {key: value for key, value in values.items() if key != 'uuid'}
+                      for joint, values in skeleton.items()})
+
+
+def skeleton_changes(before, after_names):
+    '''
+    Renames and transform changes made to the joints of a skeleton snapshot.
+
+    Arguments
+    before (dict): read_skeleton() result taken before the build
+    after_names (dict): uuid -> current joint name, None if deleted
+
+    Returns dict {'renames': {old: new}, 'attributes': {new name: {attribute: value}}}
+    '''
+    renames = dict()
+    attributes = dict()
+    for joint, values in before.items():
+        name = after_names.get(values['uuid'])
+        if not name:
+            continue
+        if name.split('|')[-1] != joint:
+            renames[joint] = name.split('|')[-1]
+        for attribute in SKELETON_ATTRIBUTES:
+            if attribute not in values:
+                continue
+            value = normalize(cmds.getAttr(f'{name}.{attribute}')[0])
+            if value != values[attribute]:
+                attributes.setdefault(name, dict())[attribute] = value
+    return {'renames': renames, 'attributes': attributes}
+
+
+class NodeRecorder():
+    '''
+    Collects the nodes created while recording, through an MDGMessage callback.
+    '''
+    def __init__(self):
+        self.handles = list()
+        self._callback_id = None
+
+    def __enter__(self):
+        self._callback_id = om.MDGMessage.addNodeAddedCallback(self._node_added, 'dependNode')
+        return self
+
+    def __exit__(self, *args):
+        om.MMessage.removeCallback(self._callback_id)
+
+    def _node_added(self, node, client_data):
+        self.handles.append(om.MObjectHandle(node))
+
+    def nodes(self):
+        '''
+        Returns long names of the recorded nodes that still exist.
+        '''
+        nodes = list()
+        for handle in self.handles:
+            if not handle.isValid():
+                continue
+            node = handle.object()
+            if node.hasFn(om.MFn.kDagNode):
+                nodes.append(om.MFnDagNode(node).fullPathName())
+            else:
+                nodes.append(om.MFnDependencyNode(node).name())
+        return list(dict.fromkeys(nodes))
+
+
+class CachedAppendage():
+    '''
+    Stand-in for an appendage restored from the cache. Holds the attributes of the built
+    appendage (names, controls, bnd joints) that other appendages and the rig read.
+    '''
+    def __init__(self, state):
+        self.__dict__.update(state)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}('{self.start_joint}', appendage_name='{self.appendage_name}')"
+
+    @property
+    def input(self):
+        if '_input_handle' not in vars(self):
+            self._input_handle = node_handle.NodeHandle.from_uuid(self._input)
+        return self._input_handle.name
+
+    @property
+    def output(self):
+        if '_output_handle' not in vars(self):
+            self._output_handle = node_handle.NodeHandle.from_uuid(self._output)
+        return self._output_handle.name
+
+    @property
+    def result_matrix(self):
+        return f'{self.output}.output_leaf_world_matrix'
+
+
+def appendage_state(appendage):
+    '''
+    JSON friendly copy of an appendage's attributes. Name objects are stored as strings.
+    '''
+    state = dict()
+    for attribute, value in vars(appendage).items():
+        if isinstance(value, node_handle.NodeHandle):
+            # Only valid in this session, restored appendages make new handles from the UUIDs
+            continue
+        try:
+            state[attribute] = json.loads(json.dumps(value, default=str))
+        except (TypeError, ValueError):
+            logger.debug(f'Not caching {attribute} of {appendage}')
+    # Input/output are stored by UUID, keep the names to find them if the UUID changes on import
+    state['input_name'] = cmds.ls(appendage._input)[0]
+    state['output_name'] = cmds.ls(appendage._output)[0]
+    return state
+
+
+class BuildCache():
+    '''
+    Arguments
+    cache_dir (str): directory holding the fragments and metadata of one asset
+    '''
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.keys = dict() # step name -> key
+        self.hits = list()
+        self.misses = list()
+        self.seconds = dict() # step name -> build or restore time
+
+    def step_key(self, name, settings, skeleton, appendage_class, dependencies):
+        return hash_data({'step': name,
+                          'settings': settings,
+                          'skeleton': skeleton_hash(skeleton),
+                          'code': code_version(appendage_class),
+                          'dependencies': [self.keys.get(dep) for dep in dependencies]})
+
+    def paths(self, name, key):
+        base = os.path.join(self.cache_dir, f'{name}_{key[:16]}')
+        return f'{base}.json', f'{base}.ma'
+
+    def cached_build(self, name, build, settings, start_joint, appendage_class,
+                     dependencies=(), stop_joints=(), get_appendage=None, set_appendage=None):
+        '''
+        Wrap a build step so it restores from the cache when its key is unchanged.
+
+        Arguments
+        name (str): build step name
+        build (callable): procedural build of the step
+        settings (dict): settings fields of the appendage, see settings_fields()
+        start_joint (str): first joint of the appendage's source skeleton
+        appendage_class (class): appendage class, for the code version
+        dependencies (str list): build steps this step depends on
+        stop_joints (str list): start joints of other appendages under start_joint
+        get_appendage (callable): returns the appendage the build created
+        set_appendage (callable): set_appendage(appendage) stores a restored appendage
+
+        Returns callable build step
+        '''
+        def cached():
+            timer = time.perf_counter()
+            skeleton = read_skeleton(start_joint, stop_joints)
+            key = self.step_key(name, settings, skeleton, appendage_class, dependencies)
+            self.keys[name] = key
+            metadata_path, fragment_path = self.paths(name, key)
+            if os.path.exists(metadata_path) and os.path.exists(fragment_path):
+                set_appendage(self.restore(metadata_path, fragment_path))
+                self.hits.append(name)
+            else:
+                with NodeRecorder() as recorder:
+                    build()
+                self.store(metadata_path, fragment_path, key, recorder.nodes(), skeleton,
+                           get_appendage())
+                self.misses.append(name)
+            self.seconds[name] = time.perf_counter() - timer
+        return cached
+
+    def store(self, metadata_path, fragment_path, key, nodes, skeleton, appendage):
+        '''
+        Export the nodes a step created and write its metadata.
+        '''
+        node_set = set(nodes)
+        parents = dict()
+        connections = list()
+        for node in nodes:
+            if cmds.objectType(node, isAType='dagNode'):
+                parent = cmds.listRelatives(node, parent=True, fullPath=True)
+                if parent and parent[0] not in node_set:
+                    parents[node] = parent[0]
+            # Connections to nodes outside the fragment are lost on export
+            for source, destination in self.external_connections(node, node_set):
+                connections.append([source, destination])
+
+        after_names = {values['uuid']: (cmds.ls(values['uuid']) or [None])[0]
+                       for values in skeleton.values()}
+
+        cmds.select(nodes, noExpand=True, replace=True)
+        cmds.file(fragment_path, exportSelectedStrict=True, type='mayaAscii', force=True,
+                  preserveReferences=False)
+        cmds.select(clear=True)
+
+        metadata = {'format': CACHE_FORMAT,
+                    'key': key,
+                    'nodes': {node: cmds.ls(node, uuid=True)[0] for node in nodes},
+                    'parents': parents,
+                    'connections': connections,
+                    'skeleton': skeleton_changes(skeleton, after_names),
+                    'state': appendage_state(appendage)}
+        with open(metadata_path, 'w') as f:
+            json.dump(metadata, f, indent=1)
+        logger.debug(f'Cached {len(nodes)} nodes: {fragment_path}')
+
+    def external_connections(self, node, node_set):
+        '''
+        Yields (source, destination) plugs, by long name, of the connections between node and
+        nodes outside node_set.
+        '''
+        for incoming in (True, False):
+            plugs = cmds.listConnections(node, source=incoming, destination=not incoming,
+                                         connections=True, plugs=True, fullNodeName=True,
+                                         skipConversionNodes=False) or []
+            for own, other in zip(plugs[::2], plugs[1::2]):
+                if other.split('.')[0] in node_set:
+                    continue
+                yield (other, own) if incoming else (own, other)
+
+    def imported_names(self, metadata, new_uuids):
+        '''
+        Returns dict of recorded long name -> current long name of the fragment nodes.
+        Imported nodes keep their UUID unless it is already in use, otherwise fall back on the
+        short name among the new nodes (import may have renamed it).
+        '''
+        new_nodes = [cmds.ls(uuid, long=True)[0] for uuid in new_uuids]
+        new_set = set(new_nodes)
+        by_short_name = dict()
+        for node in new_nodes:
+            by_short_name.setdefault(node.split('|')[-1], node)
+        names = dict()
+        for node, uuid in metadata['nodes'].items():
+            found = [name for name in cmds.ls(uuid, long=True) if name in new_set]
+            names[node] = found[0] if found else by_short_name.get(node.split('|')[-1], node)
+        return names
+
+    def restore(self, metadata_path, fragment_path):
+        '''
+        Import a cached fragment and reconnect it to the scene.
+
+        Returns CachedAppendage
+        '''
+        with open(metadata_path, 'r') as f:
+            metadata = json.load(f)
+
+        # Skeleton first, the connections use the renamed joints
+        for old, new in metadata['skeleton']['renames'].items():
+            if cmds.objExists(old):
+                cmds.rename(old, new)
+        for joint, attributes in metadata['skeleton']['attributes'].items():
+            for attribute, value in attributes.items():
+                if cmds.getAttr(f'{joint}.{attribute}', settable=True):
+                    cmds.setAttr(f'{joint}.{attribute}', *value)
+
+        new_nodes = cmds.file(fragment_path, i=True, type='mayaAscii', preserveReferences=False,
+                              mergeNamespacesOnClash=False, returnNewNodes=True) or []
+        new_uuids = cmds.ls(new_nodes, uuid=True)
+        names = self.imported_names(metadata, new_uuids)
+        for node, parent in metadata['parents'].items():
+            if not cmds.objExists(parent):
+                continue
+            name = cmds.parent(names[node], parent)[0]
+            if name.split('|')[-1] != node.split('|')[-1]:
+                # Back to the recorded name, so the long names of its children match again
+                cmds.rename(name, node.split('|')[-1])
+        names = self.imported_names(metadata, new_uuids)
+        for source, destination in metadata['connections']:
+            source, destination = [names.get(plug.split('.')[0], plug.split('.')[0]) +
+                                   plug[len(plug.split('.')[0]):]
+                                   for plug in (source, destination)]
+            if not cmds.objExists(source) or not cmds.objExists(destination):
+                logger.warning(f'Cannot reconnect {source} -> {destination}')
+                continue
+            if not cmds.isConnected(source, destination):
+                cmds.connectAttr(source, destination, force=True)
+
+        state = metadata['state']
+        for attribute in ('_input', '_output'):
+            if not cmds.ls(state[attribute]):
+                state[attribute] = cmds.ls(state[f"{attribute[1:]}_name"], uuid=True)[0]
+        return CachedAppendage(state)
+
+    def report(self):
+        lines = [f'Build cache: {len(self.hits)} hit(s), {len(self.misses)} rebuilt']
+        for name in self.keys:
+            status = 'hit' if name in self.hits else 'rebuilt'
+            lines.append(f'\t{name:<12}{status:<10}{self.seconds.get(name, 0.0):>8.2f}s')
+        return '\n'.join(lines)
@@ -0,0 +1,280 @@
+'''
+build_farm.py
+
+Headless batch builder for many rigs. Each asset is built in its own worker interpreter
+(mayapy) with a timeout, retries and its own log file. A summary with the build time of
+every asset is written when all jobs are done.
+
+Manifest (JSON list of asset specs):
+[{"asset_name": "hero", "skeleton_file": "/assets/hero/skeleton.ma",
+  "settings": {"arm_num_lowerTwist_joints": 2}},
+ {"asset_name": "villain", "skeleton_file": "/assets/villain/skeleton.ma"}]
+
+Run:
+mayapy -m adv_scripting.rig.build_farm manifest.json --output-dir /builds --workers 4
+
+The controller does not need Maya. Workers run with --mayapy (default: MAYAPY environment
+variable, else the current interpreter). Extra --python-path directories are put in front of
+the worker PYTHONPATH, e.g. a directory with a stand-in maya package for tests. With
+--fake-maya (or ADV_SCRIPTING_FAKE_MAYA=1 set) the default builder runs on the in-memory fake
+Maya engine (adv_scripting.fake_maya), which reads and writes its own scene files only.
+'''
+import argparse
+import importlib
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import traceback
+
+logger = logging.getLogger(__name__)
+
+# Directory containing the adv_scripting package, needed on the worker PYTHONPATH
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..'))
+DEFAULT_BUILDER = 'adv_scripting.rig.build_farm:build_asset'
+POLL_INTERVAL = 0.05
+
+
+# WORKER ===============================================================
+
+def build_asset(job):
+    '''
+    Default builder. Open the skeleton, build a Biped with the job's settings and save it.
+
+    Returns path of the saved rig file.
+    '''
+    if os.environ.get('ADV_SCRIPTING_FAKE_MAYA'):
+        import adv_scripting.fake_maya as fake_maya
+        fake_maya.install()
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+    import maya.cmds as cmds
+    import adv_scripting.rig.settings as rig_settings
+    import adv_scripting.rig.biped as biped
+
+    cmds.file(job['skeleton_file'], open=True, force=True)
+    settings = rig_settings.BipedSettings(asset_name=job['asset_name'], **job.get('settings', {}))
+    biped.Biped(settings.asset_name, settings)
+    cmds.file(rename=job['output_file'])
+    cmds.file(save=True, type='mayaAscii', force=True)
+    return job['output_file']
+
+
+def import_builder(builder):
+    '''
+    Arguments
+    builder (str): 'module:function'
+    '''
+    module_name, function_name = builder.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def run_worker(job_path):
+    '''
+    Worker entry point. Builds one job and writes its result file.
+
+    Returns process exit code
+    '''
+    with open(job_path, 'r') as f:
+        job = json.load(f)
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s - %(module)s - %(funcName)s - %(message)s')
+    logger.info(f"Building {job['asset_name']} (attempt {job['attempt']})")
+    result = {'asset_name': job['asset_name'], 'attempt': job['attempt']}
+    timer = time.perf_counter()
+    try:
+        result['output_file'] = import_builder(job['builder'])(job)
+        result['status'] = 'success'
+    except Exception:
+        logger.error(traceback.format_exc())
+        result['status'] = 'failed'
+        result['error'] = traceback.format_exc().strip().splitlines()[-1]
+    result['seconds'] = time.perf_counter() - timer
+    with open(job['result_file'], 'w') as f:
+        json.dump(result, f)
+    logger.info(f"{job['asset_name']}: {result['status']} in {result['seconds']:.2f}s")
+    return 0 if result['status'] == 'success' else 1
+
+
+# CONTROLLER ===========================================================
+
+class BuildFarm():
+    '''
+    Arguments
+    output_dir (str): rig files, logs, job files and the summary go here
+    workers (int): number of builds running at once
+    timeout (float): seconds before a build is killed
+    retries (int): extra attempts for a failed or timed out build
+    interpreter (str/None): worker executable, MAYAPY environment variable or sys.executable if None
+    python_path (str list): directories put in front of the worker PYTHONPATH
+    builder (str): 'module:function' building one job in the worker
+    '''
+    def __init__(self, output_dir, workers=2, timeout=1800, retries=1,
+                 interpreter=None, python_path=(), builder=DEFAULT_BUILDER):
+        self.output_dir = os.path.abspath(output_dir)
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.retries = retries
+        self.interpreter = interpreter or os.environ.get('MAYAPY') or sys.executable
+        self.python_path = [os.path.abspath(path) for path in python_path]
+        self.builder = builder
+        for folder in ('logs', 'jobs'):
+            os.makedirs(os.path.join(self.output_dir, folder), exist_ok=True)
+
+    def create_job(self, spec):
+        job = dict(spec)
+        job.setdefault('settings', dict())
+        job.setdefault('builder', self.builder)
+        job.setdefault('output_file', os.path.join(self.output_dir, f"{spec['asset_name']}.ma"))
+        job['attempt'] = 0
+        job['attempts'] = list()
+        return job
+
+    def worker_env(self):
+        env = dict(os.environ)
+        paths = self.python_path + [ROOT_DIR]
+        if env.get('PYTHONPATH'):
+            paths.append(env['PYTHONPATH'])
+        env['PYTHONPATH'] = os.pathsep.join(paths)
+        return env
+
+    def start(self, job):
+        '''
+        Launch a worker process for the next attempt of job.
+        '''
+        job['attempt'] += 1
+        name = f"{job['asset_name']}_{job['attempt']}"
+        job['log_file'] = os.path.join(self.output_dir, 'logs', f'{name}.log')
+        job['result_file'] = os.path.join(self.output_dir, 'jobs', f'{name}_result.json')
+        job_path = os.path.join(self.output_dir, 'jobs', f'{name}.json')
+        with open(job_path, 'w') as f:
+            json.dump({key: value for key, value in job.items() if key != 'attempts'}, f, indent=1)
+        log = open(job['log_file'], 'w')
+        process = subprocess.Popen([self.interpreter, '-m', 'adv_scripting.rig.build_farm',
+                                    '--worker', job_path],
+                                   stdout=log, stderr=subprocess.STDOUT, env=self.worker_env(),
+                                   cwd=self.output_dir)
+        logger.info(f"Started {job['asset_name']} attempt {job['attempt']} (pid {process.pid})")
+        return {'job': job, 'process': process, 'log': log, 'start': time.perf_counter()}
+
+    def finish(self, running, timed_out=False):
+        '''
+        Record the result of a finished or killed worker.
+
+        Returns True if the job should be retried.
+        '''
+        job = running['job']
+        running['log'].close()
+        attempt = {'attempt': job['attempt'],
+                   'log_file': job['log_file'],
+                   'wall_seconds': time.perf_counter() - running['start']}
+        if timed_out:
+            attempt['status'] = 'timeout'
+        elif os.path.exists(job['result_file']):
+            with open(job['result_file'], 'r') as f:
+                attempt.update(json.load(f))
+        else:
+            attempt['status'] = 'crashed'
+            attempt['exit_code'] = running['process'].returncode
+        job['attempts'].append(attempt)
+        logger.info(f"{job['asset_name']} attempt {job['attempt']}: {attempt['status']}")
+        return attempt['status'] != 'success' and job['attempt'] <= self.retries
+
+    def run(self, specs):
+        '''
+        Build every asset spec.
+
+        Returns summary dict, also written to <output_dir>/summary.json
+        '''
+        timer = time.perf_counter()
+        pending = [self.create_job(spec) for spec in specs]
+        jobs = list(pending)
+        running = list()
+        while pending or running:
+            while pending and len(running) < self.workers:
+                running.append(self.start(pending.pop(0)))
+            time.sleep(POLL_INTERVAL)
+            for item in list(running):
+                timed_out = False
+                if item['process'].poll() is None:
+                    if time.perf_counter() - item['start'] < self.timeout:
+                        continue
+                    item['process'].kill()
+                    item['process'].wait()
+                    timed_out = True
+                running.remove(item)
+                if self.finish(item, timed_out):
+                    pending.append(item['job'])
+
+        summary = self.summary(jobs, time.perf_counter() - timer)
+        with open(os.path.join(self.output_dir, 'summary.json'), 'w') as f:
+            json.dump(summary, f, indent=1)
+        logger.info(format_summary(summary))
+        return summary
+
+    def summary(self, jobs, seconds):
+        assets = list()
+        for job in jobs:
+            last = job['attempts'][-1]
+            assets.append({'asset_name': job['asset_name'],
+                           'status': last['status'],
+                           'attempts': len(job['attempts']),
+                           'build_seconds': last.get('seconds'),
+                           'wall_seconds': sum(attempt['wall_seconds'] for attempt in job['attempts']),
+                           'output_file': last.get('output_file'),
+                           'error': last.get('error'),
+                           'log_file': last['log_file'],
+                           'history': job['attempts']})
+        return {'seconds': seconds,
+                'succeeded': sum(asset['status'] == 'success' for asset in assets),
+                'failed': sum(asset['status'] != 'success' for asset in assets),
+                'assets': assets}
+
+
+def format_summary(summary):
+    lines = [f"Build farm: {summary['succeeded']} succeeded, {summary['failed']} failed "
+             f"in {summary['seconds']:.1f}s",
+             f"{'asset':<24}{'status':<10}{'attempts':>9}{'build s':>10}{'wall s':>10}"]
+    for asset in summary['assets']:
+        build_seconds = asset['build_seconds']
+        build_seconds = f'{build_seconds:.2f}' if build_seconds is not None else '-'
+        lines.append(f"{asset['asset_name']:<24}{asset['status']:<10}{asset['attempts']:>9}"
+                     f"{build_seconds:>10}{asset['wall_seconds']:>10.2f}")
+    return '\n'.join(lines)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Build rigs headless in worker processes.')
+    parser.add_argument('manifest', nargs='?', help='JSON list of asset specs')
+    parser.add_argument('--output-dir', default='rig_builds')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--timeout', type=float, default=1800)
+    parser.add_argument('--retries', type=int, default=1)
+    parser.add_argument('--mayapy', default=None, help='Worker interpreter')
+    parser.add_argument('--python-path', action='append', default=[])
+    parser.add_argument('--builder', default=DEFAULT_BUILDER)
+    parser.add_argument('--fake-maya', action='store_true',
+                        help='Build on the in-memory fake Maya engine instead of mayapy')
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.worker:
+        return run_worker(args.worker)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if args.fake_maya: # Inherited by the workers
+        os.environ['ADV_SCRIPTING_FAKE_MAYA'] = '1'
+    with open(args.manifest, 'r') as f:
+        specs = json.load(f)
+    farm = BuildFarm(args.output_dir, args.workers, args.timeout, args.retries,
+                     args.mayapy, args.python_path, args.builder)
+    summary = farm.run(specs)
+    return 0 if not summary['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
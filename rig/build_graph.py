@@ -0,0 +1,142 @@
+'''
+build_graph.py
+
+Dependency-graph scheduler for building rig appendages.
+
+Each appendage is added as a BuildStep that names the steps it takes inputs from. The
+scheduler orders the steps into phases: every step in a phase only depends on steps in
+earlier phases, so the steps of one phase (e.g. left and right arm) are independent of
+each other and can be built as a batch.
+
+e.g.
+import adv_scripting.rig.build_graph as build_graph
+scheduler = build_graph.BuildScheduler()
+scheduler.add('root', build_root)
+scheduler.add('spine', build_spine, dependencies=['root'])
+scheduler.add('lt_leg', build_leg, dependencies=['root'])
+print(scheduler.format_plan())
+scheduler.run()
+'''
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BuildStep():
+    '''
+    A single unit of work in a rig build.
+
+    Arguments
+    name (str): unique name of the step, e.g. 'lt_arm'
+    build (callable): called with no arguments to build the step
+    dependencies (str list): names of the steps that have to be built first
+    enabled (bool): disabled steps, and every step that depends on them, are skipped
+    '''
+    def __init__(self, name, build, dependencies=None, enabled=True):
+        self.name = name
+        self.build = build
+        self.dependencies = list(dependencies or [])
+        self.enabled = enabled
+
+    def __repr__(self):
+        return f'BuildStep({self.name!r}, dependencies={self.dependencies}, enabled={self.enabled})'
+
+
+class BuildScheduler():
+    '''
+    Collects BuildSteps and derives a topological build plan.
+    Steps are kept in the order they were added, which is also the order within a phase.
+    '''
+    def __init__(self):
+        self.steps = dict()
+        # Step name -> seconds its build took in the last run()
+        self.timings = dict()
+
+    def add(self, name, build, dependencies=None, enabled=True):
+        if name in self.steps:
+            raise ValueError(f"Build step '{name}' already exists.")
+        self.steps[name] = BuildStep(name, build, dependencies, enabled)
+        return self.steps[name]
+
+    def disable(self, names):
+        for name in names:
+            if name not in self.steps:
+                logger.warning(f"Cannot disable unknown build step '{name}'.")
+                continue
+            self.steps[name].enabled = False
+
+    def skipped(self):
+        '''
+        Names of steps that will not be built: disabled steps and their dependents.
+        '''
+        skipped = {name for name, step in self.steps.items() if not step.enabled}
+        changed = True
+        while changed:
+            changed = False
+            for name, step in self.steps.items():
+                if name not in skipped and skipped.intersection(step.dependencies):
+                    skipped.add(name)
+                    changed = True
+        return [name for name in self.steps if name in skipped]
+
+    def plan(self):
+        '''
+        Order the enabled steps into phases (Kahn's algorithm, one layer per phase).
+
+        Returns 2D list of step names, e.g.
+        [['root'], ['spine', 'lt_leg', 'rt_leg'], ['head', 'lt_arm', 'rt_arm'], ['lt_hand', 'rt_hand']]
+        '''
+        for name, step in self.steps.items():
+            missing = [dep for dep in step.dependencies if dep not in self.steps]
+            if missing:
+                raise ValueError(f"Build step '{name}' depends on unknown step(s) {missing}.")
+
+        skipped = set(self.skipped())
+        remaining = {name: set(step.dependencies)
+                     for name, step in self.steps.items() if name not in skipped}
+        phases = list()
+        while remaining:
+            phase = [name for name, dependencies in remaining.items() if not dependencies]
+            if not phase:
+                raise ValueError(f'Build steps have a dependency cycle: {sorted(remaining)}.')
+            for name in phase:
+                del remaining[name]
+            for dependencies in remaining.values():
+                dependencies.difference_update(phase)
+            phases.append(phase)
+        return phases
+
+    def format_plan(self, phases=None):
+        '''
+        Human readable build plan for logging or inspection.
+        '''
+        if phases is None:
+            phases = self.plan()
+        lines = list()
+        for index, phase in enumerate(phases):
+            lines.append(f'Phase {index}:')
+            for name in phase:
+                dependencies = ', '.join(self.steps[name].dependencies) or '-'
+                lines.append(f'\t{name} <- {dependencies}')
+        skipped = self.skipped()
+        if skipped:
+            lines.append(f"Skipped: {', '.join(skipped)}")
+        return '\n'.join(lines)
+
+    def run(self, phases=None):
+        '''
+        Build every step, phase by phase.
+
+        Returns the phases that were built.
+        '''
+        if phases is None:
+            phases = self.plan()
+        logger.info(f'Build plan:\n{self.format_plan(phases)}')
+        for index, phase in enumerate(phases):
+            logger.debug(f'Build phase {index}: {phase}')
+            for name in phase:
+                start = time.perf_counter()
+                self.steps[name].build()
+                self.timings[name] = time.perf_counter() - start
+        return phases
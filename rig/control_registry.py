@@ -0,0 +1,245 @@
+'''
+control_registry.py
+
+Indexed registry of the animation controls of a rig, stored on the rig top node:
+    controls (multi message): controls[i] is connected from the message of control i
+    control_registry (string): JSON metadata of every registered index, fields in FIELDS order
+        appendage: appendage_name of the appendage the control belongs to
+        side: 'lt', 'rt' or None
+        role: 'fk', 'ik' or 'switch'
+        label: key of the control in the appendage's controls dict, e.g. 'ctrl_0', 'pv_ctrl'
+        pose: default pose, keyable scalar attribute -> value at registration
+
+Reading the registry is two commands, whatever the size of the scene. Controls are found by
+connection, so renaming or reparenting them does not break the registry. Controls are returned
+by full path, appendages may share short names (e.g. the front and rear legs of a quadruped).
+
+e.g.
+import adv_scripting.rig.control_registry as control_registry
+control_registry.register_appendages(rig.rig_grp, rig.appendages)
+control_registry.get_controls(rig.rig_grp, role='ik', side='lt')
+control_registry.reset_pose(rig.rig_grp, appendage='lt_arm')
+'''
+import json
+import logging
+import maya.cmds as cmds
+
+logger = logging.getLogger(__name__)
+
+CONTROLS_ATTRIBUTE = 'controls'
+METADATA_ATTRIBUTE = 'control_registry'
+REGISTRY_VERSION = 1
+FIELDS = ('appendage', 'side', 'role', 'label', 'pose')
+ROLES = ('fk', 'ik', 'switch')
+# Appendage.controls keys -> registry role
+ROLE_KEYS = {'fk': 'fk', 'ik': 'ik', 'switch': 'switch', 'switches': 'switch'}
+# Decimals kept for default pose values
+POSE_PRECISION = 5
+
+
+# READ =================================================================
+
+def has_registry(top_node):
+    return cmds.attributeQuery(CONTROLS_ATTRIBUTE, node=top_node, exists=True) and \
+        cmds.attributeQuery(METADATA_ATTRIBUTE, node=top_node, exists=True)
+
+
+def read_metadata(top_node):
+    '''
+    Returns dict of registry index (int) -> metadata dict with FIELDS
+    '''
+    data = cmds.getAttr(f'{top_node}.{METADATA_ATTRIBUTE}')
+    data = json.loads(data) if data else {'version': REGISTRY_VERSION, 'entries': {}}
+    if data.get('version') != REGISTRY_VERSION:
+        raise ValueError(f"{top_node} has control registry version {data.get('version')}, "
+                         f"expected {REGISTRY_VERSION}.")
+    return {int(index): dict(zip(FIELDS, entry)) for index, entry in data['entries'].items()}
+
+
+def get_entries(top_node):
+    '''
+    Every registered control with its metadata, in registry order.
+
+    Returns list of dicts with 'control' (full path), 'index' and FIELDS
+    '''
+    if not has_registry(top_node):
+        return list()
+    metadata = read_metadata(top_node)
+    connections = cmds.listConnections(f'{top_node}.{CONTROLS_ATTRIBUTE}', source=True,
+                                       destination=False, connections=True,
+                                       fullNodeName=True) or []
+    entries = list()
+    for plug, control in zip(connections[::2], connections[1::2]):
+        index = int(plug.rpartition('[')[2].rstrip(']'))
+        entry = dict(metadata.get(index) or dict.fromkeys(FIELDS))
+        entry.update(control=control, index=index)
+        entries.append(entry)
+    return sorted(entries, key=lambda entry: entry['index'])
+
+
+def get_controls(top_node, role=None, appendage=None, side=None):
+    '''
+    Registered controls, filtered by any of role, appendage and side.
+
+    Arguments
+    top_node (str): rig top node
+    role (str/None): 'fk', 'ik' or 'switch'
+    appendage (str/None): appendage name
+    side (str/None): 'lt' or 'rt'
+
+    Returns list of control full paths
+    '''
+    if role is not None and role not in ROLES:
+        raise ValueError(f"Unknown control role '{role}', use one of {ROLES}.")
+    return [entry['control'] for entry in get_entries(top_node)
+            if (role is None or entry['role'] == role) and
+            (appendage is None or entry['appendage'] == appendage) and
+            (side is None or entry['side'] == side)]
+
+
+def format_summary(top_node):
+    '''
+    Number of registered controls per appendage and role.
+    '''
+    counts = dict()
+    for entry in get_entries(top_node):
+        roles = counts.setdefault(entry['appendage'], dict.fromkeys(ROLES, 0))
+        roles[entry['role']] = roles.get(entry['role'], 0) + 1
+    lines = [f"Control registry: {top_node}",
+             f"{'appendage':<28}" + ''.join(f'{role:>8}' for role in ROLES)]
+    for appendage, roles in counts.items():
+        lines.append(f'{str(appendage):<28}' + ''.join(f'{roles[role]:>8}' for role in ROLES))
+    return '\n'.join(lines)
+
+
+# WRITE ================================================================
+
+def read_pose(control):
+    '''
+    Returns dict of keyable scalar attribute -> value
+    '''
+    pose = dict()
+    for attribute in cmds.listAttr(control, keyable=True, scalar=True) or []:
+        value = cmds.getAttr(f'{control}.{attribute}')
+        if isinstance(value, (int, float)):
+            pose[attribute] = round(value, POSE_PRECISION)
+    return pose
+
+
+def create_registry(top_node):
+    if not cmds.attributeQuery(CONTROLS_ATTRIBUTE, node=top_node, exists=True):
+        cmds.addAttr(top_node, longName=CONTROLS_ATTRIBUTE, attributeType='message', multi=True)
+    if not cmds.attributeQuery(METADATA_ATTRIBUTE, node=top_node, exists=True):
+        cmds.addAttr(top_node, longName=METADATA_ATTRIBUTE, dataType='string')
+
+
+def register_controls(top_node, entries):
+    '''
+    Add controls to the registry. Controls that are already registered are skipped.
+
+    Arguments
+    top_node (str): rig top node
+    entries (list): dicts with 'control' and the FIELDS, 'pose' is read from the control if
+        missing
+
+    Returns list of the registered control full paths
+    '''
+    create_registry(top_node)
+    metadata = read_metadata(top_node)
+    registered = {entry['control'] for entry in get_entries(top_node)}
+    index = max(metadata, default=-1) + 1
+    added = list()
+    for entry in entries:
+        control = entry['control']
+        matches = cmds.ls(control, long=True)
+        if len(matches) != 1:
+            logger.warning(f"Not registering {control}, "
+                           f"{'more than one object matches' if matches else 'it does not exist'}.")
+            continue
+        long_name = matches[0]
+        if long_name in registered:
+            continue
+        if entry.get('role') not in ROLES:
+            raise ValueError(f"Unknown control role '{entry.get('role')}', use one of {ROLES}.")
+        cmds.connectAttr(f'{long_name}.message', f'{top_node}.{CONTROLS_ATTRIBUTE}[{index}]')
+        fields = dict(entry)
+        if fields.get('pose') is None:
+            fields['pose'] = read_pose(long_name)
+        metadata[index] = {field: fields.get(field) for field in FIELDS}
+        registered.add(long_name)
+        added.append(long_name)
+        index += 1
+    write_metadata(top_node, metadata)
+    logger.debug(f'Registered {len(added)} control(s) on {top_node}')
+    return added
+
+
+def write_metadata(top_node, metadata):
+    data = {'version': REGISTRY_VERSION,
+            'entries': {str(index): [entry[field] for field in FIELDS]
+                        for index, entry in sorted(metadata.items())}}
+    cmds.setAttr(f'{top_node}.{METADATA_ATTRIBUTE}', json.dumps(data, separators=(',', ':')),
+                 type='string')
+
+
+def appendage_entries(appendage):
+    '''
+    Registry entries for the controls of an appendage. Nested control dicts (e.g. the fingers
+    of a hand) are walked, their labels joined with '.'. A control name that does not match
+    exactly one node (a short name several appendages use, a path from before the control was
+    parented) resolves by short name under the appendage's group.
+    '''
+    side = getattr(appendage, 'side', None)
+    side = str(side) if side else None
+    group = getattr(appendage, 'appendage_grp', None)
+    group = cmds.ls(str(group), long=True) if group else []
+
+    def resolve(control):
+        if len(cmds.ls(control)) == 1 or len(group) != 1:
+            return control
+        inside = [match for match in cmds.ls(control.split('|')[-1], long=True)
+                  if match.startswith(group[0] + '|')]
+        return inside[0] if len(inside) == 1 else control
+
+    def walk(controls, role, label):
+        for key, value in controls.items():
+            key = str(key)
+            key_label = f'{label}.{key}' if label else key
+            if isinstance(value, dict):
+                if role is None and key in ROLE_KEYS:
+                    yield from walk(value, ROLE_KEYS[key], label)
+                else:
+                    yield from walk(value, role, key_label)
+            elif role is not None and value:
+                yield {'control': resolve(str(value)), 'appendage': str(appendage.appendage_name),
+                       'side': side, 'role': role, 'label': key_label}
+
+    return list(walk(appendage.controls, None, ''))
+
+
+def register_appendages(top_node, appendages):
+    '''
+    Register the controls of built appendages.
+
+    Returns list of the registered control full paths
+    '''
+    entries = list()
+    for appendage in appendages:
+        entries.extend(appendage_entries(appendage))
+    return register_controls(top_node, entries)
+
+
+def reset_pose(top_node, role=None, appendage=None, side=None):
+    '''
+    Set controls back to their registered default pose. Locked or connected attributes are
+    left alone.
+    '''
+    for entry in get_entries(top_node):
+        if (role is not None and entry['role'] != role) or \
+                (appendage is not None and entry['appendage'] != appendage) or \
+                (side is not None and entry['side'] != side):
+            continue
+        for attribute, value in (entry['pose'] or {}).items():
+            plug = f"{entry['control']}.{attribute}"
+            if cmds.getAttr(plug, settable=True):
+                cmds.setAttr(plug, value)
@@ -0,0 +1,132 @@
+'''
+replay_benchmark.py
+
+Rig build time on a generated skeleton: the procedural Biped build against a replay of its
+captured description (rig_description.replay). Each run generates the skeleton in a new scene
+and times the build, or the replay of the description captured from the first build. The
+replayed rig must diff equivalent to the built one.
+
+Run:
+mayapy -m adv_scripting.rig.replay_benchmark --generator biped --repeat 3
+python -m adv_scripting.rig.replay_benchmark --fake-maya
+'''
+import argparse
+import json
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+GENERATOR_NAMES = ('biped', 'quadruped', 'creature')
+BUILDERS = ('build', 'replay')
+
+
+# RUN ==================================================================
+
+def new_skeleton(generator):
+    '''
+    New scene with a generated skeleton.
+
+    Returns skeleton_generator.Skeleton
+    '''
+    import maya.cmds as cmds
+    import adv_scripting.rig.skeleton_generator as skeleton_generator
+    cmds.file(new=True, force=True)
+    return skeleton_generator.GENERATORS[generator]()
+
+
+def build(generator):
+    '''
+    Build a Biped on a new generated skeleton.
+
+    Returns (seconds, top nodes the build added)
+    '''
+    import maya.cmds as cmds
+    import adv_scripting.rig.biped as biped
+    import adv_scripting.rig.settings as rig_settings
+    skeleton = new_skeleton(generator)
+    before = set(cmds.ls(assemblies=True))
+    settings = rig_settings.BipedSettings(asset_name=f'{generator}_replay', **skeleton.settings)
+    start = time.perf_counter()
+    biped.Biped(settings.asset_name, settings)
+    seconds = time.perf_counter() - start
+    # The rig group, plus controls the build leaves at the world
+    return seconds, [node for node in cmds.ls(assemblies=True) if node not in before]
+
+
+def replay(generator, description):
+    '''
+    Replay description on a new generated skeleton.
+
+    Returns seconds
+    '''
+    import adv_scripting.rig.rig_description as rig_description
+    new_skeleton(generator)
+    start = time.perf_counter()
+    rig_description.replay(description)
+    return time.perf_counter() - start
+
+
+def run(generator='biped', repeat=3):
+    '''
+    Returns dict of builder -> dict with nodes and (fastest) seconds
+    '''
+    import maya.cmds as cmds
+    import adv_scripting.rig.rig_description as rig_description
+    build_seconds, top_nodes = build(generator)
+    description = rig_description.capture(top_nodes)
+    # Replay from what load() returns, not the captured objects
+    description = json.loads(json.dumps(description))
+    for _ in range(repeat - 1):
+        build_seconds = min(build_seconds, build(generator)[0])
+
+    replay_seconds = None
+    for _ in range(repeat):
+        seconds = replay(generator, description)
+        replay_seconds = seconds if replay_seconds is None else min(replay_seconds, seconds)
+    difference = rig_description.diff(description, rig_description.capture(top_nodes))
+    cmds.file(new=True, force=True)
+    if not rig_description.is_equivalent(difference):
+        raise RuntimeError(f'Replayed rig differs from the build: {difference}')
+
+    nodes = len(description['nodes'])
+    return {'build': {'nodes': nodes, 'seconds': build_seconds},
+            'replay': {'nodes': nodes, 'seconds': replay_seconds}}
+
+
+def format_results(results):
+    lines = [f"{'builder':<10}{'nodes':>10}{'seconds':>10}"]
+    for name, result in results.items():
+        lines.append(f"{name:<10}{result['nodes']:>10}{result['seconds']:>10.3f}")
+    if results['replay']['seconds']:
+        lines.append(f"speedup: {results['build']['seconds'] / results['replay']['seconds']:.1f}x")
+    return '\n'.join(lines)
+
+
+# MAIN =================================================================
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmark rig replay against a procedural build.')
+    parser.add_argument('--generator', choices=GENERATOR_NAMES, default='biped')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fake-maya', action='store_true',
+                        help='Run on the in-memory fake Maya engine instead of mayapy')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if args.fake_maya:
+        import adv_scripting.fake_maya as fake_maya
+        fake_maya.install()
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+
+    print(format_results(run(args.generator, args.repeat)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
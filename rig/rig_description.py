@@ -0,0 +1,526 @@
+'''
+rig_description.py
+
+Declarative description of a built rig and a fast replay builder.
+
+capture() records the node graph under a rig's top node (nodes, parenting, non-default
+attribute values, dynamic attributes, nurbs curve shapes and connections) into a plain dict
+that is saved as compact JSON. replay() recreates the rig from the description in a few
+bulk DG/DAG modifier passes without running the procedural appendage code. diff()
+compares two descriptions, so capturing a replayed rig and diffing it against the original
+confirms the replay is equivalent. replay_benchmark.py times a replay against the procedural
+Biped build it was captured from.
+
+Existing joints (the source skeleton) are reused by name instead of created.
+
+e.g.
+import adv_scripting.rig.rig_description as rig_description
+description = rig_description.capture('biped_grp')
+rig_description.save(description, 'C:/temp/biped_rig.json')
+# New scene with the skeleton
+nodes = rig_description.replay(rig_description.load('C:/temp/biped_rig.json'))
+print(rig_description.diff(description, rig_description.capture('biped_grp')))
+'''
+import json
+import logging
+import time
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+logger = logging.getLogger(__name__)
+
+DESCRIPTION_FORMAT = 1
+# Connected DG nodes of these types belong to the scene, not the rig
+EXCLUDE_TYPES = {'hyperLayout', 'nodeGraphEditorInfo', 'objectSet', 'shadingEngine',
+                 'displayLayer', 'renderLayer', 'groupId', 'time'}
+# Attribute types captured by value
+NUMERIC_TYPES = {'double', 'float', 'doubleLinear', 'doubleAngle', 'long', 'short', 'byte',
+                 'enum', 'bool', 'time'}
+VALUE_TYPES = NUMERIC_TYPES | {'matrix', 'string'}
+# Node types that are reused from the scene when a single node of the same name exists
+REUSE_TYPES = {'joint'}
+# Values closer than this are equal, both when dropping defaults and when diffing
+TOLERANCE = 1e-4
+
+
+# CAPTURE ==============================================================
+
+def collect_nodes(rig_grp):
+    '''
+    The rig top node, its DAG descendants and the DG nodes connected to them.
+
+    Returns list of node keys: long names for DAG nodes, names for DG nodes.
+    Parents come before their children.
+    '''
+    nodes = cmds.ls(rig_grp, dag=True, long=True)
+    seen = set(nodes)
+    defaults = set(cmds.ls(defaultNodes=True))
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        for other in set(cmds.listConnections(node, source=True, destination=True) or []):
+            if other in seen or other in defaults:
+                continue
+            seen.add(other)
+            if cmds.objectType(other, isAType='dagNode') or cmds.nodeType(other) in EXCLUDE_TYPES:
+                continue
+            nodes.append(other)
+            stack.append(other)
+    return nodes
+
+
+def read_attributes(node):
+    '''
+    Settable attribute values of a node.
+
+    Returns dict plug -> [attribute type, value]
+    '''
+    attributes = dict()
+    for attribute in cmds.listAttr(node, settable=True, multi=True) or []:
+        plug = f'{node}.{attribute}'
+        try:
+            attribute_type = cmds.getAttr(plug, type=True)
+        except (RuntimeError, ValueError):
+            continue
+        if attribute_type not in VALUE_TYPES:
+            continue
+        try:
+            value = cmds.getAttr(plug)
+        except (RuntimeError, ValueError):
+            continue
+        if value is None:
+            continue
+        attributes[attribute] = [attribute_type, value]
+    return attributes
+
+
+class DefaultValues():
+    '''
+    Attribute defaults per node type, read from a scratch node of each type.
+    '''
+    def __init__(self):
+        self.defaults = dict()
+
+    def get(self, node_type):
+        if node_type not in self.defaults:
+            try:
+                scratch = cmds.createNode(node_type, skipSelect=True)
+            except RuntimeError:
+                logger.debug(f'Cannot create {node_type} to read defaults.')
+                self.defaults[node_type] = dict()
+                return self.defaults[node_type]
+            self.defaults[node_type] = read_attributes(scratch)
+            # Shapes get a parent transform, delete both
+            parent = cmds.listRelatives(scratch, parent=True, fullPath=True)
+            cmds.delete(parent or scratch)
+        return self.defaults[node_type]
+
+
+def read_dynamic_attributes(node):
+    '''
+    Returns list of dicts describing the user defined attributes of node.
+    '''
+    dynamic = list()
+    for attribute in cmds.listAttr(node, userDefined=True) or []:
+        if '.' in attribute:
+            continue
+        spec = {'name': attribute,
+                'type': cmds.attributeQuery(attribute, node=node, attributeType=True),
+                'nice_name': cmds.attributeQuery(attribute, node=node, niceName=True),
+                'keyable': cmds.attributeQuery(attribute, node=node, keyable=True),
+                'hidden': cmds.attributeQuery(attribute, node=node, hidden=True)}
+        if spec['type'] == 'typed':
+            spec['type'] = 'typed_' + (cmds.getAttr(f'{node}.{attribute}', type=True) or 'string')
+        if spec['type'] == 'enum':
+            spec['fields'] = cmds.attributeQuery(attribute, node=node, listEnum=True)[0]
+        if spec['type'] in NUMERIC_TYPES:
+            if cmds.attributeQuery(attribute, node=node, minExists=True):
+                spec['min'] = cmds.attributeQuery(attribute, node=node, minimum=True)[0]
+            if cmds.attributeQuery(attribute, node=node, maxExists=True):
+                spec['max'] = cmds.attributeQuery(attribute, node=node, maximum=True)[0]
+        dynamic.append(spec)
+    return dynamic
+
+
+def read_curve(shape):
+    fn_curve = om.MFnNurbsCurve(get_object(shape))
+    return {'cvs': [(p.x, p.y, p.z) for p in fn_curve.cvPositions()],
+            'knots': list(fn_curve.knots()),
+            'degree': fn_curve.degree,
+            'form': fn_curve.form}
+
+
+def capture(rig_grp):
+    '''
+    Describe the rig under rig_grp (str or str list of top nodes).
+
+    Returns dict
+        'nodes': list of {'name', 'type', 'parent', 'attributes', 'dynamic'(, 'curve')}
+        'connections': list of [source plug, destination plug]
+    '''
+    timer = time.perf_counter()
+    nodes = collect_nodes(rig_grp)
+    keys = set(nodes)
+    defaults = DefaultValues()
+    long_names = dict()
+
+    def node_key(plug):
+        node, attribute = plug.split('.', 1)
+        if node not in long_names:
+            long_names[node] = cmds.ls(node, long=True)[0]
+        return f'{long_names[node]}.{attribute}'
+
+    description = {'format': DESCRIPTION_FORMAT, 'root': cmds.ls(rig_grp, long=True)[0],
+                   'nodes': list(), 'connections': list()}
+    for node in nodes:
+        node_type = cmds.nodeType(node)
+        parent = cmds.listRelatives(node, parent=True, fullPath=True) if node.startswith('|') else None
+        type_defaults = defaults.get(node_type)
+        attributes = {attribute: value for attribute, value in read_attributes(node).items()
+                      if not values_equal(type_defaults.get(attribute), value, TOLERANCE)}
+        entry = {'name': node,
+                 'type': node_type,
+                 'parent': parent[0] if parent else None,
+                 'attributes': attributes,
+                 'dynamic': read_dynamic_attributes(node)}
+        if node_type == 'nurbsCurve':
+            entry['curve'] = read_curve(node)
+        description['nodes'].append(entry)
+
+        # Incoming connections, every captured connection has its destination on a captured node
+        plugs = cmds.listConnections(node, source=True, destination=False,
+                                     connections=True, plugs=True) or []
+        for destination, source in zip(plugs[::2], plugs[1::2]):
+            description['connections'].append([node_key(source), node_key(destination)])
+    # Outgoing connections to nodes outside the rig (e.g. skeleton offsetParentMatrix)
+    for node in nodes:
+        plugs = cmds.listConnections(node, source=False, destination=True,
+                                     connections=True, plugs=True) or []
+        for source, destination in zip(plugs[::2], plugs[1::2]):
+            if node_key(destination).split('.')[0] not in keys:
+                description['connections'].append([node_key(source), node_key(destination)])
+
+    logger.info(f"Captured {len(description['nodes'])} nodes, "
+                f"{len(description['connections'])} connections in {time.perf_counter() - timer:.2f}s")
+    return description
+
+
+def save(description, path):
+    with open(path, 'w') as f:
+        json.dump(description, f, separators=(',', ':'))
+    return path
+
+
+def load(path):
+    with open(path, 'r') as f:
+        description = json.load(f)
+    if description.get('format') != DESCRIPTION_FORMAT:
+        raise ValueError(f"{path} has description format {description.get('format')}, "
+                         f"expected {DESCRIPTION_FORMAT}.")
+    return description
+
+
+# REPLAY ===============================================================
+
+def get_object(node):
+    selection = om.MSelectionList()
+    selection.add(node)
+    return selection.getDependNode(0)
+
+
+def find_plug(node, attribute):
+    '''
+    MPlug of an attribute path on an MObject, e.g. 'matrixIn[1]' or 'translate.translateX'.
+    '''
+    fn_node = om.MFnDependencyNode(node)
+    plug = None
+    for part in attribute.split('.'):
+        name, _, index = part.partition('[')
+        attribute_object = fn_node.attribute(name)
+        plug = fn_node.findPlug(attribute_object, False) if plug is None else plug.child(attribute_object)
+        if index:
+            plug = plug.elementByLogicalIndex(int(index.rstrip(']')))
+    return plug
+
+
+def find_existing(entry):
+    '''
+    Scene node to reuse for a description entry, None to create it.
+    '''
+    if cmds.objExists(entry['name']) and cmds.nodeType(entry['name']) == entry['type']:
+        return get_object(entry['name'])
+    if entry['type'] in REUSE_TYPES:
+        matches = cmds.ls(entry['name'].split('|')[-1], type=entry['type'], long=True)
+        if len(matches) == 1:
+            return get_object(matches[0])
+    return None
+
+
+def create_attribute(spec):
+    '''
+    Build an MObject attribute from a read_dynamic_attributes() spec.
+    '''
+    name = spec['name']
+    attribute_type = spec['type']
+    if attribute_type == 'message':
+        fn = om.MFnMessageAttribute()
+        attribute = fn.create(name, name)
+    elif attribute_type == 'matrix':
+        fn = om.MFnMatrixAttribute()
+        attribute = fn.create(name, name, om.MFnMatrixAttribute.kDouble)
+    elif attribute_type == 'typed_string':
+        fn = om.MFnTypedAttribute()
+        attribute = fn.create(name, name, om.MFnData.kString)
+    elif attribute_type == 'typed_matrix':
+        fn = om.MFnTypedAttribute()
+        attribute = fn.create(name, name, om.MFnData.kMatrix)
+    elif attribute_type == 'enum':
+        fn = om.MFnEnumAttribute()
+        attribute = fn.create(name, name)
+        for index, field in enumerate(spec['fields'].split(':')):
+            field, _, value = field.partition('=')
+            fn.addField(field, int(value) if value else index)
+    elif attribute_type in ('doubleLinear', 'doubleAngle', 'time'):
+        fn = om.MFnUnitAttribute()
+        unit = {'doubleLinear': om.MFnUnitAttribute.kDistance,
+                'doubleAngle': om.MFnUnitAttribute.kAngle,
+                'time': om.MFnUnitAttribute.kTime}[attribute_type]
+        attribute = fn.create(name, name, unit)
+    elif attribute_type in NUMERIC_TYPES:
+        fn = om.MFnNumericAttribute()
+        numeric = {'double': om.MFnNumericData.kDouble,
+                   'float': om.MFnNumericData.kFloat,
+                   'long': om.MFnNumericData.kInt,
+                   'short': om.MFnNumericData.kShort,
+                   'byte': om.MFnNumericData.kByte,
+                   'bool': om.MFnNumericData.kBoolean}[attribute_type]
+        attribute = fn.create(name, name, numeric)
+        if 'min' in spec:
+            fn.setMin(spec['min'])
+        if 'max' in spec:
+            fn.setMax(spec['max'])
+    else:
+        logger.warning(f"Cannot replay dynamic attribute '{name}' of type {attribute_type}.")
+        return None
+    fn.keyable = spec['keyable']
+    fn.hidden = spec['hidden']
+    if spec.get('nice_name'):
+        fn.setNiceNameOverride(spec['nice_name'])
+    return attribute
+
+
+def is_driven(plug):
+    '''
+    True when plug, or the compound it belongs to, has an incoming connection.
+    '''
+    return plug.isDestination or plug.isChild and plug.parent().isDestination
+
+
+def set_plug_value(modifier, plug, attribute_type, value):
+    if attribute_type == 'matrix':
+        data = om.MFnMatrixData().create(om.MMatrix(value))
+        modifier.newPlugValue(plug, data)
+    elif attribute_type == 'string':
+        modifier.newPlugValueString(plug, value)
+    elif attribute_type == 'doubleLinear':
+        modifier.newPlugValueMDistance(plug, om.MDistance(value, om.MDistance.uiUnit()))
+    elif attribute_type == 'doubleAngle':
+        modifier.newPlugValueMAngle(plug, om.MAngle(value, om.MAngle.uiUnit()))
+    elif attribute_type == 'time':
+        modifier.newPlugValueMTime(plug, om.MTime(value, om.MTime.uiUnit()))
+    elif attribute_type == 'bool':
+        modifier.newPlugValueBool(plug, bool(value))
+    elif attribute_type in ('long', 'short', 'byte', 'enum'):
+        modifier.newPlugValueInt(plug, int(value))
+    else:
+        modifier.newPlugValueDouble(plug, float(value))
+
+
+def replay(description):
+    '''
+    Recreate a captured rig through DG/DAG modifiers. Nodes are tracked by the MObject they
+    were created as, names are only used for nodes outside the description. Reused nodes get
+    the type default of the attributes the description leaves out.
+
+    Returns dict of description node name -> MObjectHandle
+    '''
+    timer = time.perf_counter()
+    objects = dict()
+    created = list()
+    curves = list()
+
+    # Pass 1: create and parent nodes. Existing nodes are looked up first, createNode adds
+    # nodes with default names (multMatrix1, ...) that could match a captured name.
+    existing_nodes = [find_existing(entry) for entry in description['nodes']]
+    dg_modifier = om.MDGModifier()
+    dag_modifier = om.MDagModifier()
+    for entry, existing in zip(description['nodes'], existing_nodes):
+        parent = objects.get(entry['parent']) if entry['parent'] else None
+        if parent is None and entry['parent'] and cmds.objExists(entry['parent']):
+            parent = get_object(entry['parent'])
+        if existing is not None:
+            objects[entry['name']] = existing
+            if parent is not None and om.MFnDagNode(existing).parent(0) != parent:
+                dag_modifier.reparentNode(existing, parent)
+            continue
+        if entry['type'] == 'nurbsCurve':
+            curves.append((entry, parent)) # Created from its cvs after the parent exists
+            continue
+        if entry['name'].startswith('|'):
+            node = dag_modifier.createNode(entry['type'], parent or om.MObject.kNullObj)
+        else:
+            node = dg_modifier.createNode(entry['type'])
+        objects[entry['name']] = node
+        created.append(entry['name'])
+    dg_modifier.doIt()
+    dag_modifier.doIt()
+
+    # New nodes have default names (multMatrix1, ...) that can hold the captured name of a node
+    # renamed later, so move them out of the way before naming them
+    for modifier_names in ([f'{name.split("|")[-1]}_replay' for name in created],
+                           [name.split('|')[-1] for name in created]):
+        modifier = om.MDGModifier()
+        for name, new_name in zip(created, modifier_names):
+            modifier.renameNode(objects[name], new_name)
+        modifier.doIt()
+
+    for entry, parent in curves:
+        curve = entry['curve']
+        node = om.MFnNurbsCurve().create([om.MPoint(*cv) for cv in curve['cvs']],
+                                         curve['knots'], curve['degree'], curve['form'],
+                                         False, True, parent)
+        om.MFnDependencyNode(node).setName(entry['name'].split('|')[-1])
+        objects[entry['name']] = node
+        created.append(entry['name'])
+
+    # Pass 2: dynamic attributes
+    modifier = om.MDGModifier()
+    for entry in description['nodes']:
+        fn_node = om.MFnDependencyNode(objects[entry['name']])
+        for spec in entry['dynamic']:
+            if fn_node.hasAttribute(spec['name']):
+                continue
+            attribute = create_attribute(spec)
+            if attribute is not None:
+                modifier.addAttribute(objects[entry['name']], attribute)
+    modifier.doIt()
+
+    # Pass 3: values and connections
+    def resolve(plug):
+        node, attribute = plug.split('.', 1)
+        if node not in objects:
+            objects[node] = get_object(node)
+        return find_plug(objects[node], attribute)
+
+    defaults = DefaultValues()
+    modifier = om.MDGModifier()
+    for entry, existing in zip(description['nodes'], existing_nodes):
+        attributes = entry['attributes']
+        if existing is not None:
+            attributes = dict(defaults.get(entry['type']), **attributes)
+        for attribute, (attribute_type, value) in attributes.items():
+            try:
+                plug = find_plug(objects[entry['name']], attribute)
+            except RuntimeError:
+                logger.debug(f"Cannot find {entry['name']}.{attribute}")
+                continue
+            if plug.isLocked or attribute not in entry['attributes'] and is_driven(plug):
+                continue
+            set_plug_value(modifier, plug, attribute_type, value)
+    for source, destination in description['connections']:
+        try:
+            source_plug = resolve(source)
+            destination_plug = resolve(destination)
+        except RuntimeError:
+            logger.warning(f'Cannot reconnect {source} -> {destination}')
+            continue
+        if destination_plug.isDestination:
+            if destination_plug.source() == source_plug:
+                continue
+            modifier.disconnect(destination_plug.source(), destination_plug)
+        modifier.connect(source_plug, destination_plug)
+    modifier.doIt()
+
+    logger.info(f"Replayed {len(created)} nodes, {len(description['connections'])} connections "
+                f'in {time.perf_counter() - timer:.2f}s')
+    return {entry['name']: om.MObjectHandle(objects[entry['name']])
+            for entry in description['nodes']}
+
+
+def replay_file(path):
+    '''
+    Build a rig from a saved description.
+    '''
+    return replay(load(path))
+
+
+# DIFF =================================================================
+
+def values_equal(a, b, tolerance, angle=False):
+    '''
+    Compare attribute values, element wise for lists. Angles are compared modulo 360.
+    '''
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(values_equal(x, y, tolerance, angle) for x, y in zip(a, b))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        difference = a - b
+        if angle:
+            difference = (difference + 180.0) % 360.0 - 180.0
+        return abs(difference) <= tolerance
+    return a == b
+
+
+def diff(description_a, description_b, tolerance=TOLERANCE, defaults=None):
+    '''
+    Compare two rig descriptions. An attribute left out of one description (it was at its
+    default when captured) is compared against the default of the node type.
+
+    Arguments
+    defaults (DefaultValues): type defaults, read from scratch nodes in the current scene when
+        None
+
+    Returns dict, all empty when the rigs are equivalent
+        'missing': nodes only in a
+        'extra': nodes only in b
+        'changed': node -> list of differences (type, parent, attribute values)
+        'missing_connections' / 'extra_connections': [source, destination] only in a / b
+    '''
+    nodes_a = {entry['name']: entry for entry in description_a['nodes']}
+    nodes_b = {entry['name']: entry for entry in description_b['nodes']}
+    result = {'missing': sorted(set(nodes_a) - set(nodes_b)),
+              'extra': sorted(set(nodes_b) - set(nodes_a)),
+              'changed': dict(),
+              'missing_connections': list(),
+              'extra_connections': list()}
+
+    for name in set(nodes_a) & set(nodes_b):
+        a, b = nodes_a[name], nodes_b[name]
+        changes = list()
+        for field in ('type', 'parent'):
+            if a[field] != b[field]:
+                changes.append(f'{field}: {a[field]} != {b[field]}')
+        for attribute in set(a['attributes']) | set(b['attributes']):
+            default = [None, None]
+            if attribute not in a['attributes'] or attribute not in b['attributes']:
+                defaults = defaults or DefaultValues()
+                default = defaults.get(a['type']).get(attribute, [None, None])
+            attribute_type, value_a = a['attributes'].get(attribute, default)
+            value_b = b['attributes'].get(attribute, default)[1]
+            if not values_equal(value_a, value_b, tolerance, attribute_type == 'doubleAngle'):
+                changes.append(f'{attribute}: {value_a} != {value_b}')
+        dynamic_a = {spec['name'] for spec in a['dynamic']}
+        dynamic_b = {spec['name'] for spec in b['dynamic']}
+        if dynamic_a != dynamic_b:
+            changes.append(f'dynamic attributes: {sorted(dynamic_a ^ dynamic_b)}')
+        if changes:
+            result['changed'][name] = changes
+
+    connections_a = {tuple(connection) for connection in description_a['connections']}
+    connections_b = {tuple(connection) for connection in description_b['connections']}
+    result['missing_connections'] = sorted(connections_a - connections_b)
+    result['extra_connections'] = sorted(connections_b - connections_a)
+    return result
+
+
+def is_equivalent(difference):
+    return not any(difference.values())
@@ -0,0 +1,256 @@
+'''
+scaling_benchmark.py
+
+Build time against joint count. Each level generates a bigger procedural skeleton (more spine,
+twist and finger joints, or more limbs) with skeleton_generator, builds a Biped on it in a new
+scene and records the time of the whole build and of every appendage step. Results are written
+to scaling.csv, and to scaling.png when matplotlib is available.
+
+The log-log slope printed for each part is its scaling exponent: ~1 means build time grows
+linearly with the joint count, 2 means quadratic.
+
+Run:
+mayapy -m adv_scripting.rig.scaling_benchmark --generator biped --levels 6 --output-dir /tmp/scaling
+python -m adv_scripting.rig.scaling_benchmark --fake-maya
+'''
+import argparse
+import csv
+import logging
+import math
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+GENERATOR_NAMES = ('biped', 'quadruped', 'creature')
+CSV_FIELDS = ('generator', 'level', 'part', 'joints', 'seconds')
+# Leg attributes holding foot nodes named by side only, e.g. lt_ball_ik_ctrl_
+LEG_FOOT_NODES = ('ball_ik_control', 'toe_ik_control', 'ball_ik_handle', 'toe_ik_handle')
+
+
+# LEVELS ===============================================================
+
+def level_parameters(generator, level):
+    '''
+    Generator keyword arguments for a level, level 0 is the default skeleton.
+    '''
+    if generator == 'biped':
+        return {'spine_joints': 5 + level, 'arm_twist_joints': (1 + level, 1 + level),
+                'leg_twist_joints': (1 + level, 1 + level), 'fingers': 5 + level}
+    if generator == 'quadruped':
+        return {'spine_joints': 6 + level, 'leg_twist_joints': (1 + level, 1 + level),
+                'toes': 4 + level}
+    if generator == 'creature':
+        return {'limb_pairs': 2 + level}
+    raise ValueError(f"Unknown generator '{generator}', use one of {GENERATOR_NAMES}.")
+
+
+def part_name(step):
+    '''
+    Appendage name of a build step, sides are summed: 'lt_arm' -> 'arm'
+    '''
+    side, _, name = step.partition('_')
+    return name if side in ('lt', 'rt') else step
+
+
+def rename_foot_nodes(leg_appendage, element):
+    '''
+    Put element in front of the side-named foot nodes of a built Leg, so another Leg can be
+    built on the same side without name clashes.
+    '''
+    import maya.cmds as cmds
+    for attribute in LEG_FOOT_NODES:
+        node = getattr(leg_appendage, attribute)
+        setattr(leg_appendage, attribute, cmds.rename(node, f"{element}_{node.lstrip('|')}"))
+
+
+def run_level(generator, level):
+    '''
+    Build one level in a new scene.
+
+    Returns list of row dicts with CSV_FIELDS.
+    '''
+    import maya.cmds as cmds
+    import adv_scripting.rig.settings as rig_settings
+    import adv_scripting.rig.biped as biped
+    import adv_scripting.rig.skeleton_generator as skeleton_generator
+    import adv_scripting.rig.appendages.leg as leg
+
+    cmds.file(new=True, force=True)
+    skeleton = skeleton_generator.GENERATORS[generator](**level_parameters(generator, level))
+    settings = rig_settings.BipedSettings(asset_name=f'{generator}_{level:02}', **skeleton.settings)
+
+    start = time.perf_counter()
+    rig = biped.Biped(settings.asset_name, settings)
+    timings = dict(rig.scheduler.timings)
+    # Creature limbs after the first pair are not part of the Biped
+    extra_limbs = {name: joint for name, joint in skeleton.limbs.items()
+                   if name not in ('lt_limb01', 'rt_limb01')}
+    if extra_limbs:
+        for limb in rig.legs.values():
+            rename_foot_nodes(limb, 'limb01')
+    for name, start_joint in extra_limbs.items():
+        limb_start = time.perf_counter()
+        limb = leg.Leg(f'{name}_appendage', start_joint, name.split('_')[0],
+                       skeleton.settings['leg_num_upperTwist_joints'],
+                       skeleton.settings['leg_num_lowerTwist_joints'],
+                       input_matrix=rig.root.result_matrix)
+        cmds.parent(limb.appendage_grp, rig.rig_grp)
+        rename_foot_nodes(limb, name.split('_')[1])
+        timings[name] = time.perf_counter() - limb_start
+    seconds = time.perf_counter() - start
+
+    rows = [{'generator': generator, 'level': level, 'part': 'biped',
+             'joints': skeleton.joint_count, 'seconds': seconds}]
+    parts = dict()
+    for step, step_seconds in timings.items():
+        name = part_name(step)
+        if name.startswith('limb'):
+            name = 'leg'
+        joints, total = parts.get(name, (0, 0.0))
+        parts[name] = (joints + len(skeleton.parts.get(step, ())), total + step_seconds)
+    for name, (joints, total) in parts.items():
+        rows.append({'generator': generator, 'level': level, 'part': name,
+                     'joints': joints, 'seconds': total})
+    logger.info(f'{generator} level {level}: {skeleton.joint_count} joints in {seconds:.2f}s')
+    return rows
+
+
+def run(generators=GENERATOR_NAMES, levels=4, repeat=1, warmup=True):
+    '''
+    Build every level of every generator repeat times, keeping the fastest time of each part.
+
+    Arguments
+    warmup (bool): build and discard the first level once, so module imports and first call
+        costs are not counted
+
+    Returns list of row dicts with CSV_FIELDS.
+    '''
+    if warmup and generators:
+        run_level(generators[0], 0)
+    rows = list()
+    for generator in generators:
+        for level in range(levels):
+            best = dict()
+            for _ in range(repeat):
+                for row in run_level(generator, level):
+                    if row['part'] not in best or row['seconds'] < best[row['part']]['seconds']:
+                        best[row['part']] = row
+            rows.extend(best.values())
+    return rows
+
+
+# RESULTS ==============================================================
+
+def scaling_exponent(rows):
+    '''
+    Least squares slope of log(seconds) against log(joints), None with less than two sizes.
+    '''
+    points = [(math.log(row['joints']), math.log(row['seconds'])) for row in rows
+              if row['joints'] > 0 and row['seconds'] > 0]
+    if len({x for x, _ in points}) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    return covariance / variance
+
+
+def group_rows(rows):
+    '''
+    Returns dict of (generator, part) -> rows ordered by level.
+    '''
+    groups = dict()
+    for row in rows:
+        groups.setdefault((row['generator'], row['part']), list()).append(row)
+    for group in groups.values():
+        group.sort(key=lambda row: row['level'])
+    return groups
+
+
+def format_results(rows):
+    lines = [f"{'generator':<12}{'part':<8}{'joints':>14}{'seconds':>18}{'exponent':>10}"]
+    for (generator, part), group in group_rows(rows).items():
+        exponent = scaling_exponent(group)
+        exponent = f'{exponent:.2f}' if exponent is not None else '-'
+        joints = f"{group[0]['joints']}-{group[-1]['joints']}"
+        seconds = f"{group[0]['seconds']:.3f}-{group[-1]['seconds']:.3f}"
+        lines.append(f'{generator:<12}{part:<8}{joints:>14}{seconds:>18}{exponent:>10}')
+    return '\n'.join(lines)
+
+
+def write_csv(rows, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def plot(rows, path):
+    '''
+    Log-log plot of build time against joint count, one line per generator and part.
+
+    Returns path, or None when matplotlib is not installed.
+    '''
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        logger.warning('matplotlib is not installed, skipping the plot.')
+        return None
+    figure, axes = plt.subplots(figsize=(9, 6))
+    for (generator, part), group in group_rows(rows).items():
+        axes.plot([row['joints'] for row in group], [row['seconds'] for row in group],
+                  marker='o', linewidth=2.5 if part == 'biped' else 1.0,
+                  label=f'{generator} {part}')
+    axes.set_xscale('log')
+    axes.set_yscale('log')
+    axes.set_xlabel('joints')
+    axes.set_ylabel('build seconds')
+    axes.set_title('Rig build time against joint count')
+    axes.legend(fontsize='small', ncol=2)
+    figure.tight_layout()
+    figure.savefig(path)
+    plt.close(figure)
+    return path
+
+
+# MAIN =================================================================
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmark rig build time against joint count.')
+    parser.add_argument('--generator', action='append', choices=GENERATOR_NAMES, default=None,
+                        help='Skeleton generator, repeat for several (default: all)')
+    parser.add_argument('--levels', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--output-dir', default='scaling_benchmark')
+    parser.add_argument('--fake-maya', action='store_true',
+                        help='Run on the in-memory fake Maya engine instead of mayapy')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if args.fake_maya:
+        import adv_scripting.fake_maya as fake_maya
+        fake_maya.install()
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+
+    rows = run(args.generator or GENERATOR_NAMES, args.levels, args.repeat)
+    os.makedirs(args.output_dir, exist_ok=True)
+    logger.info(f"Results: {write_csv(rows, os.path.join(args.output_dir, 'scaling.csv'))}")
+    plot_path = plot(rows, os.path.join(args.output_dir, 'scaling.png'))
+    if plot_path:
+        logger.info(f'Plot: {plot_path}')
+    print(format_results(rows))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -20,7 +20,13 @@ class BipedSettings():
         hand_appendage_name = 'hand',
         hand_start_joint = 'lt_hand_bnd_jnt',
         hand_num_upperTwist_joint = 0,
-        hand_num_lowerTwist_joint = 0
+        hand_num_lowerTwist_joint = 0,
+        disabled_appendages = (),
+        profile_build = False,
+        profile_trace_path = None,
+        trace_cmds = False,
+        cache_dir = None,
+        capture_path = None
         ):
 
         self.asset_name = asset_name
@@ -44,3 +50,16 @@ class BipedSettings():
         self.hand_start_joint = hand_start_joint
         self.hand_num_upperTwist_joint = hand_num_upperTwist_joint
         self.hand_num_lowerTwist_joint = hand_num_lowerTwist_joint
+        # Build step names to skip, e.g. ['lt_hand', 'rt_hand']. See Biped.create_scheduler
+        self.disabled_appendages = list(disabled_appendages)
+        # Record per appendage phase timings. See build_profiler.
+        # The Chrome trace goes to profile_trace_path, or the temp directory if None.
+        self.profile_build = profile_build
+        self.profile_trace_path = profile_trace_path
+        # Log a ranked report of maya.cmds call sites after the build. See cmds_tracer.
+        self.trace_cmds = trace_cmds
+        # Directory of the per appendage build cache. Rebuilds only re-run appendages whose
+        # settings, skeleton or code changed. No cache if None. See build_cache.
+        self.cache_dir = cache_dir
+        # Save a rig_description of the built rig to this JSON file, to replay without rebuilding
+        self.capture_path = capture_path
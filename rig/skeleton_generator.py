@@ -0,0 +1,408 @@
+'''
+skeleton_generator.py
+
+Procedural bind skeletons, so the rig builders can be tested and benchmarked without a skeleton
+file. Joints are named with the rig_name convention (e.g. lt_upper_arm_bnd_jnt_01) and the names
+are unchanged by utilities.rename_hierarchy. Every generator returns a Skeleton holding the
+BipedSettings arguments that point at its start joints and joint counts.
+
+Layout: Y up, facing +Z, the left side on +X. Two-bone limbs are bent slightly so the pole
+vector of the IK chain is defined.
+
+e.g.
+import adv_scripting.rig.skeleton_generator as skeleton_generator
+import adv_scripting.rig.settings as rig_settings
+import adv_scripting.rig.biped as biped
+skeleton = skeleton_generator.biped(spine_joints=5, arm_twist_joints=(2, 2), fingers=4)
+settings = rig_settings.BipedSettings(asset_name='hero', **skeleton.settings)
+rig = biped.Biped(settings.asset_name, settings)
+'''
+import maya.cmds as cmds
+import logging
+import math
+import adv_scripting.rig_name as rig_name
+
+logger = logging.getLogger(__name__)
+
+# Finger elements in order from the thumb. Extra fingers are named finger06, finger07...
+# 'middle' is not used, it is parsed as a region.
+FINGER_NAMES = ['thumb', 'index', 'long', 'ring', 'pinky']
+SIDES = {'lt': 1.0, 'rt': -1.0}
+# The Spine appendage skins its surface to three driver joints and the Head follows spine_fk_5
+MIN_SPINE_JOINTS = 5
+
+
+class Skeleton():
+    '''
+    Result of a generator.
+
+    Arguments
+    name (str): generator name, e.g. 'biped'
+    root_joint (str): top joint of the skeleton
+    '''
+    def __init__(self, name, root_joint):
+        self.name = name
+        self.root_joint = root_joint
+        # Every generated joint, in creation order
+        self.joints = list()
+        # BipedSettings keyword arguments for the appendages of this skeleton
+        self.settings = dict()
+        # Biped build step name (e.g. 'lt_arm') -> joints generated for that appendage
+        self.parts = dict()
+        # Limb name -> start joint, for limbs the Biped class does not build (e.g. extra legs)
+        self.limbs = dict()
+
+    def __repr__(self):
+        return f"Skeleton('{self.name}', root_joint='{self.root_joint}', joints={len(self.joints)})"
+
+    @property
+    def joint_count(self):
+        return len(self.joints)
+
+    def add_part(self, name, start):
+        '''
+        The joints created since len(self.joints) was start belong to build step name.
+        '''
+        self.parts[name] = self.joints[start:]
+
+
+# JOINTS ===============================================================
+
+def joint_name(element, side=None, region=None, position=None):
+    '''
+    Bind joint name, e.g. joint_name('upper_arm', 'lt', position=1) -> 'lt_upper_arm_bnd_jnt_01'
+    '''
+    return rig_name.RigName(side=side,
+                            region=region,
+                            element=element,
+                            control_type='bnd',
+                            rig_type='jnt',
+                            position=position).output()
+
+
+def finger_name(index):
+    return FINGER_NAMES[index] if index < len(FINGER_NAMES) else f'finger{index+1:02}'
+
+
+def create_joint(skeleton, name, position, parent=None):
+    '''
+    Create a joint at a world position under parent.
+
+    Returns joint name
+    '''
+    if cmds.objExists(name):
+        raise RuntimeError(f'Cannot generate skeleton, {name} already exists.')
+    if parent:
+        cmds.select(parent, replace=True)
+    else:
+        cmds.select(clear=True)
+    joint = cmds.joint(name=name, position=position)
+    skeleton.joints.append(joint)
+    return joint
+
+
+def create_chain(skeleton, names, positions, parent=None):
+    '''
+    Create a joint chain and orient it, x down the chain and y up.
+
+    Returns list of joint names
+    '''
+    chain = list()
+    for name, position in zip(names, positions):
+        chain.append(create_joint(skeleton, name, position, chain[-1] if chain else parent))
+    for joint in chain:
+        cmds.joint(joint, edit=True, orientJoint='xyz', secondaryAxisOrient='yup',
+                   zeroScaleOrient=True)
+    return chain
+
+
+def lerp(start, end, weight):
+    return [a + (b - a) * weight for a, b in zip(start, end)]
+
+
+def mirror(position, side):
+    return [position[0] * SIDES[side], position[1], position[2]]
+
+
+def segment(start, end, count):
+    '''
+    Returns count positions from start towards end, end excluded.
+    '''
+    return [lerp(start, end, index / count) for index in range(count)]
+
+
+# LIMBS ================================================================
+
+def two_bone_limb(skeleton, parent, side, region, upper, lower, positions,
+                  upper_twist_joints=0, lower_twist_joints=0):
+    '''
+    Two-bone chain as TwoBoneFKIK reads it: upper joint, upper twists, lower joint, lower twists,
+    then the end joint (created by the caller under the returned lower chain).
+
+    Arguments
+    upper, lower (str): elements of the two bones, e.g. 'upper_arm', 'lower_arm'
+    positions (list): left side world positions of the upper joint, lower joint and end joint
+
+    Returns list of joint names, upper to the last lower twist joint
+    '''
+    start, middle, end = [mirror(position, side) for position in positions]
+    names = [joint_name(upper, side, region, index + 1) for index in range(upper_twist_joints + 1)]
+    names += [joint_name(lower, side, region, index + 1) for index in range(lower_twist_joints + 1)]
+    points = segment(start, middle, upper_twist_joints + 1) + \
+             segment(middle, end, lower_twist_joints + 1)
+    return create_chain(skeleton, names, points, parent)
+
+
+def digits(skeleton, parent, side, region, count, joints, base, spread, length):
+    '''
+    Fingers or toes. Each digit is a chain of joints, the end joint included.
+
+    Arguments
+    base (list): left side world position of the middle digit's first joint
+    spread (float): distance between digits along z
+    length (float): length of a digit along x
+    '''
+    roots = list()
+    for index in range(count):
+        element = finger_name(index)
+        offset = (index - (count - 1) / 2.0) * spread
+        start = [base[0], base[1], base[2] - offset]
+        end = [base[0] + length, base[1] - length * 0.2, base[2] - offset]
+        names = [joint_name(element, side, region, number + 1) for number in range(joints)]
+        points = list()
+        for number in range(joints):
+            weight = number / max(joints - 1, 1)
+            # Knuckles slightly raised so the chain bends like a relaxed finger
+            point = lerp(start, end, weight)
+            point[1] += abs(length) * 0.1 * math.sin(math.pi * weight)
+            points.append(mirror(point, side))
+        roots.append(create_chain(skeleton, names, points, parent)[0])
+    return roots
+
+
+def foot(skeleton, parent, side, region, ankle, prefix=''):
+    '''
+    Ankle, ball and toe tip, as the Leg appendage reads them.
+
+    Arguments
+    prefix (str): put in front of the elements, e.g. 'limb02_'
+
+    Returns list of joint names
+    '''
+    names = [joint_name(f'{prefix}{element}', side, region)
+             for element in ('foot', 'ball', 'toe_tip')]
+    points = [ankle, [ankle[0], 1, ankle[2] + 12], [ankle[0], 0, ankle[2] + 20]]
+    return create_chain(skeleton, names, [mirror(point, side) for point in points], parent)
+
+
+def spine_chain(skeleton, parent, count, start, end, element='spine'):
+    if count < MIN_SPINE_JOINTS:
+        raise ValueError(f'The Spine appendage needs at least {MIN_SPINE_JOINTS} joints, got {count}.')
+    names = [joint_name(element, position=index + 1) for index in range(count)]
+    points = [lerp(start, end, index / max(count - 1, 1)) for index in range(count)]
+    return create_chain(skeleton, names, points, parent)
+
+
+def neck_chain(skeleton, parent, neck_joints, start, end):
+    '''
+    Neck start joint, neck_joints in-between joints, skull and skull tip.
+
+    Returns list of joint names
+    '''
+    names = [joint_name('neck')]
+    names += [joint_name('upper_neck', position=index + 1) for index in range(neck_joints)]
+    names += [joint_name('skull'), joint_name('skull_tip')]
+    points = segment(start, end, neck_joints + 1) + [end, lerp(start, end, 1.5)]
+    return create_chain(skeleton, names, points, parent)
+
+
+# GENERATORS ===========================================================
+
+def biped(spine_joints=5, neck_joints=0, arm_twist_joints=(1, 1), leg_twist_joints=(1, 1),
+          fingers=5, finger_joints=4):
+    '''
+    Humanoid skeleton: root, spine, neck and head, clavicles, arms, hands with fingers and legs
+    with feet.
+
+    Arguments
+    spine_joints (int): number of spine joints
+    neck_joints (int): joints between the neck and skull
+    arm_twist_joints (tuple): (upper, lower) twist joints of each arm
+    leg_twist_joints (tuple): (upper, lower) twist joints of each leg
+    fingers (int): fingers per hand
+    finger_joints (int): joints per finger, tip included. At least 3.
+
+    Returns Skeleton
+    '''
+    skeleton = Skeleton('biped', None)
+    root = create_joint(skeleton, joint_name('root'), [0, 100, 0])
+    skeleton.root_joint = root
+    skeleton.add_part('root', 0)
+    start = skeleton.joint_count
+    spine = spine_chain(skeleton, root, spine_joints, [0, 105, 0], [0, 145, 0])
+    skeleton.add_part('spine', start)
+    start = skeleton.joint_count
+    neck = neck_chain(skeleton, spine[-1], neck_joints, [0, 150, 0], [0, 165, 0])
+    skeleton.add_part('head', start)
+    for side in SIDES:
+        start = skeleton.joint_count
+        clavicle = create_chain(skeleton, [joint_name('clavicle', side)],
+                                [mirror([3, 145, 2], side)], spine[-1])[0]
+        arm = two_bone_limb(skeleton, clavicle, side, None, 'upper_arm', 'lower_arm',
+                            [[15, 145, 0], [42, 145, -3], [68, 145, 0]], *arm_twist_joints)
+        skeleton.add_part(f'{side}_arm', start)
+        start = skeleton.joint_count
+        hand = create_chain(skeleton, [joint_name('hand', side)], [mirror([68, 145, 0], side)],
+                            arm[-1])[0]
+        digits(skeleton, hand, side, None, fingers, finger_joints, [76, 145, 0], 2.0, 8.0)
+        skeleton.add_part(f'{side}_hand', start)
+
+        start = skeleton.joint_count
+        leg = two_bone_limb(skeleton, root, side, None, 'upper_leg', 'lower_leg',
+                            [[10, 95, 0], [10, 52, 3], [10, 9, 0]], *leg_twist_joints)
+        foot(skeleton, leg[-1], side, None, [10, 9, 0])
+        skeleton.add_part(f'{side}_leg', start)
+
+    skeleton.settings = {
+        'root_start_joint': root,
+        'spine_start_joint': spine[0],
+        'spine_num_spine_joints': spine_joints,
+        'head_start_joint': neck[0],
+        'head_num_twist_joints': neck_joints,
+        'arm_start_joint': joint_name('upper_arm', 'lt', position=1),
+        'arm_num_upperTwist_joints': arm_twist_joints[0],
+        'arm_num_lowerTwist_joints': arm_twist_joints[1],
+        'leg_start_joint': joint_name('upper_leg', 'lt', position=1),
+        'leg_num_upperTwist_joints': leg_twist_joints[0],
+        'leg_num_lowerTwist_joints': leg_twist_joints[1],
+        'hand_start_joint': joint_name('hand', 'lt')}
+    cmds.select(clear=True)
+    logger.info(f'Generated {skeleton}')
+    return skeleton
+
+
+def quadruped(spine_joints=6, neck_joints=2, leg_twist_joints=(1, 1), toes=4, toe_joints=3):
+    '''
+    Four legged skeleton with a horizontal spine. The front legs hang from clavicles like arms
+    and end in paws with toes, the rear legs end in feet.
+
+    Arguments
+    spine_joints (int): number of spine joints, hips to shoulders
+    neck_joints (int): joints between the neck and skull
+    leg_twist_joints (tuple): (upper, lower) twist joints of every leg
+    toes (int): toes per front paw
+    toe_joints (int): joints per toe, tip included. At least 3.
+
+    Returns Skeleton
+    '''
+    skeleton = Skeleton('quadruped', None)
+    root = create_joint(skeleton, joint_name('root'), [0, 70, -40])
+    skeleton.root_joint = root
+    skeleton.add_part('root', 0)
+    start = skeleton.joint_count
+    spine = spine_chain(skeleton, root, spine_joints, [0, 72, -32], [0, 75, 35])
+    skeleton.add_part('spine', start)
+    start = skeleton.joint_count
+    neck = neck_chain(skeleton, spine[-1], neck_joints, [0, 82, 45], [0, 95, 60])
+    skeleton.add_part('head', start)
+    for side in SIDES:
+        start = skeleton.joint_count
+        clavicle = create_chain(skeleton, [joint_name('clavicle', side, 'front')],
+                                [mirror([6, 70, 36], side)], spine[-1])[0]
+        front = two_bone_limb(skeleton, clavicle, side, 'front', 'upper_leg', 'lower_leg',
+                              [[10, 62, 38], [10, 35, 33], [10, 6, 36]], *leg_twist_joints)
+        skeleton.add_part(f'{side}_arm', start)
+        start = skeleton.joint_count
+        paw = create_chain(skeleton, [joint_name('paw', side, 'front')],
+                           [mirror([10, 6, 36], side)], front[-1])[0]
+        digits(skeleton, paw, side, 'front', toes, toe_joints, [10, 4, 40], 1.5, 5.0)
+        skeleton.add_part(f'{side}_hand', start)
+
+        start = skeleton.joint_count
+        rear = two_bone_limb(skeleton, root, side, 'rear', 'upper_leg', 'lower_leg',
+                             [[10, 66, -40], [10, 38, -32], [10, 12, -46]], *leg_twist_joints)
+        foot(skeleton, rear[-1], side, 'rear', [10, 12, -46])
+        skeleton.add_part(f'{side}_leg', start)
+
+    skeleton.settings = {
+        'root_start_joint': root,
+        'spine_start_joint': spine[0],
+        'spine_num_spine_joints': spine_joints,
+        'head_start_joint': neck[0],
+        'head_num_twist_joints': neck_joints,
+        'arm_appendage_name': 'lt_front_leg_appendage',
+        'arm_start_joint': joint_name('upper_leg', 'lt', 'front', 1),
+        'arm_num_upperTwist_joints': leg_twist_joints[0],
+        'arm_num_lowerTwist_joints': leg_twist_joints[1],
+        'leg_appendage_name': 'lt_rear_leg_appendage',
+        'leg_start_joint': joint_name('upper_leg', 'lt', 'rear', 1),
+        'leg_num_upperTwist_joints': leg_twist_joints[0],
+        'leg_num_lowerTwist_joints': leg_twist_joints[1],
+        'hand_appendage_name': 'paw',
+        'hand_start_joint': joint_name('paw', 'lt', 'front')}
+    cmds.select(clear=True)
+    logger.info(f'Generated {skeleton}')
+    return skeleton
+
+
+def creature(limb_pairs=4, spine_joints=None, neck_joints=1, leg_twist_joints=(0, 0)):
+    '''
+    Many legged creature, e.g. an insect or centipede. One pair of legs with feet hangs from
+    evenly spaced spine joints. The front pair uses the BipedSettings leg fields, every pair is
+    listed in Skeleton.limbs as '<side>_limb<nn>' for building with the Leg appendage.
+
+    Arguments
+    limb_pairs (int): pairs of legs
+    spine_joints (int/None): number of spine joints, at least limb_pairs.
+        max(MIN_SPINE_JOINTS, 2 * limb_pairs) if None.
+    neck_joints (int): joints between the neck and skull
+    leg_twist_joints (tuple): (upper, lower) twist joints of every leg
+
+    Returns Skeleton
+    '''
+    spine_joints = spine_joints or max(MIN_SPINE_JOINTS, 2 * limb_pairs)
+    if spine_joints < limb_pairs:
+        raise ValueError(f'creature needs at least {limb_pairs} spine joints, got {spine_joints}.')
+    skeleton = Skeleton('creature', None)
+    length = 20.0 * limb_pairs
+    root = create_joint(skeleton, joint_name('root'), [0, 30, -length / 2])
+    skeleton.root_joint = root
+    skeleton.add_part('root', 0)
+    start = skeleton.joint_count
+    spine = spine_chain(skeleton, root, spine_joints, [0, 30, 5 - length / 2], [0, 30, length / 2])
+    skeleton.add_part('spine', start)
+    start = skeleton.joint_count
+    neck = neck_chain(skeleton, spine[-1], neck_joints, [0, 32, length / 2 + 5],
+                      [0, 36, length / 2 + 15])
+    skeleton.add_part('head', start)
+    for pair in range(limb_pairs):
+        # Front pair on the last spine joint, rear pair on the first
+        parent = spine[round((spine_joints - 1) * (1 - pair / max(limb_pairs - 1, 1)))]
+        z = cmds.xform(parent, query=True, worldSpace=True, translation=True)[2]
+        element = f'limb{pair+1:02}'
+        for side in SIDES:
+            start = skeleton.joint_count
+            leg = two_bone_limb(skeleton, parent, side, None, f'{element}_thigh', f'{element}_shin',
+                                [[4, 30, z], [18, 38, z + 1], [26, 4, z]], *leg_twist_joints)
+            foot(skeleton, leg[-1], side, None, [26, 4, z], prefix=f'{element}_')
+            skeleton.limbs[f'{side}_{element}'] = leg[0]
+            # The front pair is built as the Biped legs
+            skeleton.add_part(f'{side}_leg' if pair == 0 else f'{side}_{element}', start)
+
+    skeleton.settings = {
+        'root_start_joint': root,
+        'spine_start_joint': spine[0],
+        'spine_num_spine_joints': spine_joints,
+        'head_start_joint': neck[0],
+        'head_num_twist_joints': neck_joints,
+        'leg_appendage_name': 'lt_limb01_appendage',
+        'leg_start_joint': skeleton.limbs['lt_limb01'],
+        'leg_num_upperTwist_joints': leg_twist_joints[0],
+        'leg_num_lowerTwist_joints': leg_twist_joints[1],
+        'disabled_appendages': [f'{side}_{step}' for side in SIDES for step in ('arm', 'hand')]}
+    cmds.select(clear=True)
+    logger.info(f'Generated {skeleton}')
+    return skeleton
+
+
+GENERATORS = {'biped': biped, 'quadruped': quadruped, 'creature': creature}
@@ -6,8 +6,10 @@ import logging
 logger = logging.getLogger(__name__)
 
 import adv_scripting.rig.biped as biped
+import adv_scripting.rig.control_registry as control_registry
 import importlib as il
 il.reload(biped)
+il.reload(control_registry)
 
 try:
     from maya import OpenMayaUI as omui
@@ -72,7 +74,8 @@ class RigBuildUI(QtWidgets.QDialog):
 
     def slot_build_clicked(self):
         print (self.rig_data)
-        biped.build_biped(self.rig_data)
+        rig = biped.build_biped(self.rig_data)
+        logger.info(control_registry.format_summary(rig.rig_grp))
 
     def slot_close(self):
         self.close()
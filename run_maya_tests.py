@@ -1,21 +1,39 @@
-import os, subprocess, shutil
+'''
+run_maya_tests.py
+
+Run tests.py in mayapy: the MAYAPY environment variable, else mayapy on PATH. Without Maya the
+tests run in this interpreter on the in-memory fake Maya engine (adv_scripting.fake_maya).
+
+Run:
+python run_maya_tests.py
+MAYAPY=/usr/autodesk/maya2023/bin/mayapy python run_maya_tests.py
+'''
+import os, subprocess, shutil, sys
 
 ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
 
+
+def find_mayapy():
+    '''
+    Returns path of mayapy, None if Maya is not installed
+    '''
+    mayapy = os.environ.get('MAYAPY') or shutil.which('mayapy')
+    if mayapy and not os.path.exists(mayapy):
+        raise RuntimeError(f'mayapy {mayapy} does not exist.')
+    return mayapy
+
+
 def main():
     print('RUN TESTS')
-    mayapy = '/Applications/Autodesk/maya2023/Maya.app/Contents/bin/mayapy'
-    mayaunittest = f'{ROOT_DIR}/adv_scripting/tests.py'
-    cmd = [mayapy, mayaunittest]
-    if not os.path.exists(cmd[0]):
-        raise RuntimeError('Maya {0} is not installed on this system.'.format(mayapy))
-
-    try:
-        subprocess.run(cmd)
-    except subprocess.CalledProcessError:
-        print(subprocess.CalledProcessError.stderr)
-        print(subprocess.CalledProcessError.stdout)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT_DIR] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    mayapy = find_mayapy()
+    if not mayapy:
+        print('mayapy not found, running on the fake Maya engine.')
+        env['ADV_SCRIPTING_FAKE_MAYA'] = '1'
+    cmd = [mayapy or sys.executable, '-m', 'adv_scripting.tests']
+    return subprocess.run(cmd, env=env, cwd=ROOT_DIR).returncode
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,317 @@
+'''
+surface_query.py
+
+Batched closest point UV queries for attaching joints to a mesh or NURBS surface (ribbon
+spines, follicle / uvPin placement).
+
+The acceleration structure is built once per surface and can be queried with any number of
+points. Results are returned as NumPy arrays instead of one joint at a time.
+
+    MeshSurface: MMeshIntersector plus a per-triangle UV table
+    NurbsSurface: KD-tree over a sample grid to seed MFnNurbsSurface.closestPoint
+    PointCloudSurface: pure NumPy KD-tree over points with known UVs, for testing
+
+e.g.
+import adv_scripting.surface_query as surface_query
+uvs = surface_query.get_surface_coordinates('spineSetupSurface', joints)
+'''
+import logging
+import numpy as np
+import maya.api.OpenMaya as om
+
+logger = logging.getLogger(__name__)
+
+
+# KD-TREE ==============================================================
+
+class KDTree():
+    '''
+    Static KD-tree over an (N,3) array of points, pure NumPy.
+    Leaves hold up to leaf_size points which are searched brute force.
+    '''
+    def __init__(self, points, leaf_size=16):
+        self.points = np.asarray(points, dtype=float)
+        if self.points.ndim != 2 or not len(self.points):
+            raise ValueError('KDTree needs a non-empty (N, dim) array of points.')
+        self.leaf_size = leaf_size
+        self.index = np.arange(len(self.points))
+        # Flat node arrays. Leaves have dim -1 and cover index[start:end].
+        self.dim = list()
+        self.split = list()
+        self.left = list()
+        self.right = list()
+        self.start = list()
+        self.end = list()
+        self._build(0, len(self.points))
+        self.dim = np.array(self.dim)
+        self.split = np.array(self.split)
+
+    def _add_node(self, start, end):
+        self.dim.append(-1)
+        self.split.append(0.0)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.start.append(start)
+        self.end.append(end)
+        return len(self.dim) - 1
+
+    def _build(self, start, end):
+        # Iterative build, a deep recursion would hit the interpreter limit on big clouds.
+        root = self._add_node(start, end)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            start, end = self.start[node], self.end[node]
+            if end - start <= self.leaf_size:
+                continue
+            subset = self.points[self.index[start:end]]
+            dim = int(np.argmax(subset.max(axis=0) - subset.min(axis=0)))
+            middle = (end - start) // 2
+            order = np.argpartition(subset[:, dim], middle)
+            self.index[start:end] = self.index[start:end][order]
+            self.dim[node] = dim
+            self.split[node] = float(self.points[self.index[start + middle], dim])
+            self.left[node] = self._add_node(start, start + middle)
+            self.right[node] = self._add_node(start + middle, end)
+            stack.extend([self.left[node], self.right[node]])
+
+    def query(self, points):
+        '''
+        Nearest neighbour for each point.
+
+        Arguments:
+        points (float list): (M,dim) query points
+
+        Returns (distances (M,), indices (M,)) as numpy arrays
+        '''
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        distances = np.empty(len(points))
+        indices = np.empty(len(points), dtype=int)
+        for row, point in enumerate(points):
+            best_distance = np.inf
+            best_index = -1
+            stack = [0]
+            while stack:
+                node = stack.pop()
+                dim = self.dim[node]
+                if dim < 0: # Leaf, brute force
+                    candidates = self.index[self.start[node]:self.end[node]]
+                    distance_sq = ((self.points[candidates] - point)**2).sum(axis=1)
+                    nearest = int(np.argmin(distance_sq))
+                    if distance_sq[nearest] < best_distance:
+                        best_distance = distance_sq[nearest]
+                        best_index = candidates[nearest]
+                    continue
+                offset = point[dim] - self.split[node]
+                near, far = (self.left[node], self.right[node]) if offset < 0 else \
+                            (self.right[node], self.left[node])
+                # Only visit the far side if the splitting plane is closer than the best hit
+                if offset * offset < best_distance:
+                    stack.append(far)
+                stack.append(near)
+            distances[row] = np.sqrt(best_distance)
+            indices[row] = best_index
+        return distances, indices
+
+
+# SURFACES =============================================================
+
+class PointCloudSurface():
+    '''
+    Surface approximated by points with known UVs. Returns the UV of the nearest point.
+
+    Arguments:
+    points (float list): (N,3) positions
+    uvs (float list): (N,2) UV coordinate of each position
+    '''
+    def __init__(self, points, uvs, leaf_size=16):
+        self.uvs = np.asarray(uvs, dtype=float)
+        self.tree = KDTree(points, leaf_size)
+
+    def closest_uv(self, points):
+        '''
+        Returns (uvs (M,2), distances (M,)) as numpy arrays
+        '''
+        distances, indices = self.tree.query(points)
+        return self.uvs[indices], distances
+
+
+class MeshSurface():
+    '''
+    Closest point UVs on a polygon mesh.
+    Builds an MMeshIntersector and a triangle->UV table once.
+
+    Arguments:
+    mesh (str): mesh shape or transform name
+    uv_set (str/None): UV set to read, current UV set if None
+    '''
+    def __init__(self, mesh, uv_set=None):
+        dag = get_dag_path(mesh)
+        dag.extendToShape()
+        self.fn_mesh = om.MFnMesh(dag)
+        self.uv_set = uv_set or self.fn_mesh.currentUVSetName()
+        self.intersector = om.MMeshIntersector()
+        self.intersector.create(dag.node(), dag.inclusiveMatrix())
+        self.build_triangle_uvs()
+
+    def build_triangle_uvs(self):
+        '''
+        Table of the three UVs of every triangle, indexed by face_offset[face] + triangle.
+        '''
+        us, vs = self.fn_mesh.getUVs(self.uv_set)
+        uv_counts, uv_ids = self.fn_mesh.getAssignedUVs(self.uv_set)
+        vertex_counts, vertex_ids = self.fn_mesh.getVertices()
+        triangle_counts, triangle_vertices = self.fn_mesh.getTriangles()
+        vertex_counts = np.array(vertex_counts)
+        triangle_counts = np.array(triangle_counts)
+        if (np.array(uv_counts) != vertex_counts).any():
+            logger.warning(f"{self.fn_mesh.name()} has faces without UVs in '{self.uv_set}'.")
+
+        # Face-vertex lookup sorted by (face, vertex) to find the UV of each triangle corner
+        num_vertices = self.fn_mesh.numVertices
+        face_of_fv = np.repeat(np.arange(len(vertex_counts)), vertex_counts)
+        keys = face_of_fv * num_vertices + np.array(vertex_ids)
+        order = np.argsort(keys)
+        uv_of_fv = np.full(len(keys), -1)
+        uv_of_fv[:len(uv_ids)] = np.array(uv_ids)
+
+        face_of_corner = np.repeat(np.arange(len(triangle_counts)), triangle_counts * 3)
+        corner_keys = face_of_corner * num_vertices + np.array(triangle_vertices)
+        corners = order[np.searchsorted(keys, corner_keys, sorter=order)]
+        corner_uvs = np.stack([np.array(us), np.array(vs)], axis=-1)[uv_of_fv[corners]]
+
+        self.triangle_uvs = corner_uvs.reshape(-1, 3, 2)
+        self.face_offset = np.concatenate([[0], np.cumsum(triangle_counts)[:-1]])
+
+    def closest_uv(self, points):
+        '''
+        Arguments:
+        points (float list): (M,3) world space positions
+
+        Returns (uvs (M,2), distances (M,)) as numpy arrays
+        '''
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        triangles = np.empty(len(points), dtype=int)
+        barycentric = np.empty((len(points), 2))
+        distances = np.empty(len(points))
+        for row, point in enumerate(points):
+            point_on_mesh = self.intersector.getClosestPoint(om.MPoint(*point))
+            triangles[row] = self.face_offset[point_on_mesh.face] + point_on_mesh.triangle
+            barycentric[row] = point_on_mesh.barycentricCoords
+            closest = om.MPoint(point_on_mesh.point) * self.intersector_matrix
+            distances[row] = closest.distanceTo(om.MPoint(*point))
+        # point = u * corner0 + v * corner1 + (1 - u - v) * corner2
+        weights = np.column_stack([barycentric, 1.0 - barycentric.sum(axis=1)])
+        uvs = np.einsum('ij,ijk->ik', weights, self.triangle_uvs[triangles])
+        return uvs, distances
+
+    @property
+    def intersector_matrix(self):
+        # getClosestPoint returns object space points
+        return self.fn_mesh.dagPath().inclusiveMatrix()
+
+
+class NurbsSurface():
+    '''
+    Closest point UVs on a NURBS surface.
+    A KD-tree over a samples x samples grid seeds MFnNurbsSurface.closestPoint so each query
+    starts next to the answer.
+
+    Arguments:
+    surface (str): nurbsSurface shape or transform name
+    samples (int): grid samples per direction for the seed tree
+    normalize (bool): return parameters remapped to 0-1, the uvPin / follicle default
+    '''
+    def __init__(self, surface, samples=16, normalize=True):
+        dag = get_dag_path(surface)
+        dag.extendToShape()
+        self.fn_surface = om.MFnNurbsSurface(dag)
+        self.normalize = normalize
+        self.u_range = self.fn_surface.knotDomainInU
+        self.v_range = self.fn_surface.knotDomainInV
+
+        u_params = np.linspace(self.u_range[0], self.u_range[1], samples)
+        v_params = np.linspace(self.v_range[0], self.v_range[1], samples)
+        self.seed_params = np.array([(u, v) for u in u_params for v in v_params])
+        seed_points = [self.fn_surface.getPointAtParam(u, v, om.MSpace.kWorld)
+                       for u, v in self.seed_params]
+        self.tree = KDTree([(p.x, p.y, p.z) for p in seed_points])
+
+    def closest_uv(self, points):
+        '''
+        Arguments:
+        points (float list): (M,3) world space positions
+
+        Returns (uvs (M,2), distances (M,)) as numpy arrays
+        '''
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        _, seeds = self.tree.query(points)
+        uvs = np.empty((len(points), 2))
+        distances = np.empty(len(points))
+        for row, (point, seed) in enumerate(zip(points, seeds)):
+            u_start, v_start = self.seed_params[seed]
+            closest, u, v = self.fn_surface.closestPoint(om.MPoint(*point),
+                                                         uStart=u_start,
+                                                         vStart=v_start,
+                                                         space=om.MSpace.kWorld)
+            uvs[row] = (u, v)
+            distances[row] = closest.distanceTo(om.MPoint(*point))
+        if self.normalize:
+            uvs[:, 0] = (uvs[:, 0] - self.u_range[0]) / (self.u_range[1] - self.u_range[0])
+            uvs[:, 1] = (uvs[:, 1] - self.v_range[0]) / (self.v_range[1] - self.v_range[0])
+        return uvs, distances
+
+
+# MAYA HELPERS =========================================================
+
+def get_dag_path(node):
+    selection = om.MSelectionList()
+    selection.add(node)
+    return selection.getDagPath(0)
+
+
+def get_world_positions(nodes):
+    '''
+    World space translation of each node, read through one selection list.
+
+    Returns numpy array (N,3)
+    '''
+    selection = om.MSelectionList()
+    for node in nodes:
+        selection.add(node)
+    positions = np.empty((len(nodes), 3))
+    for index in range(len(nodes)):
+        matrix = selection.getDagPath(index).inclusiveMatrix()
+        positions[index] = (matrix[12], matrix[13], matrix[14])
+    return positions
+
+
+def surface_query(surface, **kwargs):
+    '''
+    Build the query structure for a mesh or NURBS surface. Keep the result around to query
+    several joint sets against the same surface.
+    '''
+    dag = get_dag_path(surface)
+    dag.extendToShape()
+    if dag.hasFn(om.MFn.kMesh):
+        return MeshSurface(surface, **kwargs)
+    elif dag.hasFn(om.MFn.kNurbsSurface):
+        return NurbsSurface(surface, **kwargs)
+    raise TypeError(f"'{surface}' is not a mesh or nurbsSurface.")
+
+
+def get_surface_coordinates(surface, joints, query=None, **kwargs):
+    '''
+    Closest point UVs of many joints on a surface.
+
+    Arguments:
+    surface (str): mesh or nurbsSurface
+    joints (str list): joints (or any transforms) to query
+    query (MeshSurface/NurbsSurface/None): previously built surface_query() to reuse
+
+    Returns numpy array (N,2) of UV coordinates
+    '''
+    if query is None:
+        query = surface_query(surface, **kwargs)
+    uvs, _ = query.closest_uv(get_world_positions(joints))
+    return uvs
@@ -3,32 +3,66 @@ tests.py
 
 Run in command line:
 mayapy -m tests -v
-mayapy -m tests -v -f<filename> -fp<filepath -p<projectname>
 
-Use options -f --filename, -fp --filepath, -p --projectname to test on Maya file
-e.g.
-mayapy.exe -m tests -v -fp 'C:/Users/dayz/Documents/maya/projects/adv_scripting/scenes/rigging_skeleton_v04.ma'
-mayapy.exe -m tests -v -f 'rigging_skeleton_v04.ma' -p 'adv_scripting'
+Without Maya (or with ADV_SCRIPTING_FAKE_MAYA=1 set) the tests run in plain python on the
+in-memory fake Maya engine (adv_scripting.fake_maya):
+python -m adv_scripting.tests -v
+run_maya_tests.py runs the tests in mayapy when it is installed, else on the fake engine.
 
 To add additional tests, add them to the TestSuite in __main__
-e.g. suite.addTest(TestHandAppendage(test, args.filepath))
+e.g. suite.addTest(TestHandAppendage(test))
 
 Note:
-TestHandAppendage takes filename / filepath as commandline arguments,
-since building the hand rig needs a skeleton to test it on.
-Ideally unit tests should be stand alone and not rely on outside information,
-but I didn't have time to write a skeleton build script.
+Tests that need a skeleton generate it with rig/skeleton_generator.py.
 '''
 import unittest
+import math
+import json
+import shutil
+import tempfile
 import os, sys
-import argparse
-import maya.standalone
+import time
+import adv_scripting.fake_maya as fake_maya
+try:
+    if os.environ.get('ADV_SCRIPTING_FAKE_MAYA'):
+        raise ImportError('Fake Maya requested')
+    import maya.standalone
+except ImportError:
+    fake_maya.install()
+    import maya.standalone
 maya.standalone.initialize()
+FAKE_MAYA = getattr(sys.modules['maya'], 'fake', False)
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
 
 
 import adv_scripting.rig_name as rig_name
 import adv_scripting.utilities as utils
+import adv_scripting.ik_solver as ik_solver
+import adv_scripting.twist as twist
+import adv_scripting.surface_query as surface_query
+import adv_scripting.build_profiler as build_profiler
+import adv_scripting.memory_usage as memory_usage
+import adv_scripting.cmds_tracer as cmds_tracer
+import adv_scripting.node_handle as node_handle
+import adv_scripting.matrix_tools as matrix_tools
+import adv_scripting.bake_format as bake_format
+import adv_scripting.curve_format as curve_format
+import adv_scripting.anim_curves as anim_curves
+import adv_scripting.bake_sampler as bake_sampler
+import adv_scripting.bake_shards as bake_shards
+import adv_scripting.exporter as exporter
+import adv_scripting.key_reduction as key_reduction
+import adv_scripting.rig.biped as biped
+import adv_scripting.rig.build_graph as build_graph
+import adv_scripting.rig.build_cache as build_cache
+import adv_scripting.rig.rig_description as rig_description
+import adv_scripting.rig.control_registry as control_registry
+import adv_scripting.rig.build_farm as build_farm
+import adv_scripting.rig.skeleton_generator as skeleton_generator
+import adv_scripting.rig.scaling_benchmark as scaling_benchmark
+import adv_scripting.rig.replay_benchmark as replay_benchmark
+import adv_scripting.rig.settings as rig_settings
 import adv_scripting.rig.appendages.appendage as appendage
 import adv_scripting.rig.appendages.root as root
 import adv_scripting.rig.appendages.spine as spine
@@ -84,6 +118,1315 @@ class TestUtilities(unittest.TestCase):
         logger.info('Passed test create_fk_control_position')
 
 
+class TestIkSolver(unittest.TestCase):
+    def setUp(self):
+        self.root = (0, 10, 0)
+        self.mid = (5, 10, -1)
+        self.end = (10, 10, 0)
+        self.pole = ik_solver.pole_position(self.root, self.mid, self.end)
+
+    def test_solve_rest_pose(self):
+        solve = ik_solver.solve_two_bone(self.root, self.mid, self.end, self.pole, [self.end])
+        for solved, expected in zip(solve['mid'][0], self.mid):
+            self.assertAlmostEqual(solved, expected, places=4)
+        self.assertFalse(solve['flip'][0])
+
+    def test_solve_bone_lengths(self):
+        targets = [(3, 12, 1), (8, 8, 0), (0, 10, 9), (20, 10, 0)]
+        solve = ik_solver.solve_two_bone(self.root, self.mid, self.end, self.pole, targets)
+        upper = sum((a - b)**2 for a, b in zip(self.mid, self.root))**0.5
+        for mid in solve['mid']:
+            length = sum((a - b)**2 for a, b in zip(mid, self.root))**0.5
+            self.assertAlmostEqual(length, upper, places=4)
+        self.assertTrue(solve['unreachable'][-1])
+
+    def test_solve_pole_flip(self):
+        # Target straight at the pole
+        solve = ik_solver.solve_two_bone(self.root, self.mid, self.end, self.pole, [self.pole])
+        self.assertTrue(solve['flip'][0])
+
+    def test_validate_non_planar(self):
+        chain = [self.root, (2.5, 10, -0.5), self.mid, (7.5, 11, -0.5), self.end]
+        report = ik_solver.validate_chain(chain, mid_index=2)
+        self.assertTrue(report['errors'])
+        chain = [self.root, (2.5, 10, -0.5), self.mid, (7.5, 10, -0.5), self.end]
+        report = ik_solver.validate_chain(chain, mid_index=2)
+        self.assertFalse(report['errors'])
+
+
+class TestTwist(unittest.TestCase):
+    def rotate_x(self, degrees, translate=(0, 0, 0)):
+        # Maya row-vector matrix rotating around x
+        angle = math.radians(degrees)
+        return [[1, 0, 0, 0],
+                [0, math.cos(angle), math.sin(angle), 0],
+                [0, -math.sin(angle), math.cos(angle), 0],
+                [translate[0], translate[1], translate[2], 1]]
+
+    def test_twist_weights(self):
+        weights = twist.twist_weights((0, 0, 0), (10, 0, 0), [(2.5, 1, 0), (7.5, 0, 0)])
+        self.assertAlmostEqual(weights[0], 0.25)
+        self.assertAlmostEqual(weights[1], 0.75)
+
+    def test_distribute_twist(self):
+        start = self.rotate_x(0)
+        end = self.rotate_x(90, translate=(10, 0, 0))
+        result = twist.distribute_twist(start, end, [0.0, 0.5, 1.0])
+        expected = [self.rotate_x(0), self.rotate_x(45, (5, 0, 0)), self.rotate_x(90, (10, 0, 0))]
+        for matrix, expected_matrix in zip(result, expected):
+            for row, expected_row in zip(matrix, expected_matrix):
+                for value, expected_value in zip(row, expected_row):
+                    self.assertAlmostEqual(value, expected_value, places=5)
+
+
+class TestSurfaceQuery(unittest.TestCase):
+    def setUp(self):
+        # Point cloud sampled from a 10x10 plane with uvs 0-1
+        self.uvs = [(u / 20.0, v / 20.0) for u in range(21) for v in range(21)]
+        self.points = [(u * 10, 0, v * 10) for u, v in self.uvs]
+
+    def test_kd_tree_query(self):
+        tree = surface_query.KDTree(self.points, leaf_size=4)
+        queries = [(1.1, 2, 3.3), (9.9, -1, 0.2), (-5, 0, 5), (4.76, 0, 7.4)]
+        distances, indices = tree.query(queries)
+        for query, distance, index in zip(queries, distances, indices):
+            brute = min(math.dist(query, point) for point in self.points)
+            self.assertAlmostEqual(distance, brute)
+            self.assertAlmostEqual(math.dist(query, self.points[index]), brute)
+
+    def test_point_cloud_uvs(self):
+        surface = surface_query.PointCloudSurface(self.points, self.uvs)
+        uvs, distances = surface.closest_uv([(5, 1, 5), (0, 0, 10)])
+        self.assertAlmostEqual(uvs[0][0], 0.5)
+        self.assertAlmostEqual(uvs[0][1], 0.5)
+        self.assertAlmostEqual(uvs[1][0], 0.0)
+        self.assertAlmostEqual(uvs[1][1], 1.0)
+        self.assertAlmostEqual(distances[0], 1.0)
+
+
+class TestHandTraversal(unittest.TestCase):
+    def setUp(self):
+        # wrist -> hand -> 12 digits of 8 segments, thumb split off the wrist
+        self.children = {'wrist': ['hand', 'thumb_01']}
+        self.children['hand'] = [f'digit{d}_01' for d in range(12)]
+        for d in range(12):
+            for s in range(1, 8):
+                self.children[f'digit{d}_{s:02}'] = [f'digit{d}_{s+1:02}']
+            self.children[f'digit{d}_08'] = []
+        self.children['thumb_01'] = ['thumb_02']
+        self.children['thumb_02'] = []
+
+    def test_read_hand_branches(self):
+        branches, hand_bnd, thumb_bnd = hand.read_hand_branches(self.children, 'wrist')
+        self.assertEqual(hand_bnd, 'hand')
+        self.assertEqual(thumb_bnd, 'thumb_01')
+        self.assertEqual(len(branches), 13)
+        # End joints are excluded, thumb last
+        self.assertEqual(branches[0], [f'digit0_{s:02}' for s in range(1, 8)])
+        self.assertEqual(branches[-1], ['thumb_01'])
+
+    def test_split_index(self):
+        split_index = hand.get_split_index(self.children)
+        self.assertTrue(split_index['wrist'])
+        self.assertTrue(split_index['hand'])
+        self.assertFalse(split_index['thumb_01'])
+        self.assertFalse(split_index['digit3_01'])
+
+
+class TestBuildScheduler(unittest.TestCase):
+    def setUp(self):
+        self.built = list()
+        self.scheduler = build_graph.BuildScheduler()
+        # Added out of order on purpose
+        for name, dependencies in [('lt_hand', ['lt_arm']),
+                                   ('root', []),
+                                   ('lt_arm', ['spine']),
+                                   ('rt_arm', ['spine']),
+                                   ('spine', ['root']),
+                                   ('lt_leg', ['root'])]:
+            self.scheduler.add(name, lambda name=name: self.built.append(name), dependencies)
+
+    def test_plan(self):
+        self.assertEqual(self.scheduler.plan(), [['root'],
+                                                 ['spine', 'lt_leg'],
+                                                 ['lt_arm', 'rt_arm'],
+                                                 ['lt_hand']])
+
+    def test_run_skips_disabled(self):
+        self.scheduler.disable(['lt_arm'])
+        self.scheduler.run()
+        self.assertEqual(self.scheduler.skipped(), ['lt_hand', 'lt_arm'])
+        self.assertEqual(self.built, ['root', 'spine', 'lt_leg', 'rt_arm'])
+
+    def test_timings(self):
+        self.scheduler.run()
+        self.assertEqual(sorted(self.scheduler.timings), sorted(self.scheduler.steps))
+        self.assertTrue(all(seconds >= 0 for seconds in self.scheduler.timings.values()))
+
+    def test_cycle(self):
+        self.scheduler.steps['root'].dependencies.append('lt_hand')
+        with self.assertRaises(ValueError):
+            self.scheduler.plan()
+
+
+class TestBuildProfiler(unittest.TestCase):
+    def setUp(self):
+        # Stand-in command module, counting does not need a scene
+        class Commands():
+            def createNode(self, node_type, name=None):
+                return name
+            def setAttr(self, *args, **kwargs):
+                pass
+        self.commands = Commands()
+        self.create_node = self.commands.createNode
+
+    def test_phase_counts(self):
+        profiler = build_profiler.start('test', cmds_module=self.commands, count_nodes=False)
+        with build_profiler.phase('arm', 'Arm'):
+            with build_profiler.phase('arm', 'setup'):
+                self.commands.createNode('transform', name='a')
+                self.commands.setAttr('a.tx', 1)
+            with build_profiler.phase('arm', 'build'):
+                self.commands.setAttr('a.ty', 1)
+        self.assertIs(build_profiler.stop(), profiler)
+        calls = {event['name']: event['args']['cmds_calls'] for event in profiler.events}
+        self.assertEqual(calls, {'setup': 2, 'build': 1, 'Arm': 3})
+        # Commands restored
+        self.assertEqual(self.commands.createNode, self.create_node)
+        trace = profiler.trace()['traceEvents']
+        self.assertEqual([event['name'] for event in trace[1:]], ['Arm', 'setup', 'build'])
+        self.assertIn('setup', profiler.summary())
+
+    def test_disabled(self):
+        self.assertIsNone(build_profiler.get_profiler())
+        with build_profiler.phase('arm', 'setup'):
+            self.commands.createNode('transform', name='a')
+        self.assertIsNone(build_profiler.stop())
+
+
+class TestNodeHandle(unittest.TestCase):
+    def setUp(self):
+        self.group = cmds.createNode('transform', name='handle_test_grp')
+        self.node = cmds.createNode('transform', name='handle_test_output_grp')
+        self.handle = node_handle.NodeHandle.from_name(self.node)
+
+    def tearDown(self):
+        for node in cmds.ls('handle_test_*'):
+            if cmds.objExists(node):
+                cmds.delete(node)
+
+    def test_follows_reparent_and_rename(self):
+        cmds.parent(self.node, self.group)
+        self.assertEqual(self.handle.name, '|handle_test_grp|handle_test_output_grp')
+        cmds.rename(self.group, 'handle_test_renamed_grp')
+        self.assertEqual(self.handle.name, '|handle_test_renamed_grp|handle_test_output_grp')
+        self.assertEqual(node_handle.NodeHandle.from_uuid(self.handle.uuid).name, self.handle.name)
+
+    def test_uuid_is_not_a_name(self):
+        # Selection lists match strings as names, UUIDs only resolve through from_uuid
+        with self.assertRaises(ValueError):
+            node_handle.NodeHandle.from_name(self.handle.uuid)
+        self.assertEqual(node_handle.NodeHandle.from_uuid(self.handle.uuid).name, self.handle.name)
+
+    def test_counts(self):
+        counts = node_handle.get_counts()
+        profiler = build_profiler.start('test', count_nodes=False)
+        with build_profiler.phase('test', 'lookups'):
+            for _ in range(3):
+                self.handle.name
+        build_profiler.stop()
+        self.assertEqual(node_handle.counts_since(counts)['path'], 3)
+        self.assertEqual(node_handle.counts_since(counts)['resolve'], 0)
+        self.assertEqual(profiler.events[0]['args']['node_path'], 3)
+        # Names read through the handle do not call maya.cmds
+        self.assertEqual(profiler.events[0]['args']['cmds_calls'], 0)
+
+    def test_deleted(self):
+        cmds.delete(self.node)
+        self.assertFalse(self.handle.is_valid())
+        with self.assertRaises(RuntimeError):
+            self.handle.name
+
+
+class TestCmdsTracer(unittest.TestCase):
+    def setUp(self):
+        class Commands():
+            def getAttr(self, attr):
+                return 0.0
+            def setAttr(self, attr, value):
+                pass
+        self.commands = Commands()
+
+    def test_hot_sites(self):
+        with cmds_tracer.CmdsTracer(cmds_module=self.commands,
+                                    root=os.path.dirname(os.path.abspath(__file__))) as tracer:
+            for index in range(10):
+                self.commands.setAttr(f'joint{index}.tx', self.commands.getAttr('a.tx'))
+            self.commands.getAttr('b.tx')
+        totals = {total['command']: total['calls'] for total in tracer.command_totals()}
+        self.assertEqual(totals, {'getAttr': 11, 'setAttr': 10})
+        site = tracer.hot_sites(sort='calls')[0]
+        self.assertEqual(site['function'], 'test_hot_sites')
+        self.assertEqual(site['calls'], 10)
+        self.assertEqual(len(tracer.hot_sites()), 3)
+        self.assertIn('test_hot_sites()', tracer.report())
+
+
+class TestBuildCache(unittest.TestCase):
+    def test_settings_fields(self):
+        settings = rig_settings.BipedSettings(leg_num_lowerTwist_joints=3)
+        fields = build_cache.settings_fields(settings, 'leg_')
+        self.assertEqual(fields['leg_num_lowerTwist_joints'], 3)
+        self.assertNotIn('arm_num_lowerTwist_joints', fields)
+        # Changing another appendage's setting keeps the key
+        other = rig_settings.BipedSettings(leg_num_lowerTwist_joints=3, arm_num_lowerTwist_joints=4)
+        self.assertEqual(build_cache.hash_data(fields),
+                         build_cache.hash_data(build_cache.settings_fields(other, 'leg_')))
+        self.assertNotEqual(build_cache.hash_data(fields),
+                            build_cache.hash_data(build_cache.settings_fields(
+                                rig_settings.BipedSettings(), 'leg_')))
+
+    def test_code_version(self):
+        self.assertEqual(build_cache.code_version(leg.Leg), build_cache.code_version(leg.Leg))
+        self.assertNotEqual(build_cache.code_version(leg.Leg), build_cache.code_version(arm.Arm))
+
+    def test_skeleton_hash(self):
+        skeleton = {'hip': {'parent': None, 'uuid': 'A', 'translate': [0, 1, 0]}}
+        moved = {'hip': {'parent': None, 'uuid': 'B', 'translate': [0, 2, 0]}}
+        # UUIDs are not part of the hash
+        self.assertEqual(build_cache.skeleton_hash(skeleton),
+                         build_cache.skeleton_hash({'hip': dict(skeleton['hip'], uuid='B')}))
+        self.assertNotEqual(build_cache.skeleton_hash(skeleton), build_cache.skeleton_hash(moved))
+
+    def test_normalize(self):
+        # -0.0 from rounding or matrix decomposition hashes like 0.0
+        self.assertEqual(build_cache.hash_data(build_cache.normalize([0.0, -0.0, -1e-9])),
+                         build_cache.hash_data(build_cache.normalize([0.0, 0.0, 0.0])))
+
+    def snapshot(self):
+        '''
+        Returns dict transform -> world matrix of every transform in the scene
+        '''
+        return {node: cmds.xform(node, q=True, matrix=True, worldSpace=True)
+                for node in cmds.ls(type='transform', long=True)}
+
+    def test_rebuild(self):
+        cache_dir = tempfile.mkdtemp()
+        caches = list()
+        snapshots = list()
+        try:
+            for _ in range(2):
+                cmds.file(new=True, force=True)
+                skeleton = skeleton_generator.biped()
+                settings = rig_settings.BipedSettings(asset_name='cache_test', cache_dir=cache_dir,
+                                                      **skeleton.settings)
+                rig = biped.Biped(settings.asset_name, settings)
+                caches.append(rig.build_cache)
+                snapshots.append(self.snapshot())
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            cmds.file(new=True, force=True)
+        built, rebuilt = caches
+        self.assertEqual(built.hits, [])
+        # Every step of the unchanged rig is restored from the cache
+        self.assertEqual(rebuilt.misses, [])
+        self.assertEqual(sorted(rebuilt.hits), sorted(built.keys))
+        self.assertEqual(sorted(snapshots[0]), sorted(snapshots[1]))
+        for node, matrix in snapshots[0].items():
+            for value, other in zip(matrix, snapshots[1][node]):
+                self.assertAlmostEqual(value, other, places=4, msg=node)
+
+
+class TestRigDescription(unittest.TestCase):
+    def setUp(self):
+        self.description = {
+            'nodes': [{'name': '|rig_grp', 'type': 'transform', 'parent': None,
+                       'attributes': {'translateX': ['doubleLinear', 1.0]}, 'dynamic': []},
+                      {'name': 'rig_mult', 'type': 'multMatrix', 'parent': None,
+                       'attributes': {'matrixIn[0]': ['matrix', [1.0, 0, 0, 0, 0, 1, 0, 0,
+                                                                 0, 0, 1, 0, 0, 2, 0, 1]]},
+                       'dynamic': []}],
+            'connections': [['rig_mult.matrixSum', '|rig_grp.offsetParentMatrix']]}
+
+    def copy(self):
+        return json.loads(json.dumps(self.description))
+
+    def test_diff_equivalent(self):
+        other = self.copy()
+        other['nodes'][0]['attributes']['translateX'][1] = 1.0 + 1e-6
+        self.assertTrue(rig_description.is_equivalent(rig_description.diff(self.description, other)))
+
+    def test_diff_changes(self):
+        other = self.copy()
+        other['nodes'][1]['attributes']['matrixIn[0]'][1][13] = 3.0
+        other['nodes'].pop(0)
+        other['connections'] = []
+        difference = rig_description.diff(self.description, other)
+        self.assertEqual(difference['missing'], ['|rig_grp'])
+        self.assertEqual(list(difference['changed']), ['rig_mult'])
+        self.assertEqual(difference['missing_connections'],
+                         [('rig_mult.matrixSum', '|rig_grp.offsetParentMatrix')])
+
+    def test_diff_defaults_and_angles(self):
+        other = self.copy()
+        self.description['nodes'][0]['attributes']['scaleZ'] = ['double', 0.9999999999999999]
+        self.description['nodes'][0]['attributes']['rotateX'] = ['doubleAngle', -180.0]
+        other['nodes'][0]['attributes']['rotateX'] = ['doubleAngle', 180.0]
+        self.assertTrue(rig_description.is_equivalent(rig_description.diff(self.description, other)))
+        other['nodes'][0]['attributes']['rotateX'] = ['doubleAngle', 90.0]
+        difference = rig_description.diff(self.description, other)
+        self.assertEqual(list(difference['changed']), ['|rig_grp'])
+
+    def test_replay_biped(self):
+        cmds.file(new=True, force=True)
+        try:
+            skeleton = skeleton_generator.biped()
+            before = set(cmds.ls(assemblies=True))
+            settings = rig_settings.BipedSettings(asset_name='replay_test', **skeleton.settings)
+            biped.Biped(settings.asset_name, settings)
+            # The rig group, plus controls the build leaves at the world
+            top_nodes = [node for node in cmds.ls(assemblies=True) if node not in before]
+            description = rig_description.capture(top_nodes)
+
+            cmds.file(new=True, force=True)
+            skeleton_generator.biped()
+            rig_description.replay(json.loads(json.dumps(description)))
+            difference = rig_description.diff(description, rig_description.capture(top_nodes))
+        finally:
+            cmds.file(new=True, force=True)
+        self.assertTrue(rig_description.is_equivalent(difference), difference)
+
+    def test_replay_benchmark(self):
+        results = replay_benchmark.run('biped', repeat=1)
+        self.assertEqual(results['replay']['nodes'], results['build']['nodes'])
+        self.assertGreater(results['replay']['seconds'], 0.0)
+        self.assertIn('speedup', replay_benchmark.format_results(results))
+
+
+class TestControlRegistry(unittest.TestCase):
+    def setUp(self):
+        class Appendage():
+            pass
+        self.top_node = cmds.createNode('transform', name='registry_test_grp')
+        self.arm = Appendage()
+        self.arm.appendage_name = 'lt_arm'
+        self.arm.side = 'lt'
+        self.arm.controls = {'fk': {'ctrl_0': self.control('registry_test_fk_0'),
+                                    'ctrl_1': self.control('registry_test_fk_1')},
+                             'ik': {'end_ctrl': self.control('registry_test_ik')},
+                             'switches': {'fkik': self.control('registry_test_switch')}}
+        self.hand = Appendage()
+        self.hand.appendage_name = 'lt_hand'
+        self.hand.side = 'lt'
+        self.hand.controls = {'finger_01': {'fk': {'ctrl_0': self.control('registry_test_finger')},
+                                            'ik': {}}}
+
+    def control(self, name):
+        return cmds.createNode('transform', name=name)
+
+    def tearDown(self):
+        cmds.delete(cmds.ls('registry_test_*'))
+
+    def test_query_by_role(self):
+        added = control_registry.register_appendages(self.top_node, [self.arm, self.hand])
+        self.assertEqual(len(added), 5)
+        self.assertEqual(control_registry.get_controls(self.top_node, role='fk', appendage='lt_arm'),
+                         ['|registry_test_fk_0', '|registry_test_fk_1'])
+        self.assertEqual(control_registry.get_controls(self.top_node, role='switch'),
+                         ['|registry_test_switch'])
+        self.assertEqual(control_registry.get_controls(self.top_node, side='rt'), [])
+        labels = [entry['label'] for entry in control_registry.get_entries(self.top_node)]
+        self.assertIn('finger_01.ctrl_0', labels)
+        # Registering again does not add duplicates
+        self.assertEqual(control_registry.register_appendages(self.top_node, [self.arm]), [])
+        with self.assertRaises(ValueError):
+            control_registry.get_controls(self.top_node, role='pv')
+
+    def test_survives_rename(self):
+        control_registry.register_appendages(self.top_node, [self.arm])
+        cmds.rename('registry_test_ik', 'registry_test_ik_renamed')
+        self.assertEqual(control_registry.get_controls(self.top_node, role='ik'),
+                         ['|registry_test_ik_renamed'])
+
+    def test_shared_short_names(self):
+        # Front and rear legs of a quadruped build controls with the same short name
+        legs = list()
+        for element in ('front', 'rear'):
+            leg = type(self.arm)()
+            leg.appendage_name = f'lt_{element}_leg'
+            leg.side = 'lt'
+            leg.appendage_grp = cmds.createNode('transform', name=f'registry_test_{element}_grp')
+            control = cmds.createNode('transform', name='registry_test_leg_ik_ctrl',
+                                      parent=leg.appendage_grp)
+            cmds.setAttr(f'{control}.translateX', len(legs))
+            leg.controls = {'ik': {'end_ctrl': 'registry_test_leg_ik_ctrl'}}
+            legs.append(leg)
+        try:
+            added = control_registry.register_appendages(self.top_node, legs)
+            expected = ['|registry_test_front_grp|registry_test_leg_ik_ctrl',
+                        '|registry_test_rear_grp|registry_test_leg_ik_ctrl']
+            self.assertEqual(added, expected)
+            self.assertEqual(control_registry.get_controls(self.top_node, appendage='lt_rear_leg'),
+                             expected[1:])
+            cmds.setAttr(f'{expected[1]}.translateX', 5)
+            control_registry.reset_pose(self.top_node, appendage='lt_rear_leg')
+            self.assertEqual([cmds.getAttr(f'{control}.translateX') for control in expected],
+                             [0, 1])
+        finally:
+            cmds.delete([leg.appendage_grp for leg in legs])
+
+    def test_reset_pose(self):
+        cmds.setAttr('registry_test_fk_0.translateX', 2)
+        control_registry.register_appendages(self.top_node, [self.arm])
+        cmds.setAttr('registry_test_fk_0.translateX', 5)
+        cmds.setAttr('registry_test_fk_0.rotateY', 30)
+        control_registry.reset_pose(self.top_node, role='fk')
+        self.assertEqual(cmds.getAttr('registry_test_fk_0.translateX'), 2)
+        self.assertEqual(cmds.getAttr('registry_test_fk_0.rotateY'), 0)
+
+
+class TestBakeFormat(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.output_dir, 'anim_bake.bin')
+        self.data = {frame: {'root_proxy_jnt': {'translateX': frame * 0.5, 'rotateY': -frame},
+                             'cam': {'translateX': 1.25}}
+                     for frame in range(1, 11)}
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        frames, nodes, channels, values = bake_format.from_frame_dict(self.data)
+        self.assertEqual(values.shape, (10, 2, 2))
+        bake_format.write(self.path, frames, nodes, channels, values)
+        self.assertTrue(bake_format.is_bake_file(self.path))
+        bake = bake_format.BakeFile(self.path)
+        self.assertIsInstance(bake.values, bake_format.np.memmap)
+        self.assertEqual(bake.header['data_offset'] % bake_format.ALIGNMENT, 0)
+        # Missing channels come back as NaN and are left out of the frame dict
+        self.assertTrue(math.isnan(bake.channel('cam', 'rotateY')[0]))
+        self.assertEqual(bake.to_frame_dict()[3.0],
+                         {'root_proxy_jnt': {'translateX': 1.5, 'rotateY': -3.0},
+                          'cam': {'translateX': 1.25}})
+        bake.close()
+
+    def test_slices(self):
+        frames, nodes, channels, values = bake_format.from_frame_dict(self.data)
+        bake_format.write(self.path, frames, nodes, channels, values, dtype='float64')
+        bake = bake_format.BakeFile(self.path)
+        self.assertEqual(list(bake.channel('root_proxy_jnt', 'rotateY', 4, 6)), [-4, -5, -6])
+        self.assertEqual(bake.node('root_proxy_jnt', start=9).shape, (2, 2))
+        self.assertEqual(bake.frame(2)[bake.node_index['root_proxy_jnt']].tolist(), [1.0, -2.0])
+        self.assertEqual(list(bake.to_frame_dict(nodes=['cam'], frames=(9, 20))), [9.0, 10.0])
+        with self.assertRaises(KeyError):
+            bake.frame(11)
+        bake.close()
+        with self.assertRaises(ValueError):
+            bake_format.write(self.path, frames, nodes, channels, values[:, :1])
+
+    def test_stream(self):
+        frames, nodes, channels, values = bake_format.from_frame_dict(self.data)
+        bake_format.write(self.path, frames, nodes, channels, values)
+        stream_path = os.path.join(self.output_dir, 'stream.bin')
+        json_path = os.path.join(self.output_dir, 'stream.json')
+        with bake_format.BakeWriter(stream_path, frames, nodes, channels) as writer, \
+                bake_format.JsonBakeWriter(json_path) as json_writer:
+            for start in range(0, len(frames), 3):
+                writer.write(values[start:start + 3])
+                json_writer.write(frames[start:start + 3], nodes, channels, values[start:start + 3])
+        # Same files as one-shot writes
+        with open(self.path, 'rb') as f, open(stream_path, 'rb') as stream:
+            self.assertEqual(f.read(), stream.read())
+        with open(json_path, 'r') as f:
+            self.assertEqual(f.read(), json.dumps(
+                bake_format.frame_dict(frames, nodes, channels, values), indent=4))
+        # Missing frames fail and the partial file is removed
+        with self.assertRaises(ValueError):
+            with bake_format.BakeWriter(stream_path, frames, nodes, channels) as writer:
+                writer.write(values[:4])
+        self.assertFalse(os.path.exists(stream_path))
+        with self.assertRaises(ValueError):
+            with bake_format.BakeWriter(stream_path, frames, nodes, channels) as writer:
+                writer.write(values[:, :1])
+        self.assertFalse(os.path.exists(stream_path))
+
+
+    def test_compressed(self):
+        frames = list(range(0, 300))
+        time = bake_format.np.array(frames, dtype=float)[:, None]
+        values = bake_format.np.stack([bake_format.np.sin(time * 0.05 + 1) * 90.0,
+                                       bake_format.np.cos(time * 0.02) * 3.0,
+                                       time * 0.0 + 1.0], axis=-1)
+        values = bake_format.np.concatenate([values, values * 0.5 + 2.0], axis=1)
+        values[:, 1, 2] = bake_format.np.nan
+        nodes, channels = ['root_proxy_jnt', 'cam'], ['rotateX', 'translateY', 'scaleX']
+        with bake_format.CompressedBakeWriter(self.path, frames, nodes, channels,
+                                              block_frames=64) as writer:
+            for start in range(0, len(frames), 7):
+                writer.write(values[start:start + 7])
+        stream_path = os.path.join(self.output_dir, 'one_shot.bin')
+        with bake_format.CompressedBakeWriter(stream_path, frames, nodes, channels,
+                                              block_frames=64) as writer:
+            writer.write(values)
+        # Blocks do not depend on the chunks written
+        with open(self.path, 'rb') as f, open(stream_path, 'rb') as stream:
+            self.assertEqual(f.read(), stream.read())
+        # Encoded values against float32
+        self.assertLess(writer.size, values.size * 4 / 3)
+
+        bake = bake_format.BakeFile(self.path)
+        self.assertTrue(bake.compressed)
+        rotate = bake.channel('root_proxy_jnt', 'rotateX', 100, 120)
+        # Only the blocks of that column and frame range are decoded
+        self.assertEqual(sorted(bake._blocks), [(0, 1)])
+        error = bake_format.np.abs(rotate - values[100:121, 0, 0]).max()
+        self.assertLessEqual(error, bake.errors[0, 0])
+        self.assertLessEqual(bake.errors[0, 0], 180.0 / 65534 / 2 * 1.0001)
+        self.assertEqual(bake.header['max_error']['rotateX'], bake.errors[:, 0].max())
+        self.assertTrue(math.isnan(bake.channel('cam', 'scaleX')[0]))
+        self.assertEqual(bake.channel('root_proxy_jnt', 'scaleX').tolist(), [1.0] * 300)
+        self.assertTrue(bake_format.np.allclose(bake.values[:, :, :2], values[:, :, :2],
+                                                atol=bake.errors.max()))
+        self.assertEqual(bake.frame(299).shape, (2, 3))
+        self.assertEqual(list(bake.to_frame_dict(nodes=['cam'], frames=(3, 4))), [3.0, 4.0])
+        bake.close()
+        # Coarser levels within a tolerance per channel
+        with bake_format.CompressedBakeWriter(stream_path, frames, nodes, channels,
+                                              tolerances=[0.05, 0.01, 0.0]) as writer:
+            writer.write(values)
+        bake = bake_format.BakeFile(stream_path)
+        self.assertEqual(bake.header['tolerances'], {'rotateX': 0.05, 'translateY': 0.01,
+                                                     'scaleX': 0.0})
+        self.assertTrue((bake.errors <= [0.05, 0.01, 0.0]).all())
+        self.assertGreater(bake.errors[0, 0], 0.01)
+        self.assertLess(os.path.getsize(stream_path), os.path.getsize(self.path))
+        bake.close()
+        with self.assertRaises(ValueError):
+            bake_format.CompressedBakeWriter(self.path, frames, nodes, channels, bits=20)
+
+
+class TestAnimExporter(unittest.TestCase):
+    class AnimFile():
+        # Stands in for masterfile.AnimFile, which makes project directories
+        def __init__(self, path):
+            self.baked_anim = self.anim_curves = path
+            self.versions = 0
+
+        def create_version(self):
+            self.versions += 1
+
+    def setUp(self):
+        cmds.file(new=True, force=True)
+        self.output_dir = tempfile.mkdtemp()
+        self.anim_file = self.AnimFile(self.output_dir)
+        self.publish_data = {'asset_name': 'hero', 'start_frame': 0, 'end_frame': 10,
+                             'rig_version': 0, 'publish': True, 'cache': False}
+        self.build_scene()
+        cmds.setKeyframe('root_ctrl', at='translateX', t=0, v=0)
+        cmds.setKeyframe('root_ctrl', at='translateX', t=10, v=5)
+        cmds.setKeyframe('spine_bnd_jnt_01', at='rotateZ', t=0, v=0)
+        cmds.setKeyframe('spine_bnd_jnt_01', at='rotateZ', t=5, v=45)
+        cmds.setKeyframe('shot_cam', at='translateZ', t=0, v=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def build_scene(self):
+        '''
+        Top node with a two joint skeleton, the root joint driven by a registered control.
+        '''
+        self.top_node = cmds.createNode('transform', name='Biped_grp')
+        skeleton_grp = cmds.createNode('transform', name='skeleton_grp', parent=self.top_node)
+        root_jnt = cmds.createNode('joint', name='root_bnd_jnt', parent=skeleton_grp)
+        spine_jnt = cmds.createNode('joint', name='spine_bnd_jnt_01', parent=root_jnt)
+        cmds.setAttr(f'{spine_jnt}.translateY', 2)
+        ctrl = cmds.createNode('transform', name='root_ctrl')
+        cmds.connectAttr(f'{ctrl}.worldMatrix[0]', f'{root_jnt}.offsetParentMatrix')
+        control_registry.register_controls(self.top_node, [
+            {'control': ctrl, 'appendage': 'root', 'side': None, 'role': 'fk', 'label': 'ctrl'}])
+        camera = cmds.createNode('transform', name='shot_cam')
+        cmds.createNode('camera', name='shot_camShape', parent=camera)
+
+    def test_export(self):
+        exporter.AnimExporter(self.top_node, self.publish_data, self.anim_file)
+        self.assertEqual(self.anim_file.versions, 1)
+        data = curve_format.load(os.path.join(self.output_dir, exporter.ANIM_CURVE_FILENAME))
+        self.assertEqual(data['version'], curve_format.SCHEMA_VERSION)
+        curves = {(curve['node'], curve['attribute']): curve for curve in data['curves']}
+        self.assertEqual(sorted(curves), [('root_ctrl', 'translateX'), ('shot_cam', 'translateZ'),
+                                          ('spine_bnd_jnt_01', 'rotateZ')])
+        curve = curves[('spine_bnd_jnt_01', 'rotateZ')]
+        self.assertEqual(curve['times'], [0.0, 5.0])
+        self.assertEqual(curve['values'], [0.0, 45.0])
+        for field in curve_format.TANGENT_FIELDS:
+            self.assertEqual(len(curve[field]), 2)
+
+        bake = bake_format.BakeFile(os.path.join(self.output_dir, exporter.ANIM_BAKE_FILENAME))
+        self.assertEqual(bake.nodes, ['root_proxy_jnt', 'spine_proxy_jnt_01'])
+        self.assertEqual(len(bake.frames), 11)
+        self.assertAlmostEqual(float(bake.channel('root_proxy_jnt', 'translateX')[-1]), 5.0)
+        self.assertAlmostEqual(float(bake.channel('spine_proxy_jnt_01', 'rotateZ')[5]), 45.0)
+        bake.close()
+        # JSON bake only as debug export
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir,
+                                                     exporter.ANIM_BAKE_DEBUG_FILENAME)))
+
+    def test_stream_export(self):
+        with self.assertLogs(level='INFO') as logs:
+            export = exporter.AnimExporter(self.top_node, self.publish_data, self.anim_file,
+                                           debug_json=True, chunk_frames=4)
+        # Memory of the export itself, not the process high-water mark
+        self.assertNotEqual(export.memory.summary(), 'unknown')
+        if export.memory.baseline is not None:
+            self.assertGreaterEqual(export.memory.peak, 0)
+        self.assertTrue(any(export.memory.summary() in line for line in logs.output))
+        # Same files as one-shot writes of everything sampled and read at once
+        nodes = ['root_proxy_jnt', 'spine_proxy_jnt_01']
+        samples = bake_sampler.sample(['root_bnd_jnt', 'spine_bnd_jnt_01'], range(0, 11))
+        curves = anim_curves.read_curves(['root_bnd_jnt', 'spine_bnd_jnt_01', 'root_ctrl',
+                                          'shot_cam', 'shot_camShape'])
+        expected_dir = os.path.join(self.output_dir, 'expected')
+        os.makedirs(expected_dir)
+        bake_format.write(os.path.join(expected_dir, exporter.ANIM_BAKE_FILENAME),
+                          list(range(0, 11)), nodes, samples['channels'], samples['values'])
+        with open(os.path.join(expected_dir, exporter.ANIM_BAKE_DEBUG_FILENAME), 'w') as f:
+            f.write(json.dumps(bake_format.frame_dict(list(range(0, 11)), nodes,
+                                                      samples['channels'], samples['values']),
+                               indent=4))
+        curve_format.save(os.path.join(expected_dir, exporter.ANIM_CURVE_FILENAME),
+                          curve_format.make_data(curves))
+        for filename in (exporter.ANIM_BAKE_FILENAME, exporter.ANIM_BAKE_DEBUG_FILENAME):
+            with open(os.path.join(self.output_dir, filename), 'rb') as f, \
+                    open(os.path.join(expected_dir, filename), 'rb') as expected:
+                self.assertEqual(f.read(), expected.read(), filename)
+        # The exported index also has the roles
+        self.assertEqual(
+            curve_format.load(os.path.join(self.output_dir, exporter.ANIM_CURVE_FILENAME)),
+            curve_format.load(os.path.join(expected_dir, exporter.ANIM_CURVE_FILENAME)))
+
+    def test_reduced_export(self):
+        for method in key_reduction.METHODS:
+            exporter.AnimExporter(self.top_node, self.publish_data, self.anim_file,
+                                  chunk_frames=4, reduce_keys=method)
+            self.assertFalse(os.path.exists(os.path.join(self.output_dir,
+                                                         exporter.ANIM_BAKE_FILENAME)))
+            data = curve_format.load(os.path.join(self.output_dir,
+                                                  exporter.ANIM_BAKE_KEYS_FILENAME))
+            curves = {(curve['node'], curve['attribute']): curve for curve in data['curves']}
+            # Static channels keep one key
+            self.assertEqual(curves[('spine_proxy_jnt_01', 'translateY')]['times'], [0.0])
+            self.assertLess(sum(len(curve['times']) for curve in data['curves']), 11 * 18)
+            for curve in data['curves']:
+                self.assertLessEqual(curve['error'], curve['tolerance'])
+
+            # Keys rebuild the sampled values on the proxies within the tolerances
+            samples = bake_sampler.sample(['root_bnd_jnt', 'spine_bnd_jnt_01'], range(0, 11))
+            cmds.file(new=True, force=True)
+            self.build_scene()
+            exporter.AnimImporter(self.top_node, self.publish_data, self.anim_file)
+            for frame in range(0, 11):
+                cmds.currentTime(frame)
+                for node_index, node in enumerate(['root_proxy_jnt', 'spine_proxy_jnt_01']):
+                    for channel_index, channel in enumerate(bake_sampler.CHANNELS):
+                        self.assertAlmostEqual(cmds.getAttr(f'{node}.{channel}'),
+                                               samples['values'][frame, node_index, channel_index],
+                                               delta=curves[(node, channel)]['tolerance'])
+            cmds.file(new=True, force=True)
+            self.setUp()
+
+    def test_compressed_export(self):
+        exporter.AnimExporter(self.top_node, self.publish_data, self.anim_file,
+                              bake_compression={'bits': 12}, chunk_frames=4)
+        bake = bake_format.BakeFile(os.path.join(self.output_dir, exporter.ANIM_BAKE_FILENAME))
+        self.assertEqual(bake.header['encoding'], {'bits': 12, 'delta': 2, 'compressor': 'zlib'})
+        self.assertAlmostEqual(float(bake.channel('spine_proxy_jnt_01', 'rotateZ')[5]), 45.0,
+                               delta=bake.errors[1, 5])
+        errors = bake.errors
+        bake.close()
+        samples = bake_sampler.sample(['root_bnd_jnt'], range(0, 11))
+        cmds.file(new=True, force=True)
+        self.build_scene()
+        exporter.AnimImporter(self.top_node, self.publish_data, self.anim_file)
+        for frame in (0, 3, 10):
+            cmds.currentTime(frame)
+            self.assertAlmostEqual(cmds.getAttr('root_proxy_jnt.translateX'),
+                                   samples['values'][frame, 0, 0], delta=errors[0, 0] + 1e-9)
+
+    def test_import(self):
+        exporter.AnimExporter(self.top_node, self.publish_data, self.anim_file)
+        cmds.file(new=True, force=True)
+        self.build_scene()
+        exporter.AnimImporter(self.top_node, self.publish_data, self.anim_file)
+        self.assertEqual(cmds.keyframe('root_ctrl.translateX', q=True, tc=True), [0.0, 10.0])
+        self.assertEqual(cmds.keyframe('spine_bnd_jnt_01.rotateZ', q=True, vc=True), [0.0, 45.0])
+        self.assertEqual(cmds.keyframe('root_proxy_jnt.translateX', q=True, kc=True), 11)
+
+    def test_partial_import(self):
+        exporter.AnimExporter(self.top_node, self.publish_data, self.anim_file)
+        index = curve_format.read_index(os.path.join(self.output_dir, exporter.ANIM_CURVE_FILENAME))
+        self.assertEqual({(entry['node'], entry['role']) for entry in index['curves']},
+                         {('root_ctrl', 'controls'), ('shot_cam', 'cameras'),
+                          ('spine_bnd_jnt_01', 'joints')})
+        # Cameras only, no proxy skeleton or bake
+        cmds.file(new=True, force=True)
+        self.build_scene()
+        exporter.AnimImporter(self.top_node, self.publish_data, self.anim_file, roles=['cameras'])
+        self.assertEqual(cmds.keyframe('shot_cam.translateZ', q=True, vc=True), [10.0])
+        self.assertEqual(cmds.keyframe('root_ctrl.translateX', q=True, kc=True), 0)
+        self.assertFalse(cmds.objExists('root_proxy_jnt'))
+        # Node patterns and a frame window, on curves and bake
+        cmds.file(new=True, force=True)
+        self.build_scene()
+        exporter.AnimImporter(self.top_node, self.publish_data, self.anim_file,
+                              nodes=['spine*'], start_frame=6, end_frame=8)
+        self.assertEqual(cmds.keyframe('spine_bnd_jnt_01.rotateZ', q=True, tc=True), [5.0])
+        self.assertEqual(cmds.keyframe('root_ctrl.translateX', q=True, kc=True), 0)
+        self.assertEqual(cmds.keyframe('spine_proxy_jnt_01.translateX', q=True, tc=True),
+                         [6.0, 7.0, 8.0])
+        self.assertEqual(cmds.keyframe('root_proxy_jnt.translateX', q=True, kc=True), 0)
+        # Exports without an index take the roles from the scene
+        path = os.path.join(self.output_dir, exporter.ANIM_CURVE_FILENAME)
+        data = curve_format.load(path)
+        with open(path, 'w') as f:
+            json.dump(data, f)
+        self.assertIsNone(curve_format.read_index(path))
+        with self.assertRaises(ValueError):
+            curve_format.load_curves(path, roles=['cameras'])
+        cmds.file(new=True, force=True)
+        self.build_scene()
+        exporter.AnimImporter(self.top_node, self.publish_data, self.anim_file, roles=['cameras'])
+        self.assertEqual(cmds.keyframe('shot_cam.translateZ', q=True, vc=True), [10.0])
+        self.assertEqual(cmds.keyframe('root_ctrl.translateX', q=True, kc=True), 0)
+        self.assertEqual(cmds.keyframe('spine_bnd_jnt_01.rotateZ', q=True, kc=True), 0)
+
+    def test_curve_index(self):
+        path = os.path.join(self.output_dir, exporter.ANIM_CURVE_FILENAME)
+        curves = [curve_format.new_curve(f'node_{index:02}', 'translateX') for index in range(5)]
+        for index, curve in enumerate(curves):
+            curve['times'] = [0.0, 10.0 + index]
+            curve['values'] = [float(index), 'é']
+        curve_format.save(path, curve_format.make_data(curves), role='joints')
+        entries = curve_format.read_index(path)['curves']
+        self.assertEqual([(entry['start'], entry['end']) for entry in entries][1], (0.0, 11.0))
+        curve_format.READ_GAP, read_gap = 0, curve_format.READ_GAP
+        try:
+            self.assertEqual(curve_format.read_ranges(path, entries[3:0:-2]),
+                             [curves[1], curves[3]])
+        finally:
+            curve_format.READ_GAP = read_gap
+        self.assertEqual(curve_format.load_curves(path, nodes=['node_0[24]']),
+                         [curves[2], curves[4]])
+        self.assertEqual(curve_format.load_curves(path, roles=['cameras']), [])
+        # The index is inside the file, which is still one JSON document
+        self.assertEqual(os.listdir(self.output_dir), [exporter.ANIM_CURVE_FILENAME])
+        self.assertEqual(curve_format.load(path), curve_format.make_data(curves))
+        # Files with a broken index are read whole
+        with open(path, 'r+b') as f:
+            f.seek(-curve_format.INDEX_TRAILER_SIZE + len(curve_format.INDEX_OFFSET_KEY), 2)
+            f.write(b'99999999')
+        with self.assertLogs(level='WARNING'):
+            self.assertIsNone(curve_format.read_index(path))
+        self.assertEqual(curve_format.load_curves(path, nodes=['node_01'], end=5),
+                         [curve_format.window(curves[1], end=5)])
+
+    def test_sample_bake(self):
+        cmds.setAttr('spine_bnd_jnt_01.jointOrient', 0, 20, 30)
+        cmds.setAttr('spine_bnd_jnt_01.rotateOrder', 4)
+        cmds.setKeyframe('spine_bnd_jnt_01', at='rotateX', t=0, v=-10)
+        cmds.setKeyframe('spine_bnd_jnt_01', at='rotateX', t=10, v=60)
+        cmds.setKeyframe('spine_bnd_jnt_01', at='scaleY', t=10, v=2)
+        cmds.currentTime(3)
+        node_count = len(cmds.ls())
+        samples = bake_sampler.sample(['root_bnd_jnt', 'spine_bnd_jnt_01'], range(0, 11))
+        # Nothing created and the current time untouched
+        self.assertEqual(len(cmds.ls()), node_count)
+        self.assertEqual(cmds.currentTime(q=True), 3)
+        self.assertEqual(samples['values'].shape, (11, 2, len(bake_sampler.CHANNELS)))
+        for frame in (0, 4, 7, 10):
+            cmds.currentTime(frame)
+            root_values, spine_values = samples['values'][frame]
+            # offsetParentMatrix from the control is baked into the root translation
+            self.assertAlmostEqual(root_values[0], cmds.getAttr('root_ctrl.translateX'))
+            expected = cmds.getAttr('spine_bnd_jnt_01.translate')[0] + \
+                cmds.getAttr('spine_bnd_jnt_01.rotate')[0] + cmds.getAttr('spine_bnd_jnt_01.scale')[0]
+            for value, expected_value in zip(spine_values, expected):
+                self.assertAlmostEqual(value, expected_value, places=6)
+            world = cmds.xform('spine_bnd_jnt_01', q=True, matrix=True, worldSpace=True)
+            self.assertTrue(bake_sampler.np.allclose(samples['world'][frame, 1].flatten(), world))
+
+    def test_read_curves(self):
+        cmds.keyTangent('spine_bnd_jnt_01.rotateZ', e=True, t=(5, 5), itt='linear', ott='step')
+        cmds.setKeyframe('shot_camShape', at='focalLength', t=3, v=50)
+        nodes = ['root_bnd_jnt', 'spine_bnd_jnt_01', 'root_ctrl', 'shot_cam', 'shot_camShape']
+        curves = anim_curves.read_curves(nodes)
+        expected = anim_curves.read_curves_commands(nodes)
+        self.assertEqual(len(curves), 4)
+        for curve, other in zip(sorted(curves, key=lambda curve: curve['node']),
+                                sorted(expected, key=lambda curve: curve['node'])):
+            self.assertEqual((curve['node'], curve['attribute']), (other['node'], other['attribute']))
+            for field in ('times', 'values', 'itt', 'ott', 'iw', 'ow'):
+                self.assertEqual(curve[field], other[field])
+            for field in ('ia', 'oa'):
+                for angle, other_angle in zip(curve[field], other[field]):
+                    self.assertAlmostEqual(angle, other_angle)
+        # Angular curves are read in radians by the API and stored in degrees
+        spine_curve = next(curve for curve in curves if curve['attribute'] == 'rotateZ')
+        self.assertEqual(spine_curve['values'], [0.0, 45.0])
+        self.assertEqual(spine_curve['ott'], ['auto', 'step'])
+        self.assertEqual(anim_curves.read_curves([]), [])
+
+    def test_write_curves(self):
+        cmds.keyTangent('spine_bnd_jnt_01.rotateZ', e=True, t=(5, 5), itt='linear', ott='step')
+        cmds.setKeyframe('root_ctrl', at='translateX', t=4, v=1)
+        nodes = ['spine_bnd_jnt_01', 'root_ctrl', 'shot_cam']
+        curves = anim_curves.read_curves(nodes)
+        written = dict()
+        for writer in (anim_curves.write_curves_commands, anim_curves.write_curves):
+            cmds.cutKey(nodes, clear=True)
+            self.assertEqual(writer(curves), 6)
+            written[writer] = anim_curves.read_curves(nodes)
+        bulk, commands = written[anim_curves.write_curves], written[anim_curves.write_curves_commands]
+        self.assertEqual(len(bulk), 3)
+        for curve, other in zip(bulk, commands):
+            for field in ('node', 'attribute', 'times', 'values', 'itt', 'iw', 'ow'):
+                self.assertEqual(curve[field], other[field])
+            for field in ('ia', 'oa'):
+                for angle, other_angle in zip(curve[field], other[field]):
+                    self.assertAlmostEqual(angle, other_angle)
+        # Stepped keys stay stepped, keyTangent -oa made them fixed
+        spine_curve = next(curve for curve in bulk if curve['attribute'] == 'rotateZ')
+        self.assertEqual(spine_curve['ott'], ['fixed', 'step'])
+        self.assertEqual([curve['ott'] for curve in bulk if curve is not spine_curve],
+                         [curve['ott'] for curve in commands if curve['attribute'] != 'rotateZ'])
+        # Existing curves are reused and merged into
+        curve_count = len(cmds.ls(type='animCurve'))
+        anim_curves.write_curves([dict(curves[0], times=[8.0], values=[10.0], itt=[], ott=[])])
+        self.assertEqual(len(cmds.ls(type='animCurve')), curve_count)
+        self.assertEqual(cmds.keyframe('root_ctrl.translateX', q=True, tc=True), [0.0, 4.0, 8.0, 10.0])
+        # Curves created with a modifier are connected before they are keyed
+        cmds.cutKey('root_ctrl', clear=True)
+        modifier = om.MDGModifier()
+        root_curve = next(curve for curve in curves if curve['node'] == 'root_ctrl')
+        self.assertEqual(anim_curves.write_curves([root_curve], modifier=modifier), 3)
+        self.assertEqual(cmds.keyframe('root_ctrl.translateX', q=True, tc=True), root_curve['times'])
+        modifier.undoIt()
+        self.assertEqual(cmds.keyframe('root_ctrl.translateX', q=True, kc=True), 0)
+        self.assertEqual(len(cmds.ls(type='animCurve')), curve_count - 1)
+
+    def test_import_undo(self):
+        exporter.AnimExporter(self.top_node, self.publish_data, self.anim_file)
+        cmds.file(new=True, force=True)
+        self.build_scene()
+        curve_count = len(cmds.ls(type='animCurve'))
+        with self.assertLogs(level='INFO') as logs:
+            exporter.AnimImporter(self.top_node, self.publish_data, self.anim_file)
+        self.assertTrue(any('keys/s' in line for line in logs.output))
+        imported_count = len(cmds.ls(type='animCurve'))
+        key_count = cmds.keyframe('root_ctrl.translateX', q=True, kc=True)
+        self.assertGreater(imported_count, curve_count)
+        self.assertGreater(key_count, 0)
+        # One undo reverts the import, the curve edits and the bake
+        cmds.undo()
+        self.assertEqual(len(cmds.ls(type='animCurve')), curve_count)
+        self.assertEqual(cmds.keyframe('root_ctrl.translateX', q=True, kc=True), 0)
+        cmds.redo()
+        self.assertEqual(len(cmds.ls(type='animCurve')), imported_count)
+        self.assertEqual(cmds.keyframe('root_ctrl.translateX', q=True, kc=True), key_count)
+
+    def test_migrate_frame_major(self):
+        tangent = {'itt': 'linear', 'ott': 'linear', 'iw': 1.0, 'ow': 1.0, 'ia': 0.0, 'oa': 0.0}
+        old = {'5': {'root_ctrl': {'translateX': {'value': 2.0, 'tangent': tangent}}},
+               '0': {'root_ctrl': {'translateX': {'value': 0.0, 'tangent': tangent}},
+                     'shot_cam': {'translateZ': {'value': 10.0, 'tangent': tangent}}}}
+        path = os.path.join(self.output_dir, exporter.ANIM_CURVE_FILENAME)
+        with open(path, 'w') as f:
+            json.dump(old, f)
+        data = curve_format.load(path)
+        self.assertEqual([curve['node'] for curve in data['curves']], ['root_ctrl', 'shot_cam'])
+        curve = data['curves'][0]
+        self.assertEqual(curve['times'], [0.0, 5.0])
+        self.assertEqual(curve['itt'], ['linear', 'linear'])
+        self.assertEqual(curve_format.keys(curve)[1], (5.0, 2.0, tangent))
+
+
+class TestKeyReduction(unittest.TestCase):
+    def setUp(self):
+        self.frames = key_reduction.np.arange(0, 120, dtype=float)
+        frames = self.frames
+        self.values = key_reduction.np.stack([
+            key_reduction.np.full(len(frames), 2.5), # constant
+            frames * 0.5 - 3.0, # linear
+            key_reduction.np.minimum(frames, 40.0), # linear with a kink at 40
+            key_reduction.np.sin(frames * 0.02) * 5.0], axis=1)
+        self.tolerances = key_reduction.np.full(4, 1e-3)
+
+    def test_reduce(self):
+        counts = dict()
+        for method in key_reduction.METHODS:
+            result = key_reduction.reduce(self.frames, self.values, self.tolerances, method)
+            counts[method] = result['keep'].sum(axis=0).tolist()
+            rebuilt = key_reduction.rebuild(self.frames, self.values, result['keep'],
+                                            result['slopes'])
+            error = key_reduction.np.abs(rebuilt - self.values).max(axis=0)
+            self.assertTrue(key_reduction.np.allclose(error, result['error']))
+            self.assertTrue((result['error'] <= self.tolerances).all())
+        self.assertEqual(counts['linear'][:3], [2, 2, 3])
+        # Smooth motion needs far fewer bezier keys
+        self.assertLess(counts['bezier'][3], counts['linear'][3] / 2)
+        self.assertLess(counts['linear'][3], len(self.frames))
+        with self.assertRaises(ValueError):
+            key_reduction.reduce(self.frames, self.values, self.tolerances, 'cubic')
+
+    def test_chunks(self):
+        channels = ['translateX', 'translateY', 'rotateX', 'rotateY']
+        self.assertEqual(key_reduction.channel_tolerances(channels).tolist(),
+                         [1e-3, 1e-3, 1e-2, 1e-2])
+        reducer = key_reduction.KeyReducer(channels, 1e-3, 'linear')
+        for start in range(0, len(self.frames), 50):
+            reducer.add(self.frames[start:start + 50], self.values[start:start + 50])
+        self.assertEqual(reducer.constant().tolist(), [True, False, False, False])
+        curves = reducer.curves(['a', 'a', 'b', 'b'], fps=24.0)
+        self.assertEqual([(curve['node'], curve['attribute']) for curve in curves],
+                         [('a', 'translateX'), ('a', 'translateY'), ('b', 'rotateX'),
+                          ('b', 'rotateY')])
+        self.assertEqual(curves[0]['times'], [0.0])
+        # Chunk ends are kept
+        self.assertEqual(curves[1]['times'], [0.0, 49.0, 50.0, 99.0, 100.0, 119.0])
+        self.assertAlmostEqual(curves[1]['oa'][0], math.degrees(math.atan(0.5 * 24.0)))
+        self.assertEqual(reducer.key_count(), sum(len(curve['times']) for curve in curves))
+        for curve in curves:
+            self.assertLessEqual(curve['error'], curve['tolerance'])
+
+
+class TestBakeShards(unittest.TestCase):
+    # Stand-in maya package and sampler for the workers
+    STUBS = {
+        'maya/__init__.py': '',
+        'maya/standalone.py': 'def initialize(name=None):\n    pass\n',
+        'maya/cmds.py': '''
+opened = list()
+def file(path, open=False, force=False):
+    opened.append(path)
+''',
+        'shard_sampler.py': '''
+import time
+import numpy as np
+def sample(nodes, frames):
+    if frames[0] == 0:
+        time.sleep(0.5) # First shard finishes last
+    if 13 in frames:
+        raise RuntimeError('bad frame')
+    values = np.array([[[frame * 100 + node * 10 + channel for channel in range(3)]
+                        for node in range(len(nodes))] for frame in frames], dtype=float)
+    return {'frames': list(frames), 'nodes': list(nodes), 'channels': ['a', 'b', 'c'],
+            'values': values, 'world': np.zeros((len(frames), len(nodes), 4, 4))}
+'''}
+
+    def setUp(self):
+        self.stub_dir = tempfile.mkdtemp()
+        for name, text in self.STUBS.items():
+            os.makedirs(os.path.dirname(os.path.join(self.stub_dir, name)), exist_ok=True)
+            with open(os.path.join(self.stub_dir, name), 'w') as f:
+                f.write(text)
+        self.scene_file = os.path.join(self.stub_dir, 'shot.ma')
+
+    def tearDown(self):
+        shutil.rmtree(self.stub_dir, ignore_errors=True)
+
+    def sharded(self, **kwargs):
+        return bake_shards.ShardedBake(self.scene_file, interpreter=sys.executable,
+                                       python_path=[self.stub_dir], sampler='shard_sampler:sample',
+                                       **kwargs)
+
+    def test_split_frames(self):
+        self.assertEqual(bake_shards.split_frames(range(10), 3),
+                         [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]])
+        self.assertEqual(bake_shards.split_frames(range(2), 4), [[0], [1]])
+
+    def test_merge(self):
+        bake = self.sharded(workers=3, min_shard_frames=2, work_dir=self.stub_dir)
+        sample = bake.sample(['root', 'spine'], range(0, 12))
+        self.assertEqual(len(bake.shard_seconds), 3)
+        self.assertEqual(sample['frames'], list(range(0, 12)))
+        self.assertEqual(sample['values'].shape, (12, 2, 3))
+        # Merged in frame order although the first shard finished last
+        self.assertEqual(sample['values'][:, 1, 2].tolist(), [frame * 100 + 12.0
+                                                               for frame in range(12)])
+        self.assertTrue(os.path.exists(os.path.join(self.stub_dir, 'shard_000.log')))
+        # Workers only send back the values unless asked for more
+        self.assertNotIn('world', sample)
+        bake = self.sharded(workers=2, min_shard_frames=2, arrays=('values', 'world'))
+        self.assertEqual(bake.sample(['root'], range(0, 4))['world'].shape, (4, 1, 4, 4))
+
+    def test_iter_chunks(self):
+        bake = self.sharded(workers=2, min_shard_frames=2)
+        chunks = list(bake.iter_chunks(['root'], range(0, 12), 4))
+        # One worker per shard for the whole range, chunked inside each worker
+        self.assertEqual(bake.workers_started, 2)
+        self.assertEqual(len(bake.shard_seconds), 2)
+        self.assertEqual([chunk['frames'] for chunk in chunks],
+                         [[0, 1, 2, 3], [4, 5], [6, 7, 8, 9], [10, 11]])
+        for chunk in chunks:
+            self.assertEqual(chunk['channels'], ['a', 'b', 'c'])
+            self.assertEqual(chunk['values'][:, 0, 1].tolist(),
+                             [frame * 100 + 1.0 for frame in chunk['frames']])
+        # Chunk files are removed once read
+        self.assertFalse([name for name in os.listdir(self.stub_dir) if name.endswith('.npz')])
+
+    def test_saved_scene(self):
+        cmds.file(new=True, force=True)
+        self.assertIsNone(bake_shards.saved_scene())
+        cmds.createNode('transform', name='shard_test_grp')
+        cmds.file(rename=self.scene_file)
+        cmds.file(save=True)
+        self.assertEqual(bake_shards.saved_scene(), self.scene_file)
+        # Workers would sample the file on disk, without this edit
+        cmds.setAttr('shard_test_grp.translateX', 1)
+        self.assertIsNone(bake_shards.saved_scene())
+        cmds.file(new=True, force=True)
+
+    def test_fallback_and_failure(self):
+        sys.path.insert(0, self.stub_dir)
+        try:
+            bake = self.sharded(workers=4, min_shard_frames=50)
+            self.assertEqual(bake.shard_count(60), 1)
+            sample = bake.sample(['root'], range(20, 30))
+            self.assertEqual(bake.shard_seconds, [])
+            self.assertEqual(sample['values'][0, 0].tolist(), [2000.0, 2001.0, 2002.0])
+        finally:
+            sys.path.remove(self.stub_dir)
+            sys.modules.pop('shard_sampler', None)
+        with self.assertRaises(RuntimeError):
+            self.sharded(workers=2, min_shard_frames=2).sample(['root'], range(10, 20))
+
+
+class TestMemoryUsage(unittest.TestCase):
+    def test_monitor(self):
+        size = 64 * 1024 * 1024
+        with memory_usage.MemoryMonitor(trace_python=True) as monitor:
+            block = bake_format.np.ones(size // 8)
+            block[::512] = 2.0 # Touch the pages
+        del block
+        self.assertGreaterEqual(monitor.python_peak, size * 0.9)
+        if monitor.baseline is not None:
+            self.assertGreaterEqual(monitor.peak, size // 2)
+        self.assertIn('peak Python allocations', monitor.summary())
+        self.assertEqual(memory_usage.format_bytes(1536), '1.5 KB')
+
+
+class TestBuildFarm(unittest.TestCase):
+    BUILDER = '''
+import time
+def build(job):
+    if job['asset_name'] == 'slow':
+        time.sleep(30)
+    if job['asset_name'] == 'flaky' and job['attempt'] == 1:
+        raise RuntimeError('first attempt fails')
+    with open(job['output_file'], 'w') as f:
+        f.write(job['asset_name'])
+    return job['output_file']
+'''
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        # Builder module standing in for Maya in the workers
+        with open(os.path.join(self.output_dir, 'farm_builder.py'), 'w') as f:
+            f.write(self.BUILDER)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_run(self):
+        farm = build_farm.BuildFarm(self.output_dir, workers=3, timeout=3, retries=1,
+                                    interpreter=sys.executable,
+                                    python_path=[self.output_dir],
+                                    builder='farm_builder:build')
+        summary = farm.run([{'asset_name': 'hero', 'skeleton_file': 'hero.ma'},
+                            {'asset_name': 'flaky', 'skeleton_file': 'flaky.ma'},
+                            {'asset_name': 'slow', 'skeleton_file': 'slow.ma'}])
+        assets = {asset['asset_name']: asset for asset in summary['assets']}
+        self.assertEqual(assets['hero']['status'], 'success')
+        self.assertEqual(assets['hero']['attempts'], 1)
+        self.assertEqual(assets['flaky']['status'], 'success')
+        self.assertEqual(assets['flaky']['attempts'], 2)
+        self.assertEqual(assets['slow']['status'], 'timeout')
+        self.assertEqual(assets['slow']['attempts'], 2)
+        self.assertTrue(os.path.exists(assets['hero']['output_file']))
+        self.assertTrue(os.path.exists(os.path.join(self.output_dir, 'summary.json')))
+        # Each attempt has its own log
+        self.assertNotEqual(assets['flaky']['history'][0]['log_file'],
+                            assets['flaky']['history'][1]['log_file'])
+
+    @unittest.skipUnless(FAKE_MAYA, 'Workers on the fake engine cannot open Maya scene files')
+    def test_build_asset(self):
+        # The default builder in workers on the fake engine, on a generated skeleton
+        cmds.file(new=True, force=True)
+        skeleton = skeleton_generator.biped()
+        skeleton_file = os.path.join(self.output_dir, 'skeleton.ma')
+        cmds.file(rename=skeleton_file)
+        cmds.file(save=True, type='mayaAscii', force=True)
+        environ = dict(os.environ)
+        os.environ['ADV_SCRIPTING_FAKE_MAYA'] = '1'
+        try:
+            farm = build_farm.BuildFarm(self.output_dir, workers=2, timeout=120, retries=0,
+                                        interpreter=sys.executable)
+            summary = farm.run([{'asset_name': name, 'skeleton_file': skeleton_file,
+                                 'settings': skeleton.settings} for name in ('hero', 'villain')])
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+        self.assertEqual(summary['succeeded'], 2, build_farm.format_summary(summary))
+        for asset in summary['assets']:
+            cmds.file(asset['output_file'], open=True, force=True)
+            self.assertTrue(cmds.objExists(f"{asset['asset_name']}_grp"))
+            self.assertTrue(control_registry.has_registry(f"{asset['asset_name']}_grp"))
+        cmds.file(new=True, force=True)
+
+
+class TestFakeMaya(unittest.TestCase):
+    def setUp(self):
+        # Uses the fake engine directly, also when running in mayapy
+        self.cmds = fake_maya.cmds
+        self.om = fake_maya.openmaya
+        fake_maya.new_scene()
+
+    def tearDown(self):
+        fake_maya.new_scene()
+
+    def test_euler_round_trip(self):
+        rotation = [math.radians(v) for v in (30, -60, 100)]
+        for order in range(6):
+            matrix = fake_maya.mmath.euler_matrix(rotation, order)
+            euler = fake_maya.mmath.matrix_to_euler(matrix, order)
+            self.assertTrue(fake_maya.mmath.is_equivalent(
+                fake_maya.mmath.euler_matrix(euler, order), matrix, 1e-9))
+
+    def test_names(self):
+        cmds = self.cmds
+        first = cmds.joint(p=(0, 0, 0), n='chain_jnt')
+        cmds.select(cl=True)
+        second = cmds.joint(p=(0, 0, 0), n='chain_jnt')
+        self.assertEqual(second, 'chain_jnt1')
+        group = cmds.group(em=True, n='grp')
+        cmds.parent(second, group)
+        cmds.rename('|grp|chain_jnt1', 'chain_jnt')
+        self.assertEqual(sorted(cmds.ls('chain_jnt', long=True)), ['|chain_jnt', '|grp|chain_jnt'])
+        with self.assertRaises(ValueError):
+            cmds.getAttr('chain_jnt.tx')
+        uuid = cmds.ls(first, uuid=True)[0]
+        self.assertEqual(cmds.ls(uuid), ['|chain_jnt'])
+
+    def test_matrix_network(self):
+        cmds = self.cmds
+        parent = cmds.group(em=True, n='parent_grp')
+        cmds.xform(parent, ws=True, t=(1, 2, 3), ro=(0, 90, 0))
+        child = cmds.createNode('transform', n='child', p=parent)
+        cmds.setAttr(f'{child}.translate', 0, 0, 5)
+        driven = cmds.createNode('transform', n='driven')
+        mult = cmds.createNode('multMatrix')
+        cmds.connectAttr(f'{child}.worldMatrix[0]', f'{mult}.matrixIn[0]')
+        decompose = cmds.createNode('decomposeMatrix')
+        cmds.connectAttr(f'{mult}.matrixSum', f'{decompose}.inputMatrix')
+        cmds.connectAttr(f'{decompose}.outputTranslate', f'{driven}.translate')
+        for value, expected in zip(cmds.getAttr(f'{driven}.translate')[0], (6, 2, 3)):
+            self.assertAlmostEqual(value, expected)
+        cmds.setAttr(f'{parent}.translateY', 10)
+        self.assertAlmostEqual(cmds.xform(driven, q=True, ws=True, t=True)[1], 10)
+        self.assertEqual(cmds.listConnections(f'{driven}.translate', plugs=True),
+                         [f'{decompose}.outputTranslate'])
+
+    def test_keyframes(self):
+        cmds = self.cmds
+        node = cmds.createNode('transform', n='animated')
+        cmds.setKeyframe(node, attribute='translateX', time=1, value=0)
+        cmds.setKeyframe(node, attribute='translateX', time=11, value=10,
+                         inTangentType='linear', outTangentType='linear')
+        cmds.keyTangent(node, attribute='translateX', time=(1, 1), outTangentType='linear')
+        self.assertAlmostEqual(cmds.getAttr(f'{node}.translateX', time=6), 5)
+        self.assertEqual(cmds.keyframe(node, attribute='translateX', query=True,
+                                       keyframeCount=True), 2)
+        self.assertEqual(cmds.keyframe(f'{node}.translateX', query=True, timeChange=True),
+                         [1.0, 11.0])
+
+    def test_file_round_trip(self):
+        cmds = self.cmds
+        joint = cmds.joint(p=(0, 5, 0), n='saved_jnt')
+        cmds.addAttr(joint, ln='switch', at='double', min=0, max=1, k=True)
+        path = os.path.join(tempfile.mkdtemp(), 'scene.ma')
+        cmds.file(rename=path)
+        cmds.file(save=True)
+        cmds.file(new=True, force=True)
+        self.assertFalse(cmds.objExists('saved_jnt'))
+        cmds.file(path, open=True, force=True)
+        self.assertEqual(cmds.xform('saved_jnt', q=True, ws=True, t=True), [0, 5, 0])
+        self.assertEqual(cmds.attributeQuery('switch', node='saved_jnt', maximum=True), [1.0])
+        shutil.rmtree(os.path.dirname(path))
+
+    def test_scale(self):
+        # A 10k joint chain builds and evaluates in seconds
+        cmds = self.cmds
+        timer = time.perf_counter()
+        for index in range(10000):
+            cmds.joint(p=(0, index, 0), n=f'scale{index}_jnt')
+        cmds.xform('scale0_jnt', ws=True, t=(1, 0, 0))
+        position = cmds.xform('scale9999_jnt', q=True, ws=True, t=True)
+        self.assertEqual(position, [1, 9999, 0])
+        self.assertEqual(len(cmds.listRelatives('scale0_jnt', allDescendents=True)), 9999)
+        self.assertLess(time.perf_counter() - timer, 30)
+
+
+class TestSkeletonGenerator(unittest.TestCase):
+    def setUp(self):
+        cmds.file(new=True, force=True)
+
+    def tearDown(self):
+        cmds.file(new=True, force=True)
+
+    def test_names_round_trip(self):
+        # rename_hierarchy in the Root appendage must not change the generated names
+        for generator in skeleton_generator.GENERATORS.values():
+            cmds.file(new=True, force=True)
+            skeleton = generator()
+            for joint in skeleton.joints:
+                self.assertEqual(rig_name.RigName(full_name=joint).output(), joint)
+
+    def test_biped_counts(self):
+        skeleton = skeleton_generator.biped(spine_joints=6, arm_twist_joints=(2, 1), fingers=4,
+                                            finger_joints=3)
+        self.assertEqual(len(cmds.ls(type='joint')), skeleton.joint_count)
+        self.assertEqual(skeleton.settings['spine_num_spine_joints'], 6)
+        self.assertEqual(skeleton.settings['arm_num_upperTwist_joints'], 2)
+        self.assertEqual(len(skeleton.parts['spine']), 6)
+        # Hand joint and 4 fingers of 3 joints
+        self.assertEqual(len(skeleton.parts['lt_hand']), 13)
+        self.assertEqual(sum(len(joints) for joints in skeleton.parts.values()),
+                         skeleton.joint_count)
+        settings = rig_settings.BipedSettings(asset_name='generated', **skeleton.settings)
+        self.assertTrue(cmds.objExists(settings.arm_start_joint))
+
+    def test_creature_limbs(self):
+        skeleton = skeleton_generator.creature(limb_pairs=3)
+        self.assertEqual(sorted(skeleton.limbs), ['lt_limb01', 'lt_limb02', 'lt_limb03',
+                                                  'rt_limb01', 'rt_limb02', 'rt_limb03'])
+        self.assertEqual(skeleton.settings['leg_start_joint'], skeleton.limbs['lt_limb01'])
+        with self.assertRaises(ValueError):
+            skeleton_generator.creature(limb_pairs=3, spine_joints=2)
+
+    def test_scaling_benchmark(self):
+        rows = scaling_benchmark.run(['biped'], levels=2, warmup=False)
+        totals = [row for row in rows if row['part'] == 'biped']
+        self.assertEqual(len(totals), 2)
+        self.assertLess(totals[0]['joints'], totals[1]['joints'])
+        self.assertEqual({row['part'] for row in rows},
+                         {'biped', 'root', 'spine', 'head', 'arm', 'leg', 'hand'})
+        self.assertIsNotNone(scaling_benchmark.scaling_exponent(totals))
+        path = os.path.join(tempfile.mkdtemp(), 'scaling.csv')
+        scaling_benchmark.write_csv(rows, path)
+        with open(path) as f:
+            self.assertEqual(len(f.readlines()), len(rows) + 1)
+        shutil.rmtree(os.path.dirname(path))
+
+
 class TestRootAppendage(unittest.TestCase):
     def setUp(self):
         self.joint = cmds.joint(p=(50, 50, 10), n='test_root_joint_01')
@@ -112,17 +1455,21 @@ class TestRootAppendage(unittest.TestCase):
 
 class TestHandAppendage(unittest.TestCase):
 
-    def __init__(self, testname, filepath):
-        super(TestHandAppendage, self).__init__(testname)
+    def setUp(self):
         self.sides = [rig_name.Side('lt'), rig_name.Side('rt')]
         self.hands = dict()
+        # Arms and hands of a generated skeleton, the hand follows the last lower arm joint
+        cmds.file(new=True, force=True)
+        skeleton = skeleton_generator.biped()
+        lower_arm = rig_name.RigName(full_name=skeleton_generator.joint_name(
+            'lower_arm', position=skeleton.settings['arm_num_lowerTwist_joints'] + 1))
         self.settings = {
             'Hand': {
                 'appendage_name': rig_name.Element('test_hand'),
-                'start_joint': rig_name.RigName(full_name='wrist_bnd_jnt'),
+                'start_joint': rig_name.RigName(full_name=skeleton.settings['hand_start_joint']),
                 'num_upperTwist_joint': None,
                 'num_lowerTwist_joint': None,
-                'input_matrix': rig_name.RigName(full_name='lower_arm_bnd_jnt_02')
+                'input_matrix': lower_arm
             }
         }
         self.transforms_orig = dict()
@@ -132,9 +1479,6 @@ class TestHandAppendage(unittest.TestCase):
         self.joint_map = dict()
         self.controls = dict()
 
-        cmds.file(filepath, o=1, f=1) # Open Maya file
-        logger.setLevel(logging.DEBUG)
-
         for side in self.sides:
             # Read initial transforms on joints
             self.transforms_orig[side] = utils.read_transforms_hierarchy(
@@ -146,6 +1490,9 @@ class TestHandAppendage(unittest.TestCase):
                                  self.settings['Hand']['num_lowerTwist_joint'],
                                  self.settings['Hand']['input_matrix'].rename(side=side).output() + '.worldMatrix[0]')
             self.hands[side] = rig_hand
+            # In a rig the arm drives the wrist bind joint, here the wrist control stands in for it
+            matrix_tools.matrix_parent_constraint(rig_hand.fk_ctrl[rig_hand.wrist_bnd],
+                                                  rig_hand.wrist_bnd)
             # Get Joint Transforms
             self.bnd_jnt[side] = rig_hand.bnd_jnt
             jnt_bnd = [x for branch in rig_hand.skeleton_bnd for x in branch]
@@ -168,6 +1515,9 @@ class TestHandAppendage(unittest.TestCase):
             self.controls[side] = {**rig_hand.fk_ctrl, **rig_hand.ik_ctrl} # Ignore pv controls for now
             self.transforms_ctrl[side] = utils.read_transforms_list(self.controls[side].values())
 
+    def tearDown(self):
+        cmds.file(new=True, force=True)
+
     def get_sum(self, tuple1, tuple2):
         # Sum each coordinate (x,y,z) in two tuples
         return tuple(map(lambda x,y: x+y, tuple1, tuple2))
@@ -315,78 +1665,7 @@ class TestHandAppendage(unittest.TestCase):
         logger.info('Passed test scale check')
 
 
-def parse_args(sys_argv):
-    # Handle arguments filename, filepath, projectname
-    parser = argparse.ArgumentParser(description='Read input Maya filename')
-    parser.add_argument('-f', '--filename', action='store', required=False)
-    parser.add_argument('-fp', '--filepath', action='store', required=False)
-    parser.add_argument('-p', '--projectname', action='store', required=False)
-    #parser.add_argument('nargs', nargs=argparse.REMAINDER)
-    options, args = parser.parse_known_args(sys_argv)
-
-    if not options.filename: # Filename given
-        options.filename = 'rigging_skeleton_v04.ma'
-        if not options.filepath:
-            logger.warning(f"Required argument Maya filename. Assuming default '{options.filename}'")
-
-    if options.filepath: # Filepath given
-        if os.path.isfile(options.filepath): # Check if filepath exists
-            if cmds.file(options.filepath, q=True, ex=True):
-                options.filename = os.path.basename(options.filepath)
-            else:
-                logger.error(f"File '{options.filepath}' does not exist")
-                sys.exit(0)
-        elif os.path.isdir(options.filepath):
-            filepath = os.path.join(options.filepath, options.filename)
-            if cmds.file(filepath, q=True, ex=True):
-                options.filepath = filepath
-            else:
-                logger.error(f"Directory '{options.filepath}' does not contain file '{options.filename}'")
-                sys.exit(0)
-        else:
-            logger.error(f"Unrecognized file path '{options.filepath}'")
-            sys.exit(0)
-
-    else: # No filepath given
-        if options.projectname:
-            logger.debug('Attempt to detect project directory..')
-            # Check if project exists
-            filepath = os.path.join(cmds.workspace(q=True, dir=True), options.projectname)
-            if not os.path.exists(filepath): # Try default rootDirectory
-                logger.warning(f"Project '{options.projectname}' could not be found. Path: {filepath}")
-                filepath = cmds.workspace(q=True, rd=True)
-            # Check if file exists in project directory
-            filepath = os.path.join(filepath, 'scenes', options.filename)
-            if cmds.file(filepath, q=True, ex=True):
-                options.filepath = filepath
-            else:
-                logger.error(f"File '{options.filename}' not found in project '{options.projectname}'. Path: {filepath}")
-                sys.exit(0)
-
-        else: # No projectname given
-            # Check if filename is filepath
-            if cmds.file(options.filename, q=True, ex=True):
-                options.filename = os.path.basename(options.filename)
-                options.filepath = options.filename
-
-            else: # Check current directory for file
-                currentpath = os.path.dirname(os.path.realpath(__file__))
-                filepath = os.path.join(currentpath, options.filename)
-                if cmds.file(filepath, q=True, ex=True):
-                    options.filepath = filepath
-                else:
-                    logger.error(f"File '{options.filename}' not found in current directory. Optionally provide filepath(-fp) or projectname(-p) as arguments.")
-                    sys.exit(0)
-
-    logger.info(f'FILENAME: {options.filename}')
-    logger.info(f'FILEPATH: {options.filepath}')
-    return options
-
-
 if __name__ == '__main__':
-    # Parse arguments
-    args = parse_args(sys.argv)
-
     # Create Test Loader
     test_loader = unittest.TestLoader()
     # Create Test Suite
@@ -395,6 +1674,25 @@ if __name__ == '__main__':
     # Add Test Cases
     test_rigname = test_loader.getTestCaseNames(TestRigName)
     test_utils = test_loader.getTestCaseNames(TestUtilities)
+    test_ik_solver = test_loader.getTestCaseNames(TestIkSolver)
+    test_twist = test_loader.getTestCaseNames(TestTwist)
+    test_surface_query = test_loader.getTestCaseNames(TestSurfaceQuery)
+    test_hand_traversal = test_loader.getTestCaseNames(TestHandTraversal)
+    test_build_scheduler = test_loader.getTestCaseNames(TestBuildScheduler)
+    test_build_profiler = test_loader.getTestCaseNames(TestBuildProfiler)
+    test_node_handle = test_loader.getTestCaseNames(TestNodeHandle)
+    test_cmds_tracer = test_loader.getTestCaseNames(TestCmdsTracer)
+    test_build_cache = test_loader.getTestCaseNames(TestBuildCache)
+    test_rig_description = test_loader.getTestCaseNames(TestRigDescription)
+    test_control_registry = test_loader.getTestCaseNames(TestControlRegistry)
+    test_bake_format = test_loader.getTestCaseNames(TestBakeFormat)
+    test_anim_exporter = test_loader.getTestCaseNames(TestAnimExporter)
+    test_key_reduction = test_loader.getTestCaseNames(TestKeyReduction)
+    test_bake_shards = test_loader.getTestCaseNames(TestBakeShards)
+    test_memory_usage = test_loader.getTestCaseNames(TestMemoryUsage)
+    test_build_farm = test_loader.getTestCaseNames(TestBuildFarm)
+    test_fake_maya = test_loader.getTestCaseNames(TestFakeMaya)
+    test_skeleton_generator = test_loader.getTestCaseNames(TestSkeletonGenerator)
     test_root = test_loader.getTestCaseNames(TestRootAppendage)
     test_hand = test_loader.getTestCaseNames(TestHandAppendage)
 
@@ -402,11 +1700,50 @@ if __name__ == '__main__':
         suite.addTest(TestRigName(test))
     for test in test_utils:
         suite.addTest(TestUtilities(test))
+    for test in test_ik_solver:
+        suite.addTest(TestIkSolver(test))
+    for test in test_twist:
+        suite.addTest(TestTwist(test))
+    for test in test_surface_query:
+        suite.addTest(TestSurfaceQuery(test))
+    for test in test_hand_traversal:
+        suite.addTest(TestHandTraversal(test))
+    for test in test_build_scheduler:
+        suite.addTest(TestBuildScheduler(test))
+    for test in test_build_profiler:
+        suite.addTest(TestBuildProfiler(test))
+    for test in test_node_handle:
+        suite.addTest(TestNodeHandle(test))
+    for test in test_cmds_tracer:
+        suite.addTest(TestCmdsTracer(test))
+    for test in test_build_cache:
+        suite.addTest(TestBuildCache(test))
+    for test in test_rig_description:
+        suite.addTest(TestRigDescription(test))
+    for test in test_control_registry:
+        suite.addTest(TestControlRegistry(test))
+    for test in test_bake_format:
+        suite.addTest(TestBakeFormat(test))
+    for test in test_anim_exporter:
+        suite.addTest(TestAnimExporter(test))
+    for test in test_key_reduction:
+        suite.addTest(TestKeyReduction(test))
+    for test in test_bake_shards:
+        suite.addTest(TestBakeShards(test))
+    for test in test_memory_usage:
+        suite.addTest(TestMemoryUsage(test))
+    for test in test_build_farm:
+        suite.addTest(TestBuildFarm(test))
+    for test in test_fake_maya:
+        suite.addTest(TestFakeMaya(test))
+    for test in test_skeleton_generator:
+        suite.addTest(TestSkeletonGenerator(test))
     for test in test_root:
         suite.addTest(TestRootAppendage(test))
     for test in test_hand:
-        suite.addTest(TestHandAppendage(test, args.filepath))
+        suite.addTest(TestHandAppendage(test))
 
     # Run Test
-    unittest.TextTestRunner(verbosity=2).run(suite)
+    result = unittest.TextTestRunner(verbosity=2).run(suite)
+    sys.exit(not result.wasSuccessful())
     #unittest.main(verbosity=2, argv=[sys_argv[0]])
@@ -0,0 +1,331 @@
+'''
+twist.py
+
+Twist joint distribution for two-bone limbs.
+
+Each segment (start->middle, middle->end) gets one small matrix network that extracts the twist
+of the segment's end around the bone axis (X) and one blendMatrix per twist joint that slerps
+from the segment start towards the twisted end by the joint's weight. There are no constraints
+and no per-joint extraction nodes.
+
+The NumPy functions are a reference implementation of the same math, used by tests.py and by
+compare_twist_setups() to check the node network.
+
+Matrices follow Maya's row-vector layout: rows 0-2 are the x/y/z axes, row 3 is the translation,
+and child_world = child_local * parent_world.
+
+e.g.
+import adv_scripting.twist as twist
+weights = twist.twist_weights(start_pos, end_pos, twist_positions)
+matrices = twist.distribute_twist(start_matrix, end_matrix, weights)
+'''
+import logging
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# WEIGHTS ==============================================================
+
+def twist_weights(start, end, positions):
+    '''
+    Weight of each twist joint along a segment, 0 at start and 1 at end.
+
+    Arguments:
+    start (float tuple): world position of the segment start joint
+    end (float tuple): world position of the segment end joint
+    positions (float list): (N,3) world positions of the twist joints
+
+    Returns numpy array (N,)
+    '''
+    start = np.asarray(start, dtype=float)
+    end = np.asarray(end, dtype=float)
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    segment = end - start
+    length_sq = float(segment @ segment)
+    if length_sq == 0.0:
+        return np.zeros(len(positions))
+    return np.clip((positions - start) @ segment / length_sq, 0.0, 1.0)
+
+
+def even_weights(num_twist_joints):
+    '''
+    Evenly spaced weights for num_twist_joints, excluding the start and end of the segment.
+    '''
+    return np.arange(1, num_twist_joints + 1) / (num_twist_joints + 1.0)
+
+
+# NUMPY REFERENCE ======================================================
+
+def matrix_to_quaternion(matrices):
+    '''
+    Convert (...,4,4) or (...,3,3) row-vector matrices to (...,4) quaternions (x, y, z, w).
+    '''
+    matrices = np.asarray(matrices, dtype=float)
+    # Maya's rows are the axes, the usual formulas expect columns
+    r = np.swapaxes(matrices[..., :3, :3], -1, -2)
+    trace = r[..., 0, 0] + r[..., 1, 1] + r[..., 2, 2]
+    # Candidates for each branch of the conversion, pick the numerically stable one
+    q = np.empty(matrices.shape[:-2] + (4,))
+    w_big = trace > 0
+    x_big = ~w_big & (r[..., 0, 0] >= r[..., 1, 1]) & (r[..., 0, 0] >= r[..., 2, 2])
+    y_big = ~w_big & ~x_big & (r[..., 1, 1] >= r[..., 2, 2])
+    z_big = ~w_big & ~x_big & ~y_big
+
+    s = np.sqrt(np.maximum(trace[w_big] + 1.0, 0.0)) * 2.0
+    rw = r[w_big]
+    q[w_big] = np.stack([(rw[:, 2, 1] - rw[:, 1, 2]) / s,
+                         (rw[:, 0, 2] - rw[:, 2, 0]) / s,
+                         (rw[:, 1, 0] - rw[:, 0, 1]) / s,
+                         0.25 * s], axis=-1)
+    rx = r[x_big]
+    s = np.sqrt(np.maximum(1.0 + rx[:, 0, 0] - rx[:, 1, 1] - rx[:, 2, 2], 0.0)) * 2.0
+    q[x_big] = np.stack([0.25 * s,
+                         (rx[:, 0, 1] + rx[:, 1, 0]) / s,
+                         (rx[:, 0, 2] + rx[:, 2, 0]) / s,
+                         (rx[:, 2, 1] - rx[:, 1, 2]) / s], axis=-1)
+    ry = r[y_big]
+    s = np.sqrt(np.maximum(1.0 + ry[:, 1, 1] - ry[:, 0, 0] - ry[:, 2, 2], 0.0)) * 2.0
+    q[y_big] = np.stack([(ry[:, 0, 1] + ry[:, 1, 0]) / s,
+                         0.25 * s,
+                         (ry[:, 1, 2] + ry[:, 2, 1]) / s,
+                         (ry[:, 0, 2] - ry[:, 2, 0]) / s], axis=-1)
+    rz = r[z_big]
+    s = np.sqrt(np.maximum(1.0 + rz[:, 2, 2] - rz[:, 0, 0] - rz[:, 1, 1], 0.0)) * 2.0
+    q[z_big] = np.stack([(rz[:, 0, 2] + rz[:, 2, 0]) / s,
+                         (rz[:, 1, 2] + rz[:, 2, 1]) / s,
+                         0.25 * s,
+                         (rz[:, 1, 0] - rz[:, 0, 1]) / s], axis=-1)
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def quaternion_to_matrix(quaternions):
+    '''
+    Convert (...,4) quaternions (x, y, z, w) to (...,3,3) row-vector rotation matrices.
+    '''
+    q = np.asarray(quaternions, dtype=float)
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    x, y, z, w = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    r = np.stack([
+        np.stack([1 - 2*(y*y + z*z), 2*(x*y - z*w), 2*(x*z + y*w)], axis=-1),
+        np.stack([2*(x*y + z*w), 1 - 2*(x*x + z*z), 2*(y*z - x*w)], axis=-1),
+        np.stack([2*(x*z - y*w), 2*(y*z + x*w), 1 - 2*(x*x + y*y)], axis=-1)], axis=-2)
+    return np.swapaxes(r, -1, -2)
+
+
+def extract_twist(quaternions, axis=0):
+    '''
+    Twist part of a swing/twist decomposition around axis (0=x, 1=y, 2=z).
+    Same as keeping the axis and w components of the quaternion and normalizing.
+    '''
+    q = np.asarray(quaternions, dtype=float)
+    twist = np.zeros_like(q)
+    twist[..., axis] = q[..., axis]
+    twist[..., 3] = q[..., 3]
+    length = np.linalg.norm(twist, axis=-1, keepdims=True)
+    identity = np.zeros_like(q)
+    identity[..., 3] = 1.0
+    return np.where(length > 1e-9, twist / np.where(length > 1e-9, length, 1.0), identity)
+
+
+def slerp(q0, q1, t):
+    '''
+    Spherical linear interpolation between quaternions, broadcast over q0, q1 and t.
+    Takes the shortest path like blendMatrix does.
+    '''
+    q0 = np.asarray(q0, dtype=float)
+    q1 = np.asarray(q1, dtype=float)
+    t = np.asarray(t, dtype=float)[..., None]
+    dot = np.sum(q0 * q1, axis=-1, keepdims=True)
+    q1 = np.where(dot < 0.0, -q1, q1)
+    dot = np.abs(dot)
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_theta = np.sin(theta)
+    # Fall back to lerp for (nearly) identical rotations
+    small = sin_theta < 1e-6
+    safe = np.where(small, 1.0, sin_theta)
+    w0 = np.where(small, 1.0 - t, np.sin((1.0 - t) * theta) / safe)
+    w1 = np.where(small, t, np.sin(t * theta) / safe)
+    q = w0 * q0 + w1 * q1
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def distribute_twist(start_matrices, end_matrices, weights, axis=0):
+    '''
+    Reference implementation of create_twist_network().
+
+    Arguments:
+    start_matrices (float array): (...,4,4) world matrices of the segment start, e.g. one per frame
+    end_matrices (float array): (...,4,4) world matrices of the segment end
+    weights (float list): (N,) weight per twist joint
+    axis (int): bone axis to extract the twist around
+
+    Returns numpy array (...,N,4,4) of twist joint world matrices
+    '''
+    start = np.asarray(start_matrices, dtype=float)
+    end = np.asarray(end_matrices, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+
+    # End in the space of start, then keep only the twist around the bone axis
+    local = end @ np.linalg.inv(start)
+    twist_q = extract_twist(matrix_to_quaternion(local), axis)
+    twist_local = np.zeros(local.shape)
+    twist_local[..., :3, :3] = quaternion_to_matrix(twist_q)
+    twist_local[..., 3, :3] = local[..., 3, :3]
+    twist_local[..., 3, 3] = 1.0
+    target = twist_local @ start
+
+    # blendMatrix: lerp translation, slerp rotation, from start (weight 0) to target (weight 1)
+    identity_q = np.zeros(twist_q.shape)
+    identity_q[..., 3] = 1.0
+    rotation_q = slerp(identity_q[..., None, :], twist_q[..., None, :], weights)
+    result = np.zeros(start.shape[:-2] + (len(weights), 4, 4))
+    result[..., :3, :3] = quaternion_to_matrix(rotation_q) @ start[..., None, :3, :3]
+    result[..., 3, :3] = ((1.0 - weights)[:, None] * start[..., None, 3, :3] +
+                          weights[:, None] * target[..., None, 3, :3])
+    result[..., 3, 3] = 1.0
+    return result
+
+
+# MAYA NODE NETWORKS ===================================================
+
+def create_twist_network(start_matrix, end_matrix, weights, name):
+    '''
+    Build the twist network for one segment.
+
+    start_matrix -> inverseMatrix -+
+    end_matrix --------------------+-> multMatrix -> decomposeMatrix -> quatNormalize(x,0,0,w)
+                                        -> composeMatrix -> multMatrix(* start) = twisted end
+    then one blendMatrix per twist joint from start_matrix to the twisted end.
+
+    Arguments:
+    start_matrix (str): world matrix plug of the segment start, e.g. 'lt_arm_blendMatrix.outputMatrix'
+    end_matrix (str): world matrix plug of the segment end
+    weights (float list): weight per twist joint
+    name (str): base name for the created nodes
+
+    Returns dict
+        'outputs' (str list): world matrix plug per twist joint
+        'nodes' (str list): all created nodes
+    '''
+    import maya.cmds as cmds
+    cmds.loadPlugin('matrixNodes', quiet=True)
+    cmds.loadPlugin('quatNodes', quiet=True)
+
+    nodes = list()
+    inverse = cmds.createNode('inverseMatrix', n=f'{name}_start_inverseMatrix')
+    cmds.connectAttr(start_matrix, f'{inverse}.inputMatrix')
+    local = cmds.createNode('multMatrix', n=f'{name}_local_multMatrix')
+    cmds.connectAttr(end_matrix, f'{local}.matrixIn[0]')
+    cmds.connectAttr(f'{inverse}.outputMatrix', f'{local}.matrixIn[1]')
+    decompose = cmds.createNode('decomposeMatrix', n=f'{name}_decomposeMatrix')
+    cmds.connectAttr(f'{local}.matrixSum', f'{decompose}.inputMatrix')
+
+    # Swing/twist: only keep the bone axis and w of the quaternion
+    normalize = cmds.createNode('quatNormalize', n=f'{name}_quatNormalize')
+    cmds.connectAttr(f'{decompose}.outputQuatX', f'{normalize}.inputQuatX')
+    cmds.connectAttr(f'{decompose}.outputQuatW', f'{normalize}.inputQuatW')
+    compose = cmds.createNode('composeMatrix', n=f'{name}_composeMatrix')
+    cmds.setAttr(f'{compose}.useEulerRotation', 0)
+    cmds.connectAttr(f'{normalize}.outputQuat', f'{compose}.inputQuat')
+    cmds.connectAttr(f'{decompose}.outputTranslate', f'{compose}.inputTranslate')
+    target = cmds.createNode('multMatrix', n=f'{name}_target_multMatrix')
+    cmds.connectAttr(f'{compose}.outputMatrix', f'{target}.matrixIn[0]')
+    cmds.connectAttr(start_matrix, f'{target}.matrixIn[1]')
+    nodes.extend([inverse, local, decompose, normalize, compose, target])
+
+    outputs = list()
+    for index, weight in enumerate(weights):
+        blend = cmds.createNode('blendMatrix', n=f'{name}_{index+1:02}_blendMatrix')
+        cmds.connectAttr(start_matrix, f'{blend}.inputMatrix')
+        cmds.connectAttr(f'{target}.matrixSum', f'{blend}.target[0].targetMatrix')
+        cmds.setAttr(f'{blend}.target[0].weight', float(weight))
+        outputs.append(f'{blend}.outputMatrix')
+        nodes.append(blend)
+
+    return {'outputs': outputs, 'nodes': nodes}
+
+
+def create_constraint_twist(start, end, twist_joints, weights):
+    '''
+    Naive twist setup used as the baseline in compare_twist_setups(): a weighted point and
+    orient constraint stack on every twist joint.
+
+    Returns list of created constraint nodes.
+    '''
+    import maya.cmds as cmds
+    nodes = list()
+    for joint, weight in zip(twist_joints, weights):
+        point = cmds.pointConstraint(start, end, joint)[0]
+        orient = cmds.orientConstraint(start, end, joint)[0]
+        cmds.setAttr(f'{orient}.interpType', 2) # Shortest
+        for constraint in (point, orient):
+            targets = cmds.listAttr(f'{constraint}', ud=True)
+            cmds.setAttr(f'{constraint}.{targets[0]}', 1.0 - weight)
+            cmds.setAttr(f'{constraint}.{targets[1]}', weight)
+        nodes.extend([point, orient])
+    return nodes
+
+
+def compare_twist_setups(num_twist_joints=4, frames=100, length=10.0):
+    '''
+    Build the matrix network and the constraint setup on the same test segment, twist the end
+    over frames and report node counts, playback time and the error against distribute_twist().
+
+    In Maya Script Editor (python), run:
+    import adv_scripting.twist as twist
+    twist.compare_twist_setups()
+
+    Returns dict of results for 'network' and 'constraint'.
+    '''
+    import maya.cmds as cmds
+    weights = even_weights(num_twist_joints)
+    results = dict()
+
+    for setup in ('network', 'constraint'):
+        before = set(cmds.ls(dep=True))
+        start = cmds.createNode('transform', n=f'twist_{setup}_start')
+        end = cmds.createNode('transform', n=f'twist_{setup}_end')
+        cmds.setAttr(f'{end}.translateX', length)
+        twist_joints = [cmds.createNode('joint', n=f'twist_{setup}_{i+1:02}_jnt')
+                        for i in range(num_twist_joints)]
+        cmds.setKeyframe(end, at='rotateX', t=0, v=0)
+        cmds.setKeyframe(end, at='rotateX', t=frames, v=170)
+        setup_nodes = set(cmds.ls(dep=True))
+
+        if setup == 'network':
+            network = create_twist_network(f'{start}.worldMatrix[0]',
+                                           f'{end}.worldMatrix[0]',
+                                           weights,
+                                           name=f'twist_{setup}')
+            for joint, output in zip(twist_joints, network['outputs']):
+                cmds.connectAttr(output, f'{joint}.offsetParentMatrix')
+        else:
+            create_constraint_twist(start, end, twist_joints, weights)
+        created = set(cmds.ls(dep=True)) - setup_nodes
+
+        # Playback
+        sampled = np.zeros((frames + 1, num_twist_joints, 4, 4))
+        end_matrices = np.zeros((frames + 1, 4, 4))
+        timer = time.perf_counter()
+        for frame in range(frames + 1):
+            cmds.currentTime(frame, e=True)
+            for index, joint in enumerate(twist_joints):
+                sampled[frame, index] = np.reshape(cmds.getAttr(f'{joint}.worldMatrix[0]'), (4, 4))
+        playback = time.perf_counter() - timer
+        for frame in range(frames + 1):
+            end_matrices[frame] = np.reshape(cmds.getAttr(f'{end}.worldMatrix[0]', t=frame), (4, 4))
+
+        start_matrices = np.broadcast_to(np.reshape(cmds.getAttr(f'{start}.worldMatrix[0]'), (4, 4)),
+                                         end_matrices.shape)
+        reference = distribute_twist(start_matrices, end_matrices, weights)
+        results[setup] = {'nodes': len(created),
+                          'playback_seconds': playback,
+                          'fps': (frames + 1) / playback if playback else float('inf'),
+                          'max_error': float(np.abs(sampled - reference).max())}
+
+        cmds.delete(list(set(cmds.ls(dep=True)) - before))
+        logger.info(f"{setup}: {results[setup]}")
+
+    return results
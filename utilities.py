@@ -11,6 +11,7 @@ util.create_control_joints_from_skeleton('lt_shoulder_bnd_jnt', 'lt_hand_bnd_jnt
 import maya.api.OpenMaya as om
 import adv_scripting.rig_name as rig_name
 import adv_scripting.matrix_tools as matrix_tools
+import adv_scripting.surface_query as surface_query
 import maya.cmds as cmds
 import logging
 
@@ -18,6 +19,7 @@ logger = logging.getLogger()
 
 import importlib as il
 il.reload(matrix_tools)
+il.reload(surface_query)
 
 
 def create_fk_control(joint, connect_output=None, parent_control=None, rotate_order='xyz'):
@@ -61,6 +63,35 @@ def read_hierarchy(joint, end_joint=None):
     return joint_map
 
 
+def read_children_index(node, node_type='joint'):
+    '''
+    Snapshot of a hierarchy with a single listRelatives query.
+
+    Arguments
+    node (str): root of the hierarchy
+    node_type (str/None): only include descendants of this type
+
+    Returns
+    children_index (dict) (str->str list): mapping of node to its children, in DAG order.
+        Every node in the hierarchy has an entry, leaves map to an empty list.
+    '''
+    root = cmds.ls(node, long=True)[0]
+    if node_type:
+        descendants = cmds.listRelatives(root, ad=True, f=True, type=node_type) or []
+    else:
+        descendants = cmds.listRelatives(root, ad=True, f=True) or []
+    # listRelatives -ad lists leaves first, reversed it is a depth first walk in DAG order
+    descendants.reverse()
+
+    root_name = root.split('|')[-1]
+    children_index = {root_name: []}
+    for long_name in descendants:
+        parent, name = long_name.rsplit('|', 1)
+        children_index.setdefault(name, [])
+        children_index.setdefault(parent.split('|')[-1], []).append(name)
+    return children_index
+
+
 def rename_hierarchy(joint, end_joint=None, unlock=True):
     '''
     Rename hierarchy from joint to end_joint.
@@ -270,6 +301,14 @@ def create_control_joints_from_skeleton(start_joint,
     Returns list [start, middle, end] joints.
     Each item is a tuple of (<str name>, <rig_name.RigName object>)
     '''
+    if deleteTwist: # Only the control joints are needed, skip copying the twist joints
+        control_chains = create_control_chains(start_joint,
+                                               end_joint,
+                                               [control_type],
+                                               num_upperTwist_joint,
+                                               num_lowerTwist_joint)
+        return control_chains[str(control_type)]
+
     # Duplicate the skeleton and parent it to the world
     skeleton = duplicate_skeleton(start_joint, end_joint, tag='COPY')
     cmds.parent(skeleton, w=True)
@@ -301,6 +340,76 @@ def create_control_joints_from_skeleton(start_joint,
     return control_jnt
 
 
+def read_chain(start_joint, end_joint):
+    '''
+    Read a linear joint chain from start_joint to end_joint with a single query,
+    using the long name of end_joint.
+
+    Returns list of joint names, start to end.
+    '''
+    long_name = cmds.ls(end_joint, long=True)
+    if not long_name:
+        logger.error(f"End joint '{end_joint}' does not exist.")
+        return []
+    path = long_name[0].split('|')
+    start_name = start_joint.split('|')[-1]
+    if start_name not in path:
+        logger.error(f"'{end_joint}' is not below '{start_joint}'.")
+        return []
+    return path[path.index(start_name):]
+
+def create_control_chains(start_joint,
+                          end_joint,
+                          control_types,
+                          num_upperTwist_joint=0,
+                          num_lowerTwist_joint=0):
+    '''
+    Create [start, middle, end] control joints for several control types in one batch.
+    The source chain is read once, and only the three control joints are created for each
+    control type. Twist joints are never copied.
+    e.g. create_control_chains('lt_upArm_bnd_jnt_01', 'lt_hand_bnd_jnt', ['fk', 'ik'], 1, 1)
+
+    Arguments
+    start_joint (str): name of start joint
+    end_joint (str): name of end joint
+    control_types (list): control types such as 'fk', 'ik', 'switch', 'driver'
+    num_upperTwist_joint (int/None): number of upperTwist joints
+    num_lowerTwist_joint (int/None): number of lowerTwist joints
+
+    Returns dict (str->list) mapping control type to [start, middle, end] joints.
+    Each item is a tuple of (<str name>, <rig_name.RigName object>)
+    '''
+    chain = read_chain(start_joint, end_joint)
+    control_bnd = get_joint_twobone(chain, num_upperTwist_joint, num_lowerTwist_joint)
+    # World positions are read before anything is reparented
+    positions = [cmds.xform(joint, q=True, ws=True, t=True) for joint in control_bnd]
+
+    control_chains = dict()
+    for control_type in control_types:
+        control_jnt = list()
+        for joint, position in zip(control_bnd, positions):
+            jnt_rn = rig_name.RigName(joint).rename(control_type=control_type, rig_type='jnt')
+            # Check for duplicates, same as replace_hierarchy
+            if cmds.ls(jnt_rn.output()):
+                if jnt_rn.element:
+                    jnt_rn.rename(element=f'{jnt_rn.element.output()}_COPY')
+                else:
+                    jnt_rn.rename(element='COPY')
+            jnt = cmds.duplicate(joint, po=True, n=jnt_rn.output())[0]
+            if control_jnt:
+                cmds.parent(jnt, control_jnt[-1][0])
+            else:
+                cmds.parent(jnt, w=True)
+            cmds.xform(jnt, t=position, ws=True)
+            control_jnt.append((jnt, jnt_rn))
+        control_chains[str(control_type)] = control_jnt
+
+        logger.debug(f'Control Joints ({control_type}):')
+        for ctrl_jnt in control_jnt:
+            logger.debug(f'\t{ctrl_jnt}')
+    return control_chains
+
+
 # CREATE CONTROLS & GROUP ==============================================
 
 def create_control(node, parent=None, size=1, name=None):
@@ -844,17 +953,12 @@ def delete_useless_joint(root, keyword):
     return
 
 def getSurfaceCoordinate(surface, joint):
-    # Get the position of the joint
-    joint_position = cmds.xform(joint, query=True, translation=True, worldSpace=True)
-
-    # Determine the closest point on the surface to the joint
-    closest_point_info = cmds.skinPercent(surface, closestPoint=True, query=True, position=joint_position)
-
-    # Convert the closest point to UV coordinates
-    cmds.polyListComponentConversion(toUV=True)
-    uv_values = cmds.polyEditUV(query=True, u=True, v=True)
-
-    # Print the UV-coordinate values
-    print("UV Coordinates: U={}, V={}".format(uv_values[0], uv_values[1]))
+    '''
+    Closest point UV coordinate of joint on surface (mesh or nurbsSurface).
+    For more than one joint use surface_query.get_surface_coordinates, which builds the
+    lookup structure once for all joints.
 
-    return
+    Returns (u, v) tuple
+    '''
+    uvs = surface_query.get_surface_coordinates(surface, [joint])
+    return tuple(uvs[0])